@@ -0,0 +1,747 @@
+"""
+无界面批量测试（适用于无人值守/夜间测试）
+
+直接调用各模块的测量引擎（TestRunner / RinWorkflow / TimeDomain / SpectrumSNR ...），
+不创建测试窗口、不弹图片和对话框。按参数文件依次测试多个 DUT，整批只连接一次仪器，
+结果写入 输出目录/<DUT>/<模块>/，并生成汇总 CSV 与日志，进程退出码表示整批结果。
+
+用法（在项目根目录）：
+    python batch_runner.py batch.json              # 按参数文件运行
+    python batch_runner.py batch.json --no-prompt  # DUT 之间不等待回车（自动上下料）
+    python batch_runner.py --template CT-波长 CT-功率 > batch.json   # 生成参数模板
+
+参数文件（JSON）：
+    {
+        "output_dir": "C:\\\\PTS\\\\batch",
+        "modules": ["CT-波长", "CT-功率"],              # 按顺序执行，名称与 MODULE_MAP 一致
+        "params": {"CT-波长": {"osa_ip": "192.168.29.11", "groups": [1, 2]}},
+        "duts": ["SN001", {"id": "SN002", "params": {"CT-波长": {"current_mA": 300}}}],
+        "prompt_between_duts": true                      # 换 DUT 前等待回车
+    }
+    各模块参数键与对应测试窗口的参数一致，未填写的使用窗口默认值（见 --template 输出）。
+
+退出码：0 全部通过，1 有测试项失败，2 参数文件错误，130 被中断（Ctrl+C）。
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import traceback
+
+from main_platform import MODULE_MAP
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONFIG = 2
+EXIT_INTERRUPTED = 130
+
+
+def ensure_dir(path):
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def safe_name(text):
+    """DUT 编号/模块名用作目录名时去掉 Windows 不允许的字符"""
+    return "".join("_" if c in '\\/:*?"<>|' else c for c in str(text)).strip() or "_"
+
+
+def _close_visa(ctrl):
+    """关闭 *Controller 对象持有的 VISA 会话（inst / rm）"""
+    if ctrl is None:
+        return
+    for attr in ("inst", "rm"):
+        obj = getattr(ctrl, attr, None)
+        if obj is not None:
+            try:
+                obj.close()
+            except Exception:
+                pass
+
+
+# ==========================================
+# 测量引擎适配
+# ==========================================
+class Engine:
+    """
+    无界面测量引擎基类。
+    open():             连接仪器，整批只调用一次（多个 DUT 之间不重新打开仪器）
+    run(out_dir, dut):  测量一个 DUT，结果文件写入 out_dir，返回结果摘要 {名称: 值}；失败时抛出异常
+    close():            断开仪器
+    stop():             请求尽快结束当前测量
+    """
+    defaults = {}
+
+    def __init__(self, params, log):
+        self.params = dict(self.defaults)
+        self.params.update(params or {})
+        self.log = log
+
+    def open(self):
+        pass
+
+    def run(self, out_dir, dut):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _CTEngine(Engine):
+    """CT_W / CT_P / CT_L 共用：组1 温度扫描、组2 电流扫描，汇总 CSV 存在即视为该组完成"""
+    common_defaults = {
+        "current_mA": 360.0,
+        "t_start": 36.0,
+        "t_stop": 15.0,
+        "t_step": 1.0,
+        "laser_exe_path": r"C:\PTS\qijian\上位机软件\Preci_Semi\Preci-Seed.exe",
+        "group2_temp_C": 25.0,
+        "group2_start_mA": 400.0,
+        "group2_stop_mA": 0,
+        "group2_step_mA": 5.0,
+        "group1_delay_s": 5,
+        "group2_delay_s": 2,
+        "group1_summary_filename": "Test1_summary",
+        "group2_summary_filename": "Test2_summary",
+        "groups": [1, 2],           # 要执行的测试组
+        "require_laser": True,      # 上位机连接失败时是否判为失败（False 则仅用测量仪器继续）
+        "resume": False,            # 存在参数一致的未完成断点时从断点继续
+    }
+    plot_group1 = ""
+
+    def import_module(self):
+        raise NotImplementedError
+
+    def make_instrument(self, mod):
+        raise NotImplementedError
+
+    def open(self):
+        mod = self.import_module()
+        # 模块导入时设置了 TkAgg，无界面运行只需要保存图片
+        import matplotlib.pyplot as plt
+        plt.switch_backend("Agg")
+        p = self.params
+        self.laser = mod.LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+        try:
+            self.laser.connect()
+        except Exception as e:
+            if p.get("require_laser", True):
+                raise RuntimeError(f"激光控制软件连接失败: {e}")
+            self.log(f"[警告] 激光控制软件连接失败，仅使用测量仪器继续: {e}")
+            self.laser = None
+        self.inst = self.make_instrument(mod)
+        self.runner = mod.TestRunner(self.laser, self.inst, log_func=self.log)
+
+    def before_group1(self):
+        pass
+
+    def _summary_path(self, out_dir, name):
+        if not name.lower().endswith(".csv"):
+            name += ".csv"
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            raise RuntimeError(f"未生成汇总文件 {name}，请查看日志")
+        return path
+
+    def run(self, out_dir, dut):
+        p = self.params
+        save_path = out_dir + os.sep
+        groups = [int(g) for g in p.get("groups", [1, 2])]
+        results = {}
+        self.runner._stop = False
+        if 1 in groups:
+            self.before_group1()
+            self.runner.run_group1(start_temp=float(p["t_start"]), end_temp=float(p["t_stop"]),
+                                   step=float(p["t_step"]), save_path=save_path,
+                                   delay_s=float(p["group1_delay_s"]),
+                                   summary_filename=p["group1_summary_filename"],
+                                   current_mA=float(p["current_mA"]), resume=bool(p.get("resume", False)))
+            getattr(self.runner, self.plot_group1)(save_path, summary_filename=p["group1_summary_filename"])
+            results["组1汇总"] = self._summary_path(out_dir, p["group1_summary_filename"])
+        if 2 in groups:
+            self.runner.run_group2(start_mA=float(p["group2_start_mA"]), step_mA=float(p["group2_step_mA"]),
+                                   stop_mA=float(p["group2_stop_mA"]), temp_C=float(p["group2_temp_C"]),
+                                   save_path=save_path, delay_s=float(p["group2_delay_s"]),
+                                   summary_filename=p["group2_summary_filename"],
+                                   resume=bool(p.get("resume", False)))
+            results["组2汇总"] = self._summary_path(out_dir, p["group2_summary_filename"])
+        return results
+
+    def close(self):
+        _close_visa(getattr(self, "inst", None))
+
+    def stop(self):
+        runner = getattr(self, "runner", None)
+        if runner is not None:
+            runner.stop()
+
+
+class CTWavelengthEngine(_CTEngine):
+    defaults = dict(_CTEngine.common_defaults, osa_ip="192.168.29.11")
+    plot_group1 = "plot_group1_wavelength_vs_temperature"
+
+    def import_module(self):
+        from qijian import CT_W
+        return CT_W
+
+    def make_instrument(self, mod):
+        osa = mod.OSAController(resource=f"TCPIP0::{self.params['osa_ip']}::INSTR", log_func=self.log)
+        osa.connect()
+        return osa
+
+
+class CTPowerEngine(_CTEngine):
+    defaults = dict(_CTEngine.common_defaults, usb_resource="", group2_stop_mA=0.5)
+    plot_group1 = "plot_group1_power_vs_temperature"
+
+    def import_module(self):
+        from qijian import CT_P
+        return CT_P
+
+    def make_instrument(self, mod):
+        if not self.params.get("usb_resource"):
+            raise RuntimeError("未填写 USB 资源地址 (usb_resource)")
+        pm = mod.PowerMeterController(resource=self.params["usb_resource"], log_func=self.log)
+        pm.connect()
+        return pm
+
+
+class CTLinewidthEngine(_CTEngine):
+    defaults = dict(_CTEngine.common_defaults, osa_ip="192.168.29.11", fine_center_C=25.0, fine_range_C=1.0)
+    plot_group1 = "plot_group1_linewidth_vs_temperature"
+
+    def import_module(self):
+        from qijian import CT_L
+        return CT_L
+
+    def make_instrument(self, mod):
+        sa = mod.SpectrumAnalyzerController(resource=f"TCPIP0::{self.params['osa_ip']}::INSTR", log_func=self.log)
+        sa.connect()
+        return sa
+
+    def before_group1(self):
+        self.runner.fine_center_C = self.params.get("fine_center_C")
+        self.runner.fine_range_C = self.params.get("fine_range_C")
+
+
+class Rin4051Engine(Engine):
+    defaults = {
+        "IP_ADDRESS": "192.168.7.10",
+        "DC_INPUT": 2.40,
+        "AMPLIFICATION": 14,
+        "POINTS": 2001,
+    }
+    report_hz = (1000, 10000, 100000, 1000000)
+
+    def open(self):
+        from zhongzi.Rin_4051 import Rin_4051
+        self.analyzer = Rin_4051(ip=self.params["IP_ADDRESS"], log_callback=self.log)
+        if not self.analyzer.connect():
+            raise RuntimeError(f"无法连接到频谱仪 {self.params['IP_ADDRESS']}")
+        self.workflow = None
+
+    def run(self, out_dir, dut):
+        from zhongzi.Rin_4051 import RinWorkflow, DEFAULT_SEGMENTS
+        p = self.params
+        wf = RinWorkflow(self.analyzer, output_dir=out_dir, log_callback=self.log)
+        wf.dc_value = float(p["DC_INPUT"]) / 2.0
+        wf.amplification = float(p["AMPLIFICATION"])
+        wf.points_expected = int(p["POINTS"])
+        wf.segments = DEFAULT_SEGMENTS.copy()
+        self.workflow = wf
+        if not wf.run_measurement(prefer_binary=True, save_csv=True, save_dat=True):
+            raise RuntimeError("测量未完成（被中止）")
+        if not wf.rin_ddx:
+            raise RuntimeError("没有有效的 RIN 数据")
+        return write_rin_result(out_dir, wf.rin_ddx, wf.rin_ddy, wf.rin_power, self.report_hz, self.log)
+
+    def close(self):
+        try:
+            self.analyzer.close()
+        except Exception:
+            pass
+
+    def stop(self):
+        if self.workflow is not None:
+            self.workflow.request_stop()
+
+
+class RinFSV3004Engine(Engine):
+    defaults = {
+        "osa_ip": "192.168.7.10",
+        "dc_initial": 2.40,
+    }
+    report_hz = (1000, 10000, 100000, 1000000)
+
+    def open(self):
+        from zhongzi.Rin_FSV3004 import RinAnalyzer
+        # 模块导入时设置了 TkAgg，无界面运行只需要保存图片
+        import matplotlib.pyplot as plt
+        plt.switch_backend("Agg")
+        self.ra = RinAnalyzer(log_func=self.log)
+        if not self.ra.connect(self.params["osa_ip"], 5025):
+            raise RuntimeError(f"无法连接到频谱仪 {self.params['osa_ip']}")
+        self.ra.configure_instrument()
+
+    def run(self, out_dir, dut):
+        from zhongzi.Rin_FSV3004 import DEFAULT_SEGMENTS
+        ra = self.ra
+        ra.stop_flag = False
+        ra.dc_value = float(self.params["dc_initial"]) / 2.0
+        # 仪器把数据复制到电脑共享目录，先删掉上一个 DUT 的文件，避免读到旧数据
+        for path in ra.file_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        for start, stop, bw, avg, fname in DEFAULT_SEGMENTS:
+            if ra.stop_flag:
+                raise RuntimeError("测量被中止")
+            self.log(f"[测试] 正在测量: {start}Hz - {stop}Hz, 带宽: {bw}Hz")
+            if not ra.measure_segment(start, stop, bw, avg, fname):
+                raise RuntimeError(f"分段 {fname} 测量失败")
+        ra.process_files()
+        if not ra.ddx:
+            raise RuntimeError("没有有效的 RIN 数据")
+        for path in ra.file_paths:
+            if os.path.exists(path):
+                shutil.copy2(path, out_dir)
+        return write_rin_result(out_dir, ra.ddx, ra.ddy, ra.RIN_power, self.report_hz, self.log)
+
+    def close(self):
+        self.ra.close()
+
+    def stop(self):
+        self.ra.request_stop()
+
+
+def write_rin_result(out_dir, ddx, ddy, rin_power, report_hz, log):
+    """保存 RIN 曲线 CSV，返回指定频点 RIN 值与 10MHz 积分 RMS（替代窗口模式下的结果弹窗）"""
+    path = os.path.join(out_dir, "RIN_result.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Frequency_Hz", "RIN_dBc_Hz"])
+        w.writerows(zip(ddx, ddy))
+    log(f"[保存] RIN 曲线已保存到: {path}")
+    results = {}
+    for hz in report_hz:
+        idx = min(range(len(ddx)), key=lambda i: abs(ddx[i] - hz))
+        results[f"RIN@{hz:g}Hz(dBc/Hz)"] = round(float(ddy[idx]), 3)
+    if rin_power:
+        results["积分RMS(%)"] = round(float(rin_power[-1]) * 100, 4)
+    return results
+
+
+class LineWidthEngine(Engine):
+    defaults = {
+        "中心频率(MHZ)": "80",
+        "RBW(HZ)": "100",
+        "N dB down": "20",
+        "频谱仪IP": "192.168.7.10",
+        "信号发生器IP": "192.168.7.11",
+        "仪器本地图片路径": r"C:\PTS\zhongzi\LineWidth\image.png",
+        "仪器本地数据路径": r"C:\PTS\zhongzi\LineWidth\data.csv",
+        "输出目录": r"\\192.168.7.7\PTS\zhongzi\LineWidth",     # 仪器可访问的共享目录
+    }
+
+    def open(self):
+        from zhongzi.LineWidth import LinewidthTester, SignalGenerator
+        self.tester = LinewidthTester(log_callback=self.log)
+        self.tester.connect(self.params["频谱仪IP"])
+        self.gen = SignalGenerator(log_callback=self.log)
+        self.gen.connect(self.params["信号发生器IP"])
+
+    def _measure_span(self, span, suffix, shared_dir):
+        p = self.params
+        self.tester.configure(center_freq=p["中心频率(MHZ)"], span=span, rbw=p["RBW(HZ)"], n_db_down=p["N dB down"])
+        if not self.tester.measure():
+            raise RuntimeError(f"Span {span}kHz 测量被中止")
+        base_name = os.path.splitext(os.path.basename(p["仪器本地图片路径"]))[0]
+        image = os.path.join(os.path.dirname(p["仪器本地图片路径"]), f"{base_name}_{suffix}.png")
+        trace = os.path.join(os.path.dirname(p["仪器本地数据路径"]), f"{base_name}_{suffix}.csv")
+        return self.tester.save_data(instr_image_path=image, instr_trace_csv=trace, pc_shared_folder=shared_dir)
+
+    def run(self, out_dir, dut):
+        from zhongzi.LineWidth import DEFAULT_SPANS_KHZ
+        self.tester.stop_flag.clear()
+        # 仪器只能写入共享目录：每个 DUT 使用共享目录下的子目录，测完复制到结果目录
+        shared_dir = ensure_dir(os.path.join(self.params["输出目录"], safe_name(dut)))
+        self.tester.inst.write("MMEM:MDIR 'C:\\PTS\\zhongzi\\LineWidth'")
+        self.tester.inst.write("MMEM:DEL 'C:\\PTS\\zhongzi\\LineWidth\\*.*'")
+
+        images = []
+        for span in DEFAULT_SPANS_KHZ:
+            self.log(f"[Span测试] 开始测试Span: {span}")
+            images.append(self._measure_span(span, span, shared_dir))
+
+        # 信号源加 1V 偏置后，Span=500kHz 再测一次
+        self.gen.configure(waveform="SIN", freq=0.1, volt=0, offset=1)
+        self.gen.set_output(on=True)
+        try:
+            time.sleep(1)
+            images.append(self._measure_span("500", "500+1v_with_signal", shared_dir))
+        finally:
+            self.gen.set_output(on=False)
+
+        if os.path.abspath(shared_dir) != os.path.abspath(out_dir):
+            for name in os.listdir(shared_dir):
+                shutil.copy2(os.path.join(shared_dir, name), out_dir)
+        return {"完成Span数": len(images)}
+
+    def close(self):
+        self.tester.close()
+        self.gen.close()
+
+    def stop(self):
+        self.tester.stop()
+
+
+class TimeDomainEngine(Engine):
+    defaults = {
+        "SCOPE_IP": "192.168.7.12",
+        "GEN_IP": "192.168.7.13",
+        "GEN_VOLT": 10,
+        "GEN_OFFSET": 5,
+        "SCOPE_CH": "CHAN1",
+        "TEST_FREQS": [100, 300],
+    }
+
+    def open(self):
+        from zhongzi.TimeDomain import TimeDomain
+        self.td = TimeDomain(dict(self.params, GEN_FREQ=self.params["TEST_FREQS"][0]), self.log)
+        self.td.connect_instruments()
+
+    def run(self, out_dir, dut):
+        td = self.td
+        td.params["OUTPUT_DIR"] = out_dir
+        results = {}
+        for freq in self.params["TEST_FREQS"]:
+            self.log(f"[测试] 开始 {freq}Hz 测试")
+            td.params["GEN_FREQ"] = freq
+            td.configure_gen()
+            td.configure_scope(freq)
+            results[f"{freq}Hz Vavg(V)"] = td.read_measurement(":MEAS:VAVG?")
+            results[f"{freq}Hz Vpp(V)"] = td.read_measurement(":MEAS:VPP?")
+            td.save_screenshot(filename=f"scope_screenshot_{freq}Hz.png")
+        return results
+
+    def close(self):
+        self.td.close()
+
+
+class SpectrumSNREngine(Engine):
+    defaults = {
+        "OSA_IP": "192.168.7.14",
+        "CENTER": 1064,
+        "SPAN": 150,
+        "REF_LEVEL": -4.0,
+        "VISA_TIMEOUT_S": 120,
+    }
+
+    def open(self):
+        from zhongzi.SpectrumSNR import SpectrumSNR
+        self.osa = SpectrumSNR(dict(self.params), self.log)
+        self.osa.connect_instrument()
+
+    def run(self, out_dir, dut):
+        osa = self.osa
+        osa.params["OUTPUT_DIR"] = out_dir
+        osa.configure_osa()
+        snr, wl, power = osa.measure_snr()
+        osa.save_data(snr)
+        osa.save_curve(wl, power)
+        osa.save_screenshot(snr_value=snr)
+        # 截图会把超时调大，恢复为参数值
+        osa.osa.timeout = int(float(self.params["VISA_TIMEOUT_S"]) * 1000)
+        return {"SNR(dB)": round(float(snr), 3)}
+
+    def close(self):
+        self.osa.close()
+
+
+class SingleFrequencyEngine(Engine):
+    """
+    单频测试的扫描与温度/电流控制流程写在 SingleFrequencyGUI._run 中，与界面耦合较深：
+    这里在隐藏的 Tk 根窗口中构建该界面对象，替换日志/统计显示后在当前线程同步执行 _run()，
+    不显示窗口也不弹窗（_run 内的弹窗通过 after() 排队，没有事件循环便不会执行）。
+    _run 每次自行连接仪器与上位机，因此该模块在 DUT 之间会重新连接。
+    """
+    defaults = {"测试类型": "1μm"}
+
+    def open(self):
+        import tkinter as tk
+        from zhongzi.SingleFrequency import SingleFrequencyGUI
+        self.tk_root = tk.Tk()
+        self.tk_root.withdraw()
+        self.app = SingleFrequencyGUI(self.tk_root)
+        self.errors = []
+
+        def log(msg):
+            if str(msg).startswith("[错误] 测试失败"):
+                self.errors.append(str(msg))
+            self.log(msg)
+        self.app.log = log
+        self.app.update_stats = lambda: None
+
+    def run(self, out_dir, dut):
+        app = self.app
+        is_1um = self.params.get("测试类型", "1μm") == "1μm"
+        app.test_type_var.set("1μm" if is_1um else "1.5μm")
+        p = app.params_1um if is_1um else app.params_1_5um
+        p.update({k: v for k, v in self.params.items() if k in p})
+        p["输出目录"] = out_dir
+        app.stop_flag.clear()
+        app.pause_flag.clear()
+        app.current_cycle_count = app.temperature_cycle_count = app.sweep_count = app.peak_count = 0
+        self.errors = []
+        app._run()
+        if self.errors:
+            raise RuntimeError(self.errors[-1])
+        return {"出峰次数": app.peak_count, "频率循环次数": app.sweep_count,
+                "温度循环次数": app.temperature_cycle_count, "电流循环次数": app.current_cycle_count}
+
+    def close(self):
+        try:
+            self.tk_root.destroy()
+        except Exception:
+            pass
+
+    def stop(self):
+        self.app.stop_flag.set()
+
+
+# 与 MODULE_MAP 的模块名一一对应
+HEADLESS_ENGINES = {
+    "Rin_FSV3004": RinFSV3004Engine,
+    "Rin_4051": Rin4051Engine,
+    "线宽": LineWidthEngine,
+    "时域": TimeDomainEngine,
+    "信噪比": SpectrumSNREngine,
+    "单频": SingleFrequencyEngine,
+    "CT-波长": CTWavelengthEngine,
+    "CT-功率": CTPowerEngine,
+    "CT-线宽": CTLinewidthEngine,
+}
+
+
+# ==========================================
+# 参数文件
+# ==========================================
+class BatchConfigError(Exception):
+    pass
+
+
+def load_batch_file(path):
+    """读取并检查参数文件，DUT 统一整理为 [{"id":..., "params": {...}}]"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except Exception as e:
+        raise BatchConfigError(f"无法读取参数文件 {path}: {e}")
+    if not isinstance(config, dict):
+        raise BatchConfigError("参数文件顶层必须是 JSON 对象")
+
+    modules = config.get("modules") or []
+    unknown = [m for m in modules if m not in HEADLESS_ENGINES]
+    if not modules:
+        raise BatchConfigError("未指定 modules")
+    if unknown:
+        raise BatchConfigError(f"未知模块: {', '.join(unknown)}（可选: {', '.join(MODULE_MAP)}）")
+
+    duts = []
+    for item in config.get("duts") or []:
+        if isinstance(item, dict):
+            if not item.get("id"):
+                raise BatchConfigError(f"DUT 缺少 id: {item}")
+            duts.append({"id": str(item["id"]), "params": item.get("params") or {}})
+        else:
+            duts.append({"id": str(item), "params": {}})
+    if not duts:
+        raise BatchConfigError("未指定 duts")
+
+    config["modules"] = modules
+    config["duts"] = duts
+    config.setdefault("output_dir", os.path.join(os.path.dirname(os.path.abspath(path)), "batch_output"))
+    config.setdefault("params", {})
+    config.setdefault("prompt_between_duts", True)
+    return config
+
+
+def make_template(modules):
+    names = modules or list(HEADLESS_ENGINES)
+    return {
+        "output_dir": r"C:\PTS\batch",
+        "modules": names,
+        "params": {n: dict(HEADLESS_ENGINES[n].defaults) for n in names if n in HEADLESS_ENGINES},
+        "duts": ["DUT001", "DUT002"],
+        "prompt_between_duts": True,
+    }
+
+
+# ==========================================
+# 批量执行
+# ==========================================
+class BatchLogger:
+    """同时输出到控制台和批次日志文件"""
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8")
+        self.module = ""
+
+    def __call__(self, msg):
+        line = f"[{time.strftime('%H:%M:%S')}]" + (f" [{self.module}]" if self.module else "") + f" {msg}"
+        print(line, flush=True)
+        self._f.write(line + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def run_batch(config, log, wait_next_dut=None):
+    """
+    按 DUT -> 模块顺序执行，返回 (退出码, 结果记录列表)。
+    wait_next_dut(dut_id): 换下一个 DUT 前调用（如等待操作员回车），返回 False 时结束整批。
+    """
+    modules, duts = config["modules"], config["duts"]
+    output_dir = ensure_dir(config["output_dir"])
+    engines, open_errors = {}, {}
+    records = []
+    interrupted = False
+    active = None
+
+    try:
+        for name in modules:
+            log.module = name
+            engine = HEADLESS_ENGINES[name](config["params"].get(name), log)
+            try:
+                engine.open()
+                engines[name] = engine
+                log("仪器已连接")
+            except Exception as e:
+                open_errors[name] = f"仪器连接失败: {e}"
+                log(f"[错误] {open_errors[name]}")
+                try:
+                    engine.close()
+                except Exception:
+                    pass
+
+        for i, dut in enumerate(duts):
+            if i > 0 and wait_next_dut is not None and not wait_next_dut(dut["id"]):
+                log.module = ""
+                log("操作员结束批量测试")
+                break
+            for name in modules:
+                log.module = name
+                out_dir = ensure_dir(os.path.join(output_dir, safe_name(dut["id"]), safe_name(name)))
+                record = {"dut": dut["id"], "module": name, "ok": False, "duration_s": 0.0,
+                          "results": {}, "message": "", "out_dir": out_dir}
+                records.append(record)
+                if name in open_errors:
+                    record["message"] = open_errors[name]
+                    continue
+                engine = active = engines[name]
+                # DUT 专属参数覆盖模块参数
+                saved = dict(engine.params)
+                engine.params.update(dut["params"].get(name) or {})
+                log(f"===== DUT {dut['id']} ({i + 1}/{len(duts)}) 开始 =====")
+                t0 = time.time()
+                try:
+                    record["results"] = engine.run(out_dir, dut["id"]) or {}
+                    record["ok"] = True
+                    record["message"] = "通过"
+                except Exception as e:
+                    record["message"] = str(e)
+                    log(f"[错误] {e}\n{traceback.format_exc()}")
+                finally:
+                    record["duration_s"] = round(time.time() - t0, 1)
+                    engine.params = saved
+                    active = None
+                with open(os.path.join(out_dir, "result.json"), "w", encoding="utf-8") as f:
+                    json.dump(record, f, ensure_ascii=False, indent=2)
+                log(f"===== DUT {dut['id']} {'通过' if record['ok'] else '失败'}，用时 {record['duration_s']}s =====")
+    except KeyboardInterrupt:
+        interrupted = True
+        log.module = ""
+        log("[中断] 收到 Ctrl+C，正在停止当前测量并断开仪器...")
+        if active is not None:
+            try:
+                active.stop()
+            except Exception:
+                pass
+    finally:
+        for name, engine in engines.items():
+            log.module = name
+            try:
+                engine.close()
+            except Exception as e:
+                log(f"[警告] 断开仪器失败: {e}")
+        log.module = ""
+
+    if interrupted:
+        return EXIT_INTERRUPTED, records
+    return (EXIT_OK if records and all(r["ok"] for r in records) else EXIT_FAILED), records
+
+
+def write_summary(path, records):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["DUT", "Module", "Result", "Duration_s", "Message", "Results", "OutputDir"])
+        for r in records:
+            w.writerow([r["dut"], r["module"], "PASS" if r["ok"] else "FAIL", r["duration_s"], r["message"],
+                        json.dumps(r["results"], ensure_ascii=False), r["out_dir"]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PTS 无界面批量测试")
+    parser.add_argument("param_file", nargs="?", help="批量测试参数文件 (JSON)")
+    parser.add_argument("--no-prompt", action="store_true", help="DUT 之间不等待回车")
+    parser.add_argument("--template", nargs="*", metavar="模块", help="输出参数文件模板（默认包含全部模块）")
+    args = parser.parse_args(argv)
+
+    if args.template is not None:
+        unknown = [m for m in args.template if m not in HEADLESS_ENGINES]
+        if unknown:
+            print(f"未知模块: {', '.join(unknown)}", file=sys.stderr)
+            return EXIT_CONFIG
+        print(json.dumps(make_template(args.template), ensure_ascii=False, indent=4))
+        return EXIT_OK
+
+    if not args.param_file:
+        parser.print_help()
+        return EXIT_CONFIG
+    try:
+        config = load_batch_file(args.param_file)
+    except BatchConfigError as e:
+        print(f"[参数错误] {e}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    ensure_dir(config["output_dir"])
+    log = BatchLogger(os.path.join(config["output_dir"], f"batch_{stamp}.log"))
+    log(f"批量测试开始：{len(config['duts'])} 个 DUT，模块 {', '.join(config['modules'])}")
+
+    def wait_next_dut(dut_id):
+        try:
+            answer = input(f"请更换 DUT 为 {dut_id}，完成后按回车继续（输入 q 结束）: ")
+        except EOFError:
+            return True
+        return answer.strip().lower() != "q"
+
+    prompt = config["prompt_between_duts"] and not args.no_prompt
+    code, records = run_batch(config, log, wait_next_dut if prompt else None)
+
+    summary = os.path.join(config["output_dir"], f"batch_summary_{stamp}.csv")
+    write_summary(summary, records)
+    passed = sum(1 for r in records if r["ok"])
+    log(f"批量测试结束：{passed}/{len(records)} 项通过，汇总: {summary}，退出码 {code}")
+    log.close()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
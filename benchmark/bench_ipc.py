@@ -0,0 +1,155 @@
+"""
+平台 <-> 模块进程通信基准：轮询（after 200ms + empty/get_nowait） vs 事件驱动（QueueReader）
+
+测量内容：
+    1. 命令往返延迟：主进程发送 PING -> 子进程 Tk 线程处理 -> 回复 -> 主进程收到
+    2. 空闲 CPU：子进程在无消息情况下空转 idle 秒所消耗的 CPU 时间
+    3. 遥测吞吐：逐行 put 元组 vs TelemetryWriter 批量打包，主进程接收 N 行日志的耗时
+
+用法（在项目根目录）：
+    python benchmark/bench_ipc.py [--rounds 50] [--idle 10] [--lines 20000]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import multiprocessing
+from queue import Empty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.ipc_channel import QueueReader, TelemetryWriter, unpack_batch
+
+
+def _child(mode, cmd_queue, reply_queue, idle_s):
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+
+    def handle(cmds):
+        for cmd in cmds:
+            if cmd == "EXIT":
+                root.quit()
+            elif isinstance(cmd, tuple) and cmd[0] == "PING":
+                reply_queue.put(("PONG", cmd[1]))
+
+    if mode == "poll":
+        def check():
+            try:
+                items = []
+                while not cmd_queue.empty():
+                    items.append(cmd_queue.get_nowait())
+                handle(items)
+            except Empty:
+                pass
+            finally:
+                root.after(200, check)
+        root.after(200, check)
+    else:
+        QueueReader(root, cmd_queue, handle)
+
+    def report_idle_cpu():
+        c0 = time.process_time()
+
+        def done():
+            reply_queue.put(("IDLE_CPU", time.process_time() - c0))
+        root.after(int(idle_s * 1000), done)
+
+    root.after(500, report_idle_cpu)
+    root.mainloop()
+
+
+def measure_mode(mode, rounds, idle_s):
+    cmd_q = multiprocessing.Queue()
+    reply_q = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_child, args=(mode, cmd_q, reply_q, idle_s), daemon=True)
+    p.start()
+
+    idle_cpu = None
+    deadline = time.time() + idle_s + 30
+    while idle_cpu is None and time.time() < deadline:
+        try:
+            tag, val = reply_q.get(timeout=1)
+            if tag == "IDLE_CPU":
+                idle_cpu = val
+        except Empty:
+            pass
+
+    latencies = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        cmd_q.put(("PING", t0))
+        while True:
+            tag, val = reply_q.get(timeout=10)
+            if tag == "PONG" and val == t0:
+                break
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.037)   # 错开轮询相位
+
+    cmd_q.put("EXIT")
+    p.join(5)
+    if p.is_alive():
+        p.terminate()
+    return latencies, idle_cpu
+
+
+def _telemetry_child(mode, msg_queue, lines):
+    if mode == "tuple":
+        for i in range(lines):
+            msg_queue.put(("单频", "log", f"[细扫] 中心 {i} MHz 检测完成，未发现异常峰"))
+    else:
+        tw = TelemetryWriter(msg_queue, "单频", interval=0.05)
+        for i in range(lines):
+            tw.put("log", f"[细扫] 中心 {i} MHz 检测完成，未发现异常峰")
+        time.sleep(0.2)
+        while tw._buf:
+            tw.flush()
+    msg_queue.put(("单频", "done", ""))
+
+
+def measure_telemetry(mode, lines):
+    q = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_telemetry_child, args=(mode, q, lines), daemon=True)
+    c0 = time.process_time()
+    t0 = time.perf_counter()
+    p.start()
+    received = 0
+    messages = 0
+    while True:
+        module, type_, msg = q.get(timeout=60)
+        messages += 1
+        if type_ == "done":
+            break
+        if type_ == "batch":
+            received += len(unpack_batch(msg))
+        else:
+            received += 1
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - c0
+    p.join(5)
+    return received, messages, wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description="平台通信基准：轮询 vs 事件驱动")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=10.0)
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("== 命令往返延迟 / 空闲 CPU ==")
+    for mode, label in (("poll", "轮询 200ms"), ("event", "事件驱动")):
+        lat, idle_cpu = measure_mode(mode, args.rounds, args.idle)
+        print(f"{label:<10} 延迟 中位 {statistics.median(lat):7.1f} ms  最大 {max(lat):7.1f} ms  "
+              f"空闲 {args.idle:.0f}s CPU {idle_cpu * 1000 if idle_cpu is not None else float('nan'):7.1f} ms")
+
+    print(f"== 遥测 {args.lines} 行 ==")
+    for mode, label in (("tuple", "逐行元组"), ("batch", "批量打包")):
+        received, messages, wall, cpu = measure_telemetry(mode, args.lines)
+        print(f"{label:<10} 收到 {received} 行 / {messages} 条消息  耗时 {wall * 1000:8.1f} ms  主进程 CPU {cpu * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
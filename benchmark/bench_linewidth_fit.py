@@ -0,0 +1,117 @@
+"""
+线宽取法对比：离 -3 dB 最近的采样点（CT_L measure_linewidth_from_trace 拟合未收敛时的回退，linewidth_from_3db_samples）
+            vs 线型拟合（common/linewidth_fit.fit_lineshapes）
+
+合成自外差拍频迹线：80 MHz 处 Lorentz 线型（可叠加 RBW 的 Gauss 展宽），底噪 -100 dBm，dB 正态噪声，
+按 TraceReader 二进制读取的 float32 保存。统计：
+    精度    各方法线宽相对真值的平均偏差与均方根误差；拟合另给出 (拟合值 - 真值) / σ 的均方根（约为 1 说明不确定度可信）
+    耗时    逐条调用 fit_lineshapes 与整批一次调用的耗时（CT_L 各温度点、LineWidth 各 Span 的迹线数量级）
+另核对 LineWidth 的情形：5 个 Span（100 kHz ~ 2 MHz）各自的频率轴一次拟合。
+用法（在项目根目录）：
+    python benchmark/bench_linewidth_fit.py [--batch 1 5 20 100] [--points 2001] [--noise-db 0.3] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.linewidth_fit import fit_lineshapes, linewidth_from_3db_samples
+
+# CT_L 线宽测量的扫描设置：中心 80 MHz、Span 1 MHz
+CENTER_HZ = 80e6
+SPAN_HZ = 1e6
+# LineWidth 依次使用的 Span（kHz）
+LINEWIDTH_SPANS_KHZ = (100, 200, 500, 1000, 2000)
+
+
+def beat_trace(x, linewidth_hz, rng, noise_db, gauss_hz=0.0, floor_dbm=-100.0, peak_dbm=-20.0):
+    """拍频迹线（dBm，float32）：Lorentz 全宽为线宽的 2 倍，gauss_hz > 0 时与 Gauss 卷积"""
+    d = x - CENTER_HZ - rng.uniform(-0.002, 0.002) * (x[-1] - x[0])
+    fwhm = 2.0 * linewidth_hz
+    shape = 1.0 / (1.0 + (2.0 * d / fwhm) ** 2)
+    if gauss_hz > 0:
+        step = x[1] - x[0]
+        half = int(3 * gauss_hz / step) + 1
+        k = np.exp(-4.0 * np.log(2.0) * (np.arange(-half, half + 1) * step / gauss_hz) ** 2)
+        shape = np.convolve(shape, k / k.sum(), mode="same")
+        shape /= shape.max()
+    y = 10 * np.log10(10 ** (peak_dbm / 10) * shape + 10 ** (floor_dbm / 10))
+    return (y + noise_db * rng.standard_normal(len(x))).astype(np.float32)
+
+
+def summary(estimate, truth):
+    rel = estimate / truth - 1.0
+    rel = rel[np.isfinite(rel)]
+    return 100 * float(np.mean(rel)), 100 * float(np.sqrt(np.mean(rel ** 2)))
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", type=int, nargs="+", default=[1, 5, 20, 100], help="一次拟合的迹线条数")
+    ap.add_argument("--points", type=int, default=2001)
+    ap.add_argument("--noise-db", type=float, default=0.3, help="逐点噪声起伏（dB，标准差）")
+    ap.add_argument("--traces", type=int, default=100, help="精度统计的迹线条数")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    x = np.linspace(CENTER_HZ - SPAN_HZ / 2, CENTER_HZ + SPAN_HZ / 2, args.points)
+    step = x[1] - x[0]
+
+    # 精度：线宽 2 ~ 20 kHz（拍频全宽约 8 ~ 80 个采样点间距）
+    print(f"Span {SPAN_HZ / 1e3:.0f} kHz、{args.points} 点（点间距 {step:.0f} Hz），噪声 {args.noise_db} dB，"
+          f"{args.traces} 条迹线")
+    print(f"{'迹线':<14} {'方法':<12} {'平均偏差(%)':>11} {'均方根误差(%)':>13} {'(拟合-真值)/σ 均方根':>20} {'未收敛':>6}")
+    truth = rng.uniform(2e3, 20e3, args.traces)
+    for label, gauss_hz, model in (("Lorentz", 0.0, "lorentz"), ("Lorentz+RBW", 3e3, "voigt")):
+        traces = np.array([beat_trace(x, lw, rng, args.noise_db, gauss_hz) for lw in truth])
+        near = np.array([linewidth_from_3db_samples(x, y) for y in traces])
+        mean, rms = summary(near, truth)
+        print(f"{label:<14} {'-3 dB 采样点':<12} {mean:>11.2f} {rms:>13.2f} {'-':>20} {'-':>6}")
+        for fit_model in sorted({"lorentz", model}):
+            fit = fit_lineshapes(x, traces, model=fit_model)
+            mean, rms = summary(fit["linewidth_hz"], truth)
+            z = (fit["linewidth_hz"] - truth) / fit["linewidth_err_hz"]
+            z_rms = float(np.sqrt(np.nanmean(z ** 2)))
+            print(f"{'':<14} {'拟合 ' + fit_model:<12} {mean:>11.2f} {rms:>13.2f} {z_rms:>20.2f} "
+                  f"{int((~fit['ok']).sum()):>6}")
+
+    # 耗时：逐条调用 vs 整批一次调用
+    print(f"\n{'条数':>6} {'模型':<8} {'逐条(ms)':>10} {'整批(ms)':>10} {'每条(ms)':>10} {'加速':>6}")
+    for model in ("lorentz", "voigt"):
+        for m in args.batch:
+            traces = np.array([beat_trace(x, lw, rng, args.noise_db) for lw in rng.uniform(2e3, 20e3, m)])
+            t_loop = timed(lambda: [fit_lineshapes(x, y, model=model) for y in traces], args.repeat)
+            t_batch = timed(lambda: fit_lineshapes(x, traces, model=model), args.repeat)
+            print(f"{m:>6} {model:<8} {t_loop * 1e3:>10.1f} {t_batch * 1e3:>10.1f} {t_batch / m * 1e3:>10.2f} "
+                  f"{t_loop / t_batch:>5.1f}x")
+
+    # LineWidth：各 Span 的频率轴不同，一次拟合
+    lw = 5e3
+    xs = [np.linspace(CENTER_HZ - s * 500, CENTER_HZ + s * 500, args.points) for s in LINEWIDTH_SPANS_KHZ]
+    ys = [beat_trace(fx, lw, rng, args.noise_db) for fx in xs]
+    t = timed(lambda: fit_lineshapes(xs, ys), args.repeat)
+    fit = fit_lineshapes(xs, ys)
+    print(f"\nLineWidth 各 Span（真值 {lw / 1e3:.3f} kHz），一次拟合 {t * 1e3:.1f} ms：")
+    for i, span in enumerate(LINEWIDTH_SPANS_KHZ):
+        print(f"  Span {span:>5} kHz  拟合 {fit['linewidth_hz'][i] / 1e3:.3f} ± {fit['linewidth_err_hz'][i] / 1e3:.3f} kHz"
+              f"  -3 dB 采样点 {linewidth_from_3db_samples(xs[i], ys[i]) / 1e3:.3f} kHz  拟合点数 {fit['points'][i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+单频细扫峰值检测耗时：逐点循环（原 PeakDetector.find） vs 向量化（common/spectrum_peaks.find_peaks）
+
+先核对两种实现在各条迹线上的结果完全一致（峰值个数、频率、功率、局部噪声逐位相等），再按点数统计单条迹线的
+检测耗时。迹线来源：
+    合成迹线  噪声底（float64 与 TraceReader 二进制读取的 float32 两种）叠加窄峰，含贴近判据边界的峰、
+              相等的相邻点与平台，另有极短迹线、含 NaN 的迹线、列表输入与 guard=1 的情况
+    实测迹线  --trace 指定 SingleFrequency 保存的细扫 CSV（Frequency(Hz),Power(dBm)），可多次指定
+用法（在项目根目录）：
+    python benchmark/bench_peak_detect.py [--points 2001 10001 40001] [--repeat 5] [--trace 细扫.csv ...]
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.spectrum_peaks import find_peaks
+
+# SingleFrequency 细扫默认参数（细扫峰值阈值 / 细扫邻域显著性 / 细扫邻域点数）
+DEFAULT_PARAMS = {"thresh_db": 1.0, "prom_db": 1.0, "guard": 10}
+
+
+def reference_find(x, y_dbm, thresh_db=1.0, prom_db=1.0, guard=10):
+    """原 PeakDetector.find 的逐点循环（去掉日志）"""
+    if len(y_dbm) < 2 * guard + 1:
+        return []
+    edge_points = int(len(y_dbm) * 0.1)
+    if edge_points < 10:
+        edge_points = 10
+    edge_data = np.concatenate([y_dbm[:edge_points], y_dbm[-edge_points:]])
+    noise = float(np.mean(edge_data))
+    peaks = []
+    g = guard
+    narrow_guard = max(1, int(g / 2))
+    for i in range(g, len(y_dbm) - g):
+        y = float(y_dbm[i])
+        is_local_max = True
+        for j in range(1, narrow_guard + 1):
+            if y <= float(y_dbm[i-j]) or y <= float(y_dbm[i+j]):
+                is_local_max = False
+                break
+        left_nb = y_dbm[max(0, i-g-2):i]
+        right_nb = y_dbm[i+1:min(len(y_dbm), i+g+3)]
+        left_mean = float(np.mean(left_nb)) if len(left_nb) else noise
+        right_mean = float(np.mean(right_nb)) if len(right_nb) else noise
+        local_noise = min(left_mean, right_mean, noise)
+        if (
+            is_local_max and
+            (y - local_noise >= thresh_db) and
+            (y - max(left_mean, right_mean) >= prom_db * 0.8)
+        ):
+            peaks.append((float(x[i]), y, local_noise))
+    return peaks
+
+
+def synthetic_trace(points, seed, dtype=float):
+    """0.5 GHz 细扫段：-85 dBm 噪声底 + 若干窄峰（含刚好在阈值附近的弱峰）+ 量化产生的相等相邻点"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(1.0e9, 1.5e9, points)
+    y = -85.0 + 1.5 * rng.standard_normal(points)
+    for _ in range(max(3, points // 2000)):
+        pos = int(rng.integers(points // 20, points - points // 20))
+        width = float(rng.uniform(0.5, 4.0))
+        height = float(rng.choice([1.2, 2.0, 6.0, 30.0]))
+        y += height * np.exp(-0.5 * ((np.arange(points) - pos) / width) ** 2)
+    y[points // 3:points // 3 + 8] = y[points // 3]        # 平台
+    y = np.round(y, 2)                                      # 仪器 ASCII 输出的有限位数，产生相等相邻点
+    return x, y.astype(dtype)
+
+
+def load_trace(path):
+    x, y = [], []
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 2:
+                x.append(float(row[0]))
+                y.append(float(row[1]))
+    return np.array(x), np.array(y)
+
+
+def check_equal(name, x, y, params):
+    ref = reference_find(x, y, **params)
+    new = find_peaks(x, y, **params)
+    if ref != new:
+        raise SystemExit(f"结果不一致：{name} {params}\n  原实现 {ref[:5]}\n  向量化 {new[:5]}")
+    return len(ref)
+
+
+def timed(func, x, y, params, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(x, y, **params)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--points", type=int, nargs="+", default=[2001, 10001, 40001])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--trace", action="append", default=[], help="实测细扫 CSV，可多次指定")
+    args = ap.parse_args()
+
+    # 一致性核对
+    cases = []
+    for seed in range(20):
+        for dtype in (float, np.float32):
+            x, y = synthetic_trace(int(np.random.default_rng(seed).integers(200, 6000)), seed, dtype)
+            cases.append((f"合成 seed={seed} {np.dtype(dtype).name}", x, y))
+    for n in (0, 5, 21, 22, 30):
+        x, y = synthetic_trace(max(n, 1), n)
+        cases.append((f"短迹线 {n} 点", x[:n], y[:n]))
+    x, y = synthetic_trace(3000, 99)
+    y[[5, 700, 1500, 2990]] = np.nan                        # 读取异常留下的 NaN
+    cases.append(("含 NaN", x, y))
+    cases.append(("列表输入", list(x[:800]), list(y[:800])))
+    for path in args.trace:
+        x, y = load_trace(path)
+        cases.append((f"实测 {os.path.basename(path)}", x, y))
+    param_sets = [DEFAULT_PARAMS, {"thresh_db": 0.5, "prom_db": 0.3, "guard": 1},
+                  {"thresh_db": 3.0, "prom_db": 2.0, "guard": 25}]
+    checked = found = 0
+    for name, x, y in cases:
+        for params in param_sets:
+            found += check_equal(name, x, y, params)
+            checked += 1
+    print(f"一致性核对通过：{len(cases)} 条迹线 × {len(param_sets)} 组参数，共 {checked} 次、{found} 个峰值结果逐位相同")
+
+    # 耗时
+    print(f"{'点数':>8} {'逐点循环(ms)':>14} {'向量化(ms)':>12} {'加速':>8} {'峰值数':>6}")
+    rows = [(f"{n}", *synthetic_trace(n, 1, np.float32)) for n in args.points]
+    rows += [(os.path.basename(p), *load_trace(p)) for p in args.trace]
+    for label, x, y in rows:
+        t_ref = timed(reference_find, x, y, DEFAULT_PARAMS, max(1, args.repeat // 2))
+        t_new = timed(find_peaks, x, y, DEFAULT_PARAMS, args.repeat)
+        peaks = len(find_peaks(x, y, **DEFAULT_PARAMS))
+        print(f"{label:>8} {t_ref * 1e3:>14.1f} {t_new * 1e3:>12.2f} {t_ref / t_new:>7.0f}x {peaks:>6}")
+    n = max(args.points)
+    t_ref = timed(reference_find, *synthetic_trace(n, 1, np.float32), DEFAULT_PARAMS, 1)
+    t_new = timed(find_peaks, *synthetic_trace(n, 1, np.float32), DEFAULT_PARAMS, args.repeat)
+    print(f"18 GHz 循环（36 段 × {n} 点）峰值检测：逐点循环约 {36 * t_ref:.1f} s，向量化约 {36 * t_new:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+单频细扫一个频率循环（0~18 GHz，500 MHz 一段，共 36 段）的耗时：固定等待（原实现） vs *OPC? 完成等待
+
+按 SingleFrequency 细扫流程重放驱动发出的命令：
+    初始化：set_trace_mode / set_detector / set_sweep_type / set_sweep_time / set_freq_span / set_bw
+    每段：  set_freq_span，清迹线与平均设置，2 次 (set_sweep_time + sweep_once + 读迹线)
+比较三种方式：
+    固定等待       设置后 time.sleep（RBW/VBW/迹线模式/检波器 0.5s，扫描类型/扫描时间 0.2s）
+    完成等待       设置后查询 *OPC?，仪器执行完毕立即继续
+    完成等待+影子   再经 common/scpi_state.ShadowSession 跳过未变化的设置
+
+模拟频谱仪：每条消息往返 rtt-ms，设置命令在仪器内需要 apply-ms 生效（RBW 等改动带宽的命令为 3 倍），
+*OPC? 在此前的命令全部生效后返回，一次扫描耗时 sweep-ms × 平均次数。
+用法（在项目根目录）：python benchmark/bench_sa_waits.py [--spans 36] [--rtt-ms 1] [--apply-ms 5] [--sweep-ms 50]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.scpi_state import ShadowSession
+
+FIXED_SLEEP_S = {"rbw": 0.5, "vbw": 0.5, "trace_mode": 0.5, "detector": 0.5, "sweep_type": 0.2, "sweep_time": 0.2}
+
+
+class _SimAnalyzer:
+    def __init__(self, rtt_s, apply_s, sweep_s):
+        self.rtt_s = rtt_s
+        self.apply_s = apply_s
+        self.sweep_s = sweep_s
+        self.avg = 1
+        self.busy_until = 0.0
+        self.messages = 0
+        self.timeout = 10000
+
+    def write(self, message):
+        time.sleep(self.rtt_s)
+        self.messages += 1
+        now = time.perf_counter()
+        start = max(now, self.busy_until)
+        head = message.strip().upper()
+        if head.startswith(":INIT") and "CONT" not in head:
+            cost = self.sweep_s * self.avg
+        elif head.startswith(":AVER") and "COUN" in head:
+            self.avg = int(head.split()[-1])
+            cost = self.apply_s
+        elif "BAND" in head or "SPAN" in head:
+            cost = self.apply_s * 3
+        else:
+            cost = self.apply_s
+        self.busy_until = start + cost
+
+    def query(self, message):
+        time.sleep(self.rtt_s)
+        self.messages += 1
+        if message.strip() == "*OPC?":
+            remaining = self.busy_until - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            return "1"
+        return "0"
+
+
+class _Driver:
+    """SingleFrequency 中与等待相关的部分：mode 为 fixed（固定等待）或 opc（*OPC? 完成等待）"""
+    def __init__(self, inst, mode):
+        self.inst = inst
+        self.mode = mode
+
+    def write(self, cmd):
+        if isinstance(self.inst, ShadowSession):
+            return self.inst.apply(cmd)
+        self.inst.write(cmd)
+        return True
+
+    def wait(self, step):
+        if self.mode == "fixed":
+            time.sleep(FIXED_SLEEP_S[step])
+        else:
+            self.inst.query("*OPC?")
+
+    def setting(self, cmd, step):
+        if self.write(cmd):
+            self.wait(step)
+
+    def sweep_once(self):
+        self.write(":INITiate:CONTinuous OFF")
+        self.write(":TRACe:CLEAr")
+        self.write(":INITiate:IMMediate")
+        self.inst.query("*OPC?")
+        for q in (":TRACe:DATA? TRACE1", ":SENSe:FREQuency:STARt?", ":SENSe:FREQuency:STOP?", ":SWEep:POINts?"):
+            self.inst.query(q)
+
+
+def run_cycle(driver, spans, span_hz=500e6):
+    d = driver
+    t0 = time.perf_counter()
+    d.setting(":TRACe:MODE WRITe", "trace_mode")
+    d.write(":AVERage:STATe ON")
+    d.write(":AVERage:COUNt 2")
+    d.setting(":DETector:FUNCtion1 RMS", "detector")
+    d.setting(":SWE:TYPE SPD", "sweep_type")
+    d.setting(":SWE:TIME 1", "sweep_time")
+    center = span_hz / 2
+    d.write(f":SENSe:FREQuency:CENTer {center}")
+    d.write(f":SENSe:FREQuency:SPAN {span_hz}")
+    d.setting(f":SENSe:BANDwidth:RESolution {30e3}", "rbw")
+    for _ in range(spans):
+        d.write(f":SENSe:FREQuency:CENTer {center}")
+        d.write(f":SENSe:FREQuency:SPAN {span_hz}")
+        d.write(":TRACe:CLEar TRACE1")
+        d.write(":AVERage:COUNt 2")
+        d.write(":AVERage:STATe ON")
+        for _ in range(2):
+            d.setting(":SWE:TIME 1", "sweep_time")
+            d.sweep_once()
+        center += span_hz
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--spans", type=int, default=36)
+    ap.add_argument("--rtt-ms", type=float, default=1.0)
+    ap.add_argument("--apply-ms", type=float, default=5.0)
+    ap.add_argument("--sweep-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    def sim():
+        return _SimAnalyzer(args.rtt_ms / 1000, args.apply_ms / 1000, args.sweep_ms / 1000)
+
+    print(f"{args.spans} 段/循环，往返 {args.rtt_ms:g} ms，设置生效 {args.apply_ms:g} ms，单次扫描 {args.sweep_ms:g} ms × 2 平均")
+    rows = []
+    for name, mode, shadow in (("固定等待", "fixed", False), ("完成等待", "opc", False), ("完成等待+影子", "opc", True)):
+        inst = sim()
+        driver = _Driver(ShadowSession(inst) if shadow else inst, mode)
+        elapsed = run_cycle(driver, args.spans)
+        rows.append(elapsed)
+        print(f"  {name:<8} 循环耗时 {elapsed:8.2f} s   每段 {elapsed / args.spans * 1000:8.1f} ms   消息 {inst.messages} 条")
+    print(f"完成等待比固定等待每个循环节省 {rows[0] - rows[1]:.2f} s，再加影子状态共节省 {rows[0] - rows[2]:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
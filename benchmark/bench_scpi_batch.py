@@ -0,0 +1,162 @@
+"""
+配置阶段耗时基准：逐条 write()（原实现） vs 合并发送（common/scpi_batch.py）
+
+按各模块配置方法的实际命令序列重放，每段配置后发送 *OPC? 等仪器执行完毕，统计每次配置的耗时与写消息数：
+    rin4051     Rin_4051.configure（含 VBW、平均开启，共 14 条）
+    fsv3004     RinAnalyzer.configure_instrument（Rin_FSV3004，5 条）
+    linewidth   LinewidthTester.configure（LineWidth，7 条，每个 Span 执行一次）
+    singlefreq  SingleFrequency.open 中的初始设置（6 条）
+
+用法（在项目根目录）：
+    连接真实仪器：python benchmark/bench_scpi_batch.py --resource TCPIP0::192.168.7.10::inst0::INSTR --seq rin4051 [--repeat 10]
+    无仪器时模拟：python benchmark/bench_scpi_batch.py --simulate [--rtt-ms 2] [--repeat 20]
+    本机仿真仪器：先运行 python -m emulator，设置 PTS_EMULATOR 后按真实仪器方式运行
+真实仪器模式在每种方式结束后查询 :SYST:ERR? 确认合并后的命令没有被仪器拒绝。
+模拟模式每条消息（写或查询）固定延时 rtt-ms，并按 SCPI 根路径规则拆开合并消息，核对与逐条发送的命令完全一致。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.emulation import open_resource
+from common.scpi_batch import CommandBatch, max_message_len
+
+SEQUENCES = {
+    "rin4051": [
+        ":FREQ:STARt 1000", ":FREQ:STOP 10000", ":SWE:POINts 2001", ":BAND 30", ":BAND:VID 30",
+        ":SWE:TYPE:AUTO:RUL SPEed", ":UNIT:POW V", ":AVER:STATe ON", ":AVER:COUNt 20",
+        ":DISP:WIND:TRAC:MODE WRITE", ":TRAC1:MODE CLEAR WRITE", ":TRAC1:TYPE AVER",
+        ":INIT:CONTinuous OFF", ":DISP:UPD ON",
+    ],
+    "fsv3004": [":INST:SEL SA", ":CONF:SAN", "SWE:POIN 2001", "UNIT:POW V", "TRACE1:TYPE AVERage"],
+    "linewidth": ["INIT:CONT OFF", "DISP:TRAC:Y:RLEV -20dBm", "FREQ:CENT 80MHZ", "FREQ:SPAN 100KHZ",
+                  "BAND 300HZ", "SWE:POIN 2001", ":AVER:COUN 20"],
+    "singlefreq": [":CALC:MARK1:MODE NORM", ":CALC:MARK1 ON", ":CALC:MARK1:FUNC NOIS", ":CALC:MARK1:MAX",
+                   ":SWE:TYPE:AUTO:RUL DRAN", ":UNIT:POW DBM"],
+}
+SIM_IDN = {"rin4051": "Ceyear,4051F,SIM,1.0", "fsv3004": "Rohde&Schwarz,FSV3004,SIM,1.0",
+           "linewidth": "Rohde&Schwarz,FSV3004,SIM,1.0", "singlefreq": "Ceyear,4051F,SIM,1.0"}
+
+
+def split_message(message):
+    """按 SCPI 规则展开一条消息：不以 : 开头的命令接在上一条命令的路径下，公用命令（*xxx）不改变路径"""
+    commands, path = [], ""
+    for unit in message.split(";"):
+        unit = unit.strip()
+        if unit.startswith("*"):
+            commands.append(unit)
+            continue
+        full = unit[1:] if unit.startswith(":") else path + unit
+        header = full.split(None, 1)[0]
+        path = header.rsplit(":", 1)[0] + ":" if ":" in header else ""
+        commands.append(":" + full)
+    return commands
+
+
+class _SimInstrument:
+    def __init__(self, rtt_s, idn):
+        self.rtt_s = rtt_s
+        self.idn = idn
+        self.received = []
+        self.timeout = 10000
+
+    def write(self, message):
+        time.sleep(self.rtt_s)
+        self.received.extend(split_message(message))
+
+    def query(self, message):
+        time.sleep(self.rtt_s)
+        return "1" if message.strip() == "*OPC?" else self.idn
+
+
+def _normalized(cmds):
+    return [c if c.startswith(("*", ":")) else ":" + c for c in cmds]
+
+
+def run_direct(inst, cmds, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for cmd in cmds:
+            inst.write(cmd)
+        inst.query("*OPC?")
+        times.append(time.perf_counter() - t0)
+    return times, len(cmds)
+
+
+def run_batched(inst, cmds, repeat, max_len):
+    times, messages = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        batch = CommandBatch(inst, max_len)
+        for cmd in cmds:
+            batch.write(cmd)
+        batch.query("*OPC?")
+        times.append(time.perf_counter() - t0)
+        messages = batch.messages
+    return times, messages
+
+
+def report(name, times, messages):
+    ms = [t * 1000 for t in times]
+    print(f"  {name:<6} 平均 {statistics.mean(ms):8.2f} ms/次   最小 {min(ms):8.2f} ms   写消息 {messages} 条/次")
+
+
+def bench(name, inst, idn, repeat, check_errors=False, verify=None):
+    cmds = SEQUENCES[name]
+    max_len = max_message_len(idn)
+    print(f"[{name}] {len(cmds)} 条命令，型号 {idn.split(',')[1] if ',' in idn else idn}，单条消息上限 {max_len} 字节")
+    direct, direct_n = run_direct(inst, cmds, repeat)
+    if check_errors:
+        print(f"  逐条发送后 :SYST:ERR? -> {inst.query(':SYST:ERR?').strip()}")
+    if verify is not None:
+        verify.clear()
+    batched, batched_n = run_batched(inst, cmds, repeat, max_len)
+    if check_errors:
+        print(f"  合并发送后 :SYST:ERR? -> {inst.query(':SYST:ERR?').strip()}")
+    if verify is not None:
+        same = verify[:len(cmds)] == _normalized(cmds)
+        print(f"  合并消息展开后与逐条发送{'一致' if same else '不一致！'}")
+    report("逐条", direct, direct_n)
+    report("合并", batched, batched_n)
+    print(f"  每次配置节省 {(statistics.mean(direct) - statistics.mean(batched)) * 1000:.2f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--resource", default="TCPIP0::192.168.7.10::inst0::INSTR")
+    ap.add_argument("--seq", choices=sorted(SEQUENCES) + ["all"], default="all")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--simulate", action="store_true")
+    ap.add_argument("--rtt-ms", type=float, default=2.0, help="模拟：每条消息的往返耗时")
+    args = ap.parse_args()
+
+    names = sorted(SEQUENCES) if args.seq == "all" else [args.seq]
+    if args.simulate:
+        for name in names:
+            inst = _SimInstrument(args.rtt_ms / 1000, SIM_IDN[name])
+            bench(name, inst, inst.idn, args.repeat, verify=inst.received)
+        return
+
+    import pyvisa
+    rm = pyvisa.ResourceManager()
+    inst = open_resource(rm, args.resource)
+    inst.timeout = 10000
+    inst.read_termination = "\n"
+    inst.write_termination = "\n"
+    try:
+        idn = inst.query("*IDN?").strip()
+        inst.write("*CLS")
+        for name in names:
+            bench(name, inst, idn, args.repeat, check_errors=True)
+    finally:
+        inst.close()
+        rm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+迹线读取耗时基准：ASCII（原实现 query_ascii_values） vs 32 位浮点二进制（common/scpi_trace.TraceReader）
+
+每种方式连续读取 repeat 次 :TRAC:DATA? TRACE1，统计每条迹线的耗时、接收端 CPU 时间与传输字节数，
+并核对两种方式读到的数值一致（二进制为 float32，按相对误差 1e-6 比较）。
+
+用法（在项目根目录）：
+    连接真实仪器：python benchmark/bench_trace_transfer.py --resource TCPIP0::192.168.7.10::inst0::INSTR [--repeat 50]
+    无仪器时模拟：python benchmark/bench_trace_transfer.py --simulate [--points 2001] [--repeat 200]
+    本机仿真仪器：先运行 python -m emulator，设置 PTS_EMULATOR 后按真实仪器方式运行
+模拟模式在本机起一个 TCP SCPI 服务（SOCKET 资源，pyvisa-py 后端），迹线按仪器常见的 %.9E 格式输出 ASCII，
+二进制为 IEEE 488.2 定长块；读取走 pyvisa 的实际解析路径。
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.scpi_trace import TraceReader, ASCII_FORMAT
+from common.emulation import open_resource
+
+TRACE_QUERY = ":TRAC:DATA? TRACE1"
+SIM_IDN = "Rohde&Schwarz,FSV3004,SIM,1.0"
+
+
+class _SimServer:
+    """单连接 TCP SCPI 服务：*IDN?、:FORM 切换格式、:TRAC:DATA? 返回预先编码的迹线"""
+    def __init__(self, points):
+        rng = np.random.default_rng(0)
+        trace = (-90.0 + 3.0 * rng.standard_normal(points)).astype(np.float32)
+        trace[points // 2] = -20.0
+        self.trace = trace
+        self.ascii = (",".join(f"{v:.9E}" for v in trace.astype(float)) + "\n").encode()
+        body = trace.astype("<f4").tobytes()
+        size = str(len(body))
+        self.binary = f"#{len(size)}{size}".encode() + body + b"\n"
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(1)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        binary = False
+        buf = b""
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    return
+                buf += data
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    cmd = line.decode().strip().upper()
+                    if cmd == "*IDN?":
+                        conn.sendall((SIM_IDN + "\n").encode())
+                    elif cmd.startswith(":FORM"):
+                        binary = "REAL" in cmd
+                    elif cmd.startswith(":TRAC:DATA?"):
+                        conn.sendall(self.binary if binary else self.ascii)
+                    elif cmd.endswith("?"):
+                        conn.sendall(b"0\n")
+
+
+def run_ascii(inst, repeat):
+    inst.write(ASCII_FORMAT)
+    times, cpu, last = [], [], None
+    for _ in range(repeat):
+        t0, c0 = time.perf_counter(), time.thread_time()
+        last = np.array(inst.query_ascii_values(TRACE_QUERY))
+        cpu.append(time.thread_time() - c0)
+        times.append(time.perf_counter() - t0)
+    return times, cpu, last
+
+
+def run_binary(inst, idn, repeat):
+    reader = TraceReader(inst, idn)
+    times, cpu, last = [], [], None
+    for _ in range(repeat):
+        t0, c0 = time.perf_counter(), time.thread_time()
+        last = reader.read(TRACE_QUERY)
+        cpu.append(time.thread_time() - c0)
+        times.append(time.perf_counter() - t0)
+    if reader.stats["ascii"]:
+        print("  注意：二进制读取失败，TraceReader 已改用 ASCII")
+    return times, cpu, last
+
+
+def report(name, times, cpu, nbytes):
+    ms = [t * 1000 for t in times]
+    print(f"  {name:<6} 平均 {statistics.mean(ms):8.3f} ms/条   最小 {min(ms):8.3f} ms   "
+          f"CPU {statistics.mean(cpu) * 1000:8.3f} ms/条   {nbytes} 字节/条")
+
+
+def bench(inst, idn, repeat, ascii_bytes=None, binary_bytes=None):
+    a_times, a_cpu, a_vals = run_ascii(inst, repeat)
+    b_times, b_cpu, b_vals = run_binary(inst, idn, repeat)
+    same = len(a_vals) == len(b_vals) and np.allclose(a_vals, b_vals, rtol=1e-6, atol=0)
+    print(f"{len(a_vals)} 点/条，重复 {repeat} 次，两种方式读数{'一致' if same else '不一致！'}")
+    report("ASCII", a_times, a_cpu, ascii_bytes if ascii_bytes is not None else "?")
+    report("二进制", b_times, b_cpu, binary_bytes if binary_bytes is not None else len(b_vals) * 4)
+    print(f"每条迹线节省 {(statistics.mean(a_times) - statistics.mean(b_times)) * 1000:.3f} ms，"
+          f"CPU 节省 {(statistics.mean(a_cpu) - statistics.mean(b_cpu)) * 1000:.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--resource", default="TCPIP0::192.168.7.10::inst0::INSTR")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--simulate", action="store_true")
+    ap.add_argument("--points", type=int, default=2001, help="模拟：每条迹线的点数")
+    args = ap.parse_args()
+
+    import pyvisa
+    if args.simulate:
+        server = _SimServer(args.points)
+        rm = pyvisa.ResourceManager("@py")
+        resource = f"TCPIP0::127.0.0.1::{server.port}::SOCKET"
+    else:
+        server = None
+        rm = pyvisa.ResourceManager()
+        resource = args.resource
+    inst = open_resource(rm, resource)
+    inst.timeout = 10000
+    inst.read_termination = "\n"
+    inst.write_termination = "\n"
+    try:
+        idn = inst.query("*IDN?").strip()
+        print(f"型号 {idn.split(',')[1] if ',' in idn else idn}，资源 {resource}")
+        if server is not None:
+            bench(inst, idn, args.repeat, len(server.ascii), len(server.binary))
+        else:
+            bench(inst, idn, args.repeat)
+            print(f":SYST:ERR? -> {inst.query(':SYST:ERR?').strip()}")
+            inst.write(ASCII_FORMAT)
+    finally:
+        inst.close()
+        rm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+VISA 连接开销基准：每次新建 ResourceManager + 会话（原实现） vs 进程内会话池（common/visa_pool.py）
+
+按 Rin_FSV3004 一个 DUT 的实际打开顺序重放：
+    清理仪器文件夹(SOCKET) -> 测量连接(SOCKET) -> 6 个分段各一次 MMEM:COPY(inst0::INSTR)
+    -> 底噪连接(SOCKET) + 复制 -> 种子光连接(SOCKET) + 复制
+每次打开后发送一条 *IDN? 作为首条 SCPI，统计每个 DUT 的连接耗时与实际建立的连接数。
+
+用法（在项目根目录）：
+    连接真实仪器：python benchmark/bench_visa_pool.py --ip 192.168.7.10 [--duts 5]
+    无仪器时模拟：python benchmark/bench_visa_pool.py --simulate [--rm-ms 15] [--connect-ms 35] [--duts 20]
+模拟模式用固定延时代替 ResourceManager 创建与 TCP/VXI-11 建链，只用于比较两种方式的相对开销。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.visa_pool import VisaPool
+
+
+def dut_pattern(ip, segments=6):
+    socket = f"TCPIP0::{ip}::5025::SOCKET"
+    instr = f"TCPIP0::{ip}::inst0::INSTR"
+    return [socket, socket] + [instr] * segments + [socket, instr, socket, instr]
+
+
+class _SimResource:
+    def __init__(self, connect_s):
+        time.sleep(connect_s)
+        self.timeout = 2000
+
+    def query(self, cmd):
+        return "Rohde&Schwarz,FSV3004,SIM,1.0"
+
+    def write(self, cmd):
+        pass
+
+    def close(self):
+        pass
+
+
+class _SimResourceManager:
+    def __init__(self, rm_s, connect_s):
+        time.sleep(rm_s)
+        self.connect_s = connect_s
+
+    def open_resource(self, resource):
+        return _SimResource(self.connect_s)
+
+    def close(self):
+        pass
+
+
+def run_direct(pattern, duts, rm_factory):
+    times, connects = [], 0
+    for _ in range(duts):
+        t0 = time.perf_counter()
+        for resource in pattern:
+            rm = rm_factory()
+            inst = rm.open_resource(resource)
+            inst.query("*IDN?")
+            inst.close()
+            rm.close()
+            connects += 1
+        times.append(time.perf_counter() - t0)
+    return times, connects
+
+
+def run_pooled(pattern, duts, rm_factory):
+    pool = VisaPool(rm_factory=rm_factory)
+    times = []
+    for _ in range(duts):
+        t0 = time.perf_counter()
+        for resource in pattern:
+            inst = pool.open(resource)
+            inst.query("*IDN?")
+            inst.close()
+        times.append(time.perf_counter() - t0)
+    connects = pool.stats["connects"] + pool.stats["reconnects"]
+    pool.close_all()
+    return times, connects
+
+
+def report(name, times, connects, duts):
+    ms = [t * 1000 for t in times]
+    print(f"{name:<10} 首个DUT {ms[0]:8.1f} ms   之后平均 {statistics.mean(ms[1:] or ms):8.1f} ms/DUT"
+          f"   合计 {sum(ms):9.1f} ms   建立连接 {connects} 次（{connects / duts:.1f} 次/DUT）")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ip", default="192.168.7.10")
+    ap.add_argument("--duts", type=int, default=5)
+    ap.add_argument("--simulate", action="store_true")
+    ap.add_argument("--rm-ms", type=float, default=15.0, help="模拟：创建 ResourceManager 耗时")
+    ap.add_argument("--connect-ms", type=float, default=35.0, help="模拟：建立一次会话耗时")
+    args = ap.parse_args()
+
+    if args.simulate:
+        def rm_factory():
+            return _SimResourceManager(args.rm_ms / 1000, args.connect_ms / 1000)
+    else:
+        import pyvisa
+        rm_factory = pyvisa.ResourceManager
+
+    pattern = dut_pattern(args.ip)
+    print(f"每个 DUT 打开会话 {len(pattern)} 次，共 {args.duts} 个 DUT{'（模拟）' if args.simulate else ''}")
+    direct, direct_n = run_direct(pattern, args.duts, rm_factory)
+    pooled, pooled_n = run_pooled(pattern, args.duts, rm_factory)
+    report("每次新建", direct, direct_n, args.duts)
+    report("会话池", pooled, pooled_n, args.duts)
+    saved = (sum(direct) - sum(pooled)) / args.duts * 1000
+    print(f"平均每个 DUT 节省连接开销 {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
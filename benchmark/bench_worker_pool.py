@@ -0,0 +1,116 @@
+"""
+一键测试启动延迟基准：测量从"下发测试"到模块首次打开 VISA 资源（首条 SCPI 前）的耗时。
+
+对 MODULE_MAP 中每个模块分别测量两种方式：
+    冷启动：新建进程 -> 导入依赖 -> 建窗口 -> START
+    预热池：进程已完成重量级导入，仅下发 LOAD + START
+
+用法（在项目根目录，需连接仪器网络或运行仪器模拟器）：
+    python benchmark/bench_worker_pool.py [模块名 ...] [--timeout 60]
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from queue import Empty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main_platform import MODULE_MAP, run_module_process, pooled_worker_main
+
+
+def _install_probe(msg_queue):
+    """在子进程中挂钩 ResourceManager.open_resource，记录首次访问仪器的时间"""
+    import pyvisa
+
+    original = pyvisa.ResourceManager.open_resource
+    state = {"sent": False}
+
+    def open_resource(self, *args, **kwargs):
+        if not state["sent"]:
+            state["sent"] = True
+            msg_queue.put(("__bench__", "first_scpi", time.time()))
+        return original(self, *args, **kwargs)
+
+    pyvisa.ResourceManager.open_resource = open_resource
+
+
+def _cold_child(module_name, start_method, msg_queue, cmd_queue):
+    _install_probe(msg_queue)
+    run_module_process(module_name, start_method, msg_queue, cmd_queue)
+
+
+def _warm_child(msg_queue, cmd_queue, ready_event):
+    _install_probe(msg_queue)
+    pooled_worker_main(msg_queue, cmd_queue, ready_event)
+
+
+def _wait_first_scpi(msg_queue, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            module, type_, payload = msg_queue.get(timeout=0.5)
+        except Empty:
+            continue
+        if module == "__bench__" and type_ == "first_scpi":
+            return payload
+    return None
+
+
+def measure_cold(name, timeout):
+    msg_q = multiprocessing.Queue()
+    cmd_q = multiprocessing.Queue()
+    t0 = time.time()
+    p = multiprocessing.Process(target=_cold_child,
+                                args=(name, MODULE_MAP[name]["start_method"], msg_q, cmd_q),
+                                daemon=True)
+    p.start()
+    cmd_q.put("START")
+    t1 = _wait_first_scpi(msg_q, timeout)
+    p.terminate()
+    p.join(5)
+    return None if t1 is None else t1 - t0
+
+
+def measure_warm(name, timeout):
+    msg_q = multiprocessing.Queue()
+    cmd_q = multiprocessing.Queue()
+    ready = multiprocessing.Event()
+    p = multiprocessing.Process(target=_warm_child, args=(msg_q, cmd_q, ready), daemon=True)
+    p.start()
+    if not ready.wait(timeout):
+        p.terminate()
+        return None
+    t0 = time.time()
+    cmd_q.put(("LOAD", name, MODULE_MAP[name]["start_method"], None))
+    cmd_q.put("START")
+    t1 = _wait_first_scpi(msg_q, timeout)
+    p.terminate()
+    p.join(5)
+    return None if t1 is None else t1 - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一键测试启动延迟基准（冷启动 vs 预热池）")
+    parser.add_argument("modules", nargs="*", help="要测量的模块名，默认全部")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单次测量超时 (s)")
+    args = parser.parse_args()
+
+    names = args.modules or list(MODULE_MAP.keys())
+    print(f"{'模块':<14}{'冷启动(ms)':>14}{'预热池(ms)':>14}{'加速比':>10}")
+    for name in names:
+        if name not in MODULE_MAP:
+            print(f"{name:<14}未知模块，跳过")
+            continue
+        cold = measure_cold(name, args.timeout)
+        warm = measure_warm(name, args.timeout)
+        cold_s = f"{cold * 1000:.0f}" if cold is not None else "超时"
+        warm_s = f"{warm * 1000:.0f}" if warm is not None else "超时"
+        ratio = f"{cold / warm:.1f}x" if cold and warm else "-"
+        print(f"{name:<14}{cold_s:>14}{warm_s:>14}{ratio:>10}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
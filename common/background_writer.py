@@ -0,0 +1,41 @@
+"""
+后台顺序写入
+
+BackgroundWriter: 在后台线程按提交顺序执行写汇总文件、断点等收尾操作，不占用下一测量点的时间。
+仪器调用仍在测试线程中逐点进行；close() 等待已提交的写入完成后才返回，调用方随后再读取断点、释放租约。
+
+用法：
+    writer = BackgroundWriter("ct_w")
+    try:
+        for ...:
+            ...                                 # 设置、稳定等待、采集
+            writer.submit(write_point, ...)     # 写入在后台进行
+    finally:
+        writer.close()
+
+只依赖标准库。
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class BackgroundWriter:
+    """按提交顺序在后台线程执行收尾操作；func 自行处理并记录异常"""
+    def __init__(self, name="writer"):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._pending = []
+
+    def submit(self, func, *args, **kwargs):
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(self._executor.submit(func, *args, **kwargs))
+
+    def flush(self, timeout_s=None):
+        """等待已提交的操作执行完（最多 timeout_s 秒，None 表示不限）；返回是否全部完成"""
+        _, not_done = wait(self._pending, timeout=timeout_s)
+        self._pending = list(not_done)
+        return not not_done
+
+    def close(self, timeout_s=None):
+        """等待已提交的操作执行完后关闭线程；超时仍未完成时放弃尚未开始的操作，返回是否全部完成"""
+        finished = self.flush(timeout_s)
+        self._executor.shutdown(wait=finished, cancel_futures=not finished)
+        return finished
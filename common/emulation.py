@@ -0,0 +1,68 @@
+"""
+仪器仿真重定向
+
+环境变量 PTS_EMULATOR 指向仿真实验室（python -m emulator）写出的地址表时，打开仪器前把资源地址换成
+本机仿真仪器的 SOCKET 地址，模块代码与参数都不用改：
+    - 地址表按 common/instrument_lease.instrument_key 归一后的仪器键查找，同一 IP 的 INSTR / SOCKET 写法
+      指向同一台仿真仪器；USB 仪器的键可只写到型号（USB::0X1313::0X8078），匹配任意序列号
+    - 仿真仪器按行收发，重定向后的会话读写结束符设为 LF（原 INSTR 资源靠 END 标志结束）
+    - 未设置环境变量、地址表不存在或表中没有该仪器时原样打开；平台启动的模块进程继承环境变量
+
+用法：
+    inst = open_resource(rm, "TCPIP0::192.168.7.10::inst0::INSTR")
+
+只依赖标准库。
+"""
+import os
+import json
+
+from common.instrument_lease import instrument_key
+
+EMULATOR_ENV = "PTS_EMULATOR"
+
+_tables = {}        # 地址表路径 -> (修改时间, 表)
+
+
+def emulator_table():
+    """当前生效的地址表 {仪器键: "host:port"}；未启用仿真时为空"""
+    path = os.environ.get(EMULATOR_ENV)
+    if not path:
+        return {}
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _tables.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                table = json.load(f)
+        except (OSError, ValueError):
+            table = {}
+        cached = _tables[path] = (mtime, {instrument_key(k): v for k, v in table.items()})
+    return cached[1]
+
+
+def resolve_resource(resource):
+    """仿真仪器的 SOCKET 资源地址；不重定向时返回原地址"""
+    table = emulator_table()
+    if not table:
+        return resource
+    key = instrument_key(resource)
+    address = table.get(key)
+    if address is None:
+        address = next((v for k, v in table.items() if key.startswith(k + "::")), None)
+    if address is None:
+        return resource
+    host, port = str(address).rsplit(":", 1)
+    return f"TCPIP0::{host}::{port}::SOCKET"
+
+
+def open_resource(rm, resource, **kwargs):
+    """rm.open_resource 的替代：仿真启用时打开对应的仿真仪器"""
+    target = resolve_resource(resource)
+    inst = rm.open_resource(target, **kwargs)
+    if target != resource:
+        inst.read_termination = "\n"
+        inst.write_termination = "\n"
+    return inst
@@ -0,0 +1,332 @@
+"""
+仪器租约（lease）服务
+
+集成平台启动一个独立的调度进程，按仪器（VISA 资源）发放租约：
+    - 同一台仪器同一时刻只允许一个模块持有租约，其余模块按申请顺序（FIFO）排队；
+    - 使用不同仪器的模块互不影响，可完全并行；
+    - 持有方进程崩溃/连接断开时，租约自动释放，队首的等待者立即获得租约。
+
+模块侧用法（平台未启动调度服务时为空操作，独立运行不受影响）：
+    lease = InstrumentLease([f"TCPIP0::{ip}::inst0::INSTR"], owner="线宽", log_func=self.log)
+    lease.acquire()
+    try:
+        ...  # 配置、测量
+    finally:
+        lease.release()
+在 Tk 线程中排队时用 tk_wait_check 保持界面响应并可取消。
+
+只依赖标准库，平台主进程导入时不会带入 pyvisa 等重量级依赖。
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+BROKER_ADDRESS_ENV = "PTS_INSTRUMENT_BROKER"
+BROKER_AUTHKEY_ENV = "PTS_INSTRUMENT_BROKER_KEY"
+
+
+def instrument_key(resource: str) -> str:
+    """
+    把 VISA 资源字符串归一化为"仪器"键：同一 IP 的 INSTR / SOCKET / hislip 视为同一台仪器。
+        TCPIP0::192.168.7.10::inst0::INSTR   -> TCPIP::192.168.7.10
+        TCPIP::192.168.7.10::5025::SOCKET    -> TCPIP::192.168.7.10
+        USB0::0x1313::0x8078::P000::INSTR    -> USB::0X1313::0X8078::P000
+    纯 IP 字符串同样视为 TCPIP 仪器。
+    """
+    res = str(resource).strip()
+    if not res:
+        return ""
+    parts = [p for p in res.split("::") if p]
+    if len(parts) == 1:
+        return f"TCPIP::{parts[0]}"
+    head = re.sub(r"\d+$", "", parts[0]).upper()
+    if head == "TCPIP":
+        return f"TCPIP::{parts[1]}"
+    tail = [p.upper() for p in parts[1:] if p.upper() not in ("INSTR", "SOCKET")]
+    return "::".join([head] + tail)
+
+
+# ==========================================
+# 调度进程（由 IntegratedPlatform 启动）
+# ==========================================
+class LeaseBroker:
+    """租约表：key -> 持有者，key -> 等待队列（FIFO）"""
+    def __init__(self, msg_queue=None):
+        self.msg_queue = msg_queue
+        self._lock = threading.Lock()
+        self._holders = {}      # key -> _Client
+        self._waiters = {}      # key -> deque[_Client]
+
+    def _notify(self, level, msg):
+        if self.msg_queue is not None:
+            try:
+                self.msg_queue.put(("仪器调度", level, msg))
+            except Exception:
+                pass
+
+    def acquire(self, client, key):
+        with self._lock:
+            holder = self._holders.get(key)
+            if holder is None:
+                self._holders[key] = client
+                client.held.add(key)
+                granted = True
+            else:
+                self._waiters.setdefault(key, deque()).append(client)
+                granted = False
+                holder_name = holder.owner
+                position = len(self._waiters[key])
+        if granted:
+            client.send(("GRANTED", key))
+            self._notify("info", f"{client.owner} 获得 {key}")
+        else:
+            client.send(("QUEUED", key, holder_name, position))
+            self._notify("warning", f"{client.owner} 等待 {key}（当前占用: {holder_name}，排队第 {position} 位）")
+
+    def release(self, client, key):
+        next_client = None
+        with self._lock:
+            if self._holders.get(key) is not client:
+                return
+            client.held.discard(key)
+            del self._holders[key]
+            queue = self._waiters.get(key)
+            while queue:
+                cand = queue.popleft()
+                if cand.alive:
+                    next_client = cand
+                    self._holders[key] = cand
+                    cand.held.add(key)
+                    break
+            if queue is not None and not queue:
+                del self._waiters[key]
+        self._notify("info", f"{client.owner} 释放 {key}")
+        if next_client is not None:
+            next_client.send(("GRANTED", key))
+            self._notify("info", f"{next_client.owner} 获得 {key}")
+
+    def drop(self, client):
+        """连接断开：清理该连接的排队记录并释放其持有的全部租约"""
+        client.alive = False
+        with self._lock:
+            for key, queue in list(self._waiters.items()):
+                if client in queue:
+                    queue.remove(client)
+                if not queue:
+                    del self._waiters[key]
+            held = list(client.held)
+        for key in held:
+            self.release(client, key)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {"holder": holder.owner,
+                      "waiting": [c.owner for c in self._waiters.get(key, ())]}
+                for key, holder in self._holders.items()
+            }
+
+
+class _Client:
+    def __init__(self, conn):
+        self.conn = conn
+        self.owner = "?"
+        self.held = set()
+        self.alive = True
+        self._send_lock = threading.Lock()
+
+    def send(self, obj):
+        try:
+            with self._send_lock:
+                self.conn.send(obj)
+        except Exception:
+            self.alive = False
+
+
+def _serve_client(broker, client):
+    try:
+        while True:
+            req = client.conn.recv()
+            cmd = req[0]
+            if cmd == "ACQUIRE":
+                _, key, owner = req
+                client.owner = owner or client.owner
+                broker.acquire(client, key)
+            elif cmd == "RELEASE":
+                broker.release(client, req[1])
+            elif cmd == "STATUS":
+                client.send(("STATUS", broker.snapshot()))
+    except (EOFError, OSError):
+        pass
+    except Exception as e:
+        print(f"[仪器调度] 连接处理异常: {e}")
+    finally:
+        broker.drop(client)
+        try:
+            client.conn.close()
+        except Exception:
+            pass
+
+
+def lease_broker_main(address_conn, authkey, msg_queue=None):
+    """
+    调度进程入口：在本机随机端口监听，把实际地址通过 address_conn 回传给平台，
+    每个客户端连接一个线程。
+    """
+    listener = Listener(("127.0.0.1", 0), authkey=authkey)
+    address_conn.send(listener.address)
+    address_conn.close()
+    broker = LeaseBroker(msg_queue)
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            print(f"[仪器调度] accept 失败: {e}")
+            time.sleep(0.1)
+            continue
+        client = _Client(conn)
+        threading.Thread(target=_serve_client, args=(broker, client), daemon=True).start()
+
+
+def start_lease_broker(msg_queue=None, timeout=10.0):
+    """
+    启动调度进程并把地址写入环境变量（之后创建的子进程自动继承）。
+    返回 Process 对象；启动失败返回 None，平台退化为无租约模式。
+    """
+    import multiprocessing
+    authkey = os.urandom(16)
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    p = multiprocessing.Process(target=lease_broker_main, args=(child_conn, authkey, msg_queue), daemon=True)
+    p.start()
+    if not parent_conn.poll(timeout):
+        p.terminate()
+        return None
+    host, port = parent_conn.recv()
+    os.environ[BROKER_ADDRESS_ENV] = f"{host}:{port}"
+    os.environ[BROKER_AUTHKEY_ENV] = authkey.hex()
+    return p
+
+
+def _broker_address():
+    addr = os.environ.get(BROKER_ADDRESS_ENV)
+    key = os.environ.get(BROKER_AUTHKEY_ENV)
+    if not addr or not key:
+        return None, None
+    host, port = addr.rsplit(":", 1)
+    return (host, int(port)), bytes.fromhex(key)
+
+
+def query_leases():
+    """查询当前租约表 {key: {"holder":..., "waiting": [...]}}，调度服务不可用时返回 {}"""
+    address, authkey = _broker_address()
+    if address is None:
+        return {}
+    try:
+        conn = Client(address, authkey=authkey)
+        try:
+            conn.send(("STATUS",))
+            reply = conn.recv()
+            return reply[1] if reply and reply[0] == "STATUS" else {}
+        finally:
+            conn.close()
+    except Exception:
+        return {}
+
+
+# ==========================================
+# 模块侧客户端
+# ==========================================
+def tk_wait_check(root, stop_check=None):
+    """
+    供在 Tk 线程中调用 acquire 的模块使用：排队等待期间（每 0.5 s）处理界面事件，窗口保持响应，
+    “停止”等按钮可以取消等待；窗口已关闭时同样放弃等待。
+        lease.acquire(timeout=600, stop_check=tk_wait_check(self.root, self.stop_flag.is_set))
+    """
+    def check():
+        try:
+            root.update()
+        except Exception:
+            return True
+        return stop_check is not None and bool(stop_check())
+    return check
+
+
+class InstrumentLease:
+    """
+    一次测量对若干仪器的租约。按归一化后的键排序依次申请，避免多模块交叉等待造成死锁。
+    """
+    def __init__(self, resources, owner: str = "", log_func=print):
+        if isinstance(resources, str):
+            resources = [resources]
+        self.keys = sorted({instrument_key(r) for r in resources if r})
+        self.owner = owner or f"PID {os.getpid()}"
+        self.log = log_func
+        self._conn = None
+
+    def acquire(self, timeout=None, stop_check=None) -> bool:
+        """
+        阻塞直到获得全部仪器的租约。
+        stop_check: 可选回调，返回 True 时放弃等待（用于响应"停止"按钮）。
+        返回 True 表示可以开始测量。未运行调度服务时直接返回 True。
+        """
+        address, authkey = _broker_address()
+        if address is None or not self.keys:
+            return True
+        try:
+            self._conn = Client(address, authkey=authkey)
+        except Exception as e:
+            self.log(f"[调度] 无法连接仪器调度服务，直接运行: {e}")
+            self._conn = None
+            return True
+
+        deadline = None if timeout is None else time.time() + timeout
+        for key in self.keys:
+            self._conn.send(("ACQUIRE", key, self.owner))
+            reply = self._conn.recv()
+            if reply[0] == "QUEUED":
+                self.log(f"[调度] 仪器 {key} 正被 {reply[2]} 使用，排队等待（第 {reply[3]} 位）...")
+                while True:
+                    if stop_check is not None and stop_check():
+                        self.log("[调度] 已取消等待仪器")
+                        self.release()
+                        return False
+                    if deadline is not None and time.time() > deadline:
+                        self.log(f"[调度] 等待仪器 {key} 超时")
+                        self.release()
+                        return False
+                    if self._conn.poll(0.5):
+                        reply = self._conn.recv()
+                        break
+            if reply[0] != "GRANTED":
+                self.log(f"[调度] 租约申请异常: {reply}")
+                self.release()
+                return False
+            self.log(f"[调度] 已获得仪器 {key}")
+        return True
+
+    def release(self):
+        """释放全部租约（关闭连接即可，调度进程会自动回收）"""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            for key in self.keys:
+                conn.send(("RELEASE", key))
+        except Exception:
+            pass
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
@@ -0,0 +1,111 @@
+"""
+仪器能力档案：首次连接时探测出的可用命令与数据格式，按 *IDN? 型号保存到本地
+
+同一功能在不同型号/固件上的命令写法不同，原先每次调用都按候选顺序逐个尝试（不支持的命令往往要等到超时）。
+InstrumentProfile 记录每个功能第一个可用的写法，之后的会话直接使用：
+    - 档案按 *IDN? 的 厂商,型号,固件版本 区分（不含序列号，同型号同固件的仪器共用），保存在程序目录下的
+      instrument_profiles.json，多个模块进程共用；写入时先读回文件合并，再整体替换
+    - first_working() 先试已记录的写法，失败再按候选顺序探测并更新记录（固件升级后自动重新学习）
+    - 可选功能（例如只用于日志确认的读回）全部失败时可记为不支持，之后不再探测
+    - *IDN? 为空时只在内存中记录，不写文件
+
+用法：
+    self.profile = InstrumentProfile(idn, log=self.log)
+    val = self.profile.first_working("read_power", ["READ?", "MEAS:POW?"], self._try_query_float)
+    fmt = self.profile.get("trace_format")
+
+只依赖标准库。
+"""
+import os
+import sys
+import json
+
+PROFILE_FILE = "instrument_profiles.json"
+UNSUPPORTED = ""        # 记为不支持的功能
+
+
+def default_profile_path():
+    """程序所在目录下的 instrument_profiles.json（兼容 PyInstaller 打包后的 exe）"""
+    if getattr(sys, "frozen", False):
+        base = os.path.dirname(os.path.abspath(sys.executable))
+    else:
+        base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, PROFILE_FILE)
+
+
+def identity(idn):
+    """*IDN? 响应去掉序列号（第 3 段）后作为档案键"""
+    parts = [p.strip() for p in str(idn or "").strip().split(",")]
+    if len(parts) >= 4:
+        parts = parts[:2] + parts[3:]
+    return ",".join(parts)
+
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+class InstrumentProfile:
+    """
+    idn:  *IDN? 响应
+    path: 档案文件路径，None 时用 default_profile_path()
+    log:  提供时记录新学到的写法
+    """
+    def __init__(self, idn, path=None, log=None):
+        self.key = identity(idn)
+        self.path = path or default_profile_path()
+        self.log = log
+        self.data = dict(_load(self.path).get(self.key, {})) if self.key else {}
+
+    def get(self, name, default=None):
+        return self.data.get(name, default)
+
+    def set(self, name, value):
+        """记录并保存；值未变时不写文件"""
+        if name in self.data and self.data[name] == value:
+            return
+        self.data[name] = value
+        if self.log is not None:
+            shown = "不支持" if value == UNSUPPORTED else value
+            self.log(f"[档案] {self.key or '未知型号'}：{name} -> {shown}")
+        if self.key:
+            self.save()
+
+    def save(self):
+        try:
+            profiles = _load(self.path)
+            profiles.setdefault(self.key, {}).update(self.data)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            if self.log is not None:
+                self.log(f"[档案] 保存失败: {e}")
+
+    def first_working(self, name, candidates, probe, remember_unsupported=False):
+        """
+        依次用 candidates 中的写法调用 probe(写法)，返回第一个不为 None（且未抛出异常）的结果；
+        已记录可用的写法排在最前，成功的写法被记录。全部失败返回 None；remember_unsupported 为 True 时
+        记为不支持，之后直接返回 None 不再探测。
+        """
+        known = self.data.get(name)
+        if known == UNSUPPORTED and remember_unsupported:
+            return None
+        order = ([known] if known in candidates else []) + [c for c in candidates if c != known]
+        for candidate in order:
+            try:
+                result = probe(candidate)
+            except Exception:
+                result = None
+            if result is not None:
+                self.set(name, candidate)
+                return result
+        if remember_unsupported:
+            self.set(name, UNSUPPORTED)
+        return None
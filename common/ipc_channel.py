@@ -0,0 +1,133 @@
+"""
+平台与模块进程之间的事件驱动通信
+
+QueueReader:     后台线程阻塞读取 multiprocessing.Queue，数据到达后合并唤醒一次 Tk 主循环，
+                 替代 after(200) 轮询 empty()/get_nowait()，空闲时不占 CPU、到达即处理。
+TelemetryWriter: 模块进程侧的高频消息（日志行、进度）先写入本地缓冲，
+                 每个发送周期打包成一条 (模块, "batch", 文本块) 消息，避免每行日志单独 pickle 一个元组。
+
+只依赖标准库。
+"""
+import threading
+import time
+from collections import deque
+from queue import Empty
+
+RECORD_SEP = "\x1e"
+FIELD_SEP = "\x1f"
+
+
+class QueueReader:
+    """
+    root:      Tk 根窗口（handler 在 Tk 线程中执行）
+    queue:     multiprocessing.Queue
+    handler:   handler(items) —— 一次唤醒内到达的全部数据（列表）
+    max_batch: 单次唤醒最多顺带取走的条数
+    """
+    def __init__(self, root, queue, handler, max_batch=1000):
+        self.root = root
+        self.queue = queue
+        self.handler = handler
+        self.max_batch = max_batch
+        self._pending = deque()
+        self._wake_lock = threading.Lock()
+        self._wake_scheduled = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                item = self.queue.get()
+            except (EOFError, OSError):
+                break
+            except Exception:
+                continue
+            self._pending.append(item)
+            # 顺带取走已经到达的数据，一次唤醒处理一批
+            for _ in range(self.max_batch):
+                try:
+                    self._pending.append(self.queue.get_nowait())
+                except Empty:
+                    break
+                except Exception:
+                    break
+            self._wake()
+
+    def _wake(self):
+        with self._wake_lock:
+            if self._wake_scheduled:
+                return
+            self._wake_scheduled = True
+        try:
+            self.root.after(0, self._drain)
+        except Exception:
+            # Tk 已销毁，停止读取
+            self._stopped = True
+
+    def _drain(self):
+        with self._wake_lock:
+            self._wake_scheduled = False
+        items = []
+        while self._pending:
+            items.append(self._pending.popleft())
+        if items:
+            try:
+                self.handler(items)
+            except Exception as e:
+                print(f"[IPC] 消息处理异常: {e}")
+
+    def stop(self):
+        self._stopped = True
+
+
+class TelemetryWriter:
+    """
+    模块进程侧的批量发送器：put() 只做一次 deque.append，可在任意线程调用；
+    后台线程每 interval 秒把缓冲内容编码成一个字符串，作为一条消息发送。
+    """
+    def __init__(self, msg_queue, module_name, interval=0.1, max_records=2000):
+        self.msg_queue = msg_queue
+        self.module_name = module_name
+        self.interval = interval
+        self.max_records = max_records
+        self._buf = deque()
+        self._event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, type_, msg):
+        self._buf.append((type_, msg))
+        self._event.set()
+
+    def flush(self):
+        records = []
+        while self._buf and len(records) < self.max_records:
+            records.append(self._buf.popleft())
+        if not records:
+            return
+        payload = RECORD_SEP.join(f"{t}{FIELD_SEP}{m}" for t, m in records)
+        try:
+            self.msg_queue.put((self.module_name, "batch", payload))
+        except Exception:
+            pass
+
+    def _run(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            time.sleep(self.interval)
+            while self._buf:
+                self.flush()
+
+
+def unpack_batch(payload):
+    """把 TelemetryWriter 打包的文本块还原为 [(类型, 文本), ...]"""
+    out = []
+    for rec in payload.split(RECORD_SEP):
+        if not rec:
+            continue
+        type_, _, msg = rec.partition(FIELD_SEP)
+        out.append((type_, msg))
+    return out
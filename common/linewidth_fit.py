@@ -0,0 +1,258 @@
+"""
+线宽拟合：对自外差拍频谱迹线拟合 Lorentz / Voigt 线型
+
+原线宽取法依赖仪器 n dB down Marker（结果要等仪器算完），或在迹线上取离 -3 dB 最近的采样点（精度受点间距限制）。
+这里直接用一次读回的迹线（dBm）做最小二乘拟合，得到线宽及其不确定度：
+    - 模型（dB 域，与频谱仪对数显示的噪声起伏相符）：10·log10(P·shape(f) + 底噪)
+        lorentz  shape = 1 / (1 + (2(f - f0)/FWHM_L)²)
+        voigt    伪 Voigt（Thompson-Cox-Hastings 近似）：Lorentz 宽度 FWHM_L 与 Gauss 宽度 FWHM_G（RBW、1/f 噪声展宽）；
+                 两个宽度的分离受近似精度限制，Gauss 展宽与线宽相当时才比 lorentz 准确
+    - 自外差拍频的 Lorentz 全宽为激光线宽的 2 倍：linewidth = FWHM_L / 2（与 NDB20 / (2√99) 的换算一致）
+    - 批量：多条迹线（各温度点、各 Span）一次调用，Levenberg-Marquardt 迭代对整批数组同时进行；
+      各条迹线的频率轴可以不同，点数不同时按 NaN 补齐
+    - 只拟合峰值两侧 window 倍初估 FWHM 以内的点（数组只保留这一段），NaN 点不参与；已收敛的迹线不再参与后续迭代
+    - 步长小于各参数 1σ 不确定度的 STEP_SIGMA 倍即视为收敛（窗口内看不清底噪时，底噪参数会在一个平坦的谷底来回小步移动）
+    - 不确定度由残差方差与 Jacobian 得到的协方差给出（1σ）；相邻点受 RBW 滤波相关，实际不确定度会偏大
+
+用法：
+    result = fit_lineshapes(freqs, traces_dbm, model="lorentz")      # freqs: (n,) 或 (m, n)，traces: (m, n)
+    result["linewidth_hz"][i], result["linewidth_err_hz"][i]
+    linewidth_from_3db_samples(freqs, trace_dbm)                    # 拟合未收敛时的回退：-3 dB 采样点全宽的一半
+
+依赖 numpy。
+"""
+import warnings
+
+import numpy as np
+
+MODELS = ("lorentz", "voigt")
+
+# 底噪初值（迹线 10% 分位）的先验宽度（dB）
+FLOOR_PRIOR_DB = 100.0
+# 收敛判据：步长小于参数 1σ 不确定度的这一比例
+STEP_SIGMA = 0.05
+# 归一化宽度的对数上下限（Voigt 中一个分量趋于 0 时不再继续缩小）
+_LOG_WIDTH_LIMITS = (-12.0, 6.0)
+
+_LN2 = np.log(2.0)
+
+
+def _shape(u, u0, fl, fg=None):
+    """峰值归一的线型；u 为归一化频率，fl / fg 为归一化全宽"""
+    d = u - u0
+    lorentz = 1.0 / (1.0 + (2.0 * d / fl) ** 2)
+    if fg is None:
+        return lorentz
+    # 伪 Voigt：总宽度与混合系数按 Thompson-Cox-Hastings 近似
+    f = (fg ** 5 + 2.69269 * fg ** 4 * fl + 2.42843 * fg ** 3 * fl ** 2 + 4.47163 * fg ** 2 * fl ** 3
+         + 0.07842 * fg * fl ** 4 + fl ** 5) ** 0.2
+    r = fl / f
+    eta = 1.36603 * r - 0.47719 * r ** 2 + 0.11116 * r ** 3
+    gauss = np.exp(-4.0 * _LN2 * (d / f) ** 2)
+    return eta / (1.0 + (2.0 * d / f) ** 2) + (1.0 - eta) * gauss
+
+
+def _model(theta, u, voigt):
+    """theta: (m, p) = [峰值 dBm, 中心, ln FWHM_L, (ln FWHM_G), 底噪 dBm]，u: (m, n)"""
+    peak, u0 = theta[:, 0:1], theta[:, 1:2]
+    fl = np.exp(np.clip(theta[:, 2:3], *_LOG_WIDTH_LIMITS))
+    fg = np.exp(np.clip(theta[:, 3:4], *_LOG_WIDTH_LIMITS)) if voigt else None
+    floor = theta[:, -1:]
+    linear = 10.0 ** (peak / 10.0) * _shape(u, u0, fl, fg) + 10.0 ** (floor / 10.0)
+    return 10.0 * np.log10(linear)
+
+
+def _rows(data):
+    """单条（一维）或多条（二维 / 列表）数据整理为行列表"""
+    if isinstance(data, np.ndarray) and data.ndim <= 2:
+        return list(np.atleast_2d(data.astype(float)))
+    rows = [np.asarray(r, dtype=float) for r in data]
+    if rows and rows[0].ndim == 0:
+        return [np.asarray(data, dtype=float)]
+    return [r.ravel() for r in rows]
+
+
+def _as_batch(freqs, traces):
+    """整理为 (m, n) 的频率与迹线数组，点数不同时用 NaN 补齐"""
+    ys = _rows(traces)
+    xs = _rows(freqs)
+    if len(xs) == 1 and len(ys) != 1:
+        xs = xs * len(ys)
+    if len(xs) != len(ys):
+        raise ValueError(f"频率轴 {len(xs)} 条与迹线 {len(ys)} 条不对应")
+    n = max(max((len(r) for r in ys), default=0), 1)
+    x = np.full((len(ys), n), np.nan)
+    y = np.full((len(ys), n), np.nan)
+    for i, (fx, fy) in enumerate(zip(xs, ys)):
+        if len(fx) != len(fy):
+            raise ValueError(f"第 {i} 条迹线点数 {len(fy)} 与频率轴 {len(fx)} 不一致")
+        x[i, :len(fx)] = fx
+        y[i, :len(fy)] = fy
+    return x, y
+
+
+def _initial(x, y, window):
+    """按最高点与 -3 dB 交点给出初值，并选出拟合窗口"""
+    m, n = y.shape
+    rows = np.arange(m)
+    filled = np.where(np.isfinite(y), y, -np.inf)
+    k = np.argmax(filled, axis=1)
+    peak = filled[rows, k]
+    f0 = x[rows, k]
+    with warnings.catch_warnings():
+        # 全为 NaN 的迹线在 fit_lineshapes 中记为无效
+        warnings.simplefilter("ignore", RuntimeWarning)
+        floor = np.nanpercentile(np.where(np.isfinite(y), y, np.nan), 10, axis=1)
+        step = np.nanmedian(np.abs(np.diff(x, axis=1)), axis=1)
+    # -3 dB 交点：峰值左右第一个低于峰值 3 dB 的点
+    idx = np.arange(n)
+    below = np.isfinite(y) & (filled <= (peak - 3.0)[:, None])
+    left = np.where(below & (idx < k[:, None]), idx, -1).max(axis=1)
+    right = np.where(below & (idx > k[:, None]), idx, n).min(axis=1)
+    left_f = np.where(left >= 0, x[rows, np.maximum(left, 0)], f0 - step)
+    right_f = np.where(right < n, x[rows, np.minimum(right, n - 1)], f0 + step)
+    width = np.maximum(np.abs(right_f - left_f), 2.0 * step)
+    u = (x - f0[:, None]) / width[:, None]
+    use = np.isfinite(y) & np.isfinite(u) & (np.abs(u) <= window)
+    return f0, width, peak, np.minimum(floor, peak - 3.0), u, use
+
+
+def fit_lineshapes(freqs, traces, model="lorentz", window=10.0, max_iter=200, tol=1e-8):
+    """
+    freqs:  频率（Hz），(n,) 各迹线共用，或每条迹线一行
+    traces: 迹线（dBm），(m, n) 数组或长度可不同的迹线列表；单条迹线也可直接传入
+    model:  "lorentz" 或 "voigt"
+    window: 拟合窗口（初估 FWHM 的倍数，峰值两侧）
+    返回 dict，各项为长度 m 的数组：
+        linewidth_hz / linewidth_err_hz   激光线宽（Lorentz 全宽的一半）及 1σ 不确定度
+        fwhm_hz / gauss_fwhm_hz           拍频 Lorentz 全宽、Gauss 全宽（lorentz 模型为 0）
+        center_hz / peak_dbm / floor_dbm  中心频率、峰值、底噪
+        rms_db / points / ok              残差均方根、参与拟合的点数、拟合是否收敛
+    """
+    if model not in MODELS:
+        raise ValueError(f"未知的线型模型: {model}（可选 {', '.join(MODELS)}）")
+    voigt = model == "voigt"
+    x, y = _as_batch(freqs, traces)
+    m = len(y)
+    f0, width, peak, floor, u, use = _initial(x, y, window)
+    # 只取各行窗口所在的列（频率升序时窗口连续），数组宽度由整条迹线缩到最宽的窗口
+    n = use.shape[1]
+    start = np.argmax(use, axis=1)
+    last = n - 1 - np.argmax(use[:, ::-1], axis=1)
+    raw = start[:, None] + np.arange(max(int((last - start).max(initial=0)) + 1, 1))
+    cols = np.minimum(raw, max(n - 1, 0))
+    rows = np.arange(m)[:, None]
+    use = use[rows, cols] & (raw <= last[:, None])
+    u = np.where(use, u[rows, cols], 0.0)
+    y_fit = np.where(use, y[rows, cols], 0.0)
+    w = use.astype(float)
+
+    points = use.sum(axis=1)
+    # 有效点不足（全为 NaN、迹线过短）的迹线不参与迭代，结果记为 NaN
+    valid = np.isfinite(peak) & np.isfinite(width) & (points > (5 if voigt else 4))
+    peak = np.where(valid, peak, 0.0)
+    floor = np.where(valid, floor, 0.0)
+
+    columns = [peak, np.zeros(m), np.zeros(m)]
+    if voigt:
+        # Lorentz 与 Gauss 各占一部分初估宽度
+        columns[2] = np.full(m, np.log(0.7))
+        columns.append(np.full(m, np.log(0.5)))
+    columns.append(floor)
+    theta = np.stack(columns, axis=1)
+    p = theta.shape[1]
+
+    floor0 = floor.copy()
+    dof = np.maximum(points - p, 1)
+
+    def residual(th, sel):
+        # 末列为底噪的弱先验：窗口内看不到底噪（Span 窄、线宽宽）时底噪参数不至于发散
+        prior = (th[:, -1] - floor0[sel]) / FLOOR_PRIOR_DB
+        return np.concatenate([(_model(th, u[sel], voigt) - y_fit[sel]) * w[sel], prior[:, None]], axis=1)
+
+    def jacobian(th, r0, sel):
+        jac = np.empty(r0.shape + (p,))
+        for j in range(p):
+            h = 1e-6 * np.maximum(1.0, np.abs(th[:, j]))
+            shifted = th.copy()
+            shifted[:, j] += h
+            jac[..., j] = (residual(shifted, sel) - r0) / h[:, None]
+        return jac
+
+    everything = np.arange(m)
+    r = residual(theta, everything)
+    cost = np.einsum("mn,mn->m", r, r)
+    lam = np.full(m, 1e-3)
+    active = valid.copy()
+    eye = np.eye(p)
+    for _ in range(max_iter):
+        # 只对未收敛的迹线继续迭代
+        sel = np.flatnonzero(active)
+        if not len(sel):
+            break
+        th, r_sel, cost_sel, lam_sel = theta[sel], r[sel], cost[sel], lam[sel]
+        jac = jacobian(th, r_sel, sel)
+        jt = jac.transpose(0, 2, 1)
+        jtj = jt @ jac
+        grad = (jt @ r_sel[..., None])[..., 0]
+        inverse = np.linalg.pinv(jtj + lam_sel[:, None, None] * (jtj * eye + 1e-12 * eye))
+        step = -(inverse @ grad[..., None])[..., 0]
+        trial = th + step
+        r_trial = residual(trial, sel)
+        cost_trial = np.einsum("mn,mn->m", r_trial, r_trial)
+        better = np.isfinite(cost_trial) & (cost_trial <= cost_sel)
+        improvement = np.where(better, (cost_sel - cost_trial) / np.maximum(cost_sel, 1e-300), 0.0)
+        # 步长已远小于参数的统计不确定度（底噪看不清时在其附近来回的小步不必再走）
+        sigma2 = np.diagonal(inverse, axis1=1, axis2=2) * (cost_sel / dof[sel])[:, None]
+        negligible = np.all(step ** 2 <= (STEP_SIGMA ** 2) * sigma2, axis=1)
+        accepted = sel[better]
+        theta[accepted] = trial[better]
+        r[accepted] = r_trial[better]
+        cost[accepted] = cost_trial[better]
+        lam[sel] = np.where(better, np.maximum(lam_sel / 3.0, 1e-7), lam_sel * 3.0)
+        # 收敛：步长相对不确定度可忽略，接受的一步改善已很小，或阻尼增大到步长可忽略
+        done = negligible | (better & (improvement < tol)) | (lam[sel] > 1e10)
+        active[sel[done]] = False
+
+    # 协方差：s²·(JᵀJ)⁻¹
+    jac = jacobian(theta, r, everything)
+    jtj = jac.transpose(0, 2, 1) @ jac
+    s2 = np.einsum("mn,mn->m", r[:, :-1], r[:, :-1]) / dof
+    # 宽度到达上下限的参数（Voigt 中趋于 0 的分量）导数为 0，用伪逆即视为固定，不影响其余参数的不确定度
+    cov = np.linalg.pinv(jtj) * s2[:, None, None]
+
+    theta[:, 2:p - 1] = np.clip(theta[:, 2:p - 1], *_LOG_WIDTH_LIMITS)
+    fwhm = width * np.exp(theta[:, 2])
+    fwhm_err = fwhm * np.sqrt(np.maximum(cov[:, 2, 2], 0.0))
+    gauss = width * np.exp(theta[:, 3]) if voigt else np.zeros(m)
+    ok = valid & np.isfinite(fwhm_err) & (fwhm_err > 0) & ~active
+    theta[~valid] = np.nan
+    fwhm[~valid] = fwhm_err[~valid] = gauss[~valid] = np.nan
+    return {
+        "linewidth_hz": fwhm / 2.0,
+        "linewidth_err_hz": fwhm_err / 2.0,
+        "fwhm_hz": fwhm,
+        "gauss_fwhm_hz": gauss,
+        "center_hz": f0 + theta[:, 1] * width,
+        "peak_dbm": theta[:, 0],
+        "floor_dbm": theta[:, -1],
+        "rms_db": np.sqrt(np.einsum("mn,mn->m", r[:, :-1], r[:, :-1]) / np.maximum(points, 1)),
+        "points": points,
+        "ok": ok,
+    }
+
+
+def linewidth_from_3db_samples(x, y):
+    """
+    拟合未收敛时的回退取法：峰值两侧第一个不高于峰值 -3 dB 的采样点间距（拍频全宽），取一半作为线宽（Hz）。
+    精度受点间距限制；找不到 -3 dB 交点时返回 NaN。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    k = int(np.argmax(y))
+    half = y[k] - 3.0
+    left = np.where(y[:k] <= half)[0]
+    right = np.where(y[k:] <= half)[0]
+    if len(left) == 0 or len(right) == 0:
+        return float("nan")
+    return abs(x[k + right[0]] - x[left[-1]]) / 2.0
@@ -0,0 +1,138 @@
+"""
+模块窗口日志总线
+
+测量线程调用 LogBus.write(msg) 只把 (时间, 消息) 追加到 deque（无锁、不触碰 Tk），
+Tk 线程按固定帧率（默认 20 次/秒）批量取出：
+    - 一次插入 Text 控件并滚动到底部，连续重复的行合并显示为 "… (×N)"
+    - 控件中最多保留 max_lines 行，超出的旧行删除
+    - 每一行（含重复行）完整写入轮转日志文件 logs/<名称>.log
+
+用法（GUI 创建日志 Text 控件之后）：
+    self.log_bus = LogBus(self.log_box, "Rin_4051")
+    def log(self, msg):
+        self.log_bus.write(msg)
+
+只依赖标准库。
+"""
+import os
+import sys
+import time
+import logging
+import logging.handlers
+from collections import deque
+
+from common.stations import current_station
+
+
+def default_log_dir():
+    """程序所在目录下的 logs（兼容 PyInstaller 打包后的 exe）"""
+    if getattr(sys, "frozen", False):
+        base = os.path.dirname(os.path.abspath(sys.executable))
+    else:
+        base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, "logs")
+
+
+def make_file_logger(name, log_dir=None, max_bytes=5 * 1024 * 1024, backups=5):
+    """按名称创建轮转文件 logger（只写文件、不向上传播），创建失败时返回 None"""
+    logger = logging.getLogger(f"pts.{name}")
+    if logger.handlers:
+        return logger
+    try:
+        log_dir = log_dir or default_log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(os.path.join(log_dir, f"{name}.log"), maxBytes=max_bytes,
+                                                       backupCount=backups, encoding="utf-8", delay=True)
+    except Exception as e:
+        print(f"创建日志文件失败: {e}")
+        return None
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+class LogBus:
+    """
+    widget:    日志 Text 控件（在 Tk 线程中创建）
+    name:      日志文件名（logs/<name>.log，非默认工位为 logs/<name>_<工位>.log），为 None 时不写文件
+    fps:       每秒刷新次数
+    max_lines: 控件中最多保留的行数
+    """
+    MARK = "logbus_last"
+
+    def __init__(self, widget, name=None, fps=20, max_lines=5000, log_dir=None):
+        self.widget = widget
+        self.interval_ms = max(int(1000 / fps), 10)
+        self.max_lines = int(max_lines)
+        if name and current_station():
+            name = f"{name}_{current_station()}"
+        self.file_logger = make_file_logger(name, log_dir) if name else None
+        self._queue = deque()
+        self._last_msg = None
+        self._repeat = 0
+        self._stopped = False
+        self.widget.after(self.interval_ms, self._tick)
+
+    def write(self, msg):
+        """任意线程调用；不阻塞、不访问 Tk"""
+        self._queue.append((time.strftime("[%H:%M:%S]"), str(msg)))
+
+    def stop(self):
+        self._stopped = True
+        self.drain()
+
+    def _tick(self):
+        if self._stopped:
+            return
+        try:
+            self.drain()
+        finally:
+            try:
+                self.widget.after(self.interval_ms, self._tick)
+            except Exception:
+                self._stopped = True        # 控件已销毁
+
+    def drain(self):
+        """在 Tk 线程中取出本周期积累的全部日志并一次性显示"""
+        items = []
+        queue = self._queue
+        while queue:
+            items.append(queue.popleft())
+        if not items:
+            return
+        if self.file_logger is not None:
+            try:
+                self.file_logger.info("\n".join(f"{t} {m}" for t, m in items))
+            except Exception:
+                pass
+
+        # 合并连续重复行；与控件最后一行相同的消息改写最后一行的重复次数
+        lines = []          # [[时间, 消息, 次数]]
+        for t, m in items:
+            if lines and lines[-1][1] == m:
+                lines[-1][0] = t
+                lines[-1][2] += 1
+            else:
+                lines.append([t, m, 1])
+        replace_last = lines[0][1] == self._last_msg
+        if replace_last:
+            lines[0][2] += self._repeat
+        self._last_msg, self._repeat = lines[-1][1], lines[-1][2]
+
+        w = self.widget
+        try:
+            if replace_last:
+                w.delete(self.MARK, "end-1c")
+            for i, (t, m, n) in enumerate(lines):
+                if i == len(lines) - 1:
+                    w.mark_set(self.MARK, "end-1c")
+                    w.mark_gravity(self.MARK, "left")
+                w.insert("end", f"{t} {m}" + (f"  (×{n})" if n > 1 else "") + "\n")
+            excess = int(w.index("end-1c").split(".")[0]) - 1 - self.max_lines
+            if excess > 0:
+                w.delete("1.0", f"{excess + 1}.0")
+            w.see("end")
+        except Exception:
+            pass
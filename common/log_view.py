@@ -0,0 +1,329 @@
+"""
+平台日志区：固定内存上限的日志模型 + 只显示有限行的 Treeview 视图
+
+LogStore:       全部日志按顺序编号（seq）写入本次会话的磁盘日志文件，内存中只保留最近 memory_cap 条（环形缓冲），
+                更早的记录按 seq 从文件中读取（文件偏移保存在紧凑数组中）。
+VirtualLogView: Treeview 中最多保留 max_rows 行。新日志先进入待显示列表，每个 UI 周期批量插入一次；
+                滚动到顶部时向前分页读取更早的日志（内存或磁盘），滚动到底部时恢复自动跟随最新日志。
+                按模块/级别筛选只在当前窗口范围内重新加载，不需要重建全部日志。
+
+只依赖标准库（tkinter）。
+"""
+import os
+import json
+import time
+import glob
+from array import array
+from collections import deque
+
+LEVEL_COLORS = {
+    "error": "red",
+    "warning": "#E67E00",
+    "completed": "#008000",     # 深绿色
+    "running": "#0000FF",
+}
+
+# 级别筛选选项：显示名 -> 允许的级别集合（None 表示全部）
+LEVEL_FILTERS = {
+    "全部级别": None,
+    "错误": {"error"},
+    "错误/警告": {"error", "warning"},
+    "状态": {"running", "completed", "error"},
+}
+
+
+class LogStore:
+    """
+    record: (seq, 时间, 模块, 级别, 消息)
+    path:   本次会话日志文件（每行一条 JSON 数组），为 None 时只保留内存中的记录
+    """
+    def __init__(self, path=None, memory_cap=5000):
+        self.path = path
+        self._ring = deque(maxlen=max(int(memory_cap), 100))
+        self._offsets = array("q")
+        self._size = 0
+        self._dirty = False
+        self._file = None
+        self.next_seq = 0
+        self.modules = []
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._file = open(path, "w+b")
+            except Exception as e:
+                print(f"创建日志文件失败，仅保留最近日志: {e}")
+                self._file = None
+
+    def append(self, module, msg, level="info", ts=None):
+        ts = ts or time.strftime("%H:%M:%S")
+        record = (self.next_seq, ts, str(module), level, str(msg))
+        self.next_seq += 1
+        self._ring.append(record)
+        if record[2] not in self.modules:
+            self.modules.append(record[2])
+        if self._file is not None:
+            line = (json.dumps(record[1:], ensure_ascii=False) + "\n").encode("utf-8")
+            self._offsets.append(self._size)
+            self._file.write(line)
+            self._size += len(line)
+            self._dirty = True
+        return record
+
+    def flush(self):
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            self._dirty = False
+
+    @property
+    def last_seq(self):
+        return self.next_seq - 1
+
+    @property
+    def memory_start(self):
+        """内存中最早一条记录的 seq"""
+        return self._ring[0][0] if self._ring else self.next_seq
+
+    def _read_disk(self, start, stop):
+        """从文件读取 seq ∈ [start, stop) 的记录"""
+        if self._file is None or start >= stop:
+            return []
+        self.flush()
+        begin = self._offsets[start]
+        end = self._offsets[stop] if stop < len(self._offsets) else self._size
+        self._file.seek(begin)
+        data = self._file.read(end - begin)
+        self._file.seek(0, os.SEEK_END)
+        records = []
+        for seq, line in enumerate(data.decode("utf-8").splitlines(), start):
+            try:
+                ts, module, level, msg = json.loads(line)
+            except ValueError:
+                continue
+            records.append((seq, ts, module, level, msg))
+        return records
+
+    def _range(self, start, stop):
+        """seq ∈ [start, stop) 的记录，内存中有的直接取，其余读文件"""
+        start = max(start, 0)
+        stop = min(stop, self.next_seq)
+        mem = self.memory_start
+        out = []
+        if start < mem:
+            out.extend(self._read_disk(start, min(stop, mem)))
+        if stop > mem:
+            ring = list(self._ring)
+            out.extend(ring[max(start, mem) - mem:stop - mem])
+        return out
+
+    def scan_back(self, before, match, limit, floor=0, chunk=2000, scan_limit=50000):
+        """
+        从 before-1 向前查找最多 limit 条满足 match 的记录（按 seq 升序返回）。
+        最多检查 scan_limit 条，返回 (记录列表, 已检查范围的最小 seq)。
+        """
+        found = []
+        lo = before
+        while lo > floor and len(found) < limit and before - lo < scan_limit:
+            start = max(floor, lo - chunk)
+            batch = [r for r in self._range(start, lo) if match(r)]
+            need = limit - len(found)
+            if len(batch) > need:
+                batch = batch[-need:]
+                lo = batch[0][0]
+            else:
+                lo = start
+            found[:0] = batch
+        return found, lo
+
+    def scan_forward(self, after, match, limit, chunk=2000, scan_limit=50000):
+        """从 after+1 向后查找最多 limit 条满足 match 的记录，返回 (记录列表, 已检查范围的最大 seq)"""
+        found = []
+        hi = after
+        while hi < self.last_seq and len(found) < limit and hi - after < scan_limit:
+            stop = min(self.next_seq, hi + 1 + chunk)
+            batch = [r for r in self._range(hi + 1, stop) if match(r)]
+            need = limit - len(found)
+            if len(batch) > need:
+                batch = batch[:need]
+                hi = batch[-1][0]
+            else:
+                hi = stop - 1
+            found.extend(batch)
+        return found, hi
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+
+def new_session_log_path(log_dir, keep=20):
+    """本次会话的日志文件路径，并删除较早的会话日志，只保留最近 keep 个"""
+    try:
+        old = sorted(glob.glob(os.path.join(log_dir, "platform_*.log")))
+        for path in old[:max(len(old) - keep + 1, 0)]:
+            os.remove(path)
+    except Exception:
+        pass
+    return os.path.join(log_dir, time.strftime("platform_%Y%m%d_%H%M%S.log"))
+
+
+class VirtualLogView:
+    """
+    tree:      已创建好的 Treeview（列：时间/模块/消息）
+    scrollbar: 对应的纵向滚动条
+    store:     LogStore
+    显示窗口内的行 = 所有 seq ∈ [lo, hi] 且满足筛选条件的记录，Treeview 的 iid 为 seq。
+    """
+    def __init__(self, tree, scrollbar, store, max_rows=1000, page=200, tick_ms=100):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.store = store
+        self.max_rows = max(int(max_rows), page * 2)
+        self.page = page
+        self.tick_ms = tick_ms
+        self.modules = None         # None 表示全部模块
+        self.levels = None          # None 表示全部级别
+        self.follow = True
+        self._floor = 0             # 清空日志后不再向前翻到此前的记录
+        self._lo = store.next_seq
+        self._hi = store.last_seq
+        self._rows = deque()        # 当前显示的 seq，升序
+        self._pending = []
+        self._flush_scheduled = False
+        self._paging = False
+        for level, color in LEVEL_COLORS.items():
+            tree.tag_configure(level, foreground=color)
+        tree.configure(yscrollcommand=self._on_yscroll)
+
+    # ---------- 写入 ----------
+    def log(self, module, msg, level="info"):
+        self._pending.append(self.store.append(module, msg, level))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.tree.after(self.tick_ms, self.flush)
+
+    def flush(self):
+        """把本周期积累的日志一次性插入（只在跟随最新日志时插入，翻看历史时由滚动到底部加载）"""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        self.store.flush()
+        if not pending or not self.follow:
+            return
+        rows = [r for r in pending if r[0] > self._hi and self.match(r)]
+        self._hi = pending[-1][0]
+        if len(rows) > self.max_rows:
+            rows = rows[-self.max_rows:]
+            self._clear_rows()
+            self._lo = rows[0][0]
+        self._insert(rows, at_end=True)
+        self._trim_top()
+        self.tree.yview_moveto(1)
+
+    # ---------- 筛选 ----------
+    def match(self, record):
+        return ((self.modules is None or record[2] in self.modules) and
+                (self.levels is None or record[3] in self.levels))
+
+    def set_filter(self, modules=None, levels=None):
+        """设置筛选条件并从最新日志开始重新加载一页（只重建当前窗口的行）"""
+        self.modules = set(modules) if modules else None
+        self.levels = set(levels) if levels else None
+        self.reset(self._floor)
+
+    def clear(self):
+        """清空显示；磁盘日志文件保留"""
+        self.flush()
+        self.reset(self.store.next_seq)
+
+    def reset(self, floor):
+        self._floor = floor
+        self._clear_rows()
+        self.follow = True
+        self._hi = self.store.last_seq
+        self._lo = self._hi + 1
+        self._load_older(self.page * 2)
+        self.tree.yview_moveto(1)
+
+    # ---------- 分页 ----------
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._paging:
+            return
+        first, last = float(first), float(last)
+        if first <= 0.0 and last < 1.0:
+            self._paging = True
+            self.tree.after_idle(self._page_older)
+        elif last >= 1.0 and not self.follow:
+            self._paging = True
+            self.tree.after_idle(self._page_newer)
+        elif last < 1.0 and self.follow:
+            # 用户向上翻看，暂停自动跟随
+            self.follow = False
+
+    def _page_older(self):
+        try:
+            anchor = str(self._rows[0]) if self._rows else None
+            if self._load_older(self.page) and anchor is not None:
+                self.follow = False
+                self._trim_bottom()
+                self.tree.see(anchor)
+                self.tree.yview_scroll(-3, "units")
+        finally:
+            self._paging = False
+
+    def _page_newer(self):
+        try:
+            anchor = str(self._rows[-1]) if self._rows else None
+            rows, self._hi = self.store.scan_forward(self._hi, self.match, self.page)
+            self._insert(rows, at_end=True)
+            self._trim_top()
+            if self._hi >= self.store.last_seq:
+                self.follow = True
+                self.tree.yview_moveto(1)
+            elif anchor is not None:
+                self.tree.see(anchor)
+        finally:
+            self._paging = False
+
+    def _load_older(self, limit):
+        if self._lo <= self._floor:
+            return 0
+        rows, self._lo = self.store.scan_back(self._lo, self.match, limit, floor=self._floor)
+        self._insert(rows, at_end=False)
+        return len(rows)
+
+    # ---------- Treeview 操作 ----------
+    def _insert(self, rows, at_end):
+        tree = self.tree
+        if at_end:
+            for seq, ts, module, level, msg in rows:
+                tree.insert("", "end", iid=str(seq), values=(ts, module, msg), tags=(level,))
+                self._rows.append(seq)
+        else:
+            for seq, ts, module, level, msg in reversed(rows):
+                tree.insert("", 0, iid=str(seq), values=(ts, module, msg), tags=(level,))
+                self._rows.appendleft(seq)
+
+    def _trim_top(self):
+        extra = len(self._rows) - self.max_rows
+        if extra <= 0:
+            return
+        removed = [str(self._rows.popleft()) for _ in range(extra)]
+        self.tree.delete(*removed)
+        self._lo = self._rows[0] if self._rows else self._hi + 1
+
+    def _trim_bottom(self):
+        extra = len(self._rows) - self.max_rows
+        if extra <= 0:
+            return
+        removed = [str(self._rows.pop()) for _ in range(extra)]
+        self.tree.delete(*removed)
+        self._hi = self._rows[-1] if self._rows else self._lo - 1
+
+    def _clear_rows(self):
+        if self._rows:
+            self.tree.delete(*[str(s) for s in self._rows])
+        self._rows.clear()
@@ -0,0 +1,134 @@
+"""
+结构化进度事件
+
+模块进程内的测量流程通过 ProgressTracker 上报进度，事件字段：
+    phase:        当前阶段文字（如 "组1 25.00°C"、"测量第2段..."）
+    fraction:     完成比例 0~1
+    done / total: 已完成 / 总计的扫描单位数（温度点、电流点、分段等）
+    unit:         扫描单位名称
+    points_done / points_total: 数据点数（每个单位含多个数据点时填写，否则与 done/total 相同）
+    rate:         吞吐量，单位/秒（按最近若干次更新的指数加权平均）
+    eta:          预计完成时刻（time.time() 时间戳），尚无法估计时为 None
+
+在集成平台中，run_module_process 通过 set_progress_sink() 把事件接到 TelemetryWriter，
+以 "progress" 类型随日志批量发送；模块独立运行时没有接收端，上报为空操作。
+
+只依赖标准库。
+"""
+import json
+import time
+
+_sink = None
+
+
+def set_progress_sink(func):
+    """设置本进程的进度事件接收函数 func(event_dict)，传 None 取消"""
+    global _sink
+    _sink = func
+
+
+def emit_progress(event):
+    sink = _sink
+    if sink is None:
+        return
+    try:
+        sink(event)
+    except Exception:
+        pass
+
+
+def encode_event(event) -> str:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_event(text):
+    """解析进度事件文本，格式不对时返回 None"""
+    try:
+        event = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return event if isinstance(event, dict) else None
+
+
+class ProgressTracker:
+    """
+    一次扫描的进度计数器：
+        tracker = ProgressTracker(len(temps), unit="温度点")
+        for t in tracker.iterate(temps, lambda t: f"组1 {t:.2f}°C"):
+            ...
+    done 允许为小数（如分段内的子阶段 idx + 0.2）。
+    """
+    def __init__(self, total, unit="点", points_per_unit=None, alpha=0.3, min_interval=0.2):
+        self.total = max(float(total), 0.0)
+        self.unit = unit
+        self.points_per_unit = points_per_unit
+        self.alpha = float(alpha)
+        self.min_interval = float(min_interval)
+        self.t0 = time.time()
+        self.done = 0.0
+        self.phase = ""
+        self.rate = None
+        self._last_t = self.t0
+        self._last_done = 0.0
+        self._last_emit = 0.0
+
+    def _update_rate(self, done, now):
+        dt = now - self._last_t
+        dn = done - self._last_done
+        if dn <= 0 or dt <= 0:
+            return
+        inst = dn / dt
+        self.rate = inst if self.rate is None else (self.alpha * inst + (1 - self.alpha) * self.rate)
+        self._last_t = now
+        self._last_done = done
+
+    def event(self):
+        now = time.time()
+        total = self.total
+        fraction = min(self.done / total, 1.0) if total > 0 else 0.0
+        eta = None
+        if self.rate and total > 0:
+            eta = now + max(total - self.done, 0.0) / self.rate
+        ppu = self.points_per_unit
+        return {
+            "phase": self.phase,
+            "fraction": round(fraction, 4),
+            "done": self.done,
+            "total": total,
+            "unit": self.unit,
+            "points_done": int(self.done * ppu) if ppu else int(self.done),
+            "points_total": int(total * ppu) if ppu else int(total),
+            "rate": self.rate,
+            "eta": eta,
+            "elapsed": now - self.t0,
+        }
+
+    def update(self, done, phase=None, force=False):
+        """更新已完成数量（及阶段）并上报；同一阶段内高频调用按 min_interval 限流"""
+        now = time.time()
+        done = min(max(float(done), 0.0), self.total) if self.total > 0 else float(done)
+        self._update_rate(done, now)
+        phase_changed = phase is not None and phase != self.phase
+        self.done = done
+        if phase is not None:
+            self.phase = phase
+        if not (force or phase_changed) and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+        emit_progress(self.event())
+
+    def set_phase(self, phase):
+        self.update(self.done, phase)
+
+    def finish(self, phase="完成"):
+        self.update(self.total, phase, force=True)
+
+    def iterate(self, items, phase_of=None):
+        """
+        遍历 items，每项开始前上报进度（phase_of(item) 生成阶段文字）；
+        正常遍历完毕后上报完成，break 提前退出时不上报。
+        """
+        for i, item in enumerate(items):
+            self.update(i, phase_of(item) if phase_of else None)
+            yield item
+        self.finish()
@@ -0,0 +1,111 @@
+"""
+RIN 换算与积分（Rin_FSV3004 与 Rin_4051 共用）
+
+RinConversion 把拼接后的噪声电压迹线一次换算为 RIN（dBc/Hz）：
+    RIN = 20·log10(V / (DC × 放大倍数 × 段系数))
+    - 段系数按分段取值（SEGMENT_SCALES：前两段 √5，之后 √30，超出表长的段沿用最后一个），由各段点数展开为逐点数组
+    - V ≤ 0、非有限值或分母为 0 的点记为 -inf（无效点），与原逐点换算相同
+
+RinIntegral 把 RIN 曲线（dBc/Hz）换算为线性功率谱后按梯形法求累积积分，一次算出全部前缀和：
+    - block_power()：每 6 点一段的积分 RMS 曲线（原 compute_rin_power 的结果），逐项相加的顺序与原循环相同，
+      数值一致；原实现每段都从第 0 点重新积分，点数 n 时为 O(n²)，这里为 O(n)
+    - band()：任意频带 [f_start, f_stop] 的积分 RIN（RMS，线性比值），二分定位后常数次运算；
+      频带端点落在两点之间时按线性插值的功率谱计算该小段的梯形面积
+    - -inf / NaN（无效点）按功率 0 计入，与原实现相同
+
+用法：
+    rin = RinConversion(dc_value, amplification).convert(volts, segment_lengths)   # numpy 数组
+    integral = RinIntegral(freqs, rin_dbc_hz)
+    self.RIN_power = integral.block_power()          # [RMS, ...]，对应 freqs[::6]
+    rms = integral.band(10e3, 10e6)                  # 10 kHz ~ 10 MHz 积分 RIN
+
+依赖 numpy。
+"""
+import numpy as np
+
+# 各段噪声电压的换算系数（与测量分段对应；超出表长的段沿用最后一个）
+SEGMENT_SCALES = (np.sqrt(5), np.sqrt(5), np.sqrt(30))
+
+# 原 compute_rin_power 每段的点数（积分曲线对应 ddx[::6]）
+SEGMENT_LENGTH = 6
+
+
+class RinConversion:
+    """
+    dc_value:      DC 值（V，已按原程序除以 2）
+    amplification: 放大倍数
+    scales:        各段换算系数
+    """
+    def __init__(self, dc_value, amplification, scales=SEGMENT_SCALES):
+        self.dc_value = float(dc_value)
+        self.amplification = float(amplification)
+        self.scales = np.asarray(scales, dtype=float)
+
+    def segment_scales(self, count):
+        """前 count 段的换算系数数组"""
+        return self.scales[np.minimum(np.arange(count), len(self.scales) - 1)]
+
+    def convert(self, volts, segment_lengths):
+        """volts 为各段依次拼接的噪声电压，segment_lengths 为各段点数（可含 0）；返回 RIN（dBc/Hz）数组"""
+        volts = np.asarray(volts, dtype=float)
+        lengths = np.asarray(segment_lengths, dtype=int)
+        if lengths.sum() != len(volts):
+            raise ValueError(f"分段点数合计 {lengths.sum()} 与数据点数 {len(volts)} 不一致")
+        denom = self.dc_value * self.amplification * np.repeat(self.segment_scales(len(lengths)), lengths)
+        valid = np.isfinite(volts) & (volts > 0) & (denom != 0)
+        rin = np.full(len(volts), -np.inf)
+        rin[valid] = 20 * np.log10(volts[valid] / denom[valid])
+        return rin
+
+
+class RinIntegral:
+    """
+    freqs:   频率（Hz），band() 要求升序
+    rin_dbc: 对应的 RIN（dBc/Hz）
+    """
+    def __init__(self, freqs, rin_dbc):
+        self.freqs = np.asarray(freqs, dtype=float)
+        rin = np.asarray(rin_dbc, dtype=float)
+        if self.freqs.shape != rin.shape:
+            raise ValueError(f"频率与 RIN 点数不一致: {self.freqs.shape} vs {rin.shape}")
+        finite = np.isfinite(rin)
+        self.density = np.where(finite, np.power(10, np.where(finite, rin, 0.0) / 10.0), 0.0)
+        # cumulative[i]：freqs[0] 到 freqs[i] 的积分；np.cumsum 逐项顺序累加，与原循环的舍入相同
+        terms = np.diff(self.freqs) * (self.density[1:] + self.density[:-1]) / 2.0
+        self.cumulative = np.concatenate(([0.0], np.cumsum(terms)))
+
+    def __len__(self):
+        return len(self.freqs)
+
+    def block_power(self, segment_length=SEGMENT_LENGTH):
+        """前 k×segment_length 点的积分 RMS（k = 1, 2, ...），返回列表"""
+        if len(self.freqs) < 2:
+            return []
+        ends = np.arange(segment_length, len(self.freqs) + 1, segment_length) - 1
+        return np.sqrt(self.cumulative[ends]).tolist()
+
+    def _integral_to(self, f):
+        """freqs[0] 到 f（已限制在频率范围内）的积分"""
+        x, p = self.freqs, self.density
+        i = int(np.searchsorted(x, f, side="right")) - 1
+        if i >= len(x) - 1:
+            return float(self.cumulative[-1])
+        width = x[i + 1] - x[i]
+        if width <= 0:
+            return float(self.cumulative[i])
+        pf = p[i] + (p[i + 1] - p[i]) * (f - x[i]) / width
+        return float(self.cumulative[i] + (f - x[i]) * (p[i] + pf) / 2.0)
+
+    def band_integral(self, f_start, f_stop):
+        """[f_start, f_stop] 内的线性功率积分（超出测量范围的部分不计）"""
+        if len(self.freqs) < 2:
+            return 0.0
+        lo, hi = float(self.freqs[0]), float(self.freqs[-1])
+        f_start, f_stop = min(max(f_start, lo), hi), min(max(f_stop, lo), hi)
+        if f_stop <= f_start:
+            return 0.0
+        return self._integral_to(f_stop) - self._integral_to(f_start)
+
+    def band(self, f_start, f_stop):
+        """[f_start, f_stop] 内的积分 RIN（RMS，线性比值；×100 为百分比）"""
+        return float(np.sqrt(max(self.band_integral(f_start, f_stop), 0.0)))
@@ -0,0 +1,76 @@
+"""
+迹线横轴缓存
+
+迹线数据只含纵轴，横轴由起止频率（或波长）与点数生成。原先每读一条迹线都要再查询起止值和点数，
+TraceAxis 把起止值缓存下来，直到经驱动改动了相关设置：
+    - 起止值第一次需要时通过 query_range() 向仪器查询，之后直接复用；点数取自迹线本身，不再查询
+    - 同一点数的横轴数组也会复用（只读），需要修改时先 copy()
+    - 发送了 AXIS_SETTINGS 中的设置（中心/跨度/起止频率或波长）、*RST 等复位命令，或会话出错时失效，
+      下次读迹线时重新查询；ShadowSession 会话用 watch() 挂接后自动失效
+    - 仪器面板上的手动改动无法感知，需要时（例如每次开始测试）调用 invalidate()
+
+用法：
+    self.axis = TraceAxis(lambda: (float(self.inst.query("FREQ:STAR?")), float(self.inst.query("FREQ:STOP?"))))
+    self.axis.watch(self.inst)          # self.inst 为 ShadowSession 时
+    x = self.axis.get(len(y))
+
+只依赖标准库（numpy 在生成横轴时导入）。
+"""
+from common.scpi_state import RESET
+
+# 改变横轴的设置（归一后的命令头前缀，见 common/scpi_state.canonical_header）
+AXIS_SETTINGS = ("FREQ", "WAV")
+
+
+def affects_axis(headers):
+    """headers 为归一后的命令头列表；None 表示全部设置失效"""
+    if headers is None:
+        return True
+    return any(h.startswith(RESET) or h.split(":", 1)[0] in AXIS_SETTINGS for h in headers)
+
+
+class TraceAxis:
+    """
+    query_range: 无参函数，向仪器查询并返回 (起始, 终止)；查询不到时返回 None，get() 随之返回 None
+    """
+    def __init__(self, query_range):
+        self.query_range = query_range
+        self._range = None
+        self._axis = None
+        self.stats = {"queries": 0, "hits": 0}
+
+    def get(self, npoints):
+        """返回 npoints 点的横轴（numpy 数组，只读）"""
+        import numpy as np
+        if self._axis is not None and len(self._axis) == npoints:
+            self.stats["hits"] += 1
+            return self._axis
+        if self._range is None:
+            self.stats["queries"] += 1
+            self._range = self.query_range()
+            if self._range is None:
+                return None
+        start, stop = self._range
+        axis = np.linspace(start, stop, npoints)
+        axis.setflags(write=False)
+        self._axis = axis
+        return axis
+
+    @property
+    def range(self):
+        """缓存的 (起始, 终止)，未缓存时为 None"""
+        return self._range
+
+    def invalidate(self):
+        self._range = None
+        self._axis = None
+
+    def notify(self, headers):
+        """会话发出设置命令后调用：headers 为归一后的命令头列表，None 表示全部设置失效"""
+        if affects_axis(headers):
+            self.invalidate()
+
+    def watch(self, session):
+        """挂接到 ShadowSession：经该会话发出的相关设置或出错会使横轴失效"""
+        session.listeners.append(self.notify)
+        return self
@@ -0,0 +1,141 @@
+"""
+SCPI 写命令合并发送
+
+配置阶段连续十几条 write() 每条都是一次往返（VXI-11 每次写都要等仪器应答），合并后整段配置只需一两次往返：
+    - CommandBatch 包装会话：write() 的非查询命令先缓存，用 ";" 连成一条消息发送
+    - 遇到查询（含 *OPC?）、读取、修改会话属性或缓存超过型号允许的消息长度时，先把已缓存的命令发出
+    - 不以 ":" 或 "*" 开头的命令拼接时补 ":"，保证每条命令仍从根路径解析，与单独发送时含义相同
+    - 单条消息最大长度按 *IDN? 中的型号取 MODEL_LIMITS，未列出的型号用 DEFAULT_MAX_LEN；长度为 0 的型号不合并
+
+用法：
+    with batched_writes(self, "inst", max_message_len(self.idn)):
+        self.write(":FREQ:STAR 10")     # 经 self.inst 发送的写命令被合并
+        self.write(":FREQ:STOP 100")
+    # 离开 with 时发送剩余命令，并恢复 self.inst
+
+只依赖标准库。
+"""
+from contextlib import contextmanager
+
+# (型号片段, 单条消息最大字节数)，按 *IDN? 响应大小写不敏感匹配，先匹配到的生效
+MODEL_LIMITS = [
+    ("FSV", 4096),          # R&S FSV / FSV3000
+    ("FSW", 4096),          # R&S FSW
+    ("FPL", 4096),          # R&S FPL1000
+    ("N90", 2048),          # Keysight X 系列（N9010/N9020/N9030）
+    ("4051", 512),          # 思仪 4051 系列，输入缓冲较小，保守取值
+]
+DEFAULT_MAX_LEN = 256
+
+
+def max_message_len(idn):
+    """按 *IDN? 响应取单条消息最大长度；idn 为空时返回 DEFAULT_MAX_LEN"""
+    text = str(idn or "").upper()
+    for model, limit in MODEL_LIMITS:
+        if model.upper() in text:
+            return limit
+    return DEFAULT_MAX_LEN
+
+
+def is_query(cmd):
+    """消息中任一命令的命令头以 ? 结尾即视为查询"""
+    for unit in str(cmd).split(";"):
+        words = unit.split(None, 1)
+        if words and words[0].endswith("?"):
+            return True
+    return False
+
+
+def join_commands(cmds):
+    """把多条命令连成一条消息；第二条起不以 : 或 * 开头的补 :，避免被当作上一条命令的子路径"""
+    parts = []
+    for cmd in cmds:
+        if parts and not cmd.startswith((":", "*")):
+            cmd = ":" + cmd
+        parts.append(cmd)
+    return ";".join(parts)
+
+
+class CommandBatch:
+    """
+    inst:    被包装的会话（pyvisa 资源或会话池句柄），需提供 write / query
+    max_len: 单条消息最大字节数，0 或 None 表示不合并（逐条发送）
+    """
+    def __init__(self, inst, max_len=DEFAULT_MAX_LEN):
+        object.__setattr__(self, "_inst", inst)
+        object.__setattr__(self, "_max_len", int(max_len or 0))
+        object.__setattr__(self, "_pending", [])
+        object.__setattr__(self, "_size", 0)
+        object.__setattr__(self, "messages", 0)    # 实际发出的写消息数
+        object.__setattr__(self, "commands", 0)    # 经 write() 提交的命令数
+
+    def write(self, cmd, *args, **kwargs):
+        cmd = str(cmd).strip()
+        object.__setattr__(self, "commands", self.commands + 1)
+        if args or kwargs or self._max_len <= 0 or is_query(cmd):
+            self.flush()
+            return self._send(cmd, *args, **kwargs)
+        # 加上这条后超长则先发出已缓存的部分（+2 为分隔符 ";" 与可能补的 ":"）
+        added = len(cmd) + (2 if self._pending else 0)
+        if self._pending and self._size + added > self._max_len:
+            self.flush()
+            added = len(cmd)
+        self._pending.append(cmd)
+        object.__setattr__(self, "_size", self._size + added)
+
+    def query(self, cmd, *args, **kwargs):
+        self.flush()
+        return self._inst.query(cmd, *args, **kwargs)
+
+    def flush(self):
+        """发送已缓存的命令"""
+        pending = self._pending
+        if not pending:
+            return
+        object.__setattr__(self, "_pending", [])
+        object.__setattr__(self, "_size", 0)
+        self._send(join_commands(pending))
+
+    def _send(self, message, *args, **kwargs):
+        object.__setattr__(self, "messages", self.messages + 1)
+        return self._inst.write(message, *args, **kwargs)
+
+    def __getattr__(self, name):
+        # 读取、二进制查询等其他调用都可能依赖之前的设置，先发出缓存
+        value = getattr(self._inst, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            self.flush()
+            return value(*args, **kwargs)
+        return call
+
+    def __setattr__(self, name, value):
+        self.flush()
+        setattr(self._inst, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+@contextmanager
+def batched_writes(owner, attr="inst", max_len=DEFAULT_MAX_LEN):
+    """
+    在 with 块内把 owner.<attr> 换成 CommandBatch，块内经该会话的写命令被合并；
+    离开时（包括出错时）发送剩余命令并恢复原会话。会话为 None 时不做处理。
+    """
+    inst = getattr(owner, attr)
+    if inst is None:
+        yield None
+        return
+    batch = CommandBatch(inst, max_len)
+    setattr(owner, attr, batch)
+    try:
+        yield batch
+    finally:
+        setattr(owner, attr, inst)
+        batch.flush()
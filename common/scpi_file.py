@@ -0,0 +1,74 @@
+"""
+仪器文件直接读回
+
+原先用 MMEM:COPY 让仪器把文件复制到电脑共享文件夹，再轮询等待文件出现；现在经已打开的 VISA 会话读回：
+    - 发送 MMEM:DATA? '<仪器路径>'，仪器返回 IEEE 488.2 定长块（#<位数><长度><数据>）
+    - 先读块头得到长度，数据按 chunk_size 分段读取并直接写入本地临时文件，全部收到后替换为目标文件，
+      不在内存中拼出整个文件；中途出错时删除临时文件，不留下不完整的目标文件
+    - 读完数据后丢弃块后的结束符（LF），会话可以继续正常使用
+    - 不需要电脑共享文件夹，文件写完即可使用，不再轮询等待
+
+用法：
+    size = fetch_file(self.inst, "C:\\PTS\\Rin\\Rin_1.DAT", r"C:\PTS\zhongzi\Rin\FSV3004\Rin_1.DAT")
+
+只依赖标准库。
+"""
+import os
+
+CHUNK_SIZE = 64 * 1024
+TERMINATION_TIMEOUT_MS = 1000      # 等待块后结束符的超时
+
+
+def read_block_to_file(inst, path, chunk_size=CHUNK_SIZE):
+    """从会话读取一个定长块并分段写入 path，返回数据字节数；需要会话提供 read_bytes"""
+    # 先只读 1 字节：仪器返回错误或空响应时立即报错，不等到超时
+    head = bytes(inst.read_bytes(1))
+    if head != b"#":
+        raise ValueError(f"响应不是定长数据块: {head!r}")
+    digit = bytes(inst.read_bytes(1))
+    if not digit.isdigit():
+        raise ValueError(f"定长数据块头无效: {head + digit!r}")
+    ndigits = int(digit)
+    if ndigits == 0:
+        raise ValueError("不支持不定长数据块（#0）")
+    length = int(bytes(inst.read_bytes(ndigits)))
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".part"
+    try:
+        with open(tmp, "wb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = inst.read_bytes(min(chunk_size, remaining))
+                f.write(chunk)
+                remaining -= len(chunk)
+        _discard_termination(inst)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return length
+
+
+def fetch_file(inst, instrument_path, local_path, chunk_size=CHUNK_SIZE):
+    """用 MMEM:DATA? 把仪器上的文件读回 local_path，返回字节数"""
+    inst.write(f"MMEM:DATA? '{instrument_path}'")
+    return read_block_to_file(inst, local_path, chunk_size)
+
+
+def _discard_termination(inst):
+    """读掉块后的结束符；没有结束符的会话短暂等待后放弃"""
+    term = getattr(inst, "read_termination", None) or "\n"
+    timeout = inst.timeout
+    try:
+        inst.timeout = TERMINATION_TIMEOUT_MS
+        inst.read_bytes(len(term))
+    except Exception:
+        pass
+    finally:
+        inst.timeout = timeout
@@ -0,0 +1,236 @@
+"""
+仪器设置影子状态：只发送有变化的设置命令
+
+ShadowSession 包装 VISA 会话，记录每个设置项最后一次发送（或查询到）的值：
+    - 设置命令（带参数、属于 CACHEABLE 的命令头）与记录值相同则不再发送，直接返回
+    - 命令头按 SCPI 短格式归一：":SENSe:FREQuency:SPAN" 与 "FREQ:SPAN" 视为同一设置，节点后缀 1 等同于无后缀，
+      ON/OFF 与 1/0、"1" 与 "1.0" 视为相同值
+    - 有联动关系的设置（例如改 Span 后起止频率、自动扫描时间会变）在发送后清除对应记录，见 COUPLED
+    - *RST、:SYST:PRES、*RCL、切换模式（INST / CONF）或任一调用出错（超时、连接断开）时清空全部记录，
+      :SYST:ERR? 返回错误时同样清空；查询设置项得到的值会更新记录
+    - 一条消息中含多条命令（用 ";" 分隔）时照常发送，只更新记录
+    - 仪器面板上的手动改动无法感知，需要时调用 invalidate()
+    - listeners 中的函数在每次实际发送后收到归一后的命令头列表，全部失效时收到 None（例如横轴缓存，见 scpi_axis.py）
+
+用法：
+    self.inst = ShadowSession(open_session(resource))
+    self.inst.write(":AVER:COUN 2")     # 第一次发送
+    self.inst.write(":AVERage:COUNt 2") # 与记录相同，不发送
+    sent = self.inst.apply(":SWE:TIME 1")   # 返回是否实际发送，可据此决定是否需要等待设置生效
+
+只依赖标准库。
+"""
+import re
+
+# 可以按值去重的设置项（归一后的命令头，前缀匹配到下一级节点，例如 "AVER" 包含 "AVER:COUN"）
+# Marker（CALC:MARK）不在其中：峰值搜索（CALC:MARK:MAX 等不带参数的命令）与自动跟踪会移动 Marker，记录值不可信
+CACHEABLE = (
+    "FREQ:CENT", "FREQ:SPAN", "FREQ:STAR", "FREQ:STOP",
+    "BAND", "SWE:TIME", "SWE:POIN", "SWE:TYPE",
+    "AVER", "DET", "TRAC:MODE", "TRAC:TYPE", "INIT:CONT", "UNIT:POW",
+    "DISP:TRAC:Y:RLEV",
+)
+# 发送某项设置后，仪器可能随之改变的其他设置
+COUPLED = {
+    "FREQ:CENT": ("FREQ:STAR", "FREQ:STOP"),
+    "FREQ:SPAN": ("FREQ:STAR", "FREQ:STOP", "BAND", "BAND:VID", "SWE:TIME"),
+    "FREQ:STAR": ("FREQ:CENT", "FREQ:SPAN", "BAND", "BAND:VID", "SWE:TIME"),
+    "FREQ:STOP": ("FREQ:CENT", "FREQ:SPAN", "BAND", "BAND:VID", "SWE:TIME"),
+    "BAND": ("BAND:VID", "SWE:TIME"),
+    "BAND:VID": ("SWE:TIME",),
+    "BAND:VID:RAT": ("BAND:VID", "SWE:TIME"),
+    "SWE:POIN": ("SWE:TIME",),
+}
+# 使全部设置失效的命令（前缀匹配）
+RESET = ("*RST", "*RCL", "SYST:PRES", "INST", "CONF", "MMEM:LOAD")
+# 可省略的节点：归一时去掉或改写
+_ALIASES = (("BWID", "BAND"), ("BAND:RES", "BAND"), ("DET:FUNC", "DET"), ("DISP:WIND", "DISP"))
+
+_NODE = re.compile(r"^([A-Z*]+?)(\d*)$")
+_VOWELS = "AEIOU"
+
+
+def short_form(mnemonic):
+    """SCPI 短格式：取前 4 个字母，第 4 个是元音时取前 3 个"""
+    if len(mnemonic) <= 4:
+        return mnemonic
+    return mnemonic[:3] if mnemonic[3] in _VOWELS else mnemonic[:4]
+
+
+def canonical_header(header):
+    """命令头归一：去掉前导 ":" 与可省略的 SENSe 根节点，各节点取短格式，后缀 1 去掉；查询保留末尾的 "?" """
+    header = header.strip()
+    mark = "?" if header.endswith("?") else ""
+    nodes = []
+    for node in header.rstrip("?").lstrip(":").upper().split(":"):
+        m = _NODE.match(node)
+        if not m:
+            nodes.append(node)
+            continue
+        name, suffix = m.group(1), m.group(2)
+        if not name.startswith("*"):
+            name = short_form(name)
+        nodes.append(name + ("" if suffix == "1" else suffix))
+    if nodes and nodes[0] == "SENS":
+        nodes = nodes[1:]
+    text = ":".join(nodes)
+    for old, new in _ALIASES:
+        if text == old or text.startswith(old + ":"):
+            text = new + text[len(old):]
+    return text + mark
+
+
+def canonical_value(args):
+    """参数归一：数值按浮点比较，ON/OFF 记为 1/0，纯字母的枚举取短格式"""
+    tokens = []
+    for token in re.split(r"[\s,]+", args.strip()):
+        if not token:
+            continue
+        try:
+            tokens.append(repr(float(token)))
+            continue
+        except ValueError:
+            pass
+        word = token.upper()
+        word = {"ON": "1", "OFF": "0"}.get(word, word)
+        tokens.append(short_form(word) if word.isalpha() else word)
+    return " ".join(tokens)
+
+
+def split_units(message):
+    """把消息拆成 (命令头, 参数) 列表；不以 ":" 开头的命令接在上一条命令的路径下，公用命令不改变路径"""
+    units, path = [], ""
+    for unit in str(message).strip().split(";"):
+        unit = unit.strip()
+        if not unit:
+            continue
+        parts = unit.split(None, 1)
+        header, args = parts[0], (parts[1] if len(parts) > 1 else "")
+        if header.startswith("*"):
+            units.append((header.upper(), args))
+            continue
+        full = header[1:] if header.startswith(":") else path + header
+        path = full.rsplit(":", 1)[0] + ":" if ":" in full else ""
+        units.append((canonical_header(full), args))
+    return units
+
+
+def _is_cacheable(header):
+    return any(header == key or header.startswith(key + ":") for key in CACHEABLE)
+
+
+class ShadowSession:
+    """
+    inst: 被包装的会话（pyvisa 资源、会话池句柄或 CommandBatch），需提供 write / query
+    log:  提供时记录被跳过的命令（调试用）
+    """
+    def __init__(self, inst, log=None):
+        object.__setattr__(self, "inst", inst)
+        object.__setattr__(self, "_log", log)
+        object.__setattr__(self, "_state", {})
+        object.__setattr__(self, "stats", {"sent": 0, "skipped": 0, "resets": 0, "changes": 0})
+        object.__setattr__(self, "listeners", [])
+
+    @property
+    def changes(self):
+        """实际发送的设置命令数（含 *RST 等）；比较前后两次的值可知期间是否改动过仪器设置"""
+        return self.stats["changes"]
+
+    # ---------- 写 ----------
+    def apply(self, cmd, *args, **kwargs):
+        """发送命令并返回是否实际发送；与记录值相同的单条设置命令被跳过"""
+        units = split_units(cmd)
+        if len(units) == 1 and not args and not kwargs:
+            header, value = units[0]
+            if value and _is_cacheable(header) and self._state.get(header) == canonical_value(value):
+                self.stats["skipped"] += 1
+                if self._log is not None:
+                    self._log(f"[状态] 设置未变，跳过: {str(cmd).strip()}")
+                return False
+        self._call(self.inst.write, cmd, *args, **kwargs)
+        self.stats["sent"] += 1
+        for header, value in units:
+            self._update(header, value)
+        self._notify([header for header, _ in units])
+        return True
+
+    def write(self, cmd, *args, **kwargs):
+        self.apply(cmd, *args, **kwargs)
+
+    def _update(self, header, value):
+        if header.startswith(RESET):
+            self.stats["changes"] += 1
+            self.invalidate()
+            return
+        if not value or not _is_cacheable(header):
+            return
+        self.stats["changes"] += 1
+        for key in COUPLED.get(header, ()):
+            self._state.pop(key, None)
+        if header.endswith(":AUTO"):
+            # 切换自动模式后，该项的实际值由仪器决定
+            self._state.pop(header[:-len(":AUTO")], None)
+        self._state[header] = canonical_value(value)
+
+    # ---------- 读 ----------
+    def query(self, cmd, *args, **kwargs):
+        resp = self._call(self.inst.query, cmd, *args, **kwargs)
+        units = split_units(cmd)
+        if len(units) == 1:
+            header = units[0][0].rstrip("?")
+            if header == "SYST:ERR" and not str(resp).strip().lstrip("+-").startswith("0"):
+                self.invalidate()
+            elif _is_cacheable(header) and not units[0][1]:
+                self.observe(header, resp)
+        return resp
+
+    def observe(self, header, value):
+        """用从仪器读到的实际值更新记录（例如由起止频率算出的 Span）"""
+        header = canonical_header(header)
+        if _is_cacheable(header):
+            self._state[header] = canonical_value(str(value))
+
+    def invalidate(self, header=None):
+        """清除某一项（或全部）记录，下次设置时一定发送"""
+        if header is None:
+            self._state.clear()
+            self.stats["resets"] += 1
+            self._notify(None)
+        else:
+            header = canonical_header(header)
+            self._state.pop(header, None)
+            self._notify([header])
+
+    def _notify(self, headers):
+        for listener in self.listeners:
+            listener(headers)
+
+    # ---------- 其余调用转发 ----------
+    def _call(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            # 出错后无法确定仪器执行到哪一步
+            self.invalidate()
+            raise
+
+    def __getattr__(self, name):
+        value = getattr(self.inst, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            return self._call(value, *args, **kwargs)
+        return call
+
+    def __setattr__(self, name, value):
+        if name == "inst":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.inst, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
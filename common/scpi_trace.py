@@ -0,0 +1,143 @@
+"""
+迹线数据二进制传输
+
+TraceReader 按 *IDN? 型号把迹线查询切换为 32 位浮点二进制块（IEEE 488.2 定长块），
+接收后用 numpy.frombuffer 直接在收到的缓冲区上解码（pyvisa query_binary_values 的 ndarray 容器），
+不再逐个解析 ASCII 数字：
+    - 2001 点迹线 ASCII 约 30 KB，二进制约 8 KB；解码不再产生逐点的 Python float
+    - 格式命令只在需要切换时发送；同一会话被其他代码改回 ASCII 时，读取失败后重新设置格式再试一次
+    - 仍然失败则改用 ASCII，并用 *CLS、格式命令、:SYST:ERR? 确认仪器是否拒绝格式命令：
+        拒绝（命令错误 / 参数错误）说明型号不支持，本会话之后都用 ASCII 并记入仪器能力档案；
+        未拒绝（超时、响应错位等偶发故障）只在之后 BINARY_RETRY_READS 次读取中用 ASCII，然后重新尝试二进制
+    - 返回的数组是只读的 float32 视图，需要原地修改时先 copy()
+    - 传入仪器能力档案（common/instrument_profile.py）时记录该型号是否支持二进制，已确认不支持的直接用 ASCII
+
+用法：
+    self.traces = TraceReader(self.inst, idn, log=self.log)
+    y = self.traces.read(":TRAC:DATA? TRACE1")
+
+只依赖标准库（numpy 在读取迹线时导入）。
+"""
+
+# (IDN 型号片段, 切换为 32 位浮点二进制的命令, 是否大端)，按顺序匹配，大小写不敏感
+BINARY_FORMATS = [
+    ("FSV", ":FORM REAL,32", False),                        # R&S 默认小端
+    ("FSW", ":FORM REAL,32", False),
+    ("FPL", ":FORM REAL,32", False),
+    ("N90", ":FORM:DATA REAL,32;:FORM:BORD SWAP", False),   # Keysight 默认大端，改为小端
+    ("4051", ":FORM:DATA REAL,32", False),                  # 思仪 4051
+    ("AQ63", ":FORM:DATA REAL,32", False),                  # Yokogawa AQ63xx 光谱仪
+]
+DEFAULT_BINARY = (":FORM:DATA REAL,32", False)
+ASCII_FORMAT = ":FORM:DATA ASC"
+# 已知不支持二进制迹线的型号片段，直接用 ASCII
+ASCII_ONLY = []
+# 二进制偶发失败后改用 ASCII 的读取次数，之后重新尝试二进制
+BINARY_RETRY_READS = 20
+# 确认格式命令是否被拒绝时最多读取的错误队列条数
+ERROR_QUEUE_MAX = 10
+
+
+def format_rejected(codes):
+    """错误队列中有命令错误（-1xx）或参数错误（-22x）时视为格式命令被拒绝；超时、查询错误（-4xx）等不算"""
+    return any(-199 <= code <= -100 or -229 <= code <= -220 for code in codes)
+
+
+def binary_format(idn):
+    """返回 (格式命令, 是否大端)；型号在 ASCII_ONLY 中时返回 None"""
+    text = str(idn or "").upper()
+    if any(model.upper() in text for model in ASCII_ONLY):
+        return None
+    for model, cmd, big_endian in BINARY_FORMATS:
+        if model.upper() in text:
+            return cmd, big_endian
+    return DEFAULT_BINARY
+
+
+class TraceReader:
+    """
+    inst: pyvisa 会话（或会话池句柄 / ShadowSession），需提供 write / query_binary_values / query_ascii_values
+    idn:  *IDN? 响应，用于选择格式命令
+    profile: InstrumentProfile，可选；记录 "trace_format"（binary / ascii）
+    """
+    def __init__(self, inst, idn="", log=print, profile=None):
+        self.inst = inst
+        self.log = log
+        self.profile = profile
+        fmt = None if profile is not None and profile.get("trace_format") == "ascii" else binary_format(idn)
+        self.binary = fmt is not None
+        self.format_cmd, self.big_endian = fmt or (None, False)
+        self._format = None          # 本对象最后设置的格式："binary" / "ascii"
+        self._retry_in = None        # 偶发失败后还要用 ASCII 读取的次数，None 表示不重试
+        self.stats = {"binary": 0, "ascii": 0}
+
+    def read(self, query):
+        """执行迹线查询并返回 numpy 数组（二进制为 float32，ASCII 为 float64）"""
+        import numpy as np
+        if self._retry_in is not None:
+            self._retry_in -= 1
+            if self._retry_in <= 0:
+                self._retry_in = None
+                self.binary = True
+                self.log("[迹线] 重新尝试二进制读取")
+        if self.binary:
+            error = None
+            for _ in range(2):
+                try:
+                    if self._format != "binary":
+                        self.inst.write(self.format_cmd)
+                        self._format = "binary"
+                    values = self.inst.query_binary_values(query, datatype="f", is_big_endian=self.big_endian,
+                                                           container=np.ndarray)
+                    self.stats["binary"] += 1
+                    self._remember("binary")
+                    return values
+                except Exception as e:
+                    # 格式可能被同一会话上的其他代码改掉：下次重新设置
+                    error = e
+                    self._format = None
+                    self._discard()
+            self.binary = False
+            if self._rejected():
+                self.log(f"[迹线] 仪器不接受 {self.format_cmd}（{error}），改用 ASCII")
+                self._remember("ascii")
+            else:
+                self._retry_in = BINARY_RETRY_READS
+                self.log(f"[迹线] 二进制读取失败（{error}），之后 {BINARY_RETRY_READS} 次改用 ASCII 再重试二进制")
+        if self._format != "ascii":
+            try:
+                self.inst.write(ASCII_FORMAT)
+            except Exception:
+                pass
+            self._format = "ascii"
+        values = np.asarray(self.inst.query_ascii_values(query), dtype=float)
+        self.stats["ascii"] += 1
+        return values
+
+    def _rejected(self):
+        """清空错误队列后重发格式命令，按 :SYST:ERR? 判断仪器是否拒绝；查询失败时不下结论（返回 False）"""
+        self._format = None
+        codes = []
+        try:
+            self.inst.write("*CLS")
+            self.inst.write(self.format_cmd)
+            for _ in range(ERROR_QUEUE_MAX):
+                code = int(str(self.inst.query(":SYST:ERR?")).split(",", 1)[0])
+                if code == 0:
+                    break
+                codes.append(code)
+        except Exception:
+            self._discard()
+            return False
+        return format_rejected(codes)
+
+    def _remember(self, fmt):
+        if self.profile is not None:
+            self.profile.set("trace_format", fmt)
+
+    def _discard(self):
+        """丢弃读取失败后可能残留的响应"""
+        try:
+            self.inst.clear()
+        except Exception:
+            pass
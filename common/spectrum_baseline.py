@@ -0,0 +1,110 @@
+"""
+分段噪声基线（SingleFrequency 细扫异常峰检测）
+
+细扫在固定的若干段（每段 500 MHz）之间循环，同一段反复扫描。SpanBaseline 为每段记住逐点的噪声基线，
+只把明显偏离基线的点判为异常峰：
+    - 基线为逐点的指数加权均值与方差（dB），每次扫描一遍数组运算更新；前几次按累计平均建立
+    - 学习次数不足 warmup 时，该段仍用原判据（调用方传入的 fallback，通常为 common/spectrum_peaks.find_peaks）
+    - 之后判据：高出基线 thresh_db 以上且超过 z 倍标准差（逐点标准差不低于全段平均与 min_sigma_db）；相距不超过 guard 点的
+      超限点归为同一个峰，取其中功率最大的点；局部噪声输出该点的基线值
+    - 命中点及其左右 guard 点不参与基线更新，异常不会被学进基线；仪器固有杂散等每次都在的信号会被学进基线，
+      不再反复命中
+    - 段的点数变化（改了扫描点数）时该段重新学习；reset() 清空全部基线（例如改了检测参数）
+
+用法：
+    baseline = SpanBaseline(thresh_db=5.0, guard=10, z=5.0, warmup=3)
+    peaks = baseline.detect((round(center), round(span)), x, y, fallback=lambda x, y: find_peaks(x, y, 5.0, 5.0, 10))
+
+依赖 numpy。
+"""
+import numpy as np
+
+
+class _SpanState:
+    __slots__ = ("mean", "var", "count")
+
+    def __init__(self, points):
+        self.mean = np.zeros(points)
+        self.var = np.zeros(points)
+        self.count = np.zeros(points, dtype=int)    # 逐点参与更新的次数（命中附近的点会少）
+
+
+class SpanBaseline:
+    """
+    thresh_db:    高出基线的最小幅度（dB）
+    guard:        峰值合并与排除学习的邻域点数
+    z:            显著性（标准差倍数）
+    warmup:       每段用原判据并学习基线的扫描次数
+    alpha:        指数加权系数（越大基线跟随越快）
+    min_sigma_db: 标准差下限（dB），避免学习次数少时方差偏小
+    """
+    def __init__(self, thresh_db=5.0, guard=10, z=5.0, warmup=3, alpha=0.1, min_sigma_db=0.5):
+        self.thresh_db = float(thresh_db)
+        self.guard = max(1, int(guard))
+        self.z = float(z)
+        self.warmup = max(1, int(warmup))
+        self.alpha = float(alpha)
+        self.min_sigma_db = float(min_sigma_db)
+        self._spans = {}
+
+    def reset(self):
+        self._spans.clear()
+
+    def learned(self, key):
+        """该段已学习的扫描次数"""
+        state = self._spans.get(key)
+        return 0 if state is None else int(state.count.max(initial=0))
+
+    def detect(self, key, x, y_dbm, fallback):
+        """返回 [(freq, power, baseline), ...]；学习次数不足时返回 fallback(x, y_dbm) 的结果"""
+        y = np.asarray(y_dbm, dtype=float)
+        state = self._spans.get(key)
+        if state is None or len(state.mean) != len(y):
+            state = self._spans[key] = _SpanState(len(y))
+        if self.learned(key) < self.warmup:
+            peaks = fallback(x, y_dbm)
+            hits = np.zeros(len(y), dtype=bool)
+            if peaks:
+                hits[np.searchsorted(np.asarray(x, dtype=float), [f for f, _, _ in peaks])] = True
+            self._update(state, y, hits)
+            return peaks
+
+        known = state.count > 0
+        count = np.maximum(state.count, 1)
+        # 学习次数少时按样本方差修正；逐点方差只有几次扫描时估计偏差大，取不低于全段平均（噪声起伏在段内大致相同）
+        var = np.where(count > 1, state.var * count / np.maximum(count - 1, 1), 0.0)
+        floor = max(float(np.mean(var[count > 1])) if (count > 1).any() else 0.0, self.min_sigma_db ** 2)
+        # 再计入基线均值本身的不确定度（学习次数少的点放宽）
+        sigma = np.sqrt(np.maximum(var, floor) * (1.0 + 1.0 / count))
+        mean = state.mean
+        if not known.all():
+            # 从未学到的点（学习期间一直在命中附近）按该段基线的中位数判断
+            mean = np.where(known, mean, np.median(mean[known]))
+        excess = y - mean
+        with np.errstate(invalid="ignore"):
+            hits = (excess >= self.thresh_db) & (excess >= self.z * sigma)
+        peaks = []
+        idx = np.flatnonzero(hits)
+        if len(idx):
+            # 相距不超过 guard 的超限点为同一个峰
+            for group in np.split(idx, np.flatnonzero(np.diff(idx) > self.guard) + 1):
+                i = int(group[np.argmax(y[group])])
+                peaks.append((float(x[i]), float(y_dbm[i]), float(mean[i])))
+        self._update(state, y, hits)
+        return peaks
+
+    def _update(self, state, y, hits):
+        """命中点附近以外的有限值点并入基线"""
+        learn = np.isfinite(y)
+        if hits.any():
+            near = np.convolve(hits.astype(int), np.ones(2 * self.guard + 1, dtype=int), mode="same") > 0
+            learn &= ~near
+        if not learn.any():
+            return
+        count = state.count[learn] + 1
+        # 前几次为累计平均，之后为指数加权
+        a = np.maximum(self.alpha, 1.0 / count)
+        d = y[learn] - state.mean[learn]
+        state.mean[learn] += a * d
+        state.var[learn] = (1 - a) * (state.var[learn] + a * d * d)
+        state.count[learn] = count
@@ -0,0 +1,118 @@
+"""
+频谱峰值检测（SingleFrequency 细扫 PeakDetector 的向量化实现）
+
+判据与原逐点循环完全相同，结果（频率、功率、局部噪声）逐位一致：
+    - 噪声参考：频谱两端各 10%（至少 10 点）的平均值
+    - 局部最大值：严格大于左右各 max(1, guard/2) 个相邻点
+    - 左右邻域：各取 guard+2 点（靠近两端时截短）的平均值；局部噪声取左、右均值与噪声参考中的最小值
+    - 判为峰值：高出局部噪声 thresh_db 以上，且高出左右均值中较大者 prom_db×0.8 以上
+局部最大值用平移比较一次算出整条迹线；邻域均值先用累加和对全部点估算，筛出满足（留有舍入余量的）判据的
+候选点，再对候选点按原公式复核：一次取出全部邻域窗口按行求均值（与原实现对切片 np.mean 的舍入相同），
+靠近两端邻域截短的点逐点计算，保证边界上的取舍与输出数值和原实现一致。
+
+用法：
+    peaks = find_peaks(x, y_dbm, thresh_db=1.0, prom_db=1.0, guard=10)   # [(freq, power, local_noise), ...]
+
+依赖 numpy。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 累加和估算的邻域均值与逐点 np.mean（float32 迹线按 float32 求均值）之间的舍入差远小于此值（dB）
+_SCREEN_TOL = 1e-3
+
+
+def edge_noise(y_dbm):
+    """频谱两端各 10%（至少 10 点）的平均功率，作为噪声参考"""
+    edge_points = max(int(len(y_dbm) * 0.1), 10)
+    return float(np.mean(np.concatenate([y_dbm[:edge_points], y_dbm[-edge_points:]])))
+
+
+def _check_point(x, y_dbm, i, g, noise, thresh_db, prom_db):
+    """按原逐点公式判断第 i 点；是峰值时返回 (freq, power, local_noise)"""
+    y = float(y_dbm[i])
+    left_nb = y_dbm[max(0, i - g - 2):i]
+    right_nb = y_dbm[i + 1:min(len(y_dbm), i + g + 3)]
+    left_mean = float(np.mean(left_nb)) if len(left_nb) else noise
+    right_mean = float(np.mean(right_nb)) if len(right_nb) else noise
+    local_noise = min(left_mean, right_mean, noise)
+    if y - local_noise >= thresh_db and y - max(left_mean, right_mean) >= prom_db * 0.8:
+        return float(x[i]), y, local_noise
+    return None
+
+
+def _local_max(y, g, k):
+    """y[g:n-g] 中严格大于左右各 k 个相邻点的位置（布尔数组，相对下标 g）"""
+    n = len(y)
+    center = y[g:n - g]
+    mask = np.ones(len(center), dtype=bool)
+    for j in range(1, k + 1):
+        # 与原实现一致写成 not (y <= 邻点)：邻点为 NaN 时不排除
+        mask &= ~(center <= y[g - j:n - g - j])
+        mask &= ~(center <= y[g + j:n - g + j])
+    return mask
+
+
+def _neighbour_means(y, g, noise):
+    """累加和估算 y[g:n-g] 各点的左右邻域均值"""
+    n = len(y)
+    idx = np.arange(g, n - g)
+    # 以噪声参考为零点累加，减小长迹线上的累加舍入
+    offset = noise if np.isfinite(noise) else 0.0
+    csum = np.concatenate(([0.0], np.cumsum(y - offset)))
+    start = np.maximum(idx - g - 2, 0)
+    end = np.minimum(idx + g + 3, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        left = (csum[idx] - csum[start]) / (idx - start) + offset
+        right = (csum[end] - csum[idx + 1]) / (end - idx - 1) + offset
+    left = np.where(idx > start, left, noise)
+    right = np.where(end > idx + 1, right, noise)
+    return left, right
+
+
+def _confirm(x, y_dbm, idx, g, noise, thresh_db, prom_db):
+    """按原公式复核候选点（升序下标），返回峰值列表；邻域完整的点一次取出全部窗口求均值"""
+    n = len(y_dbm)
+    full = (idx - g - 2 >= 0) & (idx + g + 3 <= n)
+    decided = {}
+    if full.any() and not np.isnan(noise):
+        # 每行与原实现的切片相同，np.mean 按行求均值与对切片求均值结果一致
+        rows = idx[full]
+        windows = sliding_window_view(y_dbm, g + 2)
+        left = np.mean(windows[rows - g - 2], axis=1).astype(float)
+        right = np.mean(windows[rows + 1], axis=1).astype(float)
+        y = y_dbm[rows].astype(float)
+        local_noise = np.minimum(np.minimum(left, right), noise)
+        hit = (y - local_noise >= thresh_db) & (y - np.maximum(left, right) >= prom_db * 0.8)
+        regular = ~(np.isnan(left) | np.isnan(right) | np.isnan(y))
+        for i, yi, ln, h in zip(rows[regular].tolist(), y[regular].tolist(),
+                                local_noise[regular].tolist(), hit[regular].tolist()):
+            decided[i] = (float(x[i]), yi, ln) if h else None
+    peaks = []
+    for i in idx.tolist():
+        # 靠近两端（邻域截短）或涉及 NaN 的点逐点判断（原实现的 min/max 遇到 NaN 时结果与顺序有关）
+        peak = decided[i] if i in decided else _check_point(x, y_dbm, i, g, noise, thresh_db, prom_db)
+        if peak is not None:
+            peaks.append(peak)
+    return peaks
+
+
+def find_peaks(x, y_dbm, thresh_db=1.0, prom_db=1.0, guard=10):
+    """返回 [(freq, power, local_noise), ...]，按迹线顺序；与原 PeakDetector.find 的结果相同"""
+    y_src = np.asarray(y_dbm)     # 复核按原数据类型计算（TraceReader 的二进制迹线为 float32）
+    y = y_src.astype(float)
+    g = max(1, int(guard))      # guard < 1 时原循环越界取点，按 1 处理
+    if len(y) < 2 * g + 1:
+        return []
+    noise = edge_noise(y_src)
+    k = max(1, int(g / 2))
+    candidates = _local_max(y, g, k)
+    if not candidates.any():
+        return []
+    left, right = _neighbour_means(y, g, noise)
+    center = y[g:len(y) - g]
+    local_noise = np.minimum(np.minimum(left, right), noise)
+    # 取反写法让 NaN 进入复核，由原公式决定
+    candidates &= ~(center - local_noise < thresh_db - _SCREEN_TOL)
+    candidates &= ~(center - np.maximum(left, right) < prom_db * 0.8 - _SCREEN_TOL)
+    return _confirm(x, y_src, np.flatnonzero(candidates) + g, g, noise, thresh_db, prom_db)
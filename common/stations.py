@@ -0,0 +1,158 @@
+"""
+多工位配置
+
+一台平台电脑可以控制多个测试工位，每个工位有自己的一套仪器、上位机窗口和输出目录。
+工位在 platform_config.json 的 "stations" 中配置，未配置的默认工位使用各模块自带的默认参数：
+
+    "stations": [
+        {
+            "name": "工位2",
+            "instruments": {"192.168.29.11": "192.168.29.21", "USB::PM100D": "USB0::0x1313::0x8078::P0012345::INSTR"},
+            "laser_window": "Preci-Semi-Seed.*COM5",
+            "laser_exe_path": "C:\\\\PTS\\\\工位2\\\\Preci-Seed.exe",
+            "paths": {"C:\\\\PTS": "C:\\\\PTS\\\\工位2"},
+            "modules": ["CT-波长", "CT-功率"],
+            "params": {"CT-波长": {"current_mA": "300"}}
+        }
+    ]
+
+    instruments: 默认仪器地址 -> 本工位仪器地址（替换参数中出现的 IP / VISA 资源）
+    laser_window / laser_exe_path: 本工位上位机窗口标题（正则）与程序路径
+    paths:       路径前缀替换，用于区分各工位的输出目录
+    modules:     本工位可用的模块，缺省为全部
+    params:      按模块直接指定的参数值
+
+同一模块在不同工位上以 "模块@工位" 作为任务名，平台按任务名分别管理进程、命令队列、日志与进度。
+
+只依赖标准库。
+"""
+import os
+import re
+
+STATION_SEP = "@"
+STATION_ENV = "PTS_STATION"
+
+# 各模块参数中表示上位机窗口标题 / 上位机路径的键
+LASER_WINDOW_KEYS = ("窗口标题(正则)",)
+LASER_EXE_KEYS = ("laser_exe_path", "上位机路径")
+LASER_INSTRUMENT_PREFIX = "上位机::"
+
+
+def task_key(module, station=None):
+    return f"{module}{STATION_SEP}{station}" if station else module
+
+
+def split_task_key(key):
+    """"CT-波长@工位2" -> ("CT-波长", "工位2")；默认工位返回 (模块, None)"""
+    module, sep, station = str(key).partition(STATION_SEP)
+    return module, (station if sep else None)
+
+
+def current_station():
+    """当前进程所属工位（由平台启动模块进程时设置），默认工位返回 None"""
+    return os.environ.get(STATION_ENV) or None
+
+
+class StationProfile:
+    def __init__(self, name, instruments=None, laser_window=None, laser_exe_path=None,
+                 paths=None, modules=None, params=None):
+        self.name = str(name)
+        self.instruments = dict(instruments or {})
+        self.laser_window = laser_window
+        self.laser_exe_path = laser_exe_path
+        self.paths = dict(paths or {})
+        self.modules = list(modules) if modules else None
+        self.params = dict(params or {})
+        # IP / 资源地址按完整地址匹配，避免 192.168.7.1 误替换 192.168.7.10 的前缀
+        self._patterns = [(re.compile(r"(?<![\w.])" + re.escape(old) + r"(?![\w.])"), new)
+                          for old, new in sorted(self.instruments.items(), key=lambda kv: -len(kv[0]))]
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data.get("instruments"), data.get("laser_window"), data.get("laser_exe_path"),
+                   data.get("paths"), data.get("modules"), data.get("params"))
+
+    def has_module(self, module):
+        return self.modules is None or module in self.modules
+
+    def map_value(self, value):
+        """替换参数值中的仪器地址与路径前缀，非字符串原样返回"""
+        if not isinstance(value, str):
+            return value
+        for pattern, new in self._patterns:
+            value = pattern.sub(lambda m, new=new: new, value)
+        for old, new in self.paths.items():
+            if value.lower().startswith(old.lower()):
+                value = new + value[len(old):]
+                break
+        return value
+
+    def map_instrument(self, resource):
+        """MODULE_MAP 中声明的仪器 -> 本工位的仪器，用于一键测试的冲突判断"""
+        if resource.startswith(LASER_INSTRUMENT_PREFIX) and self.laser_window:
+            return LASER_INSTRUMENT_PREFIX + self.laser_window
+        return self.map_value(resource)
+
+    def module_params(self, module, params):
+        """按本工位配置改写一个模块的参数字典，返回 {键: 新值}（只含有变化的项）"""
+        changed = {}
+        for key, value in params.items():
+            new = self.map_value(value)
+            if key in LASER_WINDOW_KEYS and self.laser_window:
+                new = self.laser_window
+            elif key in LASER_EXE_KEYS and self.laser_exe_path:
+                new = self.laser_exe_path
+            if new != value:
+                changed[key] = new
+        for key, value in (self.params.get(module) or {}).items():
+            if key in params:
+                changed[key] = value if not isinstance(params[key], str) else str(value)
+        return changed
+
+
+def load_station_profiles(config):
+    """platform_config 中的 "stations" -> {工位名: StationProfile}，配置有误的工位跳过"""
+    profiles = {}
+    for item in config.get("stations") or []:
+        try:
+            profile = StationProfile.from_dict(item)
+        except Exception as e:
+            print(f"工位配置无效，已跳过: {item} ({e})")
+            continue
+        if profile.name and STATION_SEP not in profile.name:
+            profiles[profile.name] = profile
+    return profiles
+
+
+def apply_station_profile(app, module, profile):
+    """
+    在模块进程中把工位配置应用到已创建的 GUI：
+    改写 params / params_1um / params_1_5um 参数字典与 entries 输入框，设置上位机窗口标题。
+    """
+    for attr in ("params", "params_1um", "params_1_5um"):
+        params = getattr(app, attr, None)
+        if isinstance(params, dict):
+            params.update(profile.module_params(module, params))
+
+    entries = getattr(app, "entries", None) or {}
+    current = {}
+    for key, widget in entries.items():
+        try:
+            current[key] = widget.get()
+        except Exception:
+            pass
+    for key, value in profile.module_params(module, current).items():
+        widget = entries[key]
+        try:
+            state = str(widget.cget("state"))
+            if state in ("disabled", "readonly"):
+                widget.configure(state="normal")
+            widget.delete(0, "end")
+            widget.insert(0, str(value))
+            if state in ("disabled", "readonly"):
+                widget.configure(state=state)
+        except Exception:
+            pass
+
+    if profile.laser_window and hasattr(app, "laser_window_title"):
+        app.laser_window_title = profile.laser_window
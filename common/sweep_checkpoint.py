@@ -0,0 +1,171 @@
+"""
+温度/电流扫描断点续测
+
+CT_W / CT_P / CT_L 的组1（温度扫描）、组2（电流扫描）每完成一个点，就把以下内容写入汇总 CSV 旁边的
+<汇总文件名>.checkpoint.json：
+    group:     测试组（1 / 2）
+    config:    扫描参数（起止、步进、固定电流/温度等），参数不同的断点不能续测
+    grid:      完整的设定点序列
+    done:      已完成点的序号
+    last:      最近完成点的设定值 {"temperature_C":…, "current_mA":…}
+    points:    各完成点的测量值（续测后作图用）
+    summary:   当时汇总 CSV 的全部行（含表头），续测时用它恢复汇总文件，避免崩溃瞬间写了一半的行
+扫描正常结束后删除断点文件；中途停止、进程退出或 VISA 超时后，下次启动同一组测试时可选择从断点继续
+（由平台一键测试 / 调度启动时不询问，直接续测）。
+
+只依赖标准库。
+"""
+import os
+import csv
+import json
+import time
+
+
+def resolve_summary_path(save_path, summary_filename, default_name):
+    """与 TestRunner 相同的规则：save_path 为目录（已存在或以分隔符结尾）时直接使用，否则取其所在目录"""
+    if os.path.isdir(save_path) or save_path.endswith(os.sep):
+        out_dir = save_path
+    else:
+        out_dir = os.path.dirname(save_path) or "."
+    name = summary_filename or default_name
+    if not name.lower().endswith(".csv"):
+        name += ".csv"
+    return os.path.join(out_dir, name)
+
+
+class SweepCheckpoint:
+    def __init__(self, summary_path, group, config):
+        self.summary_path = summary_path
+        self.path = os.path.splitext(summary_path)[0] + ".checkpoint.json"
+        self.group = int(group)
+        # 经 JSON 往返后再比较，避免 int/float、tuple/list 差异
+        self.config = json.loads(json.dumps(config))
+        self.state = None
+
+    @classmethod
+    def for_sweep(cls, save_path, summary_filename, group, **config):
+        default_name = f"Test{int(group)}_summary.csv"
+        return cls(resolve_summary_path(save_path, summary_filename, default_name), group, config)
+
+    # ---------- 读取 ----------
+    def load(self, grid=None):
+        """读取与当前参数（及设定点序列）一致、尚未完成的断点，没有时返回 None"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("group") != self.group or state.get("config") != self.config:
+            return None
+        if grid is not None and state.get("grid") != [float(g) for g in grid]:
+            return None
+        if not state.get("done") or len(state["done"]) >= len(state.get("grid", [])):
+            return None
+        return state
+
+    def describe(self, state=None):
+        """断点说明文字，用于续测提示"""
+        state = state or self.load()
+        if not state:
+            return ""
+        last = ", ".join(f"{v:g}{'°C' if k == 'temperature_C' else 'mA'}" for k, v in (state.get("last") or {}).items())
+        return (f"已完成 {len(state['done'])}/{len(state['grid'])} 点，最后完成点 {last}，"
+                f"保存于 {time.strftime('%m-%d %H:%M:%S', time.localtime(state.get('updated', 0)))}")
+
+    # ---------- 写入 ----------
+    def start(self, grid, state=None):
+        """
+        开始扫描，返回已完成点的序号集合。
+        state 为 load() 返回的断点且设定点序列一致时续测（恢复汇总文件），否则新建断点并清空汇总文件。
+        """
+        grid = [float(g) for g in grid]
+        if state is not None and state.get("grid") == grid:
+            self.state = state
+            with open(self.summary_path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(state.get("summary") or [])
+        else:
+            if state is not None and os.path.exists(self.summary_path):
+                os.remove(self.summary_path)
+            self.state = {"group": self.group, "config": self.config, "grid": grid,
+                          "done": [], "last": {}, "points": {}, "summary": []}
+            self.clear()
+        return set(self.state["done"])
+
+    def record(self, index, setpoints, values=None):
+        """第 index 点测量并写入汇总后调用：保存设定值、测量值与汇总文件快照"""
+        st = self.state
+        if st is None:
+            return
+        if index not in st["done"]:
+            st["done"].append(int(index))
+        st["last"] = dict(setpoints)
+        st["points"][str(index)] = dict(values or {})
+        try:
+            with open(self.summary_path, "r", newline="", encoding="utf-8") as f:
+                st["summary"] = list(csv.reader(f))
+        except OSError:
+            pass
+        st["updated"] = time.time()
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(st, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def points(self):
+        """已完成点的测量值，按序号排列"""
+        if not self.state:
+            return []
+        return [self.state["points"][k] for k in sorted(self.state["points"], key=int)]
+
+    def finish(self, log=None):
+        """扫描结束：全部点都已完成时删除断点，返回仍未完成的点数（中途停止或有失败点时保留断点）"""
+        if self.state is None:
+            return 0
+        remaining = len(self.state["grid"]) - len(self.state["done"])
+        if remaining <= 0:
+            self.state = None
+            self.clear()
+        elif log is not None:
+            log(f"[断点] 组{self.group} 还有 {remaining} 点未完成，断点已保存，下次开始时可从断点继续")
+        return max(remaining, 0)
+
+    def clear(self):
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def begin_sweep(group, save_path, summary_filename, grid, resume, log, **config):
+    """
+    TestRunner 在扫描循环前调用：resume 为 True 且存在参数一致的断点时续测，否则重新开始。
+    返回 (SweepCheckpoint, 已完成点的序号集合)
+    """
+    checkpoint = SweepCheckpoint.for_sweep(save_path, summary_filename, group, **config)
+    done = checkpoint.start(grid, checkpoint.load() if resume else None)
+    if done:
+        log(f"[断点] 组{group} 从断点继续：已完成 {len(done)}/{len(grid)} 点，跳过已测点")
+    return checkpoint, done
+
+
+def ask_resume(checkpoint, title, parent=None, unattended=False, log=None):
+    """
+    有可续测的断点时询问操作员是否从断点继续，返回 True / False。
+    unattended=True（平台一键测试 / 调度启动）时不弹窗，直接从断点继续，避免无人点击时阻塞后续模块。
+    """
+    state = checkpoint.load()
+    if not state:
+        return False
+    if unattended:
+        if log is not None:
+            log(f"[断点] 无人值守运行，{title}自动从断点继续：{checkpoint.describe(state)}")
+        return True
+    from tkinter import messagebox
+    return messagebox.askyesno(
+        "断点续测", f"检测到未完成的{title}：\n{checkpoint.describe(state)}\n\n是否从断点继续？（选择“否”将重新开始）",
+        parent=parent)
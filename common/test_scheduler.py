@@ -0,0 +1,205 @@
+"""
+一键测试调度：根据各模块声明使用的仪器建立冲突图，按"最长任务优先"排成有向无环图（DAG），
+使用不同仪器的模块并行、共用仪器的模块依次执行，尽量缩短一个 DUT 的总测试时间。
+
+    plan = plan_schedule(["线宽", "Rin_4051", "时域"], instruments_of, durations.estimate)
+    run = DagRun(plan)
+    for name in run.ready(): 启动 name; run.mark_started(name)
+    ...收到结束消息后 run.mark_finished(name) 并再次检查 run.ready()
+
+只依赖标准库，供平台主进程使用。
+"""
+import json
+import os
+import threading
+import time
+
+from common.instrument_lease import instrument_key
+
+
+# ==========================================
+# 历史用时记录
+# ==========================================
+class DurationStore:
+    """
+    各模块历史测试用时（秒），以指数加权平均保存到 JSON 文件，用于最长任务优先排序和 ETA 估计。
+    """
+    def __init__(self, path, default_s=300.0, alpha=0.5):
+        self.path = path
+        self.default_s = float(default_s)
+        self.alpha = float(alpha)
+        self._lock = threading.Lock()
+        self._data = {}
+        try:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = {k: float(v) for k, v in json.load(f).items()}
+        except Exception as e:
+            print(f"读取历史用时失败: {e}")
+            self._data = {}
+
+    def estimate(self, name) -> float:
+        with self._lock:
+            return self._data.get(name, self.default_s)
+
+    def known(self, name) -> bool:
+        with self._lock:
+            return name in self._data
+
+    def record(self, name, seconds: float):
+        seconds = float(seconds)
+        if seconds <= 0:
+            return
+        with self._lock:
+            old = self._data.get(name)
+            self._data[name] = seconds if old is None else (self.alpha * seconds + (1 - self.alpha) * old)
+            data = dict(self._data)
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存历史用时失败: {e}")
+
+
+# ==========================================
+# 冲突图与调度计划
+# ==========================================
+def build_conflict_graph(names, instruments_of):
+    """instruments_of(name) -> 仪器列表；返回 {name: set(与之共用仪器的模块)}"""
+    keys = {n: {instrument_key(r) for r in instruments_of(n) if r} for n in names}
+    graph = {n: set() for n in names}
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            if keys[a] & keys[b]:
+                graph[a].add(b)
+                graph[b].add(a)
+    return graph
+
+
+class SchedulePlan:
+    """
+    order:        最长任务优先的全局顺序
+    predecessors: {name: set(必须先完成的模块)}，即冲突边按 order 定向后的 DAG
+    waves:        按 DAG 层级划分的并行批次（同一批内互不冲突）
+    estimate:     {name: 预计用时 s}
+    planned_start / planned_finish: 按预计用时推演的计划时间轴（相对开始时刻，s）
+    """
+    def __init__(self, order, predecessors, waves, estimate, planned_start, planned_finish):
+        self.order = order
+        self.predecessors = predecessors
+        self.waves = waves
+        self.estimate = estimate
+        self.planned_start = planned_start
+        self.planned_finish = planned_finish
+
+    @property
+    def makespan(self) -> float:
+        return max(self.planned_finish.values()) if self.planned_finish else 0.0
+
+    @property
+    def serial_time(self) -> float:
+        return sum(self.estimate.values())
+
+    def describe(self):
+        """生成用于日志显示的计划文本行"""
+        lines = []
+        for i, wave in enumerate(self.waves, 1):
+            items = ", ".join(f"{n}(~{self.estimate[n] / 60:.1f}min)" for n in wave)
+            lines.append(f"第 {i} 批: {items}")
+        lines.append(f"预计总用时 {self.makespan / 60:.1f} min（串行约 {self.serial_time / 60:.1f} min）")
+        return lines
+
+
+def plan_schedule(names, instruments_of, estimate):
+    """
+    names:          勾选的模块名
+    instruments_of: name -> 该模块使用的仪器（IP / VISA 资源 / 其他独占资源标识）
+    estimate:       name -> 预计用时 s
+    """
+    names = list(names)
+    est = {n: float(estimate(n)) for n in names}
+    # 最长任务优先；用时相同则保持勾选顺序
+    order = sorted(names, key=lambda n: (-est[n], names.index(n)))
+    graph = build_conflict_graph(order, instruments_of)
+    rank = {n: i for i, n in enumerate(order)}
+    preds = {n: {m for m in graph[n] if rank[m] < rank[n]} for n in order}
+
+    level, start, finish = {}, {}, {}
+    for n in order:
+        level[n] = max((level[p] + 1 for p in preds[n]), default=0)
+        start[n] = max((finish[p] for p in preds[n]), default=0.0)
+        finish[n] = start[n] + est[n]
+
+    waves = []
+    for n in order:
+        while len(waves) <= level[n]:
+            waves.append([])
+        waves[level[n]].append(n)
+
+    return SchedulePlan(order, preds, waves, est, start, finish)
+
+
+class DagRun:
+    """一次调度执行的运行时状态"""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+    def __init__(self, plan: SchedulePlan):
+        self.plan = plan
+        self.t0 = time.time()
+        self.state = {n: self.PENDING for n in plan.order}
+        self.started = {}
+        self.finished = {}
+
+    def ready(self):
+        """前驱全部结束（成功或失败）且尚未启动的模块，按计划顺序返回"""
+        out = []
+        for n in self.plan.order:
+            if self.state[n] != self.PENDING:
+                continue
+            if all(self.state[p] in (self.DONE, self.FAILED) for p in self.plan.predecessors[n]):
+                out.append(n)
+        return out
+
+    def mark_started(self, name):
+        self.state[name] = self.RUNNING
+        self.started[name] = time.time() - self.t0
+
+    def mark_finished(self, name, ok=True):
+        """返回该模块实际用时（s）；不在本次调度或未运行时返回 None"""
+        if self.state.get(name) != self.RUNNING:
+            return None
+        self.state[name] = self.DONE if ok else self.FAILED
+        self.finished[name] = time.time() - self.t0
+        return self.finished[name] - self.started[name]
+
+    def is_running(self, name):
+        return self.state.get(name) == self.RUNNING
+
+    def done(self):
+        return all(s in (self.DONE, self.FAILED) for s in self.state.values())
+
+    def elapsed(self):
+        return time.time() - self.t0
+
+    def predict_finish(self, eta=None):
+        """
+        按当前执行情况重新推演各模块结束时间（相对 t0，s）。
+        eta: {name: 模块上报的预计完成时刻 time.time()}，运行中模块优先使用，否则按历史用时估计；
+             未启动模块在其前驱的预测结束时间之后开始。
+        返回 (各模块预测结束时间 dict, 整批预测结束时间)
+        """
+        eta = eta or {}
+        now = self.elapsed()
+        finish = {}
+        for n in self.plan.order:       # order 保证前驱先于后继
+            if n in self.finished:
+                finish[n] = self.finished[n]
+            elif n in self.started:
+                if eta.get(n) is not None:
+                    finish[n] = max(now, eta[n] - self.t0)
+                else:
+                    finish[n] = max(now, self.started[n] + self.plan.estimate[n])
+            else:
+                start = max([now] + [finish[p] for p in self.plan.predecessors[n]])
+                finish[n] = start + self.plan.estimate[n]
+        return finish, max(finish.values(), default=now)
@@ -0,0 +1,239 @@
+"""
+进程内 VISA 会话池
+
+同一进程中按资源地址共享 VISA 会话，避免测量过程中反复新建 ResourceManager 与连接
+（例如每个 RIN 分段单独打开 inst0::INSTR 发送 MMEM:COPY、清理仪器文件夹时临时连接）：
+    - 整个进程只创建一个 ResourceManager
+    - open_session(资源) 返回共享会话的句柄；已打开的会话直接复用，引用计数 +1
+    - 句柄的 close() 只把引用计数 -1，不关闭连接；引用归零后由后台定时器在空闲满 idle_close_s 时关闭
+      （下次打开时也会顺带清理），进程退出时全部关闭
+    - 会话空闲超过 check_after_s 或上次调用出错时，复用前先用 *IDN? 检查，失败则重新连接
+    - TCPIP0::ip::INSTR / TCPIP::ip::inst0::INSTR 等写法视为同一资源
+    - 设置了仿真地址表时连接本机仿真仪器（common/emulation.py）
+
+用法：
+    inst = open_session(f"TCPIP0::{ip}::inst0::INSTR", timeout=10000)
+    inst.write("*CLS")
+    inst.close()        # 归还会话
+
+只依赖标准库（pyvisa 在首次打开会话时导入）。
+"""
+import re
+import time
+import atexit
+import threading
+
+from common.emulation import open_resource
+
+_TCPIP_INSTR = re.compile(r"^TCPIP(\d*)::([^:]+)::(?:inst0::)?INSTR$", re.IGNORECASE)
+_TCPIP_OTHER = re.compile(r"^TCPIP(\d*)::", re.IGNORECASE)
+
+
+def normalize_resource(resource):
+    """同一仪器的不同写法映射为同一个键：TCPIP::ip::INSTR -> TCPIP0::ip::inst0::INSTR"""
+    resource = str(resource).strip()
+    m = _TCPIP_INSTR.match(resource)
+    if m:
+        return f"TCPIP{m.group(1) or '0'}::{m.group(2)}::inst0::INSTR"
+    return _TCPIP_OTHER.sub(lambda m: f"TCPIP{m.group(1) or '0'}::", resource)
+
+
+class _Entry:
+    def __init__(self, key, raw):
+        self.key = key
+        self.raw = raw
+        self.refs = 0
+        self.last_used = time.time()
+        self.suspect = False        # 上次调用出错，复用前需要检查
+
+
+class PooledSession:
+    """共享会话的句柄：属性与方法转发到底层 pyvisa 资源，close() 只归还引用"""
+    def __init__(self, pool, entry):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_entry", entry)
+        object.__setattr__(self, "_closed", False)
+
+    @property
+    def resource(self):
+        return self._entry.key
+
+    def __getattr__(self, name):
+        entry = self._entry
+        value = getattr(entry.raw, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            try:
+                return value(*args, **kwargs)
+            except Exception:
+                entry.suspect = True
+                raise
+            finally:
+                entry.last_used = time.time()
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._entry.raw, name, value)
+
+    def close(self):
+        if not self._closed:
+            object.__setattr__(self, "_closed", True)
+            self._pool.release(self._entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VisaPool:
+    """
+    rm_factory:    创建 ResourceManager 的函数，默认 pyvisa.ResourceManager
+    check_after_s: 会话空闲超过该时间后，复用前先查询 check_query 确认连接可用
+    check_query:   健康检查命令，为 None 时不检查
+    idle_close_s:  没有引用且空闲超过该时间的会话被关闭
+    """
+    def __init__(self, rm_factory=None, check_after_s=30.0, check_query="*IDN?", idle_close_s=300.0):
+        self._rm_factory = rm_factory
+        self._rm = None
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.check_after_s = check_after_s
+        self.check_query = check_query
+        self.idle_close_s = idle_close_s
+        self._reaper = None         # 关闭空闲会话的定时器
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "closes": 0}
+
+    def _resource_manager(self):
+        if self._rm is None:
+            if self._rm_factory is None:
+                import pyvisa
+                self._rm_factory = pyvisa.ResourceManager
+            self._rm = self._rm_factory()
+        return self._rm
+
+    def open(self, resource, timeout=None, read_termination=None, write_termination=None):
+        """取得资源的共享会话（必要时连接或重连），返回 PooledSession"""
+        key = normalize_resource(resource)
+        with self._lock:
+            self._close_idle(keep=key)
+            entry = self._entries.get(key)
+            if entry is not None and not self._healthy(entry):
+                self._close_raw(entry)
+                try:
+                    entry.raw = open_resource(self._resource_manager(), resource)
+                except Exception:
+                    entry.suspect = True
+                    raise
+                entry.suspect = False
+                self.stats["reconnects"] += 1
+            elif entry is not None:
+                self.stats["reuses"] += 1
+            else:
+                entry = _Entry(key, open_resource(self._resource_manager(), resource))
+                self._entries[key] = entry
+                self.stats["connects"] += 1
+            # 同一会话被多处共享时，以最后一次打开时的设置为准
+            if timeout is not None:
+                entry.raw.timeout = timeout
+            if read_termination is not None:
+                entry.raw.read_termination = read_termination
+            if write_termination is not None:
+                entry.raw.write_termination = write_termination
+            entry.refs += 1
+            entry.last_used = time.time()
+            return PooledSession(self, entry)
+
+    def release(self, entry):
+        with self._lock:
+            entry.refs = max(entry.refs - 1, 0)
+            entry.last_used = time.time()
+            if entry.refs == 0:
+                self._schedule_reap(self.idle_close_s)
+
+    def _schedule_reap(self, delay):
+        """引用归零后定时关闭空闲会话，不必等到下次 open()；已有定时器在等待时不重复创建"""
+        if self._reaper is not None or self.idle_close_s is None:
+            return
+        self._reaper = threading.Timer(max(delay, 0.0) + 0.05, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        with self._lock:
+            self._reaper = None
+            self._close_idle()
+            # 仍有未到期的空闲会话时，按最早到期的时间再等一次
+            now = time.time()
+            pending = [self.idle_close_s - (now - e.last_used) for e in self._entries.values() if e.refs == 0]
+            if pending:
+                self._schedule_reap(min(pending))
+
+    def invalidate(self, resource):
+        """标记会话可疑（例如调用方捕获到超时），下次打开时先检查"""
+        with self._lock:
+            entry = self._entries.get(normalize_resource(resource))
+            if entry is not None:
+                entry.suspect = True
+
+    def _healthy(self, entry):
+        if not entry.suspect and time.time() - entry.last_used < self.check_after_s:
+            return True
+        if self.check_query is None:
+            return not entry.suspect
+        try:
+            entry.raw.query(self.check_query)
+            return True
+        except Exception:
+            return False
+
+    def _close_raw(self, entry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+        self.stats["closes"] += 1
+
+    def _close_idle(self, keep=None):
+        now = time.time()
+        for key, entry in list(self._entries.items()):
+            if key != keep and entry.refs == 0 and now - entry.last_used > self.idle_close_s:
+                self._close_raw(entry)
+                del self._entries[key]
+
+    def close_all(self):
+        with self._lock:
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+            for entry in self._entries.values():
+                self._close_raw(entry)
+            self._entries.clear()
+            if self._rm is not None:
+                try:
+                    self._rm.close()
+                except Exception:
+                    pass
+                self._rm = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """本进程的会话池（首次调用时创建，进程退出时关闭全部会话）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = VisaPool()
+            atexit.register(_pool.close_all)
+        return _pool
+
+
+def open_session(resource, timeout=None, read_termination=None, write_termination=None):
+    return get_pool().open(resource, timeout=timeout, read_termination=read_termination,
+                           write_termination=write_termination)
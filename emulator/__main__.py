@@ -0,0 +1,65 @@
+"""
+启动仿真实验室：本机无仪器时运行各模块与基准
+
+用法（在项目根目录）：
+    python -m emulator [--map 192.168.29.11=fsv3004] [--latency default=0.002 --latency INIT=0.05] [--table 路径]
+然后在另一个终端设置环境变量后照常启动平台、模块或基准（--resource 用仪器的原地址）：
+    Linux:   export PTS_EMULATOR=/tmp/pts_emulator.json
+    Windows: set PTS_EMULATOR=%TEMP%\\pts_emulator.json
+    python main_platform.py
+--map 地址=类型 增改默认仪器（类型 none 表示不仿真该地址），--latency 命令头前缀=秒 设置命令延时，
+Ctrl+C 退出并删除地址表。
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.emulation import EMULATOR_ENV
+from emulator.lab import Lab, KINDS, DEFAULT_TABLE
+
+
+def _pairs(items, convert):
+    result = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"参数格式应为 键=值: {item}")
+        result[key.strip()] = convert(value.strip())
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m emulator", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--map", action="append", metavar="地址=类型",
+                    help=f"仿真仪器类型：{', '.join(KINDS)}, none")
+    ap.add_argument("--latency", action="append", metavar="命令头=秒")
+    ap.add_argument("--table", default=DEFAULT_TABLE, help="地址表路径")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    overrides = _pairs(args.map, lambda v: None if v.lower() == "none" else v.lower())
+    latency = _pairs(args.latency, float)
+    lab = Lab(overrides, latency, args.seed)
+    path = lab.write_table(args.table)
+    for key, (kind, server) in sorted(lab.servers.items()):
+        print(f"  {key:<28} {kind:<8} -> {server.resource}")
+    print(f"地址表：{path}\n设置环境变量 {EMULATOR_ENV}={path} 后启动平台或模块；Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        lab.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+仿真函数/任意波形发生器：Rigol DG4000 系列
+
+只保存通道设置（波形、频率、幅度、偏置、输出开关）并在查询时返回，不产生实际信号；
+线宽、时域模块的信号源控制流程可以无仪器走通。
+
+依赖 numpy（经 emulator.server）。
+"""
+from emulator.server import Instrument, ScpiError, parse_number, parse_bool
+
+IDN = "RIGOL TECHNOLOGIES,DG4102,DG4A000000001,00.01.14"
+FUNCTIONS = ("SIN", "SQU", "RAMP", "PULS", "NOIS", "USER", "DC", "TRI")
+
+
+def _num(value):
+    return f"{value:.12g}"
+
+
+class FunctionGenerator(Instrument):
+    def __init__(self, latency=None, seed=0):
+        super().__init__(latency, seed)
+        self.idn = IDN
+        self.reset()
+        for src in ("SOUR", "SOUR2"):
+            out = "OUTP" if src == "SOUR" else "OUTP2"
+            self.commands.update({
+                f"{src}:FUNC": lambda a, s=src: self._set_function(s, a),
+                f"{src}:FUNC?": lambda a, s=src: self.channels[s]["FUNC"],
+                f"{src}:FREQ": lambda a, s=src: self._set(s, "FREQ", a),
+                f"{src}:FREQ?": lambda a, s=src: _num(self.channels[s]["FREQ"]),
+                f"{src}:VOLT": lambda a, s=src: self._set(s, "VOLT", a),
+                f"{src}:VOLT?": lambda a, s=src: _num(self.channels[s]["VOLT"]),
+                f"{src}:VOLT:OFFS": lambda a, s=src: self._set(s, "OFFS", a),
+                f"{src}:VOLT:OFFS?": lambda a, s=src: _num(self.channels[s]["OFFS"]),
+                out: lambda a, s=src: self._set_output(s, a),
+                f"{out}?": lambda a, s=src: "ON" if self.channels[s]["OUTP"] else "OFF",
+                f"{out}:STAT": lambda a, s=src: self._set_output(s, a),
+            })
+
+    def reset(self):
+        self.channels = {src: {"FUNC": "SIN", "FREQ": 1e3, "VOLT": 5.0, "OFFS": 0.0, "OUTP": False}
+                         for src in ("SOUR", "SOUR2")}
+
+    def _set_function(self, src, args):
+        word = args.strip().upper()
+        name = next((f for f in FUNCTIONS if word.startswith(f)), None)
+        if name is None:
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        self.channels[src]["FUNC"] = name
+
+    def _set(self, src, key, args):
+        self.channels[src][key] = parse_number(args)
+
+    def _set_output(self, src, args):
+        self.channels[src]["OUTP"] = parse_bool(args)
@@ -0,0 +1,59 @@
+"""
+仿真仪器截图：把当前迹线画成简单的曲线图，编码为 PNG / BMP
+
+只用于让截图、MMEM:DATA? 读回与图片显示流程在无仪器时也能走通，图片内容只是迹线的示意。
+
+依赖 numpy。
+"""
+import zlib
+import struct
+
+WIDTH = 400
+HEIGHT = 240
+BACKGROUND = (16, 16, 16)
+GRID = (60, 60, 60)
+TRACE = (255, 220, 0)
+
+
+def plot(values, width=WIDTH, height=HEIGHT):
+    """返回 height x width x 3 的 uint8 数组：10x8 格线与迹线"""
+    import numpy as np
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = BACKGROUND
+    img[:, np.linspace(0, width - 1, 11).astype(int)] = GRID
+    img[np.linspace(0, height - 1, 9).astype(int), :] = GRID
+    y = np.asarray(values, dtype=float)
+    y = y[np.isfinite(y)]
+    if len(y) > 1:
+        lo, hi = float(np.min(y)), float(np.max(y))
+        span = (hi - lo) or 1.0
+        cols = np.linspace(0, width - 1, len(y)).astype(int)
+        rows = (height - 1 - (y - lo) / span * (height - 1)).astype(int)
+        for c0, c1, r0, r1 in zip(cols[:-1], cols[1:], rows[:-1], rows[1:]):
+            lo_r, hi_r = min(r0, r1), max(r0, r1)
+            img[lo_r:hi_r + 1, c0:c1 + 1] = TRACE
+    return img
+
+
+def png(img):
+    """RGB 数组 -> PNG 字节"""
+    height, width = img.shape[:2]
+    raw = b"".join(b"\x00" + img[r].tobytes() for r in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+def bmp(img):
+    """RGB 数组 -> 24 位 BMP 字节（自下而上、BGR、每行按 4 字节对齐）"""
+    height, width = img.shape[:2]
+    pad = (4 - width * 3 % 4) % 4
+    rows = b"".join(img[r, :, ::-1].tobytes() + b"\x00" * pad for r in range(height - 1, -1, -1))
+    header = struct.pack("<2sIHHI", b"BM", 54 + len(rows), 0, 0, 54)
+    info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(rows), 2835, 2835, 0, 0)
+    return header + info + rows
@@ -0,0 +1,83 @@
+"""
+仿真实验室：按默认仪器地址启动全部仿真仪器，并写出地址表
+
+地址表（JSON）把 common/instrument_lease.instrument_key 归一后的仪器键映射到本机端口，
+common/emulation.py 在环境变量 PTS_EMULATOR 指向该文件时把模块打开的仪器资源重定向到这里。
+
+同一地址在不同工位上可能接不同仪器（192.168.7.10 既是 Rin_FSV3004 / 线宽的 FSV3004，也是 Rin_4051 的地址；
+192.168.29.11 既是 CT-波长的光谱仪，也是 CT-线宽的 FSV），默认按 DEFAULT_LAB 选择，其他组合用 overrides 指定。
+
+依赖 numpy。
+"""
+import os
+import json
+import tempfile
+
+from common.instrument_lease import instrument_key
+from emulator.server import ScpiServer
+from emulator.spectrum_analyzer import SpectrumAnalyzer
+from emulator.osa import OpticalSpectrumAnalyzer
+from emulator.power_meter import PowerMeter
+from emulator.scope import Oscilloscope
+from emulator.awg import FunctionGenerator
+
+# 仿真仪器类型 -> 工厂函数 (latency, seed) -> Instrument
+KINDS = {
+    "fsv3004": lambda latency, seed: SpectrumAnalyzer("FSV3004", latency=latency, seed=seed),
+    "4051": lambda latency, seed: SpectrumAnalyzer("4051", carriers=[], spur_probability=0.1,
+                                                   latency=latency, seed=seed),
+    "osa": lambda latency, seed: OpticalSpectrumAnalyzer(latency=latency, seed=seed),
+    "pm100d": lambda latency, seed: PowerMeter(latency=latency, seed=seed),
+    "scope": lambda latency, seed: Oscilloscope(latency=latency, seed=seed),
+    "awg": lambda latency, seed: FunctionGenerator(latency=latency, seed=seed),
+}
+
+# 默认仪器地址 -> 仿真仪器类型（与 main_platform.MODULE_MAP 的 instruments 及各模块默认参数一致）
+DEFAULT_LAB = {
+    "192.168.7.10": "fsv3004",          # Rin_FSV3004、线宽频谱仪、Rin_4051
+    "192.168.7.11": "awg",              # 线宽信号发生器
+    "192.168.7.12": "scope",            # 时域示波器
+    "192.168.7.13": "awg",              # 时域信号源
+    "192.168.7.14": "osa",              # 信噪比光谱仪
+    "192.168.7.15": "4051",             # 单频频谱仪
+    "192.168.29.11": "osa",             # CT-波长光谱仪（CT-线宽时改为 fsv3004）
+    "USB::0x1313::0x8078": "pm100d",    # CT-功率 PM100D（匹配任意序列号）
+}
+DEFAULT_TABLE = os.path.join(tempfile.gettempdir(), "pts_emulator.json")
+
+
+class Lab:
+    """
+    overrides: {地址: 类型}，在 DEFAULT_LAB 基础上增改；类型为 None 时不仿真该地址
+    latency:   各仪器共用的命令延时表，见 emulator/server.py
+    """
+    def __init__(self, overrides=None, latency=None, seed=0):
+        layout = dict(DEFAULT_LAB)
+        layout.update(overrides or {})
+        self.servers = {}       # 仪器键 -> (类型, ScpiServer)
+        for i, (address, kind) in enumerate(sorted(layout.items())):
+            if kind is None:
+                continue
+            if kind not in KINDS:
+                raise ValueError(f"未知的仿真仪器类型: {kind}（可选 {', '.join(KINDS)}）")
+            instrument = KINDS[kind](latency, seed + i)
+            self.servers[instrument_key(address)] = (kind, ScpiServer(instrument).start())
+
+    def table(self):
+        return {key: server.address for key, (kind, server) in self.servers.items()}
+
+    def write_table(self, path=DEFAULT_TABLE):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.table(), f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+        return path
+
+    def instrument(self, address):
+        """地址对应的仿真仪器对象（测试中查看或修改仿真状态）"""
+        return self.servers[instrument_key(address)][1].instrument
+
+    def close(self):
+        for kind, server in self.servers.values():
+            server.close()
+        self.servers.clear()
@@ -0,0 +1,166 @@
+"""
+仿真光谱仪：Yokogawa AQ6370D
+
+合成光谱 = 激光主峰（按分辨率展宽的高斯）+ 两侧边模 + 随机起伏的噪声底：
+    - 波长设置与查询以米为单位（与 AQ63xx 一致），设置时可带 NM / UM 后缀
+    - :INITiate 单次扫描耗时 sweep_s，期间 *OPC? 与读迹线等待；主峰波长每次扫描有 pm 级抖动
+    - :TRACe:X? / :TRACe:Y?（以及 :TRACe:DATA:X? / :TRACe:DATA:Y?）返回当前迹线，格式 ASCII 或 REAL,32
+    - 灵敏度越高噪声底越低；:MMEMory:STORe:GRAPhics 保存 BMP 截图，MMEM:DATA? 读回
+
+依赖 numpy。
+"""
+import numpy as np
+
+from emulator.server import Instrument, ScpiError, parse_number, quoted_strings, format_values, binary_values
+from emulator.graphics import plot, bmp
+
+IDN = "YOKOGAWA,AQ6370D,91SIM0001,02.08"
+# :SENSe:SENSe 参数 -> (查询返回值, 噪声底 dBm)
+SENSITIVITY = {
+    "NHLD": (0, -60.0), "NAUT": (1, -65.0), "MID": (2, -70.0), "HIGH1": (3, -80.0),
+    "HIGH2": (4, -85.0), "HIGH3": (5, -90.0), "NORM": (6, -65.0),
+}
+# 边模：(相对主峰的波长偏移 nm, 相对功率 dBc)
+DEFAULT_SIDE_MODES = [(-0.8, -45.0), (0.8, -48.0)]
+
+
+def _num(value):
+    return f"{value:.10E}"
+
+
+class OpticalSpectrumAnalyzer(Instrument):
+    """
+    peak_nm / peak_dbm: 激光主峰波长与功率
+    side_modes:         [(偏移 nm, dBc)]
+    jitter_pm:          每次扫描主峰波长抖动（标准差）
+    sweep_s:            单次扫描耗时
+    """
+    def __init__(self, peak_nm=1550.12, peak_dbm=3.0, side_modes=None, jitter_pm=1.0, sweep_s=0.2,
+                 latency=None, seed=0):
+        super().__init__(latency, seed)
+        self.idn = IDN
+        self.peak_nm = peak_nm
+        self.peak_dbm = peak_dbm
+        self.side_modes = list(DEFAULT_SIDE_MODES if side_modes is None else side_modes)
+        self.jitter_pm = jitter_pm
+        self.sweep_s = sweep_s
+        self.reset()
+        self.commands.update({
+            "WAV:CENT": self._set_center, "WAV:CENT?": lambda a: _num(self.center),
+            "WAV:SPAN": self._set_span, "WAV:SPAN?": lambda a: _num(self.stop - self.start),
+            "WAV:STAR": self._set_start, "WAV:STAR?": lambda a: _num(self.start),
+            "WAV:STOP": self._set_stop, "WAV:STOP?": lambda a: _num(self.stop),
+            "SENS": self._set_sensitivity, "SENS?": lambda a: str(SENSITIVITY[self.sensitivity][0]),
+            "BAND": self._set_resolution, "BAND?": lambda a: _num(self.resolution),
+            "SWE:POIN": self._set_points, "SWE:POIN?": lambda a: str(self.points),
+            "DISP:TRAC:Y:SCAL:RLEV": self._set_ref_level,
+            "DISP:TRAC:Y:SCAL:RLEV?": lambda a: _num(self.ref_level),
+            "INIT": self._init, "INIT:IMM": self._init,
+            "ABOR": lambda a: None,
+            "SYST:ZERO:STAR": lambda a: self.start_operation(0.1),
+            "TRAC:ACT": lambda a: None, "TRAC:ACT?": lambda a: "TRA",
+            "TRAC:X?": self._x_query, "TRAC:DATA:X?": self._x_query,
+            "TRAC:Y?": self._y_query, "TRAC:DATA:Y?": self._y_query,
+            "TRAC:SNUM?": lambda a: str(self._current()[0].size),
+            "TRAC:DATA:SNUM?": lambda a: str(self._current()[0].size),
+            "FORM:DATA": self._set_format, "FORM:DATA?": lambda a: "REAL,32" if self.binary else "ASCii",
+            "MMEM:STOR:GRAP": self._store_graphics,
+        })
+        self.settings.update({
+            "UNIT:X": "0", "INIT:SMOD": "1", "INIT:CONT": "0", "SWE:POIN:AUTO": "1",
+        })
+
+    def reset(self):
+        self.start, self.stop = 1545e-9, 1555e-9
+        self.sensitivity = "NAUT"
+        self.resolution = 0.02e-9
+        self.points = 1001
+        self.ref_level = -10.0
+        self.binary = False
+        self.wavelengths = None
+        self.trace = None
+
+    @property
+    def center(self):
+        return (self.start + self.stop) / 2
+
+    # ---------- 设置 ----------
+    def _set_center(self, args):
+        half = (self.stop - self.start) / 2
+        center = parse_number(args)
+        self.start, self.stop = center - half, center + half
+
+    def _set_span(self, args):
+        half = parse_number(args) / 2
+        center = self.center
+        self.start, self.stop = center - half, center + half
+
+    def _set_start(self, args):
+        self.start = parse_number(args)
+        self.stop = max(self.stop, self.start)
+
+    def _set_stop(self, args):
+        self.stop = parse_number(args)
+        self.start = min(self.start, self.stop)
+
+    def _set_sensitivity(self, args):
+        word = args.strip().upper()
+        if word not in SENSITIVITY:
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        self.sensitivity = word
+
+    def _set_resolution(self, args):
+        self.resolution = parse_number(args)
+
+    def _set_points(self, args):
+        self.points = max(int(parse_number(args)), 101)
+
+    def _set_ref_level(self, args):
+        self.ref_level = parse_number(args)
+
+    def _set_format(self, args):
+        word = args.strip().upper()
+        if not (word.startswith("REAL") or word.startswith("ASC")):
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        self.binary = word.startswith("REAL")
+
+    # ---------- 扫描与迹线 ----------
+    def _init(self, args):
+        self._sweep()
+        self.start_operation(self.sweep_s)
+
+    def _sweep(self):
+        wl = np.linspace(self.start, self.stop, self.points)
+        floor = SENSITIVITY[self.sensitivity][1]
+        mw = 10 ** ((floor + self.rng.normal(0.0, 1.5, self.points)) / 10)
+        peak = (self.peak_nm + self.rng.normal(0.0, self.jitter_pm * 1e-3)) * 1e-9
+        sigma = max(self.resolution, 1e-12) / 2.3548
+        for offset_nm, dbc in [(0.0, 0.0)] + self.side_modes:
+            level = 10 ** ((self.peak_dbm + dbc) / 10)
+            mw = mw + level * np.exp(-0.5 * ((wl - peak - offset_nm * 1e-9) / sigma) ** 2)
+        self.wavelengths, self.trace = wl, 10 * np.log10(mw)
+
+    def _current(self):
+        self.wait_idle()
+        if self.trace is None or self.trace.size != self.points:
+            self._sweep()
+        return self.wavelengths, self.trace
+
+    def _values(self, values):
+        return binary_values(values) if self.binary else format_values(values)
+
+    def _x_query(self, args):
+        return self._values(self._current()[0])
+
+    def _y_query(self, args):
+        return self._values(self._current()[1])
+
+    # ---------- 截图 ----------
+    def _store_graphics(self, args):
+        """:MMEMory:STORe:GRAPhics COLor,BMP,"名称",INT：保存为 名称.bmp"""
+        names = quoted_strings(args)
+        if not names:
+            raise ScpiError(-109, "Missing parameter")
+        name = names[0] if names[0].lower().endswith(".bmp") else names[0] + ".bmp"
+        self.store_file(name, bmp(plot(self._current()[1])))
+        self.start_operation(0.05)
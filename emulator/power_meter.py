@@ -0,0 +1,77 @@
+"""
+仿真光功率计：Thorlabs PM100D
+
+读数 = 设定功率 × (1 + 缓慢漂移 + 读数噪声)，单位 W（:SENSe:POWer:UNIT DBM 时为 dBm）：
+    - READ? / MEAS:POW? / MEAS? 触发一次测量并返回读数，测量耗时 measure_s（按平均次数增加）
+    - INIT + FETC? 分开触发与读取；CONF:POW、波长校正、量程等设置只保存不影响读数
+
+依赖 numpy。
+"""
+import time
+
+import numpy as np
+
+from emulator.server import Instrument, ScpiError, parse_number
+
+IDN = "Thorlabs,PM100D,P0000001,2.8.0"
+
+
+class PowerMeter(Instrument):
+    """
+    power_w:   设定功率
+    noise:     读数相对噪声（标准差）
+    drift:     相对漂移幅度（周期 60 s 的正弦）
+    measure_s: 单次测量耗时
+    """
+    def __init__(self, power_w=12.3e-3, noise=2e-3, drift=5e-3, measure_s=0.003, latency=None, seed=0):
+        super().__init__(latency, seed)
+        self.idn = IDN
+        self.power_w = power_w
+        self.noise = noise
+        self.drift = drift
+        self.measure_s = measure_s
+        self.t0 = time.time()
+        self.reset()
+        self.commands.update({
+            "READ?": self._read, "MEAS?": self._read, "MEAS:POW?": self._read, "MEAS:SCAL:POW?": self._read,
+            "INIT": self._init, "INIT:IMM": self._init, "FETC?": self._fetch,
+            "POW:UNIT": self._set_unit, "POW:UNIT?": lambda a: self.unit,
+            "AVER:COUN": self._set_count, "AVER:COUN?": lambda a: str(self.count),
+            "AVER": self._set_count, "AVER?": lambda a: str(self.count),
+        })
+        self.settings.update({
+            "CONF:POW": "", "CONF?": "POW", "CORR:WAV": "1550", "POW:RANG:AUTO": "1", "POW:RANG": "0.02",
+            "CORR:COLL:ZERO": "", "INP:FILT": "0", "LINE:FREQ": "50",
+        })
+
+    def reset(self):
+        self.unit = "W"
+        self.count = 1
+        self.last = None
+
+    def _set_unit(self, args):
+        unit = args.strip().upper()
+        if unit not in ("W", "DBM"):
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        self.unit = unit
+
+    def _set_count(self, args):
+        self.count = max(int(parse_number(args)), 1)
+
+    def _measure(self):
+        time.sleep(self.measure_s * self.count)
+        phase = 2 * np.pi * (time.time() - self.t0) / 60.0
+        noise = self.rng.normal(0.0, self.noise / np.sqrt(self.count))
+        watts = self.power_w * (1 + self.drift * np.sin(phase) + noise)
+        return f"{10 * np.log10(watts * 1e3):.6E}" if self.unit == "DBM" else f"{watts:.6E}"
+
+    def _read(self, args):
+        return self._measure()
+
+    def _init(self, args):
+        self.last = self._measure()
+
+    def _fetch(self, args):
+        if self.last is None:
+            raise ScpiError(-230, "Data corrupt or stale")
+        return self.last
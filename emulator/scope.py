@@ -0,0 +1,108 @@
+"""
+仿真示波器：Rigol MSO5000 系列
+
+通道信号为幅度 vpp（V）的三角波叠加噪声：
+    - :MEASure:VPP? / :MEASure:VAVG? 等按通道返回测量值；信号超出屏幕（峰峰值大于 8 格）时返回 9.91E+37，
+      与实际示波器一样需要调大垂直刻度
+    - :STOP 后测量值保持不变，:RUN 后重新采集
+    - :DISPlay:DATA? ON,OFF,PNG 返回截图，长度字段固定 9 位（#9000012345...）
+
+依赖 numpy。
+"""
+import numpy as np
+
+from emulator.server import Instrument, ScpiError, parse_number, parse_bool, block
+from emulator.graphics import plot, png
+
+IDN = "RIGOL TECHNOLOGIES,MSO5104,MS5A000000001,00.01.03.00.01"
+OVERRANGE = "9.91E+37"
+CHANNELS = ("CHAN1", "CHAN2", "CHAN3", "CHAN4")
+
+
+class Oscilloscope(Instrument):
+    """
+    vpp:    各通道信号峰峰值（V），{"CHAN1": 0.3}
+    offset: 各通道直流电平（V）
+    noise:  噪声（V，标准差）
+    """
+    def __init__(self, vpp=None, offset=None, noise=2e-3, latency=None, seed=0):
+        super().__init__(latency, seed)
+        self.idn = IDN
+        self.vpp = {"CHAN1": 0.3}
+        self.vpp.update(vpp or {})
+        self.offset = dict(offset or {})
+        self.noise = noise
+        self.reset()
+        self.commands.update({
+            "RUN": lambda a: self._set_running(True), "STOP": lambda a: self._set_running(False),
+            "SING": lambda a: self._set_running(False),
+            "TIM:MAIN:SCAL": self._set_timebase, "TIM:MAIN:SCAL?": lambda a: f"{self.timebase:.6E}",
+            "TIM:SCAL": self._set_timebase, "TIM:SCAL?": lambda a: f"{self.timebase:.6E}",
+            "MEAS:CLE": lambda a: self.items.clear(),
+            "DISP:DATA?": self._screenshot,
+        })
+        for ch in CHANNELS:
+            node = "CHAN" if ch == "CHAN1" else ch      # 归一后的命令头去掉了后缀 1
+            self.commands[f"{node}:SCAL"] = lambda a, ch=ch: self._set_scale(ch, a)
+            self.commands[f"{node}:SCAL?"] = lambda a, ch=ch: f"{self.scale[ch]:.6E}"
+            self.commands[f"{node}:DISP"] = lambda a, ch=ch: parse_bool(a)
+            self.settings[f"{node}:COUP"] = "DC"
+            self.settings[f"{node}:OFFS"] = "0"
+        for item in ("VPP", "VAVG", "VMAX", "VMIN", "VRMS", "FREQ"):
+            self.commands[f"MEAS:{item}"] = lambda a, item=item: self.items.add((item, self._channel(a)))
+            self.commands[f"MEAS:{item}?"] = lambda a, item=item: self._measure(item, self._channel(a))
+        self.settings.update({"TIM:MODE": "MAIN", "TRIG:MODE": "EDGE", "TRIG:SWE": "AUTO", "ACQ:TYPE": "NORM"})
+
+    def reset(self):
+        self.running = True
+        self.timebase = 1e-3
+        self.scale = {ch: 1.0 for ch in CHANNELS}
+        self.items = set()
+        self.held = {}
+
+    def _set_running(self, running):
+        self.running = running
+        if running:
+            self.held.clear()
+
+    def _set_timebase(self, args):
+        self.timebase = parse_number(args)
+
+    def _set_scale(self, ch, args):
+        self.scale[ch] = parse_number(args)
+        self.held.clear()
+
+    def _channel(self, args):
+        ch = (args.strip().upper() or "CHAN1").replace("CHANNEL", "CHAN")
+        if ch not in CHANNELS:
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        return ch
+
+    def _waveform(self, ch, n=1000):
+        """一个周期的三角波采样"""
+        vpp = self.vpp.get(ch, 0.0)
+        t = np.linspace(0.0, 1.0, n, endpoint=False)
+        tri = vpp * (2 * np.abs(2 * t - 1) - 1) / 2
+        return self.offset.get(ch, 0.0) + tri + self.rng.normal(0.0, self.noise, n)
+
+    def _measure(self, item, ch):
+        key = (item, ch)
+        if not self.running and key in self.held:
+            return self.held[key]
+        wave = self._waveform(ch)
+        if np.ptp(wave) > 8 * self.scale[ch] or np.max(np.abs(wave)) > 5 * self.scale[ch]:
+            value = OVERRANGE
+        else:
+            # 小信号受垂直分辨率（8 位，满屏 8 格）限制
+            lsb = 8 * self.scale[ch] / 256
+            wave = np.round(wave / lsb) * lsb
+            result = {
+                "VPP": np.ptp(wave), "VAVG": np.mean(wave), "VMAX": np.max(wave), "VMIN": np.min(wave),
+                "VRMS": np.sqrt(np.mean(wave ** 2)), "FREQ": 1.0 / (10 * self.timebase),
+            }[item]
+            value = f"{result:.6E}"
+        self.held[key] = value
+        return value
+
+    def _screenshot(self, args):
+        return block(png(plot(self._waveform("CHAN1"))), ndigits=9)
@@ -0,0 +1,343 @@
+"""
+本机 SCPI 仿真仪器：命令解析与 TCP 服务
+
+每台仿真仪器在 127.0.0.1 上监听一个端口，按 SOCKET 资源的方式收发（一行一条消息，结束符 LF）：
+    - 一条消息可含多条命令（";" 分隔），命令头按 common/scpi_state 归一后查表执行，
+      长短格式、SENSe 根节点、节点后缀 1 的各种写法都能识别；消息中各查询的结果用 ";" 连接后一次返回
+    - 每条命令执行前按 latency 等待：按归一后的命令头前缀匹配（最长的优先），未匹配时用 "default"
+    - 扫描等耗时操作把仪器置为忙，*OPC? / *WAI 与读迹线等到操作完成；*OPC 在完成后置位 *ESR? 的 OPC 位，
+      *ESE / *STB? 按 IEEE 488.2 汇总
+    - 未知命令与查询记入错误队列（:SYST:ERR? 读出），查询不返回任何内容，与真实仪器一样要等到超时
+    - 仪器内文件（MMEM）保存在内存中，MMEM:DATA? 以 IEEE 488.2 定长块返回
+    - 同一仪器可同时有多个连接（例如 SOCKET 与 INSTR 两个会话），共用仪器状态，命令按到达顺序逐条执行
+
+用法：
+    server = ScpiServer(SpectrumAnalyzer()).start()
+    rm.open_resource(f"TCPIP0::127.0.0.1::{server.port}::SOCKET")
+
+依赖 numpy（迹线生成）。
+"""
+import re
+import time
+import fnmatch
+import threading
+import socketserver
+from collections import deque
+
+from common.scpi_state import split_units
+
+DEFAULT_LATENCY = {"default": 0.0005}
+
+# 数值参数的单位后缀（大写）-> 倍率；SCPI 中单独的 M 表示毫
+UNITS = {
+    "": 1.0, "HZ": 1.0, "KHZ": 1e3, "MHZ": 1e6, "GHZ": 1e9,
+    "S": 1.0, "MS": 1e-3, "US": 1e-6, "NS": 1e-9,
+    "V": 1.0, "MV": 1e-3, "UV": 1e-6, "W": 1.0, "MW": 1e-3, "UW": 1e-6,
+    "DB": 1.0, "DBM": 1.0, "M": 1e-3, "UM": 1e-6, "NM": 1e-9, "PM": 1e-12,
+}
+_NUMBER = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[Ee][-+]?\d+)?)\s*([A-Za-z]*)\s*$")
+_QUOTED = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+
+
+class ScpiError(Exception):
+    """命令执行错误：code 与 message 记入错误队列"""
+    def __init__(self, code, message):
+        super().__init__(f"{code},\"{message}\"")
+        self.code = code
+        self.message = message
+
+
+def parse_number(args, units=UNITS):
+    """"80MHZ" / "10 Hz" / "-20dBm" / "1550NM" -> 基本单位的浮点数"""
+    m = _NUMBER.match(str(args))
+    if not m:
+        raise ScpiError(-104, f"Data type error; {args}")
+    unit = m.group(2).upper()
+    if unit not in units:
+        raise ScpiError(-131, f"Invalid suffix; {args}")
+    return float(m.group(1)) * units[unit]
+
+
+def parse_bool(args):
+    word = str(args).strip().upper()
+    if word in ("ON", "1"):
+        return True
+    if word in ("OFF", "0"):
+        return False
+    raise ScpiError(-104, f"Data type error; {args}")
+
+
+def quoted_strings(args):
+    """参数中所有引号内的字符串"""
+    return [a if a else b for a, b in _QUOTED.findall(str(args))]
+
+
+def block(data, ndigits=None):
+    """IEEE 488.2 定长块：#<位数><长度><数据>；ndigits 固定长度字段的位数（例如部分示波器总是 #9）"""
+    size = str(len(data))
+    if ndigits is not None:
+        size = size.zfill(ndigits)
+    return f"#{len(size)}{size}".encode() + bytes(data)
+
+
+def format_values(values):
+    """ASCII 迹线：逗号分隔，%.9E"""
+    return ",".join(f"{v:.9E}" for v in values)
+
+
+def binary_values(values, big_endian=False):
+    """32 位浮点定长块，默认小端"""
+    import numpy as np
+    return block(np.asarray(values, dtype=">f4" if big_endian else "<f4").tobytes())
+
+
+class Instrument:
+    """
+    仿真仪器基类：公用命令、错误队列、忙状态、仪器内文件。
+    子类在 commands 中按归一后的命令头登记处理函数 handler(args)，查询返回 str / bytes，设置返回 None；
+    settings 中登记的命令头按原样保存参数、查询时原样返回，用于不影响仿真结果的设置。
+    """
+    idn = "PTS,Emulator,SIM0000,1.0"
+
+    def __init__(self, latency=None, seed=0):
+        import numpy as np
+        self.latency = dict(DEFAULT_LATENCY)
+        self.latency.update(latency or {})
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.RLock()
+        self.errors = deque(maxlen=32)
+        self.files = {}                 # 归一后的仪器路径 -> (原路径, 内容)
+        self.settings = {}
+        self.busy_until = 0.0
+        self.esr = 0
+        self.ese = 0
+        self.sre = 0
+        self.opc_pending = False
+        self.stats = {"messages": 0, "commands": 0, "errors": 0}
+        self.commands = {
+            "*IDN?": lambda args: self.idn,
+            "*RST": self._rst,
+            "*CLS": self._cls,
+            "*OPC": self._opc,
+            "*OPC?": self._opc_query,
+            "*WAI": lambda args: self.wait_idle(),
+            "*ESR?": self._esr_query,
+            "*ESE": self._ese,
+            "*ESE?": lambda args: str(self.ese),
+            "*SRE": self._sre,
+            "*SRE?": lambda args: str(self.sre),
+            "*STB?": lambda args: str(self.status_byte()),
+            "SYST:ERR?": self._error_query,
+            "SYST:ERR:NEXT?": self._error_query,
+            "MMEM:DATA?": self._mmem_data,
+            "MMEM:MDIR": lambda args: None,
+            "MMEM:DEL": self._mmem_delete,
+            "MMEM:COPY": self._mmem_copy,
+            "MMEM:CAT?": self._mmem_catalog,
+        }
+
+    # ---------- 执行 ----------
+    def execute(self, message):
+        """执行一条消息，返回响应字节（不含结束符）；没有查询或查询出错时返回 None"""
+        self.stats["messages"] += 1
+        responses = []
+        for header, args in split_units(message):
+            time.sleep(self.delay(header))
+            self.stats["commands"] += 1
+            with self.lock:
+                try:
+                    result = self.dispatch(header, args)
+                except ScpiError as e:
+                    self.error(e.code, e.message)
+                    return None
+            if result is not None:
+                responses.append(result if isinstance(result, bytes) else str(result).encode())
+        return b";".join(responses) if responses else None
+
+    def dispatch(self, header, args):
+        handler = self.commands.get(header)
+        if handler is not None:
+            return handler(args)
+        name = header.rstrip("?")
+        if name in self.settings:
+            if header.endswith("?"):
+                return self.settings[name]
+            self.settings[name] = args.strip()
+            return None
+        raise ScpiError(-113, f"Undefined header; {header}")
+
+    def delay(self, header):
+        best = None
+        for prefix in self.latency:
+            if prefix != "default" and header.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.latency[best if best is not None else "default"]
+
+    def error(self, code, message):
+        self.stats["errors"] += 1
+        self.errors.append((code, message))
+        self.esr |= 0x20 if -200 < code <= -100 else 0x10     # 命令错误 / 执行错误
+
+    # ---------- 忙状态 ----------
+    def start_operation(self, seconds):
+        """开始一个耗时 seconds 的操作（在上一个操作完成之后排队）"""
+        now = time.time()
+        self.busy_until = max(self.busy_until, now) + max(seconds, 0.0)
+
+    def wait_idle(self):
+        remaining = self.busy_until - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def status_byte(self):
+        if self.opc_pending and time.time() >= self.busy_until:
+            self.opc_pending = False
+            self.esr |= 0x01
+        stb = 0x04 if self.errors else 0
+        if self.esr & self.ese:
+            stb |= 0x20
+        if stb & self.sre:
+            stb |= 0x40
+        return stb
+
+    def _rst(self, args):
+        self.busy_until = 0.0
+        self.opc_pending = False
+        self.reset()
+
+    def reset(self):
+        """*RST：子类恢复默认设置"""
+
+    def _cls(self, args):
+        self.errors.clear()
+        self.esr = 0
+        self.opc_pending = False
+
+    def _opc(self, args):
+        self.opc_pending = True
+        self.status_byte()
+
+    def _opc_query(self, args):
+        self.wait_idle()
+        return "1"
+
+    def _esr_query(self, args):
+        self.status_byte()
+        value, self.esr = self.esr, 0
+        return str(value)
+
+    def _ese(self, args):
+        self.ese = int(parse_number(args))
+
+    def _sre(self, args):
+        self.sre = int(parse_number(args))
+
+    def _error_query(self, args):
+        if not self.errors:
+            return '0,"No error"'
+        code, message = self.errors.popleft()
+        return f'{code},"{message}"'
+
+    # ---------- 仪器内文件 ----------
+    @staticmethod
+    def file_key(path):
+        return str(path).strip().replace("/", "\\").upper()
+
+    def store_file(self, path, data):
+        self.files[self.file_key(path)] = (path, bytes(data))
+
+    def _path_arg(self, args):
+        names = quoted_strings(args)
+        if not names:
+            raise ScpiError(-109, "Missing parameter")
+        return names[0]
+
+    def _mmem_data(self, args):
+        key = self.file_key(self._path_arg(args))
+        if key not in self.files:
+            raise ScpiError(-256, f"File name not found; {self._path_arg(args)}")
+        return block(self.files[key][1])
+
+    def _mmem_delete(self, args):
+        pattern = self.file_key(self._path_arg(args))
+        for key in [k for k in self.files if fnmatch.fnmatchcase(k, pattern)]:
+            del self.files[key]
+
+    def _mmem_copy(self, args):
+        """仪器内复制；目标以 \\ 结尾或源含通配符时视为目录（电脑共享文件夹在仿真中无法访问，也复制到仪器内）"""
+        names = quoted_strings(args)
+        if len(names) < 2:
+            raise ScpiError(-109, "Missing parameter")
+        source, dest = names[0], names[1]
+        pattern = self.file_key(source)
+        matches = [v for k, v in self.files.items() if fnmatch.fnmatchcase(k, pattern)]
+        if not matches:
+            raise ScpiError(-256, f"File name not found; {source}")
+        is_dir = dest.endswith(("\\", "/")) or any(c in source for c in "*?")
+        for path, data in matches:
+            self.store_file(dest.rstrip("\\/") + "\\" + _basename(path) if is_dir else dest, data)
+
+    def _mmem_catalog(self, args):
+        names = quoted_strings(args)
+        folder = self.file_key(names[0]).rstrip("\\") if names else ""
+        entries = [f'"{_basename(path)},,{len(data)}"' for key, (path, data) in self.files.items()
+                   if not folder or key.rsplit("\\", 1)[0] == folder]
+        return ",".join(entries) or '""'
+
+
+def _basename(path):
+    return str(path).replace("/", "\\").rsplit("\\", 1)[-1]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        instrument = self.server.instrument
+        buf = b""
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            buf += data
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                message = line.decode("latin-1").strip()
+                if not message:
+                    continue
+                response = instrument.execute(message)
+                if response is not None:
+                    self.request.sendall(response + b"\n")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ScpiServer:
+    """把仿真仪器挂到本机 TCP 端口上；port=0 时由系统分配"""
+    def __init__(self, instrument, host="127.0.0.1", port=0):
+        self.instrument = instrument
+        self._server = _Server((host, port), _Handler)
+        self._server.instrument = instrument
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def resource(self):
+        return f"TCPIP0::{self.host}::{self.port}::SOCKET"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
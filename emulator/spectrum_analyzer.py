@@ -0,0 +1,362 @@
+"""
+仿真频谱仪：R&S FSV3004 / 思仪 4051
+
+合成迹线 = 噪声底（白噪声 + 1/f）+ 洛伦兹谱线（拍频信号）+ 可选的随机杂散：
+    - 噪声按平均次数起伏（n 次平均的功率服从 Gamma(n, 1/n)），RBW 越大噪声底越高
+    - 谱线宽度为 RBW 与线宽的合成，N dB 带宽、峰值标记、噪声标记都从当前迹线计算
+    - 单次扫描（INIT / INIT:IMM）耗时 sweep_s × 平均次数（设置了 SWE:TIME 时用设置值），期间 *OPC? / *WAI / 读迹线等待
+    - 连续扫描（INIT:CONT ON）时每次读迹线都重新生成
+    - 单位 DBM / V / W（UNIT:POW），迹线格式 ASCII 或 32 位浮点二进制（FORM[:DATA] REAL,32）
+    - MMEM:STOR:TRAC 按 FSV 的 ASCII 导出格式（";" 分隔，含表头）保存迹线，HCOPy / MMEM:STOR:IMAG 保存 PNG 截图
+
+依赖 numpy。
+"""
+import time
+
+import numpy as np
+
+from emulator.server import Instrument, ScpiError, parse_number, parse_bool, format_values, binary_values
+from emulator.graphics import plot, png
+
+MODELS = {
+    "FSV3004": {"idn": "Rohde&Schwarz,FSV3004,1330.5000K04/000000,1.70", "fmax": 4e9},
+    "4051": {"idn": "Ceyear,4051E,SIM0001,1.0.0", "fmax": 26.5e9},
+}
+# (频率 Hz, 总功率 dBm, 激光线宽 Hz)：自外差拍频谱线为洛伦兹线型，FWHM 是激光线宽的 2 倍
+DEFAULT_CARRIERS = [(80e6, -20.0, 5e3)]
+
+
+def _num(value):
+    return f"{value:.12g}"
+
+
+class SpectrumAnalyzer(Instrument):
+    """
+    model:            MODELS 中的型号
+    carriers:         [(频率 Hz, 功率 dBm, 激光线宽 Hz)]
+    noise_dbm_hz:     白噪声功率谱密度
+    flicker_hz:       1/f 噪声转角频率
+    spur_probability: 每次扫描在扫描范围内随机出现一个杂散的概率
+    sweep_s:          未设置扫描时间时单次扫描的耗时
+    """
+    def __init__(self, model="FSV3004", carriers=None, noise_dbm_hz=-150.0, flicker_hz=10e3,
+                 spur_probability=0.0, sweep_s=0.02, latency=None, seed=0):
+        super().__init__(latency, seed)
+        info = MODELS[model]
+        self.idn = info["idn"]
+        self.fmax = info["fmax"]
+        self.carriers = list(DEFAULT_CARRIERS if carriers is None else carriers)
+        self.noise_dbm_hz = noise_dbm_hz
+        self.flicker_hz = flicker_hz
+        self.spur_probability = spur_probability
+        self.sweep_s = sweep_s
+        self.reset()
+        self.commands.update({
+            "FREQ:CENT": self._set_center, "FREQ:CENT?": lambda a: _num(self.center),
+            "FREQ:SPAN": self._set_span, "FREQ:SPAN?": lambda a: _num(self.stop - self.start),
+            "FREQ:STAR": self._set_start, "FREQ:STAR?": lambda a: _num(self.start),
+            "FREQ:STOP": self._set_stop, "FREQ:STOP?": lambda a: _num(self.stop),
+            "BAND": self._set_rbw, "BAND?": lambda a: _num(self.rbw),
+            "SWE:POIN": self._set_points, "SWE:POIN?": lambda a: str(self.points),
+            "SWE:TIME": self._set_sweep_time, "SWE:TIME?": lambda a: _num(self._sweep_duration(1)),
+            "AVER": self._set_average, "AVER:STAT": self._set_average,
+            "AVER?": lambda a: "1" if self.average else "0", "AVER:STAT?": lambda a: "1" if self.average else "0",
+            "AVER:COUN": self._set_count, "AVER:COUN?": lambda a: str(self.count),
+            "SWE:COUN": self._set_count, "SWE:COUN?": lambda a: str(self.count),
+            "TRAC:TYPE": self._set_trace_mode, "TRAC:MODE": self._set_trace_mode,
+            "DISP:TRAC:MODE": self._set_trace_mode,
+            "TRAC:TYPE?": lambda a: self.trace_mode, "TRAC:MODE?": lambda a: self.trace_mode,
+            "TRAC:CLE": lambda a: None,
+            "UNIT:POW": self._set_unit, "UNIT:POW?": lambda a: self.unit,
+            "INIT:CONT": self._set_continuous, "INIT:CONT?": lambda a: "1" if self.continuous else "0",
+            "INIT": self._init, "INIT:IMM": self._init,
+            "ABOR": self._abort,
+            "FORM": self._set_format, "FORM:DATA": self._set_format,
+            "FORM?": self._format_query, "FORM:DATA?": self._format_query,
+            "FORM:BORD": self._set_byte_order,
+            "TRAC:DATA?": self._trace_query, "TRAC?": self._trace_query,
+            "CALC:MARK": self._set_marker, "CALC:MARK:STAT": self._set_marker,
+            "CALC:MARK?": lambda a: "1" if self.marker else "0",
+            "CALC:MARK:MAX": self._peak_search, "CALC:MARK:MAX:PEAK": self._peak_search,
+            "CALC:MARK:MAX:AUTO": self._set_peak_auto,
+            "CALC:MARK:X": self._set_marker_x, "CALC:MARK:X?": lambda a: _num(self.marker_x),
+            "CALC:MARK:Y?": self._marker_y,
+            "CALC:MARK:FUNC": self._set_marker_function,
+            "CALC:MARK:FUNC:NOIS": self._set_noise_marker,
+            "CALC:MARK:FUNC:NOIS:RES?": self._noise_result,
+            "CALC:MARK:FUNC:NDBD": self._set_ndb, "CALC:MARK:FUNC:NDBD?": lambda a: _num(self.ndb),
+            "CALC:MARK:FUNC:NDBD:STAT": self._set_ndb_state,
+            "CALC:MARK:FUNC:NDBD:RES?": self._ndb_result,
+            "CALC:MARK:FUNC:NDBD:FREQ?": self._ndb_frequencies,
+            "CALC:MARK:FUNC:EXEC": lambda a: None,
+            "MMEM:STOR:TRAC": self._store_trace,
+            "MMEM:STOR:IMAG": self._store_image,
+            "MMEM:NAME": self._set_file_name,
+            "HCOP:IMM": self._hardcopy, "HCOP": self._hardcopy,
+        })
+        self.settings.update({
+            "INST:SEL": "SAN", "INST": "SAN", "CONF:SAN": "", "DET": "RMS", "SWE:TYPE": "AUTO",
+            "SWE:TYPE:AUTO:RUL": "SPE", "BAND:VID": "1000000", "BAND:VID:RAT": "1", "BAND:VID:AUTO": "1",
+            "BAND:AUTO": "1", "DISP:TRAC:Y:RLEV": "0", "DISP:UPD": "1", "SYST:DISP:UPD": "1",
+            "CALC:MARK:MODE": "POS", "HCOP:DEST": "'MMEM'", "HCOP:DEV:LANG": "PNG",
+        })
+
+    def reset(self):
+        self.start, self.stop = 0.0, self.fmax
+        self.rbw = 1e6
+        self.points = 1001
+        self.sweep_time = None
+        self.average = False
+        self.count = 10
+        self.trace_mode = "WRIT"
+        self.unit = "DBM"
+        self.continuous = True
+        self.binary = False
+        self.big_endian = False
+        self.marker = False
+        self.marker_x = self.center
+        self.peak_auto = False
+        self.marker_function = "OFF"
+        self.ndb = 3.0
+        self.file_name = ""
+        self.freqs = None
+        self.trace_mw = None
+
+    @property
+    def center(self):
+        return (self.start + self.stop) / 2
+
+    # ---------- 设置 ----------
+    def _set_range(self, start, stop):
+        start = min(max(start, 0.0), self.fmax)
+        stop = min(max(stop, start), self.fmax)
+        self.start, self.stop = start, stop
+
+    def _set_center(self, args):
+        half = (self.stop - self.start) / 2
+        center = parse_number(args)
+        self._set_range(center - half, center + half)
+
+    def _set_span(self, args):
+        half = parse_number(args) / 2
+        center = self.center
+        self._set_range(center - half, center + half)
+
+    def _set_start(self, args):
+        self._set_range(parse_number(args), max(self.stop, parse_number(args)))
+
+    def _set_stop(self, args):
+        self._set_range(min(self.start, parse_number(args)), parse_number(args))
+
+    def _set_rbw(self, args):
+        self.rbw = max(parse_number(args), 1.0)
+
+    def _set_points(self, args):
+        points = int(parse_number(args))
+        if not 101 <= points <= 100001:
+            raise ScpiError(-222, f"Data out of range; {args}")
+        self.points = points
+
+    def _set_sweep_time(self, args):
+        self.sweep_time = parse_number(args)
+
+    def _set_average(self, args):
+        self.average = parse_bool(args)
+
+    def _set_count(self, args):
+        self.count = max(int(parse_number(args)), 0)
+
+    def _set_trace_mode(self, args):
+        word = args.replace(",", " ").split()[-1].upper() if args.strip() else ""
+        if word.startswith("AVER"):
+            self.trace_mode, self.average = "AVER", True
+        elif word.startswith("MAXH"):
+            self.trace_mode = "MAXH"
+        else:
+            self.trace_mode = "WRIT"
+
+    def _set_unit(self, args):
+        unit = args.strip().upper()
+        if unit not in ("DBM", "V", "W"):
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+        self.unit = unit
+
+    def _set_continuous(self, args):
+        self.continuous = parse_bool(args)
+
+    def _set_format(self, args):
+        word = args.strip().upper()
+        if word.startswith("REAL"):
+            self.binary = True
+        elif word.startswith("ASC"):
+            self.binary = False
+        else:
+            raise ScpiError(-224, f"Illegal parameter value; {args}")
+
+    def _format_query(self, args):
+        return "REAL,32" if self.binary else "ASC,0"
+
+    def _set_byte_order(self, args):
+        self.big_endian = args.strip().upper().startswith("NORM")
+
+    # ---------- 扫描与迹线 ----------
+    def _sweep_count(self):
+        return max(self.count, 1) if self.average else 1
+
+    def _sweep_duration(self, count):
+        return (self.sweep_time if self.sweep_time is not None else self.sweep_s) * count
+
+    def _init(self, args):
+        self._sweep()
+        self.start_operation(self._sweep_duration(self._sweep_count()))
+
+    def _abort(self, args):
+        self.busy_until = min(self.busy_until, time.time())
+
+    def _sweep(self):
+        """按当前设置生成一条迹线（mW）"""
+        n = self._sweep_count()
+        freqs = np.linspace(self.start, self.stop, self.points)
+        density = 10 ** (self.noise_dbm_hz / 10) * (1 + self.flicker_hz / np.maximum(freqs, self.rbw))
+        mw = density * self.rbw * self.rng.gamma(n, 1.0 / n, self.points)
+        carriers = list(self.carriers)
+        if self.spur_probability and self.rng.random() < self.spur_probability:
+            level = self.noise_dbm_hz + 10 * np.log10(self.rbw) + self.rng.uniform(10, 25)
+            carriers.append((self.rng.uniform(self.start, self.stop), level, 0.0))
+        for f0, dbm, linewidth in carriers:
+            half = linewidth
+            width = np.hypot(half, self.rbw / 2)
+            peak = 10 ** (dbm / 10) * self.rbw / (self.rbw + np.pi * half)
+            mw = mw + peak / (1 + ((freqs - f0) / width) ** 2)
+        if self.trace_mode == "MAXH" and self.trace_mw is not None and len(self.trace_mw) == len(mw):
+            mw = np.maximum(mw, self.trace_mw)
+        self.freqs, self.trace_mw = freqs, mw
+        if self.peak_auto:
+            self._peak_search("")
+
+    def _current(self):
+        """读迹线前：单次扫描等到完成，连续扫描重新生成"""
+        self.wait_idle()
+        if self.continuous or self.trace_mw is None or len(self.trace_mw) != self.points:
+            self._sweep()
+        return self.freqs, self.trace_mw
+
+    def _convert(self, mw):
+        if self.unit == "V":
+            return np.sqrt(mw * 1e-3 * 50.0)
+        if self.unit == "W":
+            return mw * 1e-3
+        return 10 * np.log10(mw)
+
+    def _trace_query(self, args):
+        values = self._convert(self._current()[1])
+        if self.binary:
+            return binary_values(values, self.big_endian)
+        return format_values(values)
+
+    # ---------- 标记 ----------
+    def _set_marker(self, args):
+        self.marker = parse_bool(args)
+
+    def _marker_index(self):
+        freqs = self._current()[0]
+        return int(np.argmin(np.abs(freqs - self.marker_x)))
+
+    def _peak_search(self, args):
+        freqs, mw = self.freqs, self.trace_mw
+        if mw is None:
+            freqs, mw = self._current()
+        self.marker = True
+        self.marker_x = float(freqs[int(np.argmax(mw))])
+
+    def _set_peak_auto(self, args):
+        self.peak_auto = parse_bool(args)
+        if self.peak_auto and self.trace_mw is not None:
+            self._peak_search("")
+
+    def _set_marker_x(self, args):
+        self.marker_x = parse_number(args)
+
+    def _marker_y(self, args):
+        i = self._marker_index()
+        if self.marker_function == "NOIS":
+            return self._noise_result(args)
+        return _num(float(self._convert(self.trace_mw[i:i + 1])[0]))
+
+    def _set_marker_function(self, args):
+        word = args.strip().upper()
+        self.marker_function = "NOIS" if word.startswith("NOIS") else "OFF"
+
+    def _set_noise_marker(self, args):
+        self.marker_function = "NOIS" if parse_bool(args) else "OFF"
+
+    def _noise_result(self, args):
+        """噪声标记：dBm/Hz"""
+        i = self._marker_index()
+        return _num(10 * np.log10(self.trace_mw[i] / self.rbw))
+
+    def _set_ndb(self, args):
+        self.ndb = abs(parse_number(args))
+
+    def _set_ndb_state(self, args):
+        parse_bool(args)
+
+    def _ndb_points(self):
+        """峰值两侧下降 ndb 的频率（线性插值）"""
+        freqs, mw = self._current()
+        db = 10 * np.log10(mw)
+        peak = int(np.argmax(db))
+        level = db[peak] - self.ndb
+        below = np.nonzero(db[:peak] <= level)[0]
+        above = np.nonzero(db[peak:] <= level)[0]
+        if len(below) == 0 or len(above) == 0:
+            raise ScpiError(-200, "Execution error; N dB down not found")
+        i, j = below[-1], peak + above[0]
+        left = np.interp(level, [db[i], db[i + 1]], [freqs[i], freqs[i + 1]])
+        right = np.interp(level, [db[j], db[j - 1]], [freqs[j], freqs[j - 1]])
+        return float(left), float(right)
+
+    def _ndb_result(self, args):
+        left, right = self._ndb_points()
+        return _num(right - left)
+
+    def _ndb_frequencies(self, args):
+        left, right = self._ndb_points()
+        return f"{_num(left)},{_num(right)}"
+
+    # ---------- 文件 ----------
+    def _store_trace(self, args):
+        path = self._path_arg(args)
+        freqs, mw = self._current()
+        values = self._convert(mw)
+        header = [
+            ("Type", self.idn.split(",")[1], ""), ("Version", self.idn.split(",")[-1], ""),
+            ("Date", time.strftime("%d.%b %y"), ""), ("Mode", "ANALYZER", ""),
+            ("Start", f"{self.start:.6f}", "Hz"), ("Stop", f"{self.stop:.6f}", "Hz"),
+            ("Center", f"{self.center:.6f}", "Hz"), ("Span", f"{self.stop - self.start:.6f}", "Hz"),
+            ("RBW", f"{self.rbw:.6f}", "Hz"), ("SWT", f"{self._sweep_duration(1):.6f}", "s"),
+            ("Trace Mode", {"AVER": "AVERAGE", "MAXH": "MAX HOLD"}.get(self.trace_mode, "CLR/WRITE"), ""),
+            ("Detector", self.settings.get("DET", "RMS"), ""), ("Sweep Count", str(self.count), ""),
+            ("Trace", "1", ""), ("x-Axis", "LIN", ""), ("y-Axis", "LOG" if self.unit == "DBM" else "LIN", ""),
+            ("x-Unit", "Hz", ""), ("y-Unit", {"DBM": "dBm"}.get(self.unit, self.unit), ""),
+            ("Values", str(len(values)), ""),
+        ]
+        lines = [f"{k};{v};{u}" if u else f"{k};{v};" for k, v, u in header]
+        lines += [f"{f:.6f};{v:.9E};" for f, v in zip(freqs, values)]
+        self.store_file(path, ("\r\n".join(lines) + "\r\n").encode())
+        self.start_operation(0.01)
+
+    def _screenshot(self):
+        return png(plot(10 * np.log10(self._current()[1])))
+
+    def _store_image(self, args):
+        self.store_file(self._path_arg(args), self._screenshot())
+
+    def _set_file_name(self, args):
+        self.file_name = self._path_arg(args)
+
+    def _hardcopy(self, args):
+        if not self.file_name:
+            raise ScpiError(-200, "Execution error; no file name")
+        self.store_file(self.file_name, self._screenshot())
+        self.start_operation(0.05)
@@ -8,7 +8,13 @@ import threading
 import time
 import traceback
 import multiprocessing
-from queue import Empty
+
+from common.instrument_lease import start_lease_broker
+from common.test_scheduler import DurationStore, DagRun, plan_schedule
+from common.ipc_channel import QueueReader, TelemetryWriter, unpack_batch
+from common.progress import set_progress_sink, encode_event, decode_event
+from common.log_view import LogStore, VirtualLogView, LEVEL_FILTERS, new_session_log_path
+from common.stations import STATION_ENV, task_key, split_task_key, load_station_profiles, apply_station_profile
 
 # ==========================================
 # 动态导入辅助函数
@@ -24,43 +30,97 @@ if os.name == 'nt':
 else:
     scaling_factor = 1.0
 
+# ==========================================
+# 平台配置
+# ==========================================
+def get_app_dir():
+    """程序所在目录（兼容 PyInstaller 打包后的 exe）"""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(os.path.abspath(sys.executable))
+    return os.path.dirname(os.path.abspath(__file__))
+
+PLATFORM_CONFIG_FILE = os.path.join(get_app_dir(), "platform_config.json")
+
+DEFAULT_PLATFORM_CONFIG = {
+    "worker_pool_size": 2,      # 预热进程数量，0 表示不使用预热池
+    "log_memory_lines": 5000,   # 日志区内存中保留的最近日志条数，更早的日志从 logs/ 下的会话日志文件分页读取
+    "log_view_rows": 1000,      # 日志区 Treeview 中最多同时显示的行数
+    "stations": [],             # 多工位配置（仪器地址、上位机窗口、输出目录），格式见 common/stations.py
+}
+
+def load_platform_config():
+    """读取 platform_config.json，缺失的项使用默认值"""
+    config = dict(DEFAULT_PLATFORM_CONFIG)
+    try:
+        if os.path.exists(PLATFORM_CONFIG_FILE):
+            with open(PLATFORM_CONFIG_FILE, "r", encoding="utf-8") as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"读取平台配置失败，使用默认配置: {e}")
+    return config
+
+
+def load_gui_class(module_name):
+    """按模块名导入对应的 GUI 类（保留显式导入，便于 PyInstaller 收集依赖）"""
+    gui_class = None
+    if module_name == "Rin_FSV3004":
+        from zhongzi.Rin_FSV3004 import RinGUI as gui_class
+    elif module_name == "Rin_4051":
+        from zhongzi.Rin_4051 import Rin_4051_GUI as gui_class
+    elif module_name == "线宽":
+        from zhongzi.LineWidth import LineWidthGUI as gui_class
+    elif module_name == "时域":
+        from zhongzi.TimeDomain import TimeDomainGUI as gui_class
+    elif module_name == "信噪比":
+        from zhongzi.SpectrumSNR import SpectrumSNRGUI as gui_class
+    elif module_name == "单频":
+        from zhongzi.SingleFrequency import SingleFrequencyGUI as gui_class
+    elif module_name == "CT-波长":
+        from qijian.CT_W import CT_W_GUI as gui_class
+    elif module_name == "CT-功率":
+        from qijian.CT_P import CT_P_GUI as gui_class
+    elif module_name == "CT-线宽":
+        from qijian.CT_L import CT_L_GUI as gui_class
+    return gui_class
+
 # 【修改点 1】：函数签名增加 cmd_queue (命令队列)
-def run_module_process(module_name, start_method, msg_queue, cmd_queue):
+def run_module_process(module_name, start_method, msg_queue, cmd_queue, station=None):
     """
     子进程执行函数
     cmd_queue: 用于接收主进程发来的指令（如 "START"）
+    station:   StationProfile，非默认工位时按工位配置改写仪器地址/上位机窗口/输出目录；
+               发往主进程的消息以 "模块@工位" 作为任务名
     """
+    task = task_key(module_name, station.name if station else None)
+    if station is not None:
+        os.environ[STATION_ENV] = station.name
     try:
-        gui_class = None
-        # 导入逻辑保持不变
-        if module_name == "Rin_FSV3004":
-            from zhongzi.Rin_FSV3004 import RinGUI as gui_class
-        elif module_name == "Rin_4051":
-            from zhongzi.Rin_4051 import Rin_4051_GUI as gui_class
-        elif module_name == "线宽":
-            from zhongzi.LineWidth import LineWidthGUI as gui_class
-        elif module_name == "时域":
-            from zhongzi.TimeDomain import TimeDomainGUI as gui_class
-        elif module_name == "信噪比":
-            from zhongzi.SpectrumSNR import SpectrumSNRGUI as gui_class
-        elif module_name == "单频":
-            from zhongzi.SingleFrequency import SingleFrequencyGUI as gui_class
-        elif module_name == "CT-波长":
-            from qijian.CT_W import CT_W_GUI as gui_class
-        elif module_name == "CT-功率":
-            from qijian.CT_P import CT_P_GUI as gui_class
-        elif module_name == "CT-线宽":
-            from qijian.CT_L import CT_L_GUI as gui_class
-        
+        gui_class = load_gui_class(module_name)
+
         if not gui_class:
             raise ValueError(f"未知模块: {module_name}")
 
-        msg_queue.put((module_name, "running", f"正在启动 {module_name} 窗口..."))
+        msg_queue.put((task, "running", f"正在启动 {task} 窗口..."))
+
+        # 模块日志行经 TelemetryWriter 批量转发到平台监控（类级替换，构造期间创建的组件同样生效）
+        telemetry = TelemetryWriter(msg_queue, task)
+        original_log = getattr(gui_class, "log", None)
+        if callable(original_log):
+            def forwarding_log(self, msg, *args, **kwargs):
+                telemetry.put("log", str(msg))
+                return original_log(self, msg, *args, **kwargs)
+            gui_class.log = forwarding_log
+
+        # 测量流程中 ProgressTracker 上报的结构化进度事件同样经 TelemetryWriter 发送
+        set_progress_sink(lambda event: telemetry.put("progress", encode_event(event)))
 
         app_instance = gui_class(None)
+        if station is not None:
+            apply_station_profile(app_instance, module_name, station)
+            msg_queue.put((task, "running", f"已应用 {station.name} 的仪器与输出目录配置"))
         
         try:
-            app_instance.root.title(f"{module_name} [就绪]")
+            app_instance.root.title(f"{task} [就绪]")
         except:
             pass
 
@@ -69,35 +129,61 @@ def run_module_process(module_name, start_method, msg_queue, cmd_queue):
             """触发测试的具体逻辑"""
             try:
                 if start_method and hasattr(app_instance, start_method):
-                    msg_queue.put((module_name, "running", f"{module_name} 测试开始..."))
+                    msg_queue.put((task, "running", f"{task} 测试开始..."))
                     try:
-                        app_instance.root.title(f"{module_name} [运行中...]")
+                        app_instance.root.title(f"{task} [运行中...]")
                     except: pass
                     
                     method = getattr(app_instance, start_method)
-                    method() # 执行测试
+                    t_start = time.time()
+                    # 平台发来的 START 无人值守：模块内的询问（如断点续测）取默认值，不弹窗阻塞调度
+                    app_instance.unattended = True
+                    try:
+                        method() # 执行测试
+                    finally:
+                        # 之后在模块窗口中手动开始的测试照常询问
+                        app_instance.unattended = False
+                    watch_test_thread(t_start)
                 else:
-                    msg_queue.put((module_name, "warning", f"未找到启动方法 {start_method}"))
+                    msg_queue.put((task, "warning", f"未找到启动方法 {start_method}"))
             except Exception as e:
-                msg_queue.put((module_name, "error", f"执行错误: {str(e)}"))
+                msg_queue.put((task, "error", f"执行错误: {str(e)}"))
+
+        def watch_test_thread(t_start):
+            """
+            启动方法大多只是开启后台线程后立即返回，这里跟踪模块的测量线程，
+            线程结束后向主进程发送 "finished"，供一键测试调度判断何时可以启动后续模块。
+            """
+            worker = None
+            for attr in ("worker", "worker_thread", "runner_thread"):
+                th = getattr(app_instance, attr, None)
+                if isinstance(th, threading.Thread) and th.is_alive():
+                    worker = th
+                    break
+            if worker is not None:
+                # 在辅助线程中 join，线程结束后再回到 Tk 线程复查，无需定时轮询
+                def wait_worker():
+                    worker.join()
+                    try:
+                        app_instance.root.after(0, lambda: watch_test_thread(t_start))
+                    except Exception:
+                        pass
+                threading.Thread(target=wait_worker, daemon=True).start()
+                return
+            try:
+                app_instance.root.title(f"{task} [就绪]")
+            except: pass
+            msg_queue.put((task, "finished", f"{task} 测试结束，用时 {time.time() - t_start:.1f}s"))
 
         # === 【修改点 2】：监听命令队列 ===
-        def check_command_queue():
-            try:
-                # 非阻塞获取命令
-                while not cmd_queue.empty():
-                    cmd = cmd_queue.get_nowait()
-                    if cmd == "START":
-                        # 收到主进程的开始命令
-                        trigger_test()
-            except Empty:
-                pass
-            finally:
-                # 每 200ms 检查一次
-                app_instance.root.after(200, check_command_queue)
-
-        # 启动监听循环
-        app_instance.root.after(200, check_command_queue)
+        # 后台线程阻塞读取命令，到达后唤醒 Tk 线程执行（替代每 200ms 轮询）
+        def handle_commands(cmds):
+            for cmd in cmds:
+                if cmd == "START":
+                    # 收到主进程的开始命令
+                    trigger_test()
+
+        command_reader = QueueReader(app_instance.root, cmd_queue, handle_commands)
 
         # 如果启动时就要求立即测试 (Auto Start)
         if start_method and start_method != "MANUAL_ONLY": 
@@ -106,32 +192,175 @@ def run_module_process(module_name, start_method, msg_queue, cmd_queue):
             # 此处保留延迟启动以兼容直接新开进程的情况
             pass 
             # 注意：我在主类中修改了逻辑，如果是"一键测试"启动，会在start后立即发消息
-            # 所以这里不需要自动运行，完全依赖 check_command_queue 即可
+            # 所以这里不需要自动运行，完全依赖命令队列即可
             # 或者保留 1秒后的自动运行也可以，看你喜好。
             # 为了防止重复，这里我们移除自动运行，全部由主进程发指令控制（更稳健）。
 
         app_instance.root.mainloop()
 
-        msg_queue.put((module_name, "completed", f"{module_name} 窗口已关闭"))
+        command_reader.stop()
+        telemetry.flush()
+        msg_queue.put((task, "completed", f"{task} 窗口已关闭"))
 
     except Exception as e:
-        msg_queue.put((module_name, "error", f"进程崩溃: {str(e)}"))
+        msg_queue.put((task, "error", f"进程崩溃: {str(e)}"))
         print(f"Process Error: {e}")
 
 
+# ==========================================
+# 预热进程池
+# ==========================================
+def warm_up_imports():
+    """
+    预先导入各测试模块共用的重量级依赖（pyvisa / numpy / matplotlib / PIL / pywinauto）。
+    不导入测试模块本身，各模块的 matplotlib.use() 仍在分配时按原顺序生效。
+    """
+    import pyvisa  # noqa: F401
+    import numpy  # noqa: F401
+    import matplotlib
+    import matplotlib.pyplot  # noqa: F401
+    import matplotlib.ticker  # noqa: F401
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # noqa: F401
+    from PIL import Image, ImageTk, ImageDraw, ImageFont  # noqa: F401
+    for optional in ("pandas", "pywinauto.application"):
+        try:
+            __import__(optional)
+        except Exception:
+            pass
+
+
+def pooled_worker_main(msg_queue, cmd_queue, ready_event):
+    """
+    预热池子进程入口：先完成重量级导入并置位 ready_event，然后阻塞等待主进程分配模块。
+    收到 ("LOAD", 模块名, 启动方法, 工位配置) 后转入 run_module_process，之后的 "START" 指令照常处理。
+    """
+    try:
+        warm_up_imports()
+    except Exception as e:
+        print(f"预热导入失败: {e}")
+    ready_event.set()
+
+    while True:
+        task = cmd_queue.get()
+        if task == "EXIT":
+            return
+        if isinstance(task, tuple) and len(task) == 4 and task[0] == "LOAD":
+            break
+
+    _, module_name, start_method, station = task
+    run_module_process(module_name, start_method, msg_queue, cmd_queue, station)
+
+
+class WorkerPool:
+    """
+    预热进程池：平台启动后在后台保持 size 个已完成导入的空闲子进程，
+    打开窗口/一键测试时直接把模块分配给空闲进程，被取走的名额由后台线程补齐。
+    """
+    def __init__(self, msg_queue, size=2):
+        self.msg_queue = msg_queue
+        self.size = max(0, int(size))
+        self._idle = []                 # [(Process, cmd_queue, ready_event)]
+        self._lock = threading.Lock()
+        self._refill_event = threading.Event()
+        self._closed = False
+
+        if self.size > 0:
+            self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self._thread.start()
+            self._refill_event.set()
+
+    def _spawn(self):
+        cmd_q = multiprocessing.Queue()
+        ready = multiprocessing.Event()
+        p = multiprocessing.Process(
+            target=pooled_worker_main,
+            args=(self.msg_queue, cmd_q, ready),
+            daemon=True
+        )
+        p.start()
+        return p, cmd_q, ready
+
+    def _refill_loop(self):
+        """后台补充线程：每次被唤醒后把空闲进程补到 size 个"""
+        while not self._closed:
+            self._refill_event.wait()
+            self._refill_event.clear()
+            while not self._closed:
+                with self._lock:
+                    self._idle = [w for w in self._idle if w[0].is_alive()]
+                    missing = self.size - len(self._idle)
+                if missing <= 0:
+                    break
+                try:
+                    worker = self._spawn()
+                except Exception as e:
+                    print(f"预热进程启动失败: {e}")
+                    break
+                with self._lock:
+                    if self._closed:
+                        worker[0].terminate()
+                        break
+                    self._idle.append(worker)
+
+    def acquire(self):
+        """
+        取出一个空闲进程，优先返回已完成预热的进程。
+        返回 (Process, cmd_queue)；池为空时返回 None，由调用方按原方式冷启动。
+        """
+        with self._lock:
+            alive = [w for w in self._idle if w[0].is_alive()]
+            ready = [w for w in alive if w[2].is_set()]
+            candidates = ready or alive
+            if not candidates:
+                self._idle = alive
+                worker = None
+            else:
+                worker = candidates[0]
+                alive.remove(worker)
+                self._idle = alive
+        if self.size > 0:
+            self._refill_event.set()
+        if worker is None:
+            return None
+        return worker[0], worker[1]
+
+    def idle_count(self):
+        with self._lock:
+            return sum(1 for w in self._idle if w[0].is_alive() and w[2].is_set())
+
+    def shutdown(self):
+        self._closed = True
+        self._refill_event.set()
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for p, cmd_q, _ in workers:
+            if p.is_alive():
+                p.terminate()
+
+
 # ==========================================
 # 配置定义 (保持不变)
 # ==========================================
 MODULE_MAP = {
-    "Rin_FSV3004": {"start_method": "start_rin", "group": "zhongzi"},
-    "Rin_4051": {"start_method": "start_test", "group": "zhongzi"},
-    "线宽": {"start_method": "start_measurement", "group": "zhongzi"},
-    "时域": {"start_method": "start_test", "group": "zhongzi"},
-    "信噪比": {"start_method": "start_test", "group": "zhongzi"},
-    "单频": {"start_method": "start", "group": "zhongzi"},
-    "CT-波长": {"start_method": "start_group1", "group": "qijian"},
-    "CT-功率": {"start_method": "start_group1", "group": "qijian"},
-    "CT-线宽": {"start_method": "start_group1", "group": "qijian"},
+    # instruments: 模块使用的仪器（默认 IP / VISA 资源 / 上位机窗口），一键测试据此判断哪些模块可以并行
+    "Rin_FSV3004": {"start_method": "start_rin", "group": "zhongzi",
+                    "instruments": ["192.168.7.10"]},
+    "Rin_4051": {"start_method": "start_test", "group": "zhongzi",
+                 "instruments": ["192.168.7.10"]},
+    "线宽": {"start_method": "start_measurement", "group": "zhongzi",
+           "instruments": ["192.168.7.10", "192.168.7.11"]},
+    "时域": {"start_method": "start_test", "group": "zhongzi",
+           "instruments": ["192.168.7.12", "192.168.7.13"]},
+    "信噪比": {"start_method": "start_test", "group": "zhongzi",
+            "instruments": ["192.168.7.14"]},
+    "单频": {"start_method": "start", "group": "zhongzi",
+           "instruments": ["192.168.7.15", "上位机::Preci-Seed"]},
+    "CT-波长": {"start_method": "start_group1", "group": "qijian",
+              "instruments": ["192.168.29.11", "上位机::Preci-Semi-Seed"]},
+    "CT-功率": {"start_method": "start_group1", "group": "qijian",
+              "instruments": ["USB::PM100D", "上位机::Preci-Semi-Seed"]},
+    "CT-线宽": {"start_method": "start_group1", "group": "qijian",
+              "instruments": ["192.168.29.11", "上位机::Preci-Semi-Seed"]},
 }
 
 MODULE_GROUPS = {
@@ -149,14 +378,37 @@ class IntegratedPlatform:
         except:
             pass
 
+        # 以下字典均以任务名为键：默认工位为模块名，其他工位为 "模块@工位"
         self.check_vars = {}     
         self.processes = {}       # {name: Process}
         self.cmd_queues = {}      # 【修改点 3】新增：存储每个进程的命令队列 {name: Queue}
         self.msg_queue = multiprocessing.Queue() 
 
+        # 仪器租约调度进程：同一台仪器同一时刻只允许一个模块使用，其余按顺序排队
+        # 必须先于预热池启动，子进程通过环境变量继承调度服务地址
+        self.broker_process = start_lease_broker(self.msg_queue)
+
+        # 预热进程池：提前完成重量级导入，缩短一键测试到首条 SCPI 指令的时间
+        self.config = load_platform_config()
+        self.worker_pool = WorkerPool(self.msg_queue, self.config.get("worker_pool_size", 2))
+
+        # 多工位：同一模块可在不同工位（不同仪器/上位机/输出目录）上同时运行
+        self.stations = load_station_profiles(self.config)
+        self.group_tasks = {}       # {分组名: [任务名]}，用于全选/清空
+
+        # 一键测试调度：历史用时用于最长任务优先排序，schedule 为当前一轮调度的运行状态
+        self.durations = DurationStore(os.path.join(get_app_dir(), "module_durations.json"))
+        self.schedule = None
+        self.module_progress = {}   # {name: 最近一次进度事件}
+        self.progress_rows = {}     # {name: (行 Frame, Progressbar, 说明 Label)}
+
         self.setup_ui()
+        if self.broker_process is None:
+            self.log("SYSTEM", "仪器调度服务启动失败，模块间将不做仪器互斥", "error")
         
-        self.root.after(100, self.process_queue_messages)
+        # 消息队列由后台线程阻塞读取，到达即唤醒 Tk 处理；状态栏/时间轴另以 1s 周期刷新
+        self.msg_reader = QueueReader(self.root, self.msg_queue, self.process_queue_messages)
+        self.root.after(1000, self.refresh_status)
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_ui(self):
@@ -207,16 +459,29 @@ class IntegratedPlatform:
             canvas.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
 
-            for name in module_list:
-                var = tk.BooleanVar()
-                self.check_vars[name] = var
-                # 使用command属性处理勾选状态变化
-                cb = ttk.Checkbutton(scroll_frame, text=name, variable=var, 
-                                     command=lambda n=name: self.on_test_item_checked(n),
-                                     style="TestCheckbutton.TCheckbutton")
-                # 绑定双击事件，实现双击打开窗口功能
-                cb.bind("<Double-1>", lambda e, n=name, w=cb: self.on_test_item_double_click(e, n, w))
-                cb.pack(anchor="w", padx=10, pady=5)
+            # 默认工位的模块，之后按配置依次列出其他工位可用的模块
+            sections = [(None, module_list)]
+            for station in self.stations.values():
+                station_modules = [n for n in module_list if station.has_module(n)]
+                if station_modules:
+                    sections.append((station.name, station_modules))
+            self.group_tasks[group_name] = []
+            for station_name, names in sections:
+                if station_name is not None:
+                    tk.Label(scroll_frame, text=f"—— {station_name} ——", bg="white", fg="#666",
+                             font=("微软雅黑", 9)).pack(anchor="w", padx=10, pady=(8, 0))
+                for module in names:
+                    name = task_key(module, station_name)
+                    self.group_tasks[group_name].append(name)
+                    var = tk.BooleanVar()
+                    self.check_vars[name] = var
+                    # 使用command属性处理勾选状态变化
+                    cb = ttk.Checkbutton(scroll_frame, text=module, variable=var, 
+                                         command=lambda n=name: self.on_test_item_checked(n),
+                                         style="TestCheckbutton.TCheckbutton")
+                    # 绑定双击事件，实现双击打开窗口功能
+                    cb.bind("<Double-1>", lambda e, n=name, w=cb: self.on_test_item_double_click(e, n, w))
+                    cb.pack(anchor="w", padx=10, pady=5)
 
         # 底部按钮区
         bottom_frame = tk.Frame(control_panel, bg="#ffffff")
@@ -265,6 +530,26 @@ class IntegratedPlatform:
                                  command=self.show_help, width=10)
         self.btn_help.pack(side=tk.LEFT, padx=1)
 
+        # 日志筛选：按模块、级别
+        self.log_module_var = tk.StringVar(value="全部模块")
+        self.log_module_combo = ttk.Combobox(button_frame, textvariable=self.log_module_var, state="readonly",
+                                             width=12, values=["全部模块"], postcommand=self.update_log_module_list)
+        self.log_module_combo.pack(side=tk.LEFT, padx=1, before=self.btn_clear_log)
+        self.log_module_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_log_filter())
+        self.log_level_var = tk.StringVar(value="全部级别")
+        self.log_level_combo = ttk.Combobox(button_frame, textvariable=self.log_level_var, state="readonly",
+                                            width=10, values=list(LEVEL_FILTERS))
+        self.log_level_combo.pack(side=tk.LEFT, padx=1, before=self.btn_clear_log)
+        self.log_level_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_log_filter())
+
+        # 一键测试时间轴：虚线框为调度计划，实心条为实际执行（蓝-运行中，绿-完成，红-失败）
+        self.timeline = tk.Canvas(right_panel, bg="white", height=0, highlightthickness=0)
+        self.timeline.pack(fill=tk.X, padx=10)
+
+        # 各模块进度：收到模块上报的进度事件后按需添加一行（模块名 / 进度条 / 阶段、吞吐、ETA）
+        self.progress_panel = tk.Frame(right_panel, bg="white")
+        self.progress_panel.pack(fill=tk.X, padx=10)
+
         log_frame = tk.Frame(right_panel)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
@@ -281,25 +566,28 @@ class IntegratedPlatform:
         self.log_tree.column("Message", minwidth=200, stretch=True, anchor="w") # 让消息列自动填充剩余空间
         
         vsb = ttk.Scrollbar(log_frame, orient="vertical", command=self.log_tree.yview)
-        self.log_tree.configure(yscrollcommand=vsb.set)
         
         self.log_tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
 
+        # 日志区只保留有限行：新日志每个 UI 周期批量插入，更早的日志滚动到顶部时从内存/会话日志文件分页读取
+        log_path = new_session_log_path(os.path.join(get_app_dir(), "logs"))
+        self.log_store = LogStore(log_path, memory_cap=self.config.get("log_memory_lines", 5000))
+        self.log_view = VirtualLogView(self.log_tree, vsb, self.log_store,
+                                       max_rows=self.config.get("log_view_rows", 1000))
+
     # ================= 逻辑控制 =================
 
     def log(self, module, msg, level="info"):
-        timestamp = time.strftime("%H:%M:%S")
-        tags = (level,)
-        self.log_tree.insert("", "end", values=(timestamp, module, msg), tags=tags)
-        self.log_tree.yview_moveto(1)
-        
-        if level == "error":
-            self.log_tree.tag_configure("error", foreground="red")
-        elif level == "completed":
-            self.log_tree.tag_configure("completed", foreground="#008000") # 深绿色
-        elif level == "running":
-            self.log_tree.tag_configure("running", foreground="#0000FF")
+        self.log_view.log(module, msg, level)
+
+    def update_log_module_list(self):
+        self.log_module_combo["values"] = ["全部模块"] + self.log_store.modules
+
+    def apply_log_filter(self):
+        module = self.log_module_var.get()
+        self.log_view.set_filter(modules=None if module == "全部模块" else [module],
+                                 levels=LEVEL_FILTERS.get(self.log_level_var.get()))
 
     def on_test_item_checked(self, module_name):
         """测试项勾选状态变化时的处理函数：仅记录状态，不自动打开窗口"""
@@ -311,6 +599,8 @@ class IntegratedPlatform:
                 # 发送终止信号或直接Terminate
                 self.processes[module_name].terminate()
                 self.log(module_name, "用户取消勾选，窗口关闭")
+                self.on_module_finished(module_name, ok=False)
+                self.remove_progress_row(module_name)
                 
                 # 清理资源
                 if module_name in self.processes: del self.processes[module_name]
@@ -332,10 +622,8 @@ class IntegratedPlatform:
         self.root.after(100, lambda w=widget: w.configure(state="normal"))
     
     def clear_logs(self):
-        """清空日志区域"""
-        # 删除所有日志条目
-        for item in self.log_tree.get_children():
-            self.log_tree.delete(item)
+        """清空日志区域（会话日志文件保留）"""
+        self.log_view.clear()
     
     def show_help(self):
         """显示操作说明文档"""
@@ -427,24 +715,44 @@ class IntegratedPlatform:
                                command=help_window.destroy, width=10)
         close_button.pack(pady=10)
 
+    def station_of(self, name):
+        """任务名 -> (模块名, StationProfile 或 None)"""
+        module, station = split_task_key(name)
+        return module, self.stations.get(station) if station else None
+
+    def instruments_of(self, name):
+        """任务使用的仪器：MODULE_MAP 中声明的默认仪器按工位配置映射"""
+        module, station = self.station_of(name)
+        instruments = MODULE_MAP[module].get("instruments", [])
+        if station is None:
+            return instruments
+        return [station.map_instrument(r) for r in instruments]
+
     def start_module_process(self, name, auto_start=False):
         """封装启动进程的逻辑"""
-        start_method = MODULE_MAP[name]["start_method"]
+        module, station = self.station_of(name)
+        start_method = MODULE_MAP[module]["start_method"]
         
-        # 创建专属命令队列
-        cmd_q = multiprocessing.Queue()
+        # 优先从预热池取空闲进程，取不到时再新建进程（冷启动）
+        worker = self.worker_pool.acquire()
+        if worker is not None:
+            p, cmd_q = worker
+            cmd_q.put(("LOAD", module, start_method, station))
+        else:
+            # 创建专属命令队列
+            cmd_q = multiprocessing.Queue()
+            
+            # 即使这里传入了 start_method，子进程现在也被修改为不会自动运行
+            # 而是等待 cmd_q 中的 "START" 指令
+            # 为了兼容性，我们在参数里还是传进去，但主要靠下面的 put("START") 控制
+            
+            p = multiprocessing.Process(
+                target=run_module_process,
+                args=(module, start_method, self.msg_queue, cmd_q, station),
+                daemon=True
+            )
+            p.start()
         self.cmd_queues[name] = cmd_q
-        
-        # 即使这里传入了 start_method，子进程现在也被修改为不会自动运行
-        # 而是等待 cmd_q 中的 "START" 指令
-        # 为了兼容性，我们在参数里还是传进去，但主要靠下面的 put("START") 控制
-        
-        p = multiprocessing.Process(
-            target=run_module_process,
-            args=(name, start_method, self.msg_queue, cmd_q),
-            daemon=True
-        )
-        p.start()
         self.processes[name] = p
         
         if auto_start:
@@ -477,82 +785,270 @@ class IntegratedPlatform:
         self.root.after(1000, lambda: self.btn_open.config(state="normal", text="打开"))
 
     def run_selected_tests(self):
-        """并发启动逻辑"""
+        """
+        调度启动逻辑：根据 MODULE_MAP 中声明的仪器建立冲突关系，
+        不共用仪器的模块并行启动，共用仪器的模块按最长任务优先依次启动。
+        """
         selected = [name for name, var in self.check_vars.items() if var.get()]
         if not selected:
             messagebox.showwarning("提示", "请先勾选测试项")
             return
+        if self.schedule is not None and not self.schedule.done():
+            messagebox.showwarning("提示", "上一轮一键测试仍在进行中")
+            return
 
-        self.btn_run.config(state="disabled", text="正在下发指令...")
+        # 不同工位使用各自的仪器，互不冲突，可并行；历史用时按模块统计
+        plan = plan_schedule(selected, self.instruments_of,
+                             lambda n: self.durations.estimate(split_task_key(n)[0]))
+        self.schedule = DagRun(plan)
+        for name in list(self.progress_rows):
+            self.remove_progress_row(name)
+
+        self.btn_run.config(state="disabled", text="调度执行中...")
         self.log("SYSTEM", f"准备执行任务: {', '.join(selected)}")
-        
-        for name in selected:
-            # 情况1: 窗口已经打开（进程存活）
-            if name in self.processes and self.processes[name].is_alive():
-                self.log(name, "窗口已存在，发送【开始测试】指令", "running")
-                # 【关键逻辑】：通过队列发送指令
-                if name in self.cmd_queues:
-                    self.cmd_queues[name].put("START")
-                else:
-                    self.log(name, "错误：找不到命令队列，尝试重启进程", "error")
-                    # 容错处理：重启
-                    self.processes[name].terminate()
-                    self.start_module_process(name, auto_start=True)
-            
-            # 情况2: 窗口未打开
+        for line in plan.describe():
+            self.log("SYSTEM", f"[调度计划] {line}")
+
+        self.dispatch_ready_modules()
+        self.draw_timeline()
+
+    def send_start(self, name):
+        """向模块下发开始测试指令，窗口未打开时先启动进程"""
+        # 情况1: 窗口已经打开（进程存活）
+        if name in self.processes and self.processes[name].is_alive():
+            self.log(name, "窗口已存在，发送【开始测试】指令", "running")
+            # 【关键逻辑】：通过队列发送指令
+            if name in self.cmd_queues:
+                self.cmd_queues[name].put("START")
             else:
+                self.log(name, "错误：找不到命令队列，尝试重启进程", "error")
+                # 容错处理：重启
+                self.processes[name].terminate()
                 self.start_module_process(name, auto_start=True)
-            
-            # 稍作延时，避免瞬间并发过高冲击
-            time.sleep(0.1)
-            
-        # 恢复按钮
-        self.root.after(1000, lambda: self.btn_run.config(state="normal", text="▶ 一键测试"))
+        
+        # 情况2: 窗口未打开
+        else:
+            self.start_module_process(name, auto_start=True)
 
-    def process_queue_messages(self):
-        """定时处理消息"""
+    def dispatch_ready_modules(self):
+        """启动所有前驱已结束的模块；全部结束后恢复按钮"""
+        run = self.schedule
+        if run is None:
+            return
+        for name in run.ready():
+            run.mark_started(name)
+            self.send_start(name)
+        if run.done():
+            self.log("SYSTEM", f"一键测试全部结束，实际用时 {run.elapsed() / 60:.1f} min"
+                               f"（计划 {run.plan.makespan / 60:.1f} min）", "completed")
+            self.btn_run.config(state="normal", text="▶ 一键测试")
+
+    def on_module_finished(self, name, ok=True):
+        """模块测试结束（或失败/窗口被关闭）：记录用时并启动后续模块"""
+        run = self.schedule
+        if run is None or not run.is_running(name):
+            return
+        duration = run.mark_finished(name, ok)
+        if ok and duration:
+            self.durations.record(split_task_key(name)[0], duration)
+        self.dispatch_ready_modules()
+        self.draw_timeline()
+
+    @staticmethod
+    def _timeline_step(span_s):
+        for step in (10, 30, 60, 120, 300, 600, 1200, 1800, 3600):
+            if span_s / step <= 8:
+                return step
+        return 7200
+
+    def draw_timeline(self):
+        """绘制一键测试的计划（虚线框）与实际执行（实心条）时间轴"""
+        c = self.timeline
+        c.delete("all")
+        run = self.schedule
+        if run is None:
+            c.config(height=0)
+            return
+
+        plan = run.plan
+        row_h, top, label_w = 22, 18, 110
+        c.config(height=top + row_h * len(plan.order) + 6)
+        width = max(c.winfo_width(), 400)
+        now = run.elapsed()
+        span = max(plan.makespan, now, max(run.finished.values(), default=0.0), 1.0) * 1.05
+        scale = (width - label_w - 10) / span
+
+        step = self._timeline_step(span)
+        t = 0
+        while t <= span:
+            x = label_w + t * scale
+            c.create_line(x, top - 2, x, top + row_h * len(plan.order), fill="#e0e0e0")
+            c.create_text(x, 2, text=f"{t / 60:.0f}m" if step >= 60 else f"{t:.0f}s",
+                          anchor="n", font=("微软雅黑", 8), fill="#666")
+            t += step
+
+        colors = {DagRun.RUNNING: "#1E96E6", DagRun.DONE: "#02BC08", DagRun.FAILED: "#E53935"}
+        for i, name in enumerate(plan.order):
+            y = top + i * row_h
+            c.create_text(4, y + row_h / 2, text=name, anchor="w", font=("微软雅黑", 9))
+            c.create_rectangle(label_w + plan.planned_start[name] * scale, y + 2,
+                               label_w + plan.planned_finish[name] * scale, y + row_h - 2,
+                               outline="#999", dash=(3, 2))
+            if name in run.started:
+                x0 = label_w + run.started[name] * scale
+                x1 = label_w + run.finished.get(name, now) * scale
+                c.create_rectangle(x0, y + 6, max(x1, x0 + 2), y + row_h - 6,
+                                   fill=colors[run.state[name]], outline="")
+
+        if not run.done():
+            x = label_w + now * scale
+            c.create_line(x, top - 2, x, top + row_h * len(plan.order), fill="red")
+
+    def process_queue_messages(self, items):
+        """处理一批消息（由 QueueReader 在 Tk 线程中调用）"""
+        for module, type_, msg in items:
+            if type_ == "batch":
+                # 模块批量转发的日志/遥测
+                for sub_type, sub_msg in unpack_batch(msg):
+                    if sub_type == "progress":
+                        self.on_progress(module, decode_event(sub_msg))
+                    else:
+                        self.log(module, sub_msg)
+            elif type_ == "running":
+                self.log(module, msg, "running")
+            elif type_ == "finished":
+                self.log(module, msg, "completed")
+                self.on_module_finished(module, ok=True)
+            elif type_ == "completed":
+                self.log(module, msg, "completed")
+                self.on_module_finished(module, ok=False)
+                self.remove_progress_row(module)
+                # 进程正常退出，清理引用
+                if module in self.processes and not self.processes[module].is_alive():
+                    del self.processes[module]
+                    if module in self.cmd_queues: del self.cmd_queues[module]
+                # 自动取消勾选（无论进程是否存在于self.processes中）
+                if module in self.check_vars:
+                    self.check_vars[module].set(False)
+                        
+            elif type_ == "error":
+                self.log(module, msg, "error")
+                self.on_module_finished(module, ok=False)
+            else:
+                self.log(module, msg)
+
+    @staticmethod
+    def _format_duration(seconds):
+        seconds = max(int(seconds), 0)
+        if seconds >= 3600:
+            return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+        return f"{seconds // 60}:{seconds % 60:02d}"
+
+    def _format_progress(self, event):
+        """进度事件 -> 一行说明文字：阶段、完成数、吞吐、剩余时间"""
+        unit = event.get("unit", "")
+        parts = [str(event.get("phase", ""))]
+        done, total = event.get("done", 0), event.get("total", 0)
+        parts.append(f"{done:g}/{total:g} {unit}")
+        if event.get("points_total") and event.get("points_total") != int(total):
+            parts.append(f"({event.get('points_done', 0)}/{event['points_total']} 点)")
+        rate = event.get("rate")
+        if rate:
+            parts.append(f"{rate:.2f} {unit}/s" if rate >= 1 else f"{rate * 60:.2f} {unit}/min")
+        eta = event.get("eta")
+        if eta:
+            parts.append(f"剩余 {self._format_duration(eta - time.time())}，预计 {time.strftime('%H:%M:%S', time.localtime(eta))}")
+        return "  ".join(p for p in parts if p)
+
+    def on_progress(self, module, event):
+        """模块上报的进度事件：更新该模块的进度条与整批 ETA"""
+        if not event:
+            return
+        self.module_progress[module] = event
+        row = self.progress_rows.get(module)
+        if row is None:
+            frame = tk.Frame(self.progress_panel, bg="white")
+            frame.pack(fill=tk.X, pady=1)
+            tk.Label(frame, text=module, width=12, anchor="w", bg="white",
+                     font=("微软雅黑", 9)).pack(side=tk.LEFT)
+            bar = ttk.Progressbar(frame, mode="determinate", maximum=100, length=220)
+            bar.pack(side=tk.LEFT, padx=4)
+            text = tk.Label(frame, anchor="w", bg="white", fg="#666", font=("微软雅黑", 9))
+            text.pack(side=tk.LEFT, fill=tk.X, expand=True)
+            row = self.progress_rows[module] = (frame, bar, text)
+        _, bar, text = row
+        bar.config(value=float(event.get("fraction", 0.0)) * 100)
+        text.config(text=self._format_progress(event))
+        self.update_batch_progress()
+
+    def remove_progress_row(self, module):
+        self.module_progress.pop(module, None)
+        row = self.progress_rows.pop(module, None)
+        if row is not None:
+            row[0].destroy()
+
+    def update_batch_progress(self):
+        """
+        总进度条与状态栏：一键测试进行中时，按模块上报的 ETA（无上报时用历史用时）
+        重新推演整批结束时间，进度 = 已用时 / 预测总用时。
+        返回是否已显示确定进度。
+        """
+        run = self.schedule
+        active_count = sum(1 for p in self.processes.values() if p.is_alive())
+        if run is not None and not run.done():
+            eta = {n: e.get("eta") for n, e in self.module_progress.items() if run.is_running(n)}
+            _, total = run.predict_finish(eta)
+            now = run.elapsed()
+            fraction = now / total if total > 0 else 0.0
+            finish_at = time.strftime("%H:%M:%S", time.localtime(run.t0 + total))
+            self.status_label.config(
+                text=f"当前活跃窗口: {active_count}  |  一键测试 {fraction * 100:.0f}%，"
+                     f"剩余约 {self._format_duration(total - now)}，预计 {finish_at} 完成", fg="blue")
+        elif self.module_progress:
+            # 单独打开窗口手动测试时，取各模块进度的平均值
+            fractions = [float(e.get("fraction", 0.0)) for e in self.module_progress.values()]
+            fraction = sum(fractions) / len(fractions)
+            self.status_label.config(text=f"当前活跃窗口: {active_count}", fg="blue")
+        else:
+            return False
+        if str(self.progress.cget("mode")) != "determinate":
+            self.progress.stop()
+            self.progress.config(mode="determinate")
+        self.progress.config(value=min(fraction, 1.0) * 100)
+        return True
+
+    def refresh_status(self):
+        """周期刷新活跃窗口数、进度条与调度时间轴"""
         try:
-            while not self.msg_queue.empty():
-                module, type_, msg = self.msg_queue.get_nowait()
-                
-                if type_ == "running":
-                    self.log(module, msg, "running")
-                elif type_ == "completed":
-                    self.log(module, msg, "completed")
-                    # 进程正常退出，清理引用
-                    if module in self.processes and not self.processes[module].is_alive():
-                        del self.processes[module]
-                        if module in self.cmd_queues: del self.cmd_queues[module]
-                    # 自动取消勾选（无论进程是否存在于self.processes中）
-                    if module in self.check_vars:
-                        self.check_vars[module].set(False)
-                            
-                elif type_ == "error":
-                    self.log(module, msg, "error")
-                else:
-                    self.log(module, msg)
-                    
-        except Empty:
-            pass
-        finally:
+            if self.schedule is not None and not self.schedule.done():
+                # 进程异常消失（未发出任何消息）时按失败处理，避免调度卡住
+                for name in list(self.schedule.plan.order):
+                    if self.schedule.is_running(name) and (
+                            name not in self.processes or not self.processes[name].is_alive()):
+                        self.log(name, "进程已退出，按失败处理", "error")
+                        self.on_module_finished(name, ok=False)
+                self.draw_timeline()
+
             active_count = sum(1 for p in self.processes.values() if p.is_alive())
-            if active_count > 0:
-                self.status_label.config(text=f"当前活跃窗口: {active_count}", fg="blue")
-                self.progress.config(mode='indeterminate')
-                self.progress.start(20)
-            else:
+            if active_count == 0:
                 self.status_label.config(text="所有任务已结束", fg="black")
                 self.progress.stop()
                 self.progress.config(mode='determinate', value=0)
-
-            self.root.after(200, self.process_queue_messages)
+            elif not self.update_batch_progress():
+                # 既无一键测试调度也无模块进度上报时，保持不确定进度显示
+                self.status_label.config(text=f"当前活跃窗口: {active_count}", fg="blue")
+                if str(self.progress.cget("mode")) != "indeterminate":
+                    self.progress.config(mode='indeterminate')
+                    self.progress.start(20)
+        finally:
+            self.root.after(1000, self.refresh_status)
 
     def select_all(self):
         try:
             current_tab = self.nb.select()
             current_tab_text = self.nb.tab(current_tab, "text").strip()
-            if current_tab_text in MODULE_GROUPS:
-                for name in MODULE_GROUPS[current_tab_text]:
+            if current_tab_text in self.group_tasks:
+                for name in self.group_tasks[current_tab_text]:
                     if name in self.check_vars:
                         # 设置为True，这将触发 on_test_item_checked 从而打开窗口
                         self.check_vars[name].set(True)
@@ -565,8 +1061,8 @@ class IntegratedPlatform:
         try:
             current_tab = self.nb.select()
             current_tab_text = self.nb.tab(current_tab, "text").strip()
-            if current_tab_text in MODULE_GROUPS:
-                for name in MODULE_GROUPS[current_tab_text]:
+            if current_tab_text in self.group_tasks:
+                for name in self.group_tasks[current_tab_text]:
                     if name in self.check_vars:
                         self.check_vars[name].set(False)
                         self.on_test_item_checked(name)
@@ -574,9 +1070,15 @@ class IntegratedPlatform:
             pass
 
     def on_close(self):
+        self.msg_reader.stop()
+        self.worker_pool.shutdown()
+        if self.broker_process is not None and self.broker_process.is_alive():
+            self.broker_process.terminate()
         for name, p in self.processes.items():
             if p.is_alive():
                 p.terminate()
+        self.log_view.flush()
+        self.log_store.close()
         self.root.destroy()
         sys.exit(0)
 
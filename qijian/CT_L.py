@@ -35,6 +35,38 @@ except Exception:
     timings = None
     PYW_AVAILABLE = False
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.scpi_state import ShadowSession
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.scpi_file import fetch_file
+    from common.linewidth_fit import fit_lineshapes, linewidth_from_3db_samples
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.scpi_state import ShadowSession
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.scpi_file import fetch_file
+    from common.linewidth_fit import fit_lineshapes, linewidth_from_3db_samples
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -148,21 +180,28 @@ class LaserController:
 class SpectrumAnalyzerController:
     """兼容 Rohde & Schwarz FSV3004 全固件版本的线宽控制类
     —— 按你提供的可运行脚本逻辑重写。
+    linewidth_method: "NDB"（仪器 20 dB 带宽 Marker）或 "拟合"（读回迹线拟合 Lorentz 线型，不用 Marker）
     """
+    LINEWIDTH_METHODS = ("NDB", "拟合")
 
-    def __init__(self, resource: str, log_func=print):
-        self.rm = pyvisa.ResourceManager()
+    def __init__(self, resource: str, log_func=print, linewidth_method: str = "NDB"):
+        self.rm = None
         self.inst = None
+        self.traces = None
+        self.axis = None
         self.resource = resource
         self.log = log_func
+        self.linewidth_method = linewidth_method
 
     def connect(self):
         try:
-            self.inst = self.rm.open_resource(self.resource)
-            self.inst.timeout = 10000
-            self.inst.write_termination = "\n"
-            self.inst.read_termination = "\n"
+            # 记录已发送的设置，各温度/电流点重复的扫描设置不再发送
+            self.inst = ShadowSession(open_session(self.resource, timeout=10000, write_termination="\n",
+                                                   read_termination="\n"))
             idn = self.inst.query("*IDN?").strip()
+            self.traces = TraceReader(self.inst, idn, log=self.log, profile=InstrumentProfile(idn, log=self.log))
+            # 起止频率缓存到经本会话改动频率设置为止
+            self.axis = TraceAxis(self._query_freq_range).watch(self.inst)
             self.log(f"[FSV] 已连接: {idn}")
             return idn
         except Exception as e:
@@ -175,6 +214,9 @@ class SpectrumAnalyzerController:
         except Exception:
             return ""
 
+    def _query_freq_range(self):
+        return float(self.inst.query("FREQ:STAR?")), float(self.inst.query("FREQ:STOP?"))
+
     def query_format(self):
         return "ASCII"
 
@@ -190,11 +232,17 @@ class SpectrumAnalyzerController:
         """
         if self.inst is None:
             raise RuntimeError("频谱仪未连接。")
+        if self.linewidth_method == "拟合":
+            # 一次扫描、一次迹线读取后拟合，不用 Marker，也不必等仪器算完
+            return self.measure_linewidth_from_trace()
+        if self.linewidth_method not in self.LINEWIDTH_METHODS:
+            self.log(f"[FSV][警告] 未知的线宽取法 {self.linewidth_method}，按 NDB 测量")
 
         try:
             self.log("[FSV] 开始测量线宽: 80MHz, span=1MHz, RBW=100Hz")
             #self.inst.clear()
             self.inst.timeout = 20000
+            changes = self.inst.changes
             self.inst.write("*CLS")
             self.inst.write("INIT:CONT OFF")
 
@@ -215,8 +263,9 @@ class SpectrumAnalyzerController:
             self.inst.write("CALC:MARK1:FUNC:NDBDown 20")
             self.inst.write("CALC:MARK1:FUNC:NDBDown:STAT ON")
 
-            # 等待计算完成
-            time.sleep(1.0)
+            # 等待计算完成；扫描与 Marker 设置都与上一点相同时，*OPC? 即可确认结果已更新
+            if self.inst.changes != changes:
+                time.sleep(1.0)
             self.inst.query("*OPC?")
 
             # 查询 3 dB 带宽结果
@@ -246,7 +295,13 @@ class SpectrumAnalyzerController:
 
 
     def measure_linewidth_from_trace(self):
-        """软件计算线宽 (3 dB 带宽)，当仪器不支持 FUNC:RES? 时使用"""
+        """
+        软件计算线宽（基于 Trace 数据），当仪器不支持 FUNC:RES? 或线宽取法为“拟合”时使用
+        - 对读回的迹线拟合 Lorentz 线型（common/linewidth_fit），线宽为拍频全宽的一半，与 NDB20 / (2√99) 一致，
+          同时给出 1σ 不确定度
+        - 拟合未收敛时回退到离 -3 dB 最近的采样点取拍频全宽，同样取一半作为线宽
+        返回值: 线宽 (kHz，两种取法均为拍频全宽的一半)
+        """
         if self.inst is None:
             raise RuntimeError("频谱仪未连接。")
         try:
@@ -273,27 +328,24 @@ class SpectrumAnalyzerController:
             self.log(f"[FSV] 扫描完成确认: {opc.strip()}")
 
             # 读取 Trace 数据
-            ydata = np.array(self.inst.query_ascii_values("TRAC:DATA? TRACE1"))
-            start = float(self.inst.query("FREQ:STAR?"))
-            stop = float(self.inst.query("FREQ:STOP?"))
-            xdata = np.linspace(start, stop, len(ydata))
-
-            # 寻找峰值与3dB宽度
-            peak_idx = np.argmax(ydata)
-            peak_power = ydata[peak_idx]
-            half_power = peak_power - 3.0
+            ydata = self.traces.read("TRAC:DATA? TRACE1")
+            xdata = self.axis.get(len(ydata))
 
-            left_idxs = np.where(ydata[:peak_idx] <= half_power)[0]
-            right_idxs = np.where(ydata[peak_idx:] <= half_power)[0]
-            if len(left_idxs) == 0 or len(right_idxs) == 0:
-                raise RuntimeError("未检测到有效的 20dB 交点，请检查信号曲线。")
+            fit = fit_lineshapes(xdata, ydata, model="lorentz")
+            if fit["ok"][0]:
+                lw_hz, err_hz = float(fit["linewidth_hz"][0]), float(fit["linewidth_err_hz"][0])
+                self.log(f"[FSV] 拟合线宽（拍频全宽的一半）: {lw_hz / 1e3:.3f} ± {err_hz / 1e3:.3f} kHz "
+                         f"(中心 {fit['center_hz'][0] / 1e6:.6f} MHz, 残差 {fit['rms_db'][0]:.2f} dB)")
+                return lw_hz / 1e3
+            self.log("[FSV][警告] 线型拟合未收敛，按 -3 dB 采样点计算拍频全宽")
 
-            f_left = xdata[left_idxs[-1]]
-            f_right = xdata[peak_idx + right_idxs[0]]
-            bw_hz = abs(f_right - f_left)
-            self.log(f"[FSV] 软件计算带宽: {bw_hz:.3f} Hz")
+            # 峰值两侧 -3 dB 采样点的拍频全宽，与拟合一致取一半作为线宽
+            lw_hz = linewidth_from_3db_samples(xdata, ydata)
+            if not np.isfinite(lw_hz):
+                raise RuntimeError("未检测到有效的 -3 dB 交点，请检查信号曲线。")
+            self.log(f"[FSV] 软件计算 -3 dB 拍频全宽: {2 * lw_hz:.3f} Hz，线宽取其一半: {lw_hz / 1e3:.3f} kHz")
 
-            return bw_hz / 1e3  # 转 kHz
+            return lw_hz / 1e3  # 转 kHz
 
         except Exception as e:
             self.log(f"[FSV][错误] 软件线宽计算失败: {e}")
@@ -306,12 +358,8 @@ class SpectrumAnalyzerController:
     # --------------------- #
     def fetch_trace(self):
         try:
-            data = self.inst.query_ascii_values(":TRAC:DATA? TRACE1")
-            n = len(data)
-            start = float(self.inst.query("FREQ:STAR?"))
-            stop = float(self.inst.query("FREQ:STOP?"))
-            freqs = np.linspace(start, stop, n)
-            return freqs, np.array(data)
+            data = self.traces.read(":TRAC:DATA? TRACE1")
+            return self.axis.get(len(data)), data
         except Exception as e:
             raise RuntimeError(f"读取Trace失败: {e}")
         
@@ -332,16 +380,13 @@ class SpectrumAnalyzerController:
                 # 部分设备不支持 INIT:IMM，忽略
                 pass
 
-            # 读取 trace 数据（ASCII）
-            ydata = self.inst.query_ascii_values("TRAC:DATA? TRACE1")
+            # 读取 trace 数据（二进制，不支持时退回 ASCII）
+            ydata = self.traces.read("TRAC:DATA? TRACE1")
             if ydata is None or len(ydata) == 0:
                 raise RuntimeError("读取TRAC:DATA? 返回空数据")
 
-            # 读取频率起止，生成 x 轴
-            start_hz = float(self.inst.query("FREQ:STAR?"))
-            stop_hz = float(self.inst.query("FREQ:STOP?"))
-            n = len(ydata)
-            freqs = np.linspace(start_hz, stop_hz, n)
+            # 按缓存的起止频率生成 x 轴
+            freqs = self.axis.get(len(ydata))
 
             # 写入 CSV
             ensure_dir(os.path.dirname(local_path) or ".")
@@ -390,33 +435,11 @@ class SpectrumAnalyzerController:
             except Exception as e:
                 raise RuntimeError(f"在仪器上生成截图失败: {e}")
 
-            # 读取二进制文件内容到本地
+            # 读取二进制文件内容到本地（定长块分段写入文件）
             try:
-                # 请求文件二进制数据
-                self.inst.write(f"MMEM:DATA? '{inst_file_name}'")
-                raw = self.inst.read_raw()  # returns bytes
+                fetch_file(self.inst, inst_file_name, local_path)
             except Exception as e:
                 raise RuntimeError(f"从仪器读取截图二进制数据失败: {e}")
-
-            # 解析 IEEE block header (#<n><len><data>) 或直接原始字节
-            data = raw
-            try:
-                if len(raw) >= 2 and raw[0:1] == b'#':
-                    # 第一字节 '#' ; 第二字节为 header length digits count
-                    header_len_digit = int(raw[1:2])
-                    header_len = 2 + header_len_digit
-                    total_len_digits = int(raw[2:2 + header_len_digit])
-                    start_idx = 2 + header_len_digit
-                    data = raw[start_idx:start_idx + total_len_digits]
-                # else: data remains raw
-            except Exception:
-                # 如果解析出错，仍尝试写入原始 raw（某些设备返回裸图片）
-                data = raw
-
-            # 写文件
-            ensure_dir(os.path.dirname(local_path) or ".")
-            with open(local_path, "wb") as f:
-                f.write(data)
             self.log(f"[FSV] 仪器截图已保存到 {local_path} (inst:{inst_file_name})")
             return local_path
 
@@ -614,8 +637,11 @@ class TestRunner:
         return fig_path
 
     def run_group1(self, start_temp: float, end_temp: float, step: float, save_path: str = "./data",
-                   delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None):
+                   delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None, resume: bool = False):
+        # resume=True 时从参数一致的断点继续（跳过已完成的温度点）
         self._stop = False
+        # 汇总/断点在后台线程写入，与下一点的设置、稳定等待同时进行
+        writer = BackgroundWriter("ct_l_group1")
         try:
             if os.path.isdir(save_path) or save_path.endswith(os.sep):
                 out_dir = save_path
@@ -735,7 +761,13 @@ class TestRunner:
             fine_center_saved = False        
 
             # ---------- 循环测量 ----------
-            for t in temps:
+            checkpoint, done = begin_sweep(1, save_path, summary_filename, temps, resume, self.log,
+                                           start=start_temp, end=end_temp, step=step, current_mA=current_mA,
+                                           fine_center=getattr(self, "fine_center_C", None),
+                                           fine_range=getattr(self, "fine_range_C", None))
+            pending = [(i, t) for i, t in enumerate(temps) if i not in done]
+            progress = ProgressTracker(len(pending), unit="温度点")
+            for i, t in progress.iterate(pending, lambda it: f"组1 {it[1]:.2f}°C"):
                 if self._stop:
                     self.log("[Runner] 收到停止信号，结束组1")
                     break
@@ -774,11 +806,7 @@ class TestRunner:
                     self.log(f"[Runner] 组1 SA 读取失败 (temp {t}°C): {e}")
                     continue
 
-                try:
-                    self._append_summary(save_path, current_for_temp, t, linewidth_khz, test_group=1, summary_filename=summary_filename)
-                    self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> 线宽 {linewidth_khz:.6f} kHz")
-                except Exception as e:
-                    self.log(f"[Runner] 组1 写入汇总失败: {e}")
+                writer.submit(self._write_group1_point, checkpoint, i, t, current_for_temp, linewidth_khz, save_path, summary_filename)
 
                 # ---- 新逻辑：在到达“精测中心温度点”时保存一次 Trace CSV + 仪器截图 ----
                 try:
@@ -786,61 +814,87 @@ class TestRunner:
                         if abs(t - fine_center) <= 1e-6:
                             self.log(f"[Runner] 到达精测中心温度点 {fine_center}°C，开始保存该点 Trace 与截图...")
 
-                            dat_filename = "fine_center.csv"
-                            screenshot_name = "fine_center.png"
-
-                            try:
-                                # 保存 Trace 数据到仪器内部
-                                instrument_path = f"C:\\PTS\\qijian\\CT_L\\{dat_filename}"
-                                self.sa.inst.write("MMEM:MDIR 'C:\\PTS\\qijian\\CT_L'")
-                                self.sa.inst.query("*OPC?")
-                                self.sa.inst.write(f":MMEM:STOR:TRAC 1,'{instrument_path}'")
-                                self.sa.inst.query("*OPC?")
-                                self.log(f"[FSV] 精测中心数据已存储在仪器内部: {instrument_path}")
-
-                                # 截图保存到仪器
-                                self.sa.inst.write("HCOPy:DEST 'MMEM'")
-                                self.sa.inst.write(f"MMEM:NAME 'C:\\PTS\\qijian\\CT_L\\{screenshot_name}'")
-                                self.sa.inst.write("HCOPy:IMM")
-                                self.sa.inst.query("*OPC?")
-                                self.log("[FSV] 仪器已截图并保存。")
-
-                                # 一次性复制整个目录到共享文件夹
-                                instrument_ip = "192.168.29.11"
-                                source_path = "C:\\PTS\\qijian\\CT_L"
-                                dest_path = r"\\192.168.29.9\PTS\qijian\CT_L"
-                                try:
-                                    rm = pyvisa.ResourceManager()
-                                    instr = rm.open_resource(f"TCPIP0::{instrument_ip}::inst0::INSTR")
-                                    instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
-                                    instr.close()
-                                    self.log(f"[FSV] 文件已从仪器复制到电脑共享文件夹：{dest_path}")
-                                except Exception as e_copy:
-                                    self.log(f"[FSV][警告] 文件复制失败: {e_copy}")
-
-                                # # 直接尝试显示截图（无需等待同步）
-                                # try:
-                                #     shared_img_path = os.path.join(dest_path, screenshot_name)
-                                #     if os.path.exists(shared_img_path):
-                                #         self.log(f"[Runner] 从共享路径加载截图: {shared_img_path}")
-                                #         self.log(f"[Runner] 精测中心截图显示完成。")
-                                #     else:
-                                #         self.log(f"[警告] 共享目录中未找到截图文件: {shared_img_path}")
-                                # except Exception as e_show:
-                                #     self.log(f"[Runner][警告] 显示截图失败: {e_show}")
-
-                            except Exception as e:
-                                self.log(f"[Runner][错误] 精测中心保存或截图失败: {e}")
+                            self._save_fine_center_trace()
 
                             fine_center_saved = True
 
                 except Exception as e:
                     self.log(f"[Runner][错误] 精测中心保存/截图逻辑异常: {e}")
+            writer.flush()
+            checkpoint.finish(self.log)
         except Exception as e:
             self.log(f"[Runner] 组1 出错: {e}")
+        finally:
+            writer.close()
 
         self.log("[Runner] 组1流程完成")
 
+    def _write_group1_point(self, checkpoint, i, t, current_for_temp, linewidth_khz, save_path, summary_filename):
+        """后台写入线程：写入组1汇总与断点"""
+        try:
+            self._append_summary(save_path, current_for_temp, t, linewidth_khz, test_group=1, summary_filename=summary_filename)
+            checkpoint.record(i, {"temperature_C": t, "current_mA": current_for_temp}, {"linewidth_kHz": linewidth_khz})
+            self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> 线宽 {linewidth_khz:.6f} kHz")
+        except Exception as e:
+            self.log(f"[Runner] 组1 写入汇总失败: {e}")
+
+    def _save_fine_center_trace(self):
+        """保存精测中心点 Trace 与截图，并读回到共享文件夹"""
+        dat_filename = "fine_center.csv"
+        screenshot_name = "fine_center.png"
+
+        try:
+            # 保存 Trace 数据到仪器内部
+            instrument_path = f"C:\\PTS\\qijian\\CT_L\\{dat_filename}"
+            self.sa.inst.write("MMEM:MDIR 'C:\\PTS\\qijian\\CT_L'")
+            self.sa.inst.query("*OPC?")
+            self.sa.inst.write(f":MMEM:STOR:TRAC 1,'{instrument_path}'")
+            self.sa.inst.query("*OPC?")
+            self.log(f"[FSV] 精测中心数据已存储在仪器内部: {instrument_path}")
+
+            # 截图保存到仪器
+            self.sa.inst.write("HCOPy:DEST 'MMEM'")
+            self.sa.inst.write(f"MMEM:NAME 'C:\\PTS\\qijian\\CT_L\\{screenshot_name}'")
+            self.sa.inst.write("HCOPy:IMM")
+            self.sa.inst.query("*OPC?")
+            self.log("[FSV] 仪器已截图并保存。")
+
+            # 经频谱仪会话把两个文件读回电脑文件夹；失败时退回一次性复制整个目录到共享文件夹
+            source_path = "C:\\PTS\\qijian\\CT_L"
+            dest_path = r"\\192.168.29.9\PTS\qijian\CT_L"
+            try:
+                for name in (dat_filename, screenshot_name):
+                    size = fetch_file(self.sa.inst, f"{source_path}\\{name}", os.path.join(dest_path, name))
+                    self.log(f"[FSV] {name} 已从仪器读回（{size} 字节）：{dest_path}")
+            except Exception as e_fetch:
+                self.log(f"[FSV][警告] 经 MMEM:DATA? 读回失败（{e_fetch}），改用共享文件夹复制")
+                try:
+                    self.sa.inst.clear()
+                except Exception:
+                    pass
+                try:
+                    # 与频谱仪测量共用会话池，地址相同时直接复用已有连接（地址取自界面参数，多工位时由工位配置改写）
+                    instr = open_session(self.sa.resource)
+                    instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
+                    instr.close()
+                    self.log(f"[FSV] 文件已从仪器复制到电脑共享文件夹：{dest_path}")
+                except Exception as e_copy:
+                    self.log(f"[FSV][警告] 文件复制失败: {e_copy}")
+
+            # # 直接尝试显示截图（无需等待同步）
+            # try:
+            #     shared_img_path = os.path.join(dest_path, screenshot_name)
+            #     if os.path.exists(shared_img_path):
+            #         self.log(f"[Runner] 从共享路径加载截图: {shared_img_path}")
+            #         self.log(f"[Runner] 精测中心截图显示完成。")
+            #     else:
+            #         self.log(f"[警告] 共享目录中未找到截图文件: {shared_img_path}")
+            # except Exception as e_show:
+            #     self.log(f"[Runner][警告] 显示截图失败: {e_show}")
+
+        except Exception as e:
+            self.log(f"[Runner][错误] 精测中心保存或截图失败: {e}")
+
     def plot_group1_linewidth_vs_temperature(self, out_dir, summary_filename=None):
         try:
             filename = summary_filename if summary_filename else "Test1_summary.csv"
@@ -887,7 +941,8 @@ class TestRunner:
             return None
 
     def run_group2(self, start_mA: float, step_mA: float, stop_mA: float, temp_C: float,
-                   save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None):
+                   save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None, resume: bool = False):
+        # resume=True 时从参数一致的断点继续（跳过已完成的电流点，作图包含断点前的数据）
         self._stop = False
         try:
             if os.path.isdir(save_path) or save_path.endswith(os.sep):
@@ -951,67 +1006,73 @@ class TestRunner:
 
         self.log(f"[Runner] 组2: 电流从 {start_curr}mA 每次 -{step_mag}mA 到 {stop_curr}mA，共 {len(currents)} 步，稳定时间 {delay_s} 秒")
 
-        peaks_curr = []
-        peaks_lw = []
+        checkpoint, done = begin_sweep(2, save_path, summary_filename, currents, resume, self.log,
+                                       start_mA=start_mA, step_mA=step_mA, stop_mA=stop_mA, temp_C=temp_C)
+        pending = [(i, c) for i, c in enumerate(currents) if i not in done]
 
         stability_threshold = 1.0
         max_wait_time = delay_s * 3
         check_interval = 0.3
 
-        for cur in currents:
-            if self._stop:
-                self.log("[Runner] 收到停止信号，提前结束组2")
-                break
-            try:
-                if self.laser:
-                    try:
-                        self.laser.set_current_mA(cur)
-                        self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
-                        wait_time = 0
-                        stable = False
-                        while wait_time < max_wait_time and not stable and not self._stop:
-                            current_current = self.laser.get_current_mA()
-                            if current_current is not None:
-                                curr_diff = abs(current_current - cur)
-                                self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
-                                if curr_diff <= stability_threshold:
-                                    stable = True
-                                    self.log(f"[Runner] 电流已稳定在 {cur}mA")
+        writer = BackgroundWriter("ct_l_group2")
+        try:
+            progress = ProgressTracker(len(pending), unit="电流点")
+            for i, cur in progress.iterate(pending, lambda it: f"组2 {it[1]:.2f}mA"):
+                if self._stop:
+                    self.log("[Runner] 收到停止信号，提前结束组2")
+                    break
+                try:
+                    if self.laser:
+                        try:
+                            self.laser.set_current_mA(cur)
+                            self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
+                            wait_time = 0
+                            stable = False
+                            while wait_time < max_wait_time and not stable and not self._stop:
+                                current_current = self.laser.get_current_mA()
+                                if current_current is not None:
+                                    curr_diff = abs(current_current - cur)
+                                    self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
+                                    if curr_diff <= stability_threshold:
+                                        stable = True
+                                        self.log(f"[Runner] 电流已稳定在 {cur}mA")
+                                    else:
+                                        time.sleep(check_interval)
+                                        wait_time += check_interval
                                 else:
                                     time.sleep(check_interval)
                                     wait_time += check_interval
-                            else:
-                                time.sleep(check_interval)
-                                wait_time += check_interval
-                        if not stable and not self._stop:
-                            self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
-                    except Exception as e:
-                        self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
+                            if not stable and not self._stop:
+                                self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
+                        except Exception as e:
+                            self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
+                            time.sleep(delay_s)
+                    else:
+                        self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA (仍会采集 SA)")
                         time.sleep(delay_s)
-                else:
-                    self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA (仍会采集 SA)")
-                    time.sleep(delay_s)
 
-                time.sleep(delay_s * 0.5)
+                    time.sleep(delay_s * 0.5)
 
-                try:
-                    linewidth_khz = self.sa.measure_linewidth_kHz()
-                except Exception as e:
-                    self.log(f"[Runner] 组2 SA 读取失败 (current {cur} mA): {e}")
-                    continue
+                    try:
+                        linewidth_khz = self.sa.measure_linewidth_kHz()
+                    except Exception as e:
+                        self.log(f"[Runner] 组2 SA 读取失败 (current {cur} mA): {e}")
+                        continue
+
+                    writer.submit(self._write_group2_point, checkpoint, i, cur, temp_C, linewidth_khz, save_path, summary_filename)
 
-                try:
-                    self._append_summary(save_path, cur, temp_C, linewidth_khz, test_group=2, summary_filename=summary_filename)
                 except Exception as e:
-                    self.log(f"[Runner] 组2 写入汇总失败: {e}")
+                    self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
+                    continue
+        finally:
+            # 等待后台写入完成后再读取断点作图
+            writer.close()
 
-                peaks_curr.append(cur)
-                peaks_lw.append(linewidth_khz)
-                self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> 线宽 {linewidth_khz:.6f} kHz")
-
-            except Exception as e:
-                self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
-                continue
+        # 含断点前已完成的点，按电流序列顺序作图
+        points = checkpoint.points()
+        peaks_curr = [pt["current_mA"] for pt in points]
+        peaks_lw = [pt["linewidth_kHz"] for pt in points]
+        checkpoint.finish(self.log)
 
         if peaks_curr:
             self._plot_xy_curve(
@@ -1025,6 +1086,16 @@ class TestRunner:
         else:
             self.log("[Runner] 组2 没有采集到线宽数据，跳过作图")
 
+    def _write_group2_point(self, checkpoint, i, cur, temp_C, linewidth_khz, save_path, summary_filename):
+        """后台写入线程：写入组2汇总与断点"""
+        try:
+            self._append_summary(save_path, cur, temp_C, linewidth_khz, test_group=2, summary_filename=summary_filename)
+        except Exception as e:
+            self.log(f"[Runner] 组2 写入汇总失败: {e}")
+
+        checkpoint.record(i, {"current_mA": cur}, {"current_mA": cur, "linewidth_kHz": linewidth_khz})
+        self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> 线宽 {linewidth_khz:.6f} kHz")
+
 # -------------------------
 # GUI (mostly unchanged, uses SA instead of OSA)
 # -------------------------
@@ -1047,6 +1118,11 @@ class CT_L_GUI:
         else:
             self.root = parent # <--- 修改点：直接使用父 Frame
 
+        # 上位机窗口标题（正则），多工位运行时由平台按工位配置改写；
+        # 与测量仪器一起作为租约键（"上位机::窗口标题"，与 MODULE_MAP 一致），同一上位机上的 CT 模块不会同时运行
+        self.laser_window_title = r"Preci-Semi-Seed"
+        # 由平台一键测试 / 调度启动时为 True：断点续测不弹窗询问，直接从断点继续
+        self.unattended = False
         self.params = {
             "osa_ip": "192.168.29.11",
             "current_mA": 360.0,
@@ -1067,6 +1143,7 @@ class CT_L_GUI:
             "group2_summary_filename": "Test2_summary",
             "fine_center_C": 25.0,
             "fine_range_C": 1.0,
+            "linewidth_method": "NDB",
         }
         self.param_labels = {
             "laser_exe_path": "软件路径",
@@ -1083,7 +1160,8 @@ class CT_L_GUI:
             "group1_delay_s": "组1 温度稳定时间 (秒)",
             "group2_delay_s": "组2 电流稳定时间 (秒)",
             "group1_summary_filename": "组1文件名",
-            "group2_summary_filename": "组2文件名"
+            "group2_summary_filename": "组2文件名",
+            "linewidth_method": "线宽取法 (NDB / 拟合)"
         }
 
         self.create_widgets()
@@ -1122,6 +1200,10 @@ class CT_L_GUI:
             connect_frame, "laser_exe_path", "软件路径:", 
             self.params.get("laser_exe_path", ""), row=2
         )
+        self._add_param_entry(
+            connect_frame, "linewidth_method", "线宽取法:",
+            self.params.get("linewidth_method", "NDB"), row=3
+        )
 
         connect_buttons = tk.Frame(connect_frame)
         connect_buttons.grid(row=6, column=0, columnspan=3, pady=4)
@@ -1188,6 +1270,7 @@ class CT_L_GUI:
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5, 0))
         self.log_box = tk.Text(log_frame)
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "CT_L")
 
     def _add_param_entry(self, parent, key, label, default="", row=0, browse=None):
         tk.Label(parent, text=label, anchor="e", width=14).grid(row=row, column=0, sticky="e", padx=4, pady=4)
@@ -1202,14 +1285,8 @@ class CT_L_GUI:
         return ent
 
     def log(self, msg: str):
-        t = time.strftime("[%H:%M:%S]")
-        try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
-            self.log_box.see(tk.END)
-            self.root.update_idletasks()
-        except Exception:
-            pass
-        print(f"{t} {msg}")
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
 
     def open_laser_software(self):
         p = self.get_params()
@@ -1220,7 +1297,7 @@ class CT_L_GUI:
                 return
             def _open_laser_thread():
                 try:
-                    self.laser = LaserController(exe_path=exe_path, window_title=r"Preci-Semi-Seed", log_func=self.log)
+                    self.laser = LaserController(exe_path=exe_path, window_title=self.laser_window_title, log_func=self.log)
                     self.laser.connect()
                     self.log("[上位机] 已成功打开或连接到上位机软件")
                 except Exception as e:
@@ -1258,14 +1335,14 @@ class CT_L_GUI:
             try:
                 if k in self.entries:
                     val = self.entries[k].get()
-                    if k in ("laser_exe_path", "osa_ip", "save_path", "group1_summary_filename", "group2_summary_filename"):
+                    if k in ("laser_exe_path", "osa_ip", "save_path", "group1_summary_filename", "group2_summary_filename", "linewidth_method"):
                         p[k] = val
                     else:
                         p[k] = float(val)
                 else:
                     p[k] = self.params[k]
             except Exception:
-                p[k] = float(self.params[k]) if k not in ("laser_exe_path", "osa_ip", "save_path", "group1_summary_filename", "group2_summary_filename") else self.params[k]
+                p[k] = float(self.params[k]) if k not in ("laser_exe_path", "osa_ip", "save_path", "group1_summary_filename", "group2_summary_filename", "linewidth_method") else self.params[k]
         return p
 
     def show_image_popup(self, img_path, title="测试完成 - 截图预览"):
@@ -1334,7 +1411,7 @@ class CT_L_GUI:
         self.group1_running = True
         try:
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1351,14 +1428,26 @@ class CT_L_GUI:
                 visa_address = f"TCPIP0::{p['osa_ip']}::INSTR"
                 self.sa = SpectrumAnalyzerController(resource=visa_address, log_func=self.log)
                 self.sa.connect()
+            self.sa.linewidth_method = p["linewidth_method"].strip()
 
             if not self.runner:
                 self.runner = TestRunner(self.laser, self.sa, log_func=self.log)
             else:
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group1_summary_filename"], 1,
+                start=p["t_start"], end=p["t_stop"], step=p["t_step"], current_mA=p["current_mA"],
+                fine_center=p.get("fine_center_C", None), fine_range=p.get("fine_range_C", None)),
+                "第一组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.sa.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-线宽", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     self.runner.fine_center_C = p.get("fine_center_C", None)
                     self.runner.fine_range_C = p.get("fine_range_C", None)
                     self.runner.run_group1(
@@ -1368,7 +1457,8 @@ class CT_L_GUI:
                         save_path=p["save_path"],
                         delay_s=p["group1_delay_s"],
                         summary_filename=p["group1_summary_filename"],
-                        current_mA=p["current_mA"]
+                        current_mA=p["current_mA"],
+                        resume=resume
                     )
                     img_path = self.runner.plot_group1_linewidth_vs_temperature(
                         p["save_path"], 
@@ -1379,6 +1469,7 @@ class CT_L_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group1_start.config(state=tk.NORMAL)
                         self.btn_group1_stop.config(state=tk.DISABLED)
@@ -1446,7 +1537,7 @@ class CT_L_GUI:
         self.group2_running = True
         try:
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1463,14 +1554,26 @@ class CT_L_GUI:
                 visa_address = f"TCPIP0::{p['osa_ip']}::INSTR"
                 self.sa = SpectrumAnalyzerController(resource=visa_address, log_func=self.log)
                 self.sa.connect()
+            self.sa.linewidth_method = p["linewidth_method"].strip()
 
             if not self.runner:
                 self.runner = TestRunner(self.laser, self.sa, log_func=self.log)
             else:
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group2_summary_filename"], 2,
+                start_mA=p["group2_start_mA"], step_mA=p["group2_step_mA"],
+                stop_mA=p["group2_stop_mA"], temp_C=p["group2_temp_C"]),
+                "第二组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.sa.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-线宽", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     img_path = None
                     self.runner.run_group2(
                         start_mA=p["group2_start_mA"],
@@ -1479,7 +1582,8 @@ class CT_L_GUI:
                         temp_C=p["group2_temp_C"],
                         save_path=p["save_path"],
                         delay_s=p["group2_delay_s"],
-                        summary_filename=p["group2_summary_filename"]
+                        summary_filename=p["group2_summary_filename"],
+                        resume=resume
                     )
                     import glob
                     pattern = os.path.join(p["save_path"], "电流线宽关系图_*.png")
@@ -1495,6 +1599,7 @@ class CT_L_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group2_start.config(state=tk.NORMAL)
                         self.btn_group2_stop.config(state=tk.DISABLED)
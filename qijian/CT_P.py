@@ -48,6 +48,28 @@ except Exception:
     timings = None
     PYW_AVAILABLE = False
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -166,15 +188,18 @@ class PowerMeterController:
     def __init__(self, resource: str, log_func=print, timeout_ms: int = 5000):
         self.rm = pyvisa.ResourceManager()
         self.inst = None
+        self.profile = None
         self.resource = resource
         self.log = log_func
         self.timeout_ms = timeout_ms
 
     def connect(self):
         try:
-            self.inst = self.rm.open_resource(self.resource)
+            self.inst = open_resource(self.rm, self.resource)
             self.inst.timeout = int(self.timeout_ms)
             # 一些设备需要设置为 ASCII/readable format，但 PM100D 通常直接支持 READ?
+            # 按型号记录可用的读数命令，之后直接使用
+            self.profile = InstrumentProfile(self.query_idn(), log=self.log)
             self.log(f"[PM] 已连接: {self.resource}")
         except Exception as e:
             self.log(f"[PM] 连接失败: {e}")
@@ -203,7 +228,7 @@ class PowerMeterController:
         """
         尝试按优先级读取功率值（单位 W）。
         返回浮点功率（W），若失败抛出 RuntimeError。
-        常见命令尝试顺序：
+        常见命令尝试顺序（档案中已记录可用的命令排在最前）：
             READ?
             MEAS:POW?
             POW:READ?
@@ -212,14 +237,10 @@ class PowerMeterController:
         if self.inst is None:
             raise RuntimeError("功率计未连接")
         candidates = ["READ?", "MEAS:POW?", "POW:READ?", "READ:POWER?", "READ:POW?"]
-        last_errs = []
-        for cmd in candidates:
-            val = self._try_query_float(cmd)
-            if val is not None:
-                self.log(f"[PM] 命令 '{cmd}' 返回: {val} (W)")
-                return float(val)
-            else:
-                last_errs.append(cmd)
+        val = self.profile.first_working("read_power", candidates, self._try_query_float)
+        if val is not None:
+            self.log(f"[PM] 命令 '{self.profile.get('read_power')}' 返回: {val} (W)")
+            return float(val)
         # 退回到 raw read（某些驱动下）
         try:
             raw = self.inst.read()
@@ -234,7 +255,7 @@ class PowerMeterController:
         except Exception as e:
             self.log(f"[PM] raw read 失败: {e}")
 
-        raise RuntimeError(f"无法从功率计读取功率，尝试的命令: {last_errs}")
+        raise RuntimeError(f"无法从功率计读取功率，尝试的命令: {candidates}")
 
 # -------------------------
 # TestRunner (改为读取功率并保存/绘图)
@@ -362,11 +383,14 @@ class TestRunner:
 
         return fig_path
 
-    def run_group1(self, start_temp: float, end_temp: float, step: float, save_path: str = "./data", delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None):
+    def run_group1(self, start_temp: float, end_temp: float, step: float, save_path: str = "./data", delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None, resume: bool = False):
         """
         组1：在固定电流下，扫描温度；每步读取功率并汇总。
+        resume=True 时从参数一致的断点继续（跳过已完成的温度点）。
         """
         self._stop = False
+        # 汇总/断点在后台线程写入，与下一点的设置、稳定等待同时进行
+        writer = BackgroundWriter("ct_p_group1")
         try:
             # 新增：检查并删除已存在的同名文件
             if summary_filename:
@@ -415,7 +439,11 @@ class TestRunner:
             max_wait_time = delay_s * 5  # 最大等待时间
             check_interval = 0.5  # 检查间隔
             
-            for t in temps:
+            checkpoint, done = begin_sweep(1, save_path, summary_filename, temps, resume, self.log,
+                                           start=start_temp, end=end_temp, step=step, current_mA=current_mA)
+            pending = [(i, t) for i, t in enumerate(temps) if i not in done]
+            progress = ProgressTracker(len(pending), unit="温度点")
+            for i, t in progress.iterate(pending, lambda it: f"组1 {it[1]:.2f}°C"):
                 if self._stop:
                     self.log("[Runner] 收到停止信号，结束组1")
                     break
@@ -465,16 +493,25 @@ class TestRunner:
                 except Exception as e:
                     self.log(f"[Runner] 组1 读取功率失败 (temp {t}°C): {e}")
                     continue
-                try:
-                    self._append_summary(save_path, current_for_temp, t, power, test_group=1, summary_filename=summary_filename)
-                    power_mw = float(power) * 1000
-                    self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> Power {power_mw:.2f} mW")
-                except Exception as e:
-                    self.log(f"[Runner] 组1 写入汇总失败: {e}")
+                writer.submit(self._write_group1_point, checkpoint, i, t, current_for_temp, power, save_path, summary_filename)
+            writer.flush()
+            checkpoint.finish(self.log)
         except Exception as e:
             self.log(f"[Runner] 组1 出错: {e}\n{traceback.format_exc()}")
+        finally:
+            writer.close()
         self.log("[Runner] 组1 流程完成")
 
+    def _write_group1_point(self, checkpoint, i, t, current_for_temp, power, save_path, summary_filename):
+        """后台写入线程：写入组1汇总与断点"""
+        try:
+            self._append_summary(save_path, current_for_temp, t, power, test_group=1, summary_filename=summary_filename)
+            checkpoint.record(i, {"temperature_C": t, "current_mA": current_for_temp}, {"power_W": float(power)})
+            power_mw = float(power) * 1000
+            self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> Power {power_mw:.2f} mW")
+        except Exception as e:
+            self.log(f"[Runner] 组1 写入汇总失败: {e}")
+
     def plot_group1_power_vs_temperature(self, out_dir, summary_filename=None):
         try:
             filename = summary_filename if summary_filename else "Test1_summary.csv"
@@ -521,9 +558,10 @@ class TestRunner:
             return None
 
     def run_group2(self, start_mA: float, step_mA: float, stop_mA: float, temp_C: float,
-                   save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None):
+                   save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None, resume: bool = False):
         """
         组2：固定温度，扫描电流（从 start_mA 递减到 stop_mA），每步读取功率。
+        resume=True 时从参数一致的断点继续（跳过已完成的电流点，作图包含断点前的数据）。
         """
         self._stop = False
         try:
@@ -596,70 +634,75 @@ class TestRunner:
                 c -= step_mag
             self.log(f"[Runner] 组2: 电流 {start_curr} -> {stop_curr} step {step_mag} 共 {len(currents)} 步, 等待 {delay_s}s")
 
-            vals_curr = []
-            vals_power = []
+            checkpoint, done = begin_sweep(2, save_path, summary_filename, currents, resume, self.log,
+                                           start_mA=start_mA, step_mA=step_mA, stop_mA=stop_mA, temp_C=temp_C)
+            pending = [(i, c) for i, c in enumerate(currents) if i not in done]
             stability_threshold = 1.0  # 电流稳定阈值，mA
             max_wait_time = delay_s * 3  # 最大等待时间
             check_interval = 0.3  # 检查间隔
             
-            for cur in currents:
-                if self._stop:
-                    self.log("[Runner] 收到停止信号，提前结束组2")
-                    break
-                try:
-                    if self.laser:
-                        try:
-                            self.laser.set_current_mA(cur)
-                            # 新增：等待电流稳定
-                            self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
-                            wait_time = 0
-                            stable = False
-                            
-                            # 循环检查电流是否稳定
-                            while wait_time < max_wait_time and not stable and not self._stop:
-                                current_current = self.laser.get_current_mA()
-                                if current_current is not None:
-                                    curr_diff = abs(current_current - cur)
-                                    self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
-                                    
-                                    if curr_diff <= stability_threshold:
-                                        stable = True
-                                        self.log(f"[Runner] 电流已稳定在 {cur}mA")
+            writer = BackgroundWriter("ct_p_group2")
+            try:
+                progress = ProgressTracker(len(pending), unit="电流点")
+                for i, cur in progress.iterate(pending, lambda it: f"组2 {it[1]:.2f}mA"):
+                    if self._stop:
+                        self.log("[Runner] 收到停止信号，提前结束组2")
+                        break
+                    try:
+                        if self.laser:
+                            try:
+                                self.laser.set_current_mA(cur)
+                                # 新增：等待电流稳定
+                                self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
+                                wait_time = 0
+                                stable = False
+
+                                # 循环检查电流是否稳定
+                                while wait_time < max_wait_time and not stable and not self._stop:
+                                    current_current = self.laser.get_current_mA()
+                                    if current_current is not None:
+                                        curr_diff = abs(current_current - cur)
+                                        self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
+
+                                        if curr_diff <= stability_threshold:
+                                            stable = True
+                                            self.log(f"[Runner] 电流已稳定在 {cur}mA")
+                                        else:
+                                            time.sleep(check_interval)
+                                            wait_time += check_interval
                                     else:
+                                        # 无法读取电流时，退化为简单延时
                                         time.sleep(check_interval)
                                         wait_time += check_interval
-                                else:
-                                    # 无法读取电流时，退化为简单延时
-                                    time.sleep(check_interval)
-                                    wait_time += check_interval
-                            
-                            if not stable and not self._stop:
-                                self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
-                        except Exception as e:
-                            self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
-                            time.sleep(delay_s)  # 设置失败时也等待一段时间
-                    else:
-                        self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA")
-                        time.sleep(delay_s)  # 未配置时使用简单延时
 
-                    time.sleep(delay_s * 0.5)  # 额外小延时，确保系统稳定
+                                if not stable and not self._stop:
+                                    self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
+                            except Exception as e:
+                                self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
+                                time.sleep(delay_s)  # 设置失败时也等待一段时间
+                        else:
+                            self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA")
+                            time.sleep(delay_s)  # 未配置时使用简单延时
 
-                    if not self.pm:
-                        raise RuntimeError("未配置功率计 (PowerMeterController)")
-                    power = self.pm.read_power()
+                        time.sleep(delay_s * 0.5)  # 额外小延时，确保系统稳定
 
-                    try:
-                        self._append_summary(save_path, cur, temp_C, power, test_group=2, summary_filename=summary_filename)
+                        if not self.pm:
+                            raise RuntimeError("未配置功率计 (PowerMeterController)")
+                        power = self.pm.read_power()
+
+                        writer.submit(self._write_group2_point, checkpoint, i, cur, temp_C, power, save_path, summary_filename)
                     except Exception as e:
-                        self.log(f"[Runner] 组2 写入汇总失败: {e}")
+                        self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
+                        continue
+            finally:
+                # 等待后台写入完成后再读取断点作图
+                writer.close()
 
-                    vals_curr.append(cur)
-                    vals_power.append(power)
-                    power_mw = float(power) * 1000
-                    self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> Power {power_mw:.2f} mW")
-                except Exception as e:
-                    self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
-                    continue
+            # 含断点前已完成的点，按电流序列顺序作图
+            points = checkpoint.points()
+            vals_curr = [pt["current_mA"] for pt in points]
+            vals_power = [pt["power_W"] for pt in points]
+            checkpoint.finish(self.log)
 
             if vals_curr:
                 vals_power_mw = [float(p) * 1000 for p in vals_power]
@@ -675,6 +718,17 @@ class TestRunner:
         except Exception as e:
             self.log(f"[Runner] 组2 出错: {e}\n{traceback.format_exc()}")
 
+    def _write_group2_point(self, checkpoint, i, cur, temp_C, power, save_path, summary_filename):
+        """后台写入线程：写入组2汇总与断点"""
+        try:
+            self._append_summary(save_path, cur, temp_C, power, test_group=2, summary_filename=summary_filename)
+        except Exception as e:
+            self.log(f"[Runner] 组2 写入汇总失败: {e}")
+
+        checkpoint.record(i, {"current_mA": cur}, {"current_mA": cur, "power_W": float(power)})
+        power_mw = float(power) * 1000
+        self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> Power {power_mw:.2f} mW")
+
 # -------------------------
 # GUI (大部分继承原结构，但把 OSA -> PowerMeter 转换)
 # -------------------------
@@ -698,6 +752,11 @@ class CT_P_GUI:
             self.root = parent # <--- 修改点：直接使用父 Frame
 
         # defaults
+        # 上位机窗口标题（正则），多工位运行时由平台按工位配置改写；
+        # 与测量仪器一起作为租约键（"上位机::窗口标题"，与 MODULE_MAP 一致），同一上位机上的 CT 模块不会同时运行
+        self.laser_window_title = r"Preci-Semi-Seed"
+        # 由平台一键测试 / 调度启动时为 True：断点续测不弹窗询问，直接从断点继续
+        self.unattended = False
         self.params = {
             "usb_resource": "",            # 用于存放 VISA 资源字符串
             "current_mA": 360.0,
@@ -839,6 +898,7 @@ class CT_P_GUI:
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5, 0))
         self.log_box = tk.Text(log_frame)
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "CT_P")
 
     def _add_param_entry(self, parent, key, label, default="", row=0, browse=None):
         tk.Label(parent, text=label, anchor="e", width=14).grid(row=row, column=0, sticky="e", padx=4, pady=4)
@@ -853,14 +913,8 @@ class CT_P_GUI:
         return ent
 
     def log(self, msg: str):
-        t = time.strftime("[%H:%M:%S]")
-        try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
-            self.log_box.see(tk.END)
-            self.root.update_idletasks()
-        except Exception:
-            pass
-        print(f"{t} {msg}")
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
 
     def open_laser_software(self):
         p = self.get_params()
@@ -872,7 +926,7 @@ class CT_P_GUI:
 
             def _open_laser_thread():
                 try:
-                    self.laser = LaserController(exe_path=exe_path, window_title=r"Preci-Semi-Seed", log_func=self.log)
+                    self.laser = LaserController(exe_path=exe_path, window_title=self.laser_window_title, log_func=self.log)
                     self.laser.connect()
                     self.log("[上位机] 已成功打开或连接到上位机软件")
                 except Exception as e:
@@ -981,7 +1035,7 @@ class CT_P_GUI:
 
         try:
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1006,8 +1060,18 @@ class CT_P_GUI:
             else:
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group1_summary_filename"], 1,
+                start=p["t_start"], end=p["t_stop"], step=p["t_step"], current_mA=p["current_mA"]),
+                "第一组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.pm.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-功率", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     self.runner.run_group1(
                         start_temp=p["t_start"],
                         end_temp=p["t_stop"],
@@ -1015,7 +1079,8 @@ class CT_P_GUI:
                         save_path=p["save_path"],
                         delay_s=p["group1_delay_s"],
                         summary_filename=p["group1_summary_filename"],
-                        current_mA=p["current_mA"]  # 传递电流参数
+                        current_mA=p["current_mA"],  # 传递电流参数
+                        resume=resume
                     )
                     img_path = self.runner.plot_group1_power_vs_temperature(
                         p["save_path"],
@@ -1026,6 +1091,7 @@ class CT_P_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group1_start.config(state=tk.NORMAL)
                         self.btn_group1_stop.config(state=tk.DISABLED)
@@ -1061,7 +1127,7 @@ class CT_P_GUI:
 
         try:
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1086,8 +1152,19 @@ class CT_P_GUI:
             else:
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group2_summary_filename"], 2,
+                start_mA=p["group2_start_mA"], step_mA=p["group2_step_mA"],
+                stop_mA=p["group2_stop_mA"], temp_C=p["group2_temp_C"]),
+                "第二组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.pm.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-功率", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     self.runner.run_group2(
                         start_mA=p["group2_start_mA"],
                         step_mA=p["group2_step_mA"],
@@ -1095,7 +1172,8 @@ class CT_P_GUI:
                         temp_C=p["group2_temp_C"],
                         save_path=p["save_path"],
                         delay_s=p["group2_delay_s"],
-                        summary_filename=p["group2_summary_filename"]
+                        summary_filename=p["group2_summary_filename"],
+                        resume=resume
                     )
                     # 找到最新保存的第二组图像并弹窗（同原逻辑）
                     import glob
@@ -1111,6 +1189,7 @@ class CT_P_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group2_start.config(state=tk.NORMAL)
                         self.btn_group2_stop.config(state=tk.DISABLED)
@@ -45,6 +45,32 @@ except Exception:
     timings = None
     PYW_AVAILABLE = False
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.stations import LASER_INSTRUMENT_PREFIX
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.sweep_checkpoint import SweepCheckpoint, ask_resume, begin_sweep
+    from common.background_writer import BackgroundWriter
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -158,6 +184,10 @@ class OSAController:
     def __init__(self, resource: str, log_func=print):
         self.rm = pyvisa.ResourceManager()
         self.inst = None
+        self.traces = None
+        self.profile = None
+        # 波长起止值缓存：本驱动不改 OSA 波长设置，每次开始测试时调用 invalidate_axis() 重新读取
+        self.axis = TraceAxis(self._query_wavelength_range)
         self.resource = resource
         self.log = log_func
         self.timeout = 20000
@@ -165,8 +195,12 @@ class OSAController:
 
     def connect(self):
         try:
-            self.inst = self.rm.open_resource(self.resource)
+            self.inst = open_resource(self.rm, self.resource)
             self.inst.timeout = max(self.timeout, 30000)
+            idn = self.query_idn()
+            # 按型号记录可用的命令写法与迹线格式，之后的会话不再逐个尝试
+            self.profile = InstrumentProfile(idn, log=self.log)
+            self.traces = TraceReader(self.inst, idn, log=self.log, profile=self.profile)
             self.log(f"[OSA] 已连接: {self.resource}")
         except Exception as e:
             self.log(f"[OSA] 连接失败: {e}")
@@ -188,7 +222,7 @@ class OSAController:
 
     def query_x_axis(self, trace: Optional[str] = None) -> Optional[np.ndarray]:
         """
-        尝试从仪器读取 X 轴（波长轴）。不同仪器命令不同，按顺序尝试几种常见命令。
+        尝试从仪器读取 X 轴（波长轴）。不同仪器命令不同，按顺序尝试几种常见命令（档案中已记录可用的排在最前）。
         返回 np.ndarray 或 None。
         """
         if self.inst is None:
@@ -196,96 +230,94 @@ class OSAController:
             return None
         t = trace or self.query_active_trace()
         cmds = [
-            f":TRACe:DATA:X? {t}",
-            f":TRACe:X? {t}",
+            ":TRACe:DATA:X? {t}",
+            ":TRACe:X? {t}",
             ":TRACe:DATA:X?",
             ":TRACe:X?",
             ":SENSE:WAVELENGTH:DATA?",
             ":SENSE:WAV:DATA?",
         ]
         last_errs = []
-        for cmd in cmds:
+
+        def probe(template):
+            cmd = template.format(t=t)
+            self.log(f"[OSA] 尝试读取 X 轴 (cmd='{cmd}')")
+            # 优先使用 query_ascii_values（返回数值列表）
             try:
-                self.log(f"[OSA] 尝试读取 X 轴 (cmd='{cmd}')")
-                # 优先使用 query_ascii_values（返回数值列表）
-                try:
-                    vals = self.inst.query_ascii_values(cmd)
-                    if vals and len(vals) > 0:
-                        arr = np.array(vals, dtype=float)
-                        self.log(f"[OSA] X 轴 ASCII 返回, pts={len(arr)} (cmd='{cmd}')")
-                        return arr
-                except Exception as e_ascii:
-                    last_errs.append((cmd, str(e_ascii)))
-                    # 继续尝试以纯文本方式读取
-                # 退回到文本读取并解析
-                try:
-                    resp = self.inst.query(cmd).strip()
-                    if resp:
-                        tokens = [tok.strip() for tok in resp.replace('\r', '').replace('\n', ',').split(',') if tok.strip() != ""]
-                        vals = [float(tok) for tok in tokens]
-                        arr = np.array(vals, dtype=float)
-                        self.log(f"[OSA] X 轴 raw ascii 返回, pts={len(arr)} (cmd='{cmd}')")
-                        return arr
-                except Exception as e_txt:
-                    last_errs.append((cmd, str(e_txt)))
-                    continue
-            except Exception as e:
-                last_errs.append((cmd, str(e)))
-                continue
-        self.log(f"[OSA] 未能从仪器读取 X 轴，尝试的命令返回错误: {last_errs}")
-        return None
+                vals = self.inst.query_ascii_values(cmd)
+                if vals and len(vals) > 0:
+                    arr = np.array(vals, dtype=float)
+                    self.log(f"[OSA] X 轴 ASCII 返回, pts={len(arr)} (cmd='{cmd}')")
+                    return arr
+            except Exception as e_ascii:
+                last_errs.append((cmd, str(e_ascii)))
+                # 继续尝试以纯文本方式读取
+            # 退回到文本读取并解析
+            try:
+                resp = self.inst.query(cmd).strip()
+                if resp:
+                    tokens = [tok.strip() for tok in resp.replace('\r', '').replace('\n', ',').split(',') if tok.strip() != ""]
+                    vals = [float(tok) for tok in tokens]
+                    arr = np.array(vals, dtype=float)
+                    self.log(f"[OSA] X 轴 raw ascii 返回, pts={len(arr)} (cmd='{cmd}')")
+                    return arr
+            except Exception as e_txt:
+                last_errs.append((cmd, str(e_txt)))
+            return None
+
+        arr = self.profile.first_working("x_axis", cmds, probe)
+        if arr is None:
+            self.log(f"[OSA] 未能从仪器读取 X 轴，尝试的命令返回错误: {last_errs}")
+        return arr
 
     def query_active_trace(self) -> str:
+        # 不支持 :TRACe:ACTive? 的型号记入档案，之后直接用 TRA
         try:
-            t = self.inst.query(":TRACe:ACTive?").strip()
+            t = self.profile.first_working("active_trace", [":TRACe:ACTive?"],
+                                           lambda cmd: self.inst.query(cmd).strip() or None,
+                                           remember_unsupported=True)
             return t if t else "TRA"
         except Exception as e:
             self.log(f"[OSA] :TRACe:ACTive? 失败: {e}")
             return "TRA"
 
     def query_trace_sample_count(self, trace: Optional[str] = None) -> Optional[int]:
-        try:
-            t = trace or self.query_active_trace()
-            resp = self.inst.query(f":TRACe:DATA:SNUMber? {t}").strip()
-            return int(float(resp))
-        except Exception:
-            try:
-                resp = self.inst.query(":TRACe:DATA:SNUMber?").strip()
-                return int(float(resp))
-            except Exception as e:
-                self.log(f"[OSA] :TRACe:DATA:SNUMber? 失败: {e}")
-                return None
+        t = trace or self.query_active_trace()
+        n = self._try_query_float([":TRACe:DATA:SNUMber? {t}", ":TRACe:DATA:SNUMber?"], "sample_count", t=t)
+        if n is None:
+            self.log("[OSA] :TRACe:DATA:SNUMber? 失败")
+            return None
+        return int(n)
 
-    def _try_query_float(self, cmd_list: List[str]) -> Optional[float]:
-        for cmd in cmd_list:
-            try:
-                resp = self.inst.query(cmd).strip()
-                if resp == "":
-                    continue
-                token = resp.split()[0].replace(",", "")
-                return float(token)
-            except Exception:
-                continue
-        return None
+    def _try_query_float(self, cmd_list: List[str], name: str, **fields) -> Optional[float]:
+        """按 cmd_list 查询第一个可解析的数值；name 为档案中的功能名，fields 用于填充命令中的 {t} 等占位"""
+        def probe(template):
+            resp = self.inst.query(template.format(**fields)).strip()
+            if resp == "":
+                return None
+            token = resp.split()[0].replace(",", "")
+            return float(token)
+        return self.profile.first_working(name, cmd_list, probe)
 
-    def _build_wavelength_axis(self, npoints: int) -> np.ndarray:
+    def _query_wavelength_range(self) -> Optional[Tuple[float, float]]:
+        """查询波长起止值（nm）；起止与中心/跨度都查不到时返回 None"""
         start_cmds = [":SENSE:WAVELENGTH:START?", ":SENSE:WAV:STAR?", ":SENSE:WAV:START?"]
         stop_cmds = [":SENSE:WAVELENGTH:STOP?", ":SENSE:WAV:STOP?"]
-        start = self._try_query_float(start_cmds)
-        stop = self._try_query_float(stop_cmds)
-        if start is not None and stop is not None and npoints > 1:
+        start = self._try_query_float(start_cmds, "wavelength_start")
+        stop = self._try_query_float(stop_cmds, "wavelength_stop")
+        if start is not None and stop is not None:
             if abs(start) < 1.0 and abs(stop) < 1.0:
                 start_nm = start * 1e9
                 stop_nm = stop * 1e9
             else:
                 start_nm = start
                 stop_nm = stop
-            return np.linspace(start_nm, stop_nm, npoints)
+            return start_nm, stop_nm
         center_cmds = [":SENSE:WAVELENGTH:CENTER?", ":SENSE:WAV:CENTER?"]
         span_cmds = [":SENSE:WAVELENGTH:SPAN?", ":SENSE:WAV:SPAN?"]
-        center = self._try_query_float(center_cmds)
-        span = self._try_query_float(span_cmds)
-        if center is not None and span is not None and npoints > 1:
+        center = self._try_query_float(center_cmds, "wavelength_center")
+        span = self._try_query_float(span_cmds, "wavelength_span")
+        if center is not None and span is not None:
             if abs(center) < 1.0:
                 center_nm = center * 1e9
                 span_nm = span * 1e9
@@ -293,7 +325,18 @@ class OSAController:
                 center_nm = center
                 span_nm = span
             half = span_nm / 2.0
-            return np.linspace(center_nm - half, center_nm + half, npoints)
+            return center_nm - half, center_nm + half
+        return None
+
+    def invalidate_axis(self):
+        """OSA 面板上可能改过波长设置时调用，下次读迹线重新查询波长起止值"""
+        self.axis.invalidate()
+
+    def _build_wavelength_axis(self, npoints: int) -> np.ndarray:
+        if npoints > 1:
+            w = self.axis.get(npoints)
+            if w is not None:
+                return w
         try:
             pts = self.query_trace_sample_count()
             if pts and pts == npoints:
@@ -306,49 +349,25 @@ class OSAController:
         if self.inst is None:
             raise RuntimeError("OSA 未连接")
         trace = self.query_active_trace() or "TRA"
-        fmt = self.query_format() or ""
         cmd = f":TRACe:DATA:Y? {trace}"
         last_errs = []
 
-        def try_ascii():
-            try:
-                vals = self.inst.query_ascii_values(cmd)
-                if vals and len(vals) > 0:
-                    self.log(f"[OSA] ASCII 读取成功 {len(vals)} 点 (cmd='{cmd}')")
-                    return np.array(vals, dtype=float)
-            except Exception as e:
-                last_errs.append(("ascii", str(e)))
-                self.log(f"[OSA] ASCII 读取失败: {e}")
-            return None
-
-        def try_binary(is_big_endian: bool, datatype: str = 'f'):
-            try:
-                orig_to = self.inst.timeout
-                self.inst.timeout = max(orig_to, self.timeout * 2)
-                vals = self.inst.query_binary_values(cmd, datatype=datatype, is_big_endian=is_big_endian)
-                self.inst.timeout = orig_to
-                if vals and len(vals) > 0:
-                    self.log(f"[OSA] Binary 读取成功 {len(vals)} 点 (big_endian={is_big_endian})")
-                    return np.array(vals, dtype=float)
-            except Exception as e:
-                last_errs.append((f"bin_be={is_big_endian}", str(e)))
-                self.log(f"[OSA] Binary 读取失败 (big_endian={is_big_endian}): {e}")
-            return None
-
-        if "ASCII" in fmt or fmt == "":
-            arr = try_ascii()
-            if arr is not None:
+        # 型号支持时用 32 位浮点二进制读取，失败自动改用 ASCII（common/scpi_trace.py）
+        orig_to = self.inst.timeout
+        try:
+            self.inst.timeout = max(orig_to, self.timeout * 2)
+            arr = self.traces.read(cmd)
+            if len(arr) > 0:
+                self.log(f"[OSA] {'Binary' if self.traces.binary else 'ASCII'} 读取成功 {len(arr)} 点 (cmd='{cmd}')")
                 w = self._build_wavelength_axis(len(arr))
                 if np.max(np.abs(w)) < 1.0:
                     w = w * 1e9
                 return w, arr
-
-        arr = try_binary(False, 'f') or try_binary(True, 'f')
-        if arr is not None:
-            w = self._build_wavelength_axis(len(arr))
-            if np.max(np.abs(w)) < 1.0:
-                w = w * 1e9
-            return w, arr
+        except Exception as e:
+            last_errs.append(("trace", str(e)))
+            self.log(f"[OSA] 迹线读取失败: {e}")
+        finally:
+            self.inst.timeout = orig_to
 
         try:
             raw = self.inst.read_raw()
@@ -583,12 +602,15 @@ class TestRunner:
         self.log("[Runner] 注意：run_manual_two_groups方法已不连续执行两组测试")
         self.log("[Runner] 请使用单独的开始按钮控制每组测试")
 
-    def run_group1(self, start_temp: float, end_temp: float, step: float, save_path: str = "./data", delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None):
+    def run_group1(self, start_temp: float, end_temp: float, step: float, save_path: str = "./data", delay_s: float = 0.8, summary_filename: str = None, current_mA: float = None, resume: bool = False):
         """
         Group1: temperature sweep at current = GUI current_mA
+        resume=True 时从参数一致的断点继续（跳过已完成的温度点）
         """
         self._stop = False
 
+        # 汇总/断点在后台线程写入，与下一点的设置、稳定等待同时进行
+        writer = BackgroundWriter("ct_w_group1")
         try:
             # 确定保存目录
             if os.path.isdir(save_path) or save_path.endswith(os.sep):
@@ -641,7 +663,11 @@ class TestRunner:
             max_wait_time = delay_s * 5  # 最大等待时间
             check_interval = 0.5  # 检查间隔
             
-            for t in temps:
+            checkpoint, done = begin_sweep(1, save_path, summary_filename, temps, resume, self.log,
+                                           start=start_temp, end=end_temp, step=step, current_mA=current_mA)
+            pending = [(i, t) for i, t in enumerate(temps) if i not in done]
+            progress = ProgressTracker(len(pending), unit="温度点")
+            for i, t in progress.iterate(pending, lambda it: f"组1 {it[1]:.2f}°C"):
                 if self._stop:
                     self.log("[Runner] 收到停止信号，结束组1")
                     break
@@ -689,16 +715,25 @@ class TestRunner:
                     self.log(f"[Runner] 组1 OSA 读取失败 (temp {t}°C): {e}")
                     continue
                 main_wl = self._compute_peak_wavelength(wavelengths, powers)
-                try:
-                    self._append_summary(save_path, current_for_temp, t, main_wl, "", test_group=1, summary_filename=summary_filename)
-                    self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> 主波长 {main_wl:.4f} nm")
-                except Exception as e:
-                    self.log(f"[Runner] 组1 写入汇总失败: {e}")
+                writer.submit(self._write_group1_point, checkpoint, i, t, current_for_temp, main_wl, save_path, summary_filename)
+            writer.flush()
+            checkpoint.finish(self.log)
         except Exception as e:
             self.log(f"[Runner] 组1 出错: {e}")
+        finally:
+            writer.close()
 
         self.log("[Runner] 组1流程完成")
 
+    def _write_group1_point(self, checkpoint, i, t, current_for_temp, main_wl, save_path, summary_filename):
+        """后台写入线程：写入组1汇总与断点"""
+        try:
+            self._append_summary(save_path, current_for_temp, t, main_wl, "", test_group=1, summary_filename=summary_filename)
+            checkpoint.record(i, {"temperature_C": t, "current_mA": current_for_temp}, {"wavelength_nm": main_wl})
+            self.log(f"[Runner] 组1 {current_for_temp}mA, {t:.2f}°C -> 主波长 {main_wl:.4f} nm")
+        except Exception as e:
+            self.log(f"[Runner] 组1 写入汇总失败: {e}")
+
     def plot_group1_wavelength_vs_temperature(self, out_dir, summary_filename=None):
         try:
             filename = summary_filename if summary_filename else "Test1_summary.csv"
@@ -753,10 +788,11 @@ class TestRunner:
 
     # 新增：单独运行第二组测试
     def run_group2(self, start_mA: float, step_mA: float, stop_mA: float, temp_C: float,
-               save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None):
+               save_path: str = "./data", delay_s: float = 0.6, summary_filename: str = None, resume: bool = False):
         """
         Group2: current sweep from start_mA down by step_mA to stop_mA,
                 with temperature fixed at temp_C
+        resume=True 时从参数一致的断点继续（跳过已完成的电流点，作图包含断点前的数据）
         """
         self._stop = False
         
@@ -840,76 +876,81 @@ class TestRunner:
 
         self.log(f"[Runner] 组2: 电流从 {start_curr}mA 每次 -{step_mag}mA 到 {stop_curr}mA，共 {len(currents)} 步，稳定时间 {delay_s} 秒")
 
-        peaks_curr = []
-        peaks_wl = []
+        checkpoint, done = begin_sweep(2, save_path, summary_filename, currents, resume, self.log,
+                                       start_mA=start_mA, step_mA=step_mA, stop_mA=stop_mA, temp_C=temp_C)
+        pending = [(i, c) for i, c in enumerate(currents) if i not in done]
 
         # 添加电流稳定检测相关参数
         stability_threshold = 1.0  # 电流稳定阈值，mA
         max_wait_time = delay_s * 3  # 最大等待时间
         check_interval = 0.3  # 检查间隔
 
-        for cur in currents:
-            if self._stop:
-                self.log("[Runner] 收到停止信号，提前结束组2")
-                break
-            try:
-                if self.laser:
-                    try:
-                        self.laser.set_current_mA(cur)
-                        # 新增：等待电流稳定
-                        self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
-                        wait_time = 0
-                        stable = False
-                         
-                        # 循环检查电流是否稳定
-                        while wait_time < max_wait_time and not stable and not self._stop:
-                            current_current = self.laser.get_current_mA()
-                            if current_current is not None:
-                                curr_diff = abs(current_current - cur)
-                                self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
-                                 
-                                if curr_diff <= stability_threshold:
-                                    stable = True
-                                    self.log(f"[Runner] 电流已稳定在 {cur}mA")
+        writer = BackgroundWriter("ct_w_group2")
+        try:
+            progress = ProgressTracker(len(pending), unit="电流点")
+            for i, cur in progress.iterate(pending, lambda it: f"组2 {it[1]:.2f}mA"):
+                if self._stop:
+                    self.log("[Runner] 收到停止信号，提前结束组2")
+                    break
+                try:
+                    if self.laser:
+                        try:
+                            self.laser.set_current_mA(cur)
+                            # 新增：等待电流稳定
+                            self.log(f"[Runner] 设置电流为 {cur}mA，等待稳定...")
+                            wait_time = 0
+                            stable = False
+
+                            # 循环检查电流是否稳定
+                            while wait_time < max_wait_time and not stable and not self._stop:
+                                current_current = self.laser.get_current_mA()
+                                if current_current is not None:
+                                    curr_diff = abs(current_current - cur)
+                                    self.log(f"[Runner] 当前电流: {current_current:.2f}mA, 目标: {cur:.2f}mA, 差值: {curr_diff:.2f}mA")
+
+                                    if curr_diff <= stability_threshold:
+                                        stable = True
+                                        self.log(f"[Runner] 电流已稳定在 {cur}mA")
+                                    else:
+                                        time.sleep(check_interval)
+                                        wait_time += check_interval
                                 else:
+                                    # 无法读取电流时，退化为简单延时
                                     time.sleep(check_interval)
                                     wait_time += check_interval
-                            else:
-                                # 无法读取电流时，退化为简单延时
-                                time.sleep(check_interval)
-                                wait_time += check_interval
-                         
-                        if not stable and not self._stop:
-                            self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
+
+                            if not stable and not self._stop:
+                                self.log(f"[Runner] 电流在 {max_wait_time}s 内未完全稳定，继续测量")
+                        except Exception as e:
+                            self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
+                            time.sleep(delay_s)  # 设置失败时也等待一段时间
+                    else:
+                        self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA (仍会采集 OSA)")
+                        time.sleep(delay_s)  # 未配置时使用简单延时
+
+                    time.sleep(delay_s * 0.5)  # 额外小延时，确保系统稳定
+
+                    try:
+                        wavelengths, powers = self.osa.sweep_and_fetch()
                     except Exception as e:
-                        self.log(f"[Runner] 设置电流 {cur} mA 失败: {e}")
-                        time.sleep(delay_s)  # 设置失败时也等待一段时间
-                else:
-                    self.log(f"[Runner] 未配置 LaserController，跳过设置电流 {cur} mA (仍会采集 OSA)")
-                    time.sleep(delay_s)  # 未配置时使用简单延时
+                        self.log(f"[Runner] 组2 OSA 读取失败 (current {cur} mA): {e}")
+                        continue
 
-                time.sleep(delay_s * 0.5)  # 额外小延时，确保系统稳定
+                    main_wl = self._compute_peak_wavelength(wavelengths, powers)
+                    writer.submit(self._write_group2_point, checkpoint, i, cur, temp_C, main_wl, save_path, summary_filename)
 
-                try:
-                    wavelengths, powers = self.osa.sweep_and_fetch()
                 except Exception as e:
-                    self.log(f"[Runner] 组2 OSA 读取失败 (current {cur} mA): {e}")
+                    self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
                     continue
+        finally:
+            # 等待后台写入完成后再读取断点作图
+            writer.close()
 
-                main_wl = self._compute_peak_wavelength(wavelengths, powers)
-                try:
-                    self._append_summary(save_path, cur, temp_C, main_wl, "",
-                                        test_group=2, summary_filename=summary_filename)
-                except Exception as e:
-                    self.log(f"[Runner] 组2 写入汇总失败: {e}")
-
-                peaks_curr.append(cur)
-                peaks_wl.append(main_wl)
-                self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> 主波长 {main_wl:.4f} nm")
-
-            except Exception as e:
-                self.log(f"[Runner] 组2 电流 {cur} mA 处理失败: {e}")
-                continue
+        # 含断点前已完成的点，按电流序列顺序作图
+        points = checkpoint.points()
+        peaks_curr = [pt["current_mA"] for pt in points]
+        peaks_wl = [pt["wavelength_nm"] for pt in points]
+        checkpoint.finish(self.log)
 
         if peaks_curr:
             self._plot_xy_curve(
@@ -923,6 +964,17 @@ class TestRunner:
         else:
             self.log("[Runner] 组2 没有采集到峰值数据，跳过作图")
 
+    def _write_group2_point(self, checkpoint, i, cur, temp_C, main_wl, save_path, summary_filename):
+        """后台写入线程：写入组2汇总与断点"""
+        try:
+            self._append_summary(save_path, cur, temp_C, main_wl, "",
+                                test_group=2, summary_filename=summary_filename)
+        except Exception as e:
+            self.log(f"[Runner] 组2 写入汇总失败: {e}")
+
+        checkpoint.record(i, {"current_mA": cur}, {"current_mA": cur, "wavelength_nm": main_wl})
+        self.log(f"[Runner] 组2 {int(cur)}mA @ {temp_C:.2f}°C -> 主波长 {main_wl:.4f} nm")
+
 # -------------------------
 # GUI (with new group2 params)
 # -------------------------
@@ -946,6 +998,11 @@ class CT_W_GUI:
             self.root = parent # <--- 修改点：直接使用父 Frame
 
         # defaults (added group2 params)
+        # 上位机窗口标题（正则），多工位运行时由平台按工位配置改写；
+        # 与测量仪器一起作为租约键（"上位机::窗口标题"，与 MODULE_MAP 一致），同一上位机上的 CT 模块不会同时运行
+        self.laser_window_title = r"Preci-Semi-Seed"
+        # 由平台一键测试 / 调度启动时为 True：断点续测不弹窗询问，直接从断点继续
+        self.unattended = False
         self.params = {
             "osa_ip": "192.168.29.11",
             "current_mA": 360.0,
@@ -1108,6 +1165,7 @@ class CT_W_GUI:
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5, 0))
         self.log_box = tk.Text(log_frame)
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "CT_W")
 
     def _add_param_entry(self, parent, key, label, default="", row=0, browse=None):
         tk.Label(parent, text=label, anchor="e", width=14).grid(row=row, column=0, sticky="e", padx=4, pady=4)
@@ -1122,14 +1180,8 @@ class CT_W_GUI:
         return ent
 
     def log(self, msg: str):
-        t = time.strftime("[%H:%M:%S]")
-        try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
-            self.log_box.see(tk.END)
-            self.root.update_idletasks()
-        except Exception:
-            pass
-        print(f"{t} {msg}")
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
 
     def open_laser_software(self):
         p = self.get_params()
@@ -1144,7 +1196,7 @@ class CT_W_GUI:
             def _open_laser_thread():
                 try:
                     # 创建LaserController实例并连接
-                    self.laser = LaserController(exe_path=exe_path, window_title=r"Preci-Semi-Seed", log_func=self.log)
+                    self.laser = LaserController(exe_path=exe_path, window_title=self.laser_window_title, log_func=self.log)
                     self.laser.connect()
                     self.log("[上位机] 已成功打开或连接到上位机软件")
                     # 确保UI更新在主线程中进行
@@ -1286,7 +1338,7 @@ class CT_W_GUI:
         try:
             # 初始化激光器和OSA控制器
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1303,6 +1355,8 @@ class CT_W_GUI:
                 visa_address = f"TCPIP0::{p['osa_ip']}::INSTR"
                 self.osa = OSAController(resource=visa_address, log_func=self.log)
                 self.osa.connect()
+            # 面板上可能改过波长设置，本次重新读取横轴
+            self.osa.invalidate_axis()
 
             if not self.runner:
                 self.runner = TestRunner(self.laser, self.osa, log_func=self.log)
@@ -1310,8 +1364,18 @@ class CT_W_GUI:
                 # 重置停止标志
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group1_summary_filename"], 1,
+                start=p["t_start"], end=p["t_stop"], step=p["t_step"], current_mA=p["current_mA"]),
+                "第一组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.osa.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-波长", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     self.runner.run_group1(
                         start_temp=p["t_start"],
                         end_temp=p["t_stop"],
@@ -1322,7 +1386,8 @@ class CT_W_GUI:
                         # 新增：传递文件名参数
                         summary_filename=p["group1_summary_filename"],
                         # 新增：传递电流参数
-                        current_mA=p["current_mA"]
+                        current_mA=p["current_mA"],
+                        resume=resume
                     )
                     # 在测试完成后调用绘图函数，并传递文件名参数
                     img_path = self.runner.plot_group1_wavelength_vs_temperature(
@@ -1335,6 +1400,7 @@ class CT_W_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group1_start.config(state=tk.NORMAL)
                         self.btn_group1_stop.config(state=tk.DISABLED)
@@ -1373,7 +1439,7 @@ class CT_W_GUI:
         try:
             # 初始化激光器和OSA控制器
             if not self.laser:
-                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=r"Preci-Semi-Seed", log_func=self.log)
+                self.laser = LaserController(exe_path=p["laser_exe_path"], window_title=self.laser_window_title, log_func=self.log)
                 try:
                     self.laser.connect()
                 except Exception as e:
@@ -1390,6 +1456,8 @@ class CT_W_GUI:
                 visa_address = f"TCPIP0::{p['osa_ip']}::INSTR"
                 self.osa = OSAController(resource=visa_address, log_func=self.log)
                 self.osa.connect()
+            # 面板上可能改过波长设置，本次重新读取横轴
+            self.osa.invalidate_axis()
 
             if not self.runner:
                 self.runner = TestRunner(self.laser, self.osa, log_func=self.log)
@@ -1397,8 +1465,19 @@ class CT_W_GUI:
                 # 重置停止标志
                 self.runner._stop = False
 
+            # 存在未完成的断点时询问是否从断点继续（在主线程弹窗）
+            resume = ask_resume(SweepCheckpoint.for_sweep(
+                p["save_path"], p["group2_summary_filename"], 2,
+                start_mA=p["group2_start_mA"], step_mA=p["group2_step_mA"],
+                stop_mA=p["group2_stop_mA"], temp_C=p["group2_temp_C"]),
+                "第二组测试", parent=self.root,
+                unattended=self.unattended, log=self.log)
+
             def target():
+                lease = InstrumentLease([self.osa.resource, LASER_INSTRUMENT_PREFIX + self.laser_window_title], owner="CT-波长", log_func=self.log)
                 try:
+                    if not lease.acquire(stop_check=lambda: self.runner._stop):
+                        return
                     # 先创建一个保存图像路径的变量
                     img_path = None
                     self.runner.run_group2(
@@ -1410,7 +1489,8 @@ class CT_W_GUI:
                         # 新增：传递组2时延参数
                         delay_s=p["group2_delay_s"],
                         # 新增：传递文件名参数
-                        summary_filename=p["group2_summary_filename"]
+                        summary_filename=p["group2_summary_filename"],
+                        resume=resume
                     )
                     import glob
                     
@@ -1432,6 +1512,7 @@ class CT_W_GUI:
                 except Exception as e:
                     self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
                 finally:
+                    lease.release()
                     try:
                         self.btn_group2_start.config(state=tk.NORMAL)
                         self.btn_group2_stop.config(state=tk.DISABLED)
@@ -1467,6 +1548,8 @@ class CT_W_GUI:
                 visa_address = f"TCPIP0::{p['osa_ip']}::INSTR"
                 self.osa = OSAController(resource=visa_address, log_func=self.log)
                 self.osa.connect()
+            # 面板上可能改过波长设置，本次重新读取横轴
+            self.osa.invalidate_axis()
 
             try:
                 self.osa.sweep_and_fetch()
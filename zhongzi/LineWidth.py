@@ -7,6 +7,31 @@ from PIL import Image, ImageTk
 import threading
 import shutil
 import ctypes
+import csv
+
+import numpy as np
+
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_file import fetch_file
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.linewidth_fit import fit_lineshapes
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_file import fetch_file
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.linewidth_fit import fit_lineshapes
 
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
@@ -22,6 +47,9 @@ if os.name == 'nt':
 else:
     scaling_factor = 1.0
 
+# 线宽测试依次使用的 Span（kHz）
+DEFAULT_SPANS_KHZ = ['100', '200', '500', '1000', '2000']
+
 # ============ 信号发生器控制类 ============
 class SignalGenerator:
     def __init__(self, log_callback=None) -> None:
@@ -30,11 +58,8 @@ class SignalGenerator:
         self.log = log_callback or (lambda msg: None)
 
     def connect(self, ip_address):
-        self.rm = pyvisa.ResourceManager()
-        self.inst = self.rm.open_resource(f'TCPIP0::{ip_address}::inst0::INSTR')
-        self.inst.timeout = 10000
-        self.inst.read_termination = '\n'
-        self.inst.write_termination = '\n'
+        self.inst = open_session(f'TCPIP0::{ip_address}::inst0::INSTR', timeout=10000,
+                                 read_termination='\n', write_termination='\n')
         self.log(f"[信号源] 已连接到信号发生器")
 
     def configure(self, waveform="SIN", freq=0.1, volt=0, offset=1):
@@ -95,25 +120,32 @@ class SignalGenerator:
 # ============ 仪器控制类 ============
 class LinewidthTester:
     def __init__(self, log_callback=None) -> None:
-        self.rm = pyvisa.ResourceManager()
+        self.rm = None
         self.inst = None
+        self.idn = ""
+        self.traces = None
         self.log = log_callback or (lambda msg: None)
         self.stop_flag = threading.Event()
 
     def connect(self, ip_address):
-        self.inst = self.rm.open_resource(f'TCPIP0::{ip_address}::inst0::INSTR')
-        self.inst.timeout = 10000
-        self.log("已连接到频谱仪")
+        # 与初始化时清理仪器文件夹共用同一会话
+        self.inst = open_session(f'TCPIP0::{ip_address}::inst0::INSTR', timeout=10000)
+        self.idn = self.inst.query("*IDN?").strip()
+        # 迹线按型号用 32 位浮点二进制传输，供线型拟合使用
+        self.traces = TraceReader(self.inst, self.idn, log=self.log, profile=InstrumentProfile(self.idn, log=self.log))
+        self.log(f"已连接到频谱仪: {self.idn}")
 
     def configure(self, center_freq, span, rbw, n_db_down):
-        self.inst.write("INIT:CONT OFF")  # 关闭连续扫描
-        # 添加单位：中心频率使用MHZ，带宽使用MHZ，RBW使用HZ
-        self.inst.write(f"DISP:TRAC:Y:RLEV -20dBm")  # 设置参考电平
-        self.inst.write(f"FREQ:CENT {center_freq}MHZ")
-        self.inst.write(f"FREQ:SPAN {span}KHZ")
-        self.inst.write(f"BAND {rbw}HZ")
-        self.inst.write("SWE:POIN 2001")  # 设置扫描点数
-        self.inst.write(":AVER:COUN 20")
+        # 每个 Span 都要重新配置，7 条命令合并为一条消息发送
+        with batched_writes(self, "inst", max_message_len(self.idn)):
+            self.inst.write("INIT:CONT OFF")  # 关闭连续扫描
+            # 添加单位：中心频率使用MHZ，带宽使用MHZ，RBW使用HZ
+            self.inst.write(f"DISP:TRAC:Y:RLEV -20dBm")  # 设置参考电平
+            self.inst.write(f"FREQ:CENT {center_freq}MHZ")
+            self.inst.write(f"FREQ:SPAN {span}KHZ")
+            self.inst.write(f"BAND {rbw}HZ")
+            self.inst.write("SWE:POIN 2001")  # 设置扫描点数
+            self.inst.write(":AVER:COUN 20")
         #self.log("设置Count数为20")
         self.n_db_down = n_db_down
         self.log("完成参数设置")
@@ -132,6 +164,36 @@ class LinewidthTester:
         self.log("测量完成")
         return True
 
+    def read_trace(self):
+        """读回当前迹线，返回 (频率 Hz, 功率 dBm)；每个 Span 的起止频率不同，按当前设置查询"""
+        y = self.traces.read("TRAC:DATA? TRACE1")
+        start, stop = float(self.inst.query("FREQ:STAR?")), float(self.inst.query("FREQ:STOP?"))
+        return np.linspace(start, stop, len(y)), y
+
+    def fit_linewidths(self, span_traces, csv_path=None):
+        """
+        span_traces: [(span, 频率, 迹线), ...]，各 Span 的迹线一次批量拟合 Lorentz 线型（common/linewidth_fit）
+        记录线宽 ± 1σ（拍频全宽的一半，与 NDB20 / (2√99) 一致）；给出 csv_path 时另存为 CSV
+        """
+        fit = fit_lineshapes([x for _, x, _ in span_traces], [y for _, _, y in span_traces], model="lorentz")
+        rows = []
+        for i, (span, _, _) in enumerate(span_traces):
+            lw_khz, err_khz = fit["linewidth_hz"][i] / 1e3, fit["linewidth_err_hz"][i] / 1e3
+            if fit["ok"][i]:
+                self.log(f"[线宽拟合] Span {span} kHz: 线宽 {lw_khz:.3f} ± {err_khz:.3f} kHz，"
+                         f"残差 {fit['rms_db'][i]:.2f} dB")
+            else:
+                self.log(f"[线宽拟合] Span {span} kHz: 拟合未收敛")
+            rows.append([span, f"{lw_khz:.6f}", f"{err_khz:.6f}", f"{fit['center_hz'][i] / 1e6:.6f}",
+                         f"{fit['rms_db'][i]:.3f}", int(fit["ok"][i])])
+        if csv_path:
+            with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+                w = csv.writer(f)
+                w.writerow(["Span(kHz)", "线宽(kHz)", "不确定度(kHz)", "中心频率(MHz)", "残差(dB)", "收敛"])
+                w.writerows(rows)
+            self.log(f"[线宽拟合] 结果已保存: {os.path.basename(csv_path)}")
+        return fit
+
     def save_data(self, instr_image_path, instr_trace_csv, pc_shared_folder):
         if self.stop_flag.is_set():
             return False
@@ -157,22 +219,17 @@ class LinewidthTester:
             self.inst.query("*OPC?")
             self.log(f"Trace数据已保存到仪器内部: {instrument_csv_path}")
 
-            # 3. 将文件从仪器复制到电脑共享文件夹，使用与仪器本地路径相同的文件名
+            # 3. 将文件从仪器读回到电脑输出目录，使用与仪器本地路径相同的文件名
             dat_filename = os.path.splitext(csv_filename)[0] + '.dat'
             
-            # 构建电脑共享文件夹中的完整路径
+            # 构建电脑输出目录中的完整路径
             pc_image_path = os.path.join(pc_shared_folder, image_filename)
             pc_trace_csv = os.path.join(pc_shared_folder, csv_filename)
             pc_trace_dat = os.path.join(pc_shared_folder, dat_filename)
             
-            # 复制文件
-            self.inst.write(f"MMEM:COPY '{instrument_image_path}', '{pc_image_path}'")
-            self.inst.query("*OPC?")
-            self.log(f"截图已复制到电脑共享文件夹: {image_filename}")
-
-            self.inst.write(f"MMEM:COPY '{instrument_csv_path}', '{pc_trace_csv}'")
-            self.inst.query("*OPC?")
-            self.log(f"Trace数据已复制到电脑共享文件夹: {csv_filename}")
+            # 读回文件
+            self._fetch_file(instrument_image_path, pc_image_path, "截图")
+            self._fetch_file(instrument_csv_path, pc_trace_csv, "Trace数据")
 
             # 4. 生成dat文件，复制csv改扩展名
             if os.path.exists(pc_trace_csv):
@@ -185,6 +242,21 @@ class LinewidthTester:
             self.log(f"保存数据失败: {e}")
             raise
 
+    def _fetch_file(self, instrument_path, pc_path, label):
+        """经当前会话（MMEM:DATA?）读回文件；失败时退回原逻辑，由仪器 MMEM:COPY 到共享文件夹"""
+        try:
+            size = fetch_file(self.inst, instrument_path, pc_path)
+            self.log(f"{label}已从仪器读回（{size} 字节）: {os.path.basename(pc_path)}")
+        except Exception as e:
+            self.log(f"{label}读回失败（{e}），改用 MMEM:COPY 复制到共享文件夹")
+            try:
+                self.inst.clear()
+            except Exception:
+                pass
+            self.inst.write(f"MMEM:COPY '{instrument_path}', '{pc_path}'")
+            self.inst.query("*OPC?")
+            self.log(f"{label}已复制到电脑共享文件夹: {os.path.basename(pc_path)}")
+
     def close(self):
         if self.inst:
             self.inst.close()
@@ -305,14 +377,11 @@ class LineWidthGUI:
         logf.pack(fill=tk.BOTH, expand=True)
         self.log_box = tk.Text(logf, font=('Arial', 10))
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "LineWidth")
         
     def log(self, msg):
-        t = time.strftime('[%H:%M:%S]')
-        self.root.after(0, lambda: self._safe_log_append(f"{t} {msg}\n"))
-    
-    def _safe_log_append(self, text):
-        self.log_box.insert(tk.END, text)
-        self.log_box.see(tk.END)
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
     
     def _save_params(self):
         """保存当前输入的参数"""
@@ -337,6 +406,11 @@ class LineWidthGUI:
         self.stop_flag.clear()
         
         def task():
+            lease = InstrumentLease([self.params['频谱仪IP'], self.params['信号发生器IP']], owner="线宽", log_func=self.log)
+            if not lease.acquire(stop_check=self.stop_flag.is_set):
+                self.root.after(0, lambda: self.start_btn.config(state=tk.NORMAL))
+                self.root.after(0, lambda: self.stop_btn.config(state=tk.DISABLED))
+                return
             try:
                 self.log("[开始] 线宽测试开始")
                 
@@ -364,16 +438,13 @@ class LineWidthGUI:
                 # 2. 清空仪器内部文件夹
                 try:
                     # 连接仪器以清空文件夹
-                    temp_rm = pyvisa.ResourceManager()
-                    temp_inst = temp_rm.open_resource(f'TCPIP0::{self.params["频谱仪IP"]}::inst0::INSTR')
-                    temp_inst.timeout = 10000
+                    temp_inst = open_session(f'TCPIP0::{self.params["频谱仪IP"]}::inst0::INSTR', timeout=10000)
                     
                     # 创建目录（如果不存在）
                     temp_inst.write("MMEM:MDIR 'C:\\PTS\\zhongzi\\LineWidth'")
                     # 清空目录
                     temp_inst.write("MMEM:DEL 'C:\\PTS\\zhongzi\\LineWidth\\*.*'")
                     temp_inst.close()
-                    temp_rm.close()
                     self.log("[初始化] 已清空仪器内部文件夹: C:\\PTS\\zhongzi\\LineWidth")
                 except Exception as e:
                     self.log(f"[警告] 清空仪器文件夹失败: {e}")
@@ -386,13 +457,12 @@ class LineWidthGUI:
                 # 连接仪器
                 self.tester.connect(self.params['频谱仪IP'])
                 
-                # 定义要测试的四个Span值
-                span_values = ['100', '200', '500', '1000', '2000']
-                
                 # 保存所有测试结果图片路径和对应的Span值
                 all_results = []
+                # 各 Span 的迹线，全部测完后一次拟合
+                span_traces = []
                 
-                for span in span_values:
+                for span in DEFAULT_SPANS_KHZ:
                     if self.tester.stop_flag.is_set():
                         self.log(f"[停止] 已停止测试，当前完成到Span: {span}")
                         break
@@ -411,6 +481,11 @@ class LineWidthGUI:
                     if not self.tester.measure():
                         self.log(f"[Span测试] 测量失败，跳过Span: {span}")
                         continue
+
+                    try:
+                        span_traces.append((span, *self.tester.read_trace()))
+                    except Exception as e:
+                        self.log(f"[线宽拟合] 读取 Span {span} 迹线失败: {e}")
                     
                     # 为不同Span值生成唯一文件名
                     base_name = os.path.splitext(os.path.basename(self.params['仪器本地图片路径']))[0]
@@ -445,6 +520,12 @@ class LineWidthGUI:
                     else:
                         self.log(f"[Span测试] Span: {span} 未找到截图文件")
                 
+                if span_traces:
+                    try:
+                        self.tester.fit_linewidths(span_traces, os.path.join(self.params['输出目录'], "linewidth_fit.csv"))
+                    except Exception as e:
+                        self.log(f"[线宽拟合] 拟合失败: {e}")
+
                 self.log(f"\n[完成] 线宽测试结束，共完成 {len(all_results)} 个Span测试")
                 
                 # ============ 信号发生器控制与额外测试 ============
@@ -539,6 +620,7 @@ class LineWidthGUI:
                 # 关闭连接
                 if self.tester:
                     self.tester.close()
+                lease.release()
                 # 恢复按钮状态
                 self.root.after(0, lambda: self.start_btn.config(state=tk.NORMAL))
                 self.root.after(0, lambda: self.stop_btn.config(state=tk.DISABLED))
@@ -22,6 +22,28 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # <-- 补全这个
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+    from common.rin import RinConversion, RinIntegral
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.progress import ProgressTracker
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+    from common.rin import RinConversion, RinIntegral
+
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
     try:
@@ -71,6 +93,8 @@ class Rin_4051:
         self.timeout_s = timeout_s
         self.rm = None
         self.inst = None
+        self.idn = ""
+        self.traces = None
         self.log_callback = log_callback or (lambda s: print(s))
 
     def log(self, s):
@@ -89,11 +113,11 @@ class Rin_4051:
             # ---- 先试 VXI-11 (带 inst0) ----
             try:
                 res_str = f"TCPIP0::{self.ip}::inst0::INSTR"
-                self.inst = self.rm.open_resource(res_str)
+                self.inst = open_resource(self.rm, res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
-                idn = self.inst.query("*IDN?").strip()
+                idn = self.idn = self.inst.query("*IDN?").strip()
                 self.log(f"连接成功 (VXI-11 inst0): {idn}")
                 return True
             except Exception as e1:
@@ -104,11 +128,11 @@ class Rin_4051:
             try:
                 self.rm = pyvisa.ResourceManager()
                 res_str = f"TCPIP0::{self.ip}::INSTR"
-                self.inst = self.rm.open_resource(res_str)
+                self.inst = open_resource(self.rm, res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
-                idn = self.inst.query("*IDN?").strip()
+                idn = self.idn = self.inst.query("*IDN?").strip()
                 self.log(f"连接成功 (VXI-11): {idn}")
                 return True
             except Exception as e2:
@@ -119,11 +143,11 @@ class Rin_4051:
             try:
                 self.rm = pyvisa.ResourceManager()
                 res_str = f"TCPIP0::{self.ip}::5025::SOCKET"
-                self.inst = self.rm.open_resource(res_str)
+                self.inst = open_resource(self.rm, res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
-                idn = self.inst.query("*IDN?").strip()
+                idn = self.idn = self.inst.query("*IDN?").strip()
                 self.log(f"连接成功 (SOCKET 5025): {idn}")
                 return True
             except Exception as e3:
@@ -146,6 +170,7 @@ class Rin_4051:
                 except Exception:
                     pass
                 self.inst = None
+            self.traces = None
             if self.rm:
                 try:
                     self.rm.close()
@@ -178,36 +203,38 @@ class Rin_4051:
         if self.inst is None:
             raise RuntimeError("未连接到仪器")
         try:
-            # 基础配置
-            self.write(f":FREQ:STARt {start_hz}")
-            self.write(f":FREQ:STOP {stop_hz}")
-            self.write(f":SWE:POINts {int(points)}")
-            self.write(f":BAND {rbw_hz}")
-            if vbw_hz is not None:
-                self.write(f":BAND:VID {vbw_hz}")
-            # 设置扫描类型规则为扫描速度优先
-            self.write(":SWE:TYPE:AUTO:RUL SPEed")
-            try:
-                self.write(":UNIT:POW V")
-            except Exception:
-                pass
-            # 平均配置
-            if int(avg_count) <= 1:
-                self.write(":AVER:STATe OFF")
-            else:
-                self.write(":AVER:STATe ON")
-                self.write(f":AVER:COUNt {int(avg_count)}")
+            # 连续的写命令合并成少量消息发送，减少往返
+            with batched_writes(self, "inst", max_message_len(self.idn)):
+                # 基础配置
+                self.write(f":FREQ:STARt {start_hz}")
+                self.write(f":FREQ:STOP {stop_hz}")
+                self.write(f":SWE:POINts {int(points)}")
+                self.write(f":BAND {rbw_hz}")
+                if vbw_hz is not None:
+                    self.write(f":BAND:VID {vbw_hz}")
+                # 设置扫描类型规则为扫描速度优先
+                self.write(":SWE:TYPE:AUTO:RUL SPEed")
+                try:
+                    self.write(":UNIT:POW V")
+                except Exception:
+                    pass
+                # 平均配置
+                if int(avg_count) <= 1:
+                    self.write(":AVER:STATe OFF")
+                else:
+                    self.write(":AVER:STATe ON")
+                    self.write(f":AVER:COUNt {int(avg_count)}")
             
-            # 添加轨迹配置 - 确保轨迹1处于活动状态并显示
-            self.write(":DISP:WIND:TRAC:MODE WRITE")  # 设置轨迹模式为写入
-            self.write(":TRAC1:MODE CLEAR WRITE")  # 清除并写入轨迹1
-            self.write(":TRAC1:TYPE AVER")  # 设置轨迹1为平均类型
+                # 添加轨迹配置 - 确保轨迹1处于活动状态并显示
+                self.write(":DISP:WIND:TRAC:MODE WRITE")  # 设置轨迹模式为写入
+                self.write(":TRAC1:MODE CLEAR WRITE")  # 清除并写入轨迹1
+                self.write(":TRAC1:TYPE AVER")  # 设置轨迹1为平均类型
             
-            # 设置连续/单次扫描模式
-            self.write(":INIT:CONTinuous OFF")  # 设置为单次扫描模式
+                # 设置连续/单次扫描模式
+                self.write(":INIT:CONTinuous OFF")  # 设置为单次扫描模式
             
-            # 显示刷新 - 确保屏幕上显示轨迹
-            self.write(":DISP:UPD ON")  # 开启显示更新
+                # 显示刷新 - 确保屏幕上显示轨迹
+                self.write(":DISP:UPD ON")  # 开启显示更新
             
             self.log("配置完成")
             return True
@@ -259,16 +286,11 @@ class Rin_4051:
         except Exception:
             fstart, fstop = 0.0, 1.0
 
-        # 读取 trace 数据
+        # 读取 trace 数据（二进制失败时自动改用 ASCII）
         if prefer_binary:
-            try:
-                self.write(":FORM:DATA REAL,32")
-                vals = self.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype="f", is_big_endian=False)
-                vals = np.array(vals, dtype=float)
-                freqs = np.linspace(fstart, fstop, len(vals))
-                return freqs, vals, True
-            except Exception as e:
-                self.log(f"二进制读取失败: {e}, 改用 ASCII")
+            vals = self.read_trace()
+            freqs = np.linspace(fstart, fstop, len(vals))
+            return freqs, vals, self.traces.binary
 
         # ASCII 备选
         raw = self.inst.query(":TRAC:DATA? TRACE1")
@@ -278,6 +300,12 @@ class Rin_4051:
         return freqs, vals, False
 
 
+    def read_trace(self):
+        """读取 TRACE1：32 位浮点二进制块直接解码，仪器不支持时自动改用 ASCII；返回 float64 数组"""
+        if self.traces is None:
+            self.traces = TraceReader(self.inst, self.idn, log=self.log, profile=InstrumentProfile(self.idn, log=self.log))
+        return self.traces.read(":TRAC:DATA? TRACE1").astype(float)
+
     def _parse_scpi_block(self, raw_bytes):
         if not raw_bytes or not raw_bytes.startswith(b'#'):
             raise ValueError("不是 SCPI 二进制块")
@@ -354,6 +382,7 @@ class RinWorkflow:
         self.rin_ddx = []
         self.rin_ddy = []
         self.rin_power = []
+        self.rin_integral = None     # 累积积分，频带积分 RIN 查询用
 
     def request_stop(self):
         self.log("[用户] 请求停止")
@@ -374,6 +403,14 @@ class RinWorkflow:
 
         # 在run_measurement方法中修改循环部分
         seg_count = len(self.segments)
+        tracker = ProgressTracker(seg_count, unit="段", points_per_unit=self.points_expected)
+
+        def report(frac, msg):
+            # 结构化进度事件（平台监控显示进度条/ETA），同时保留原有回调
+            tracker.update(frac * seg_count, msg)
+            if progress_callback:
+                progress_callback(frac, msg)
+
         for idx, seg in enumerate(self.segments):
             if self.stop_flag:
                 self.log("检测到停止标志，终止测量")
@@ -389,8 +426,7 @@ class RinWorkflow:
             dynamic_timeout = base_timeout + (rbw / 10) * freq_factor
             self.analyzer.timeout_s = dynamic_timeout
         
-            if progress_callback:
-                progress_callback(idx/seg_count, f"配置第{idx+1}段...")
+            report(idx/seg_count, f"配置第{idx+1}段...")
             ok = self.analyzer.configure(start_hz=start, stop_hz=stop, rbw_hz=rbw, vbw_hz=None, points=self.points_expected, avg_count=avg)
             if not ok:
                 self.log(f"段 {idx+1} 配置失败，跳过")
@@ -428,8 +464,7 @@ class RinWorkflow:
                 except Exception as e:
                     self.log(f"[特殊处理] 状态确认异常: {e}")
             
-            if progress_callback:
-                progress_callback((idx+0.2)/seg_count, f"测量第{idx+1}段...")
+            report((idx+0.2)/seg_count, f"测量第{idx+1}段...")
             try:
                 base_name = f"{fname.split('.')[0]}_{timestamp}"
                 csvp, datap, freqs, vals = self.analyzer.fetch_and_save_trace(session_dir, base_name=base_name, prefer_binary=prefer_binary, save_csv=save_csv, save_dat=save_dat)
@@ -439,14 +474,15 @@ class RinWorkflow:
             # extend lists robustly
             self.freqs_all.extend(np.array(freqs, dtype=float).tolist())
             self.values_all.extend(np.array(vals, dtype=float).tolist())
-            if progress_callback:
-                progress_callback((idx+1)/seg_count, f"完成第{idx+1}/{seg_count}段")
+            report((idx+1)/seg_count, f"完成第{idx+1}/{seg_count}段")
         if self.stop_flag:
             self.log("测量中止，跳过处理")
             return False
         self.log("全部段完成，开始处理")
+        tracker.set_phase("数据处理")
         self._process_data()
         self.log("处理完成")
+        tracker.finish()
         return True
 
     def _process_data(self):
@@ -458,8 +494,7 @@ class RinWorkflow:
             return
         freqs = np.array(self.freqs_all, dtype=float)
         values = np.array(self.values_all, dtype=float)
-        # build scale mapping similar to user's earlier logic
-        scale = np.ones(n, dtype=float)
+        # 各段点数：每段 points_expected 点，数据不足时截短，多出的点归为最后一段之后的一段
         seg_lengths = []
         pos = 0
         for i, seg in enumerate(self.segments):
@@ -472,46 +507,18 @@ class RinWorkflow:
         rem = n - sum(seg_lengths)
         if rem > 0:
             seg_lengths.append(rem)
-        idx0 = 0
-        for i, L in enumerate(seg_lengths):
-            idx1 = idx0 + L
-            if i < 2:
-                scale[idx0:idx1] = math.sqrt(5)
-            else:
-                scale[idx0:idx1] = math.sqrt(30)
-            idx0 = idx1
+        # 整条拼接迹线一次换算（前两段系数 √5，其余 √30；无效数据为 -inf），见 common/rin.py
         ddx = freqs.tolist()
-        ddy = []
-        for i, v in enumerate(values):
-            try:
-                if v <= 0 or not np.isfinite(v):
-                    ddy.append(float('-inf'))
-                else:
-                    denom = (self.dc_value * self.amplification * scale[i])
-                    if denom == 0:
-                        ddy.append(float('-inf'))
-                    else:
-                        ddy.append(20.0 * math.log10(v / denom))
-            except Exception:
-                ddy.append(float('-inf'))
+        ddy = RinConversion(self.dc_value, self.amplification).convert(values, seg_lengths).tolist()
         self.rin_ddx = ddx
         self.rin_ddy = ddy
         self.rin_power = self.compute_rin_power(self.rin_ddx, self.rin_ddy)
 
     def compute_rin_power(self, x, y):
-        power = []
-        segment_length = 6
-        if len(x) < 2:
-            return power
-        for k in range(1, len(x) // segment_length + 1):
-            sub_x = x[:k*segment_length]
-            sub_y = [np.power(10, val / 10.0) if np.isfinite(val) else 0.0 for val in y[:k*segment_length]]
-            integral = 0.0
-            for i in range(1, len(sub_x)):
-                dx = sub_x[i] - sub_x[i-1]
-                integral += dx * (sub_y[i] + sub_y[i-1]) / 2.0
-            power.append(math.sqrt(integral))
-        return power
+        # 每 6 点一段的积分 RMS 曲线；累积梯形积分一次算出（见 common/rin.py），结果与原逐段重算相同，
+        # 任意频带的积分 RIN 用 self.rin_integral.band(f_start, f_stop) 查询
+        self.rin_integral = RinIntegral(x, y)
+        return self.rin_integral.block_power()
 
 # -----------------------------
 # GUI class following the user's reference style
@@ -590,19 +597,11 @@ class Rin_4051_GUI:
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(10, 0), pady=5)
         self.log_box = tk.Text(log_frame)
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "Rin_4051")
 
     def log(self, msg):
-        t = time.strftime("[%H:%M:%S]")
-        try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
-            self.log_box.see(tk.END)
-            try:
-                self.root.update_idletasks()
-            except Exception:
-                pass
-            print(f"{t} {msg}")
-        except Exception:
-            print(f"{t} {msg}")
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
 
     def update_params(self):
         for k, widget in self.entries.items():
@@ -661,6 +660,9 @@ class Rin_4051_GUI:
         self.worker_thread.start()
 
     def _worker_measure(self):
+        lease = InstrumentLease([self.analyzer.ip], owner="Rin_4051", log_func=self.log)
+        if not lease.acquire(stop_check=lambda: self.workflow.stop_flag):
+            return
         try:
             ok = self.analyzer.connect()
             if not ok:
@@ -687,6 +689,7 @@ class Rin_4051_GUI:
                 self.analyzer.close()
             except Exception:
                 pass
+            lease.release()
             self.log("[主控] 线程结束")
 
     def stop_test(self):
@@ -740,9 +743,7 @@ class Rin_4051_GUI:
 
             # 修改：直接读取数据，不再调用 single_sweep_fetch（避免重复初始化）
             self.log("尝试二进制读取 TRACE (REAL,32)...")
-            analyzer.write(":FORM:DATA REAL,32")
-            vals = analyzer.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype='f', is_big_endian=False)
-            vals = np.array(vals, dtype=float)
+            vals = analyzer.read_trace()
             
             # 获取频率信息
             fstart = float(analyzer.query(":FREQ:STAR?"))
@@ -30,6 +30,24 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from io import StringIO
 from PIL import Image, ImageTk
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_file import fetch_file
+    from common.rin import RinConversion, RinIntegral
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.visa_pool import open_session
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_file import fetch_file
+    from common.rin import RinConversion, RinIntegral
+
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
     try:
@@ -44,6 +62,23 @@ if os.name == 'nt':
 else:
     scaling_factor = 1.0
 
+# RIN 分段测量参数：(起始频率 Hz, 终止频率 Hz, RBW Hz, 平均次数, 仪器内文件名)
+DEFAULT_SEGMENTS = [
+    (10, 100, 5, 20, "Rin_1.DAT"),
+    (100, 1000, 5, 20, "Rin_2.DAT"),
+    (1000, 10000, 30, 20, "Rin_3.DAT"),
+    (10000, 100000, 30, 20, "Rin_4.DAT"),
+    (100000, 1000000, 30, 20, "Rin_5.DAT"),
+    (1000000, 10000000, 30, 20, "Rin_6.DAT"),
+]
+
+# 仪器内保存文件的目录、电脑本地目录，以及直接读回失败时 MMEM:COPY 的目标共享文件夹
+INSTRUMENT_DIR = "C:\\PTS\\Rin"
+LOCAL_DIR = "C:\\PTS\\zhongzi\\Rin\\FSV3004"
+SHARE_DIR = r"\\192.168.7.7\PTS\zhongzi\Rin\FSV3004"
+# 频谱仪默认 IP（实际连接、清理、读回与租约都用界面参数“IP地址”，多工位时由工位配置改写）
+DEFAULT_IP = "192.168.7.10"
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -51,6 +86,33 @@ def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
     return path
 
+def fetch_instrument_files(inst, names, local_dir, log, ip_address=DEFAULT_IP):
+    """
+    经当前会话（MMEM:DATA?）把仪器 INSTRUMENT_DIR 下的文件读回 local_dir，返回文件所在目录；
+    读回失败时退回原逻辑：由 ip_address 处的仪器 MMEM:COPY 整个目录到共享文件夹，返回 SHARE_DIR。
+    """
+    try:
+        for name in names:
+            local_path = os.path.join(local_dir, name)
+            size = fetch_file(inst, f"{INSTRUMENT_DIR}\\{name}", local_path)
+            log(f"文件已从仪器读回（{size} 字节）：{local_path}")
+        return local_dir
+    except Exception as e:
+        log(f"经 MMEM:DATA? 读回文件失败（{e}），改用共享文件夹复制")
+        try:
+            inst.clear()
+        except Exception:
+            pass
+    instr = open_session(f"TCPIP0::{ip_address}::inst0::INSTR")
+    instr.write(f"MMEM:COPY '{INSTRUMENT_DIR}\\*.*','{SHARE_DIR}'")
+    instr.close()
+    log(f"文件已从仪器复制到电脑共享文件夹：{SHARE_DIR}")
+    return SHARE_DIR
+
+def analyzer_resource(ip_address, port=5025):
+    """频谱仪 SOCKET 资源地址（连接与仪器租约共用）"""
+    return f"TCPIP0::{ip_address}::{port}::SOCKET"
+
 def default_logger(msg: str):
     print(msg)
 
@@ -61,6 +123,8 @@ class RinAnalyzer:
     def __init__(self, log_func=default_logger):
         self.rm = None
         self.instrument = None
+        self.ip_address = DEFAULT_IP
+        self.idn = ""
         self.dc_value = 1.20  # 默认DC值
         self.amplification = 14
         self.file_paths = [
@@ -77,6 +141,7 @@ class RinAnalyzer:
         self.ddx = []
         self.ddy = []
         self.RIN_power = []
+        self.rin_integral = None     # 累积积分，频带积分 RIN 查询用
         self.stop_flag = False
         self.stop_window = None
 
@@ -87,15 +152,16 @@ class RinAnalyzer:
         self.file_wait_poll_s = 0.5
 
     # 连接仪器（保持原命令）
-    def connect(self, ip_address="192.168.7.10", port=5025):
+    def connect(self, ip_address=None, port=5025):
+        """ip_address 缺省时连接 self.ip_address（由界面参数设置）"""
+        self.ip_address = ip_address or self.ip_address
         try:
-            self.rm = pyvisa.ResourceManager()
-            # 使用 SOCKET 地址（与原脚本一致）
-            self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::{port}::SOCKET")
-            self.instrument.timeout = 60000
-            self.instrument.read_termination = '\n'
-            self.instrument.write_termination = '\n'
-            self.log("成功连接到频谱分析仪")
+            # 使用 SOCKET 地址（与原脚本一致），会话由进程内会话池共享
+            self.instrument = open_session(analyzer_resource(self.ip_address, port), timeout=60000,
+                                           read_termination='\n', write_termination='\n')
+            # 型号决定配置命令合并发送时的单条消息长度
+            self.idn = self.instrument.query("*IDN?").strip()
+            self.log(f"成功连接到频谱分析仪: {self.idn}")
             return True
         except Exception as e:
             self.log(f"连接失败: {e}")
@@ -106,11 +172,13 @@ class RinAnalyzer:
         if not self.instrument:
             self.log("未连接到仪器")
             return
-        self.instrument.write(":INST:SEL SA") # 选择频谱分析仪
-        self.instrument.write(":CONF:SAN") # 配置频谱分析仪
-        self.instrument.write("SWE:POIN 2001") # 设置采样点数
-        self.instrument.write("UNIT:POW V") # 设置单位为伏特
-        self.instrument.write("TRACE1:TYPE AVERage") # 设置追踪类型为平均
+        # 5 条配置命令合并为一条消息发送
+        with batched_writes(self, "instrument", max_message_len(self.idn)):
+            self.instrument.write(":INST:SEL SA") # 选择频谱分析仪
+            self.instrument.write(":CONF:SAN") # 配置频谱分析仪
+            self.instrument.write("SWE:POIN 2001") # 设置采样点数
+            self.instrument.write("UNIT:POW V") # 设置单位为伏特
+            self.instrument.write("TRACE1:TYPE AVERage") # 设置追踪类型为平均
         self.log("仪器已配置（SWE:POIN 2001, UNIT: V, TRACE: AVERage）")
 
     # 测量函数（与原样）
@@ -137,15 +205,10 @@ class RinAnalyzer:
             self.instrument.query("*OPC?")
             self.log(f"数据已存储在仪器内部: {instrument_path}")
 
-            # 复制到共享目录（保留原逻辑）
-            instrument_ip = "192.168.7.10"
-            source_path = "C:\\PTS\\Rin"
-            dest_path = r"\\192.168.7.7\PTS\zhongzi\Rin\FSV3004"
-            rm = pyvisa.ResourceManager()
-            instr = rm.open_resource(f"TCPIP0::{instrument_ip}::inst0::INSTR")
-            instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
-            instr.close()
-            self.log(f"文件已从仪器复制到电脑共享文件夹：{dest_path}")
+            # 经当前会话读回到本地（process_files 读取的路径），不再经共享文件夹中转
+            local_path = next((p for p in self.file_paths if filename.lower() in p.lower()), None)
+            local_dir = os.path.dirname(local_path) if local_path else LOCAL_DIR
+            fetch_instrument_files(self.instrument, [filename], local_dir, self.log, self.ip_address)
 
         except Exception as e:
             self.log(f"测量失败: {e}")
@@ -287,41 +350,37 @@ class RinAnalyzer:
                 self.dy.append([])
 
         rows_per_file = 2001
+        volts = []
+        seg_lengths = []    # 按文件序号对应换算系数，空文件计 0 点
         for j in range(len(self.dx)):
             if not self.dx[j]:
                 self.log(f"文件{j}数据为空，跳过处理")
+                seg_lengths.append(0)
                 continue
 
             if len(self.dy[j]) != rows_per_file:
                 self.log(f"警告: 文件{j}数据点不足，期望{rows_per_file}个，实际 {len(self.dy[j])}")
 
-            for i in range(min(rows_per_file, len(self.dx[j]))):
-                self.ddx.append(self.dx[j][i])
-                scale_factor = np.sqrt(5) if j < 2 else np.sqrt(30)
-                v_noise = self.dy[j][i]
-                if v_noise <= 0:
-                    self.ddy.append(float('-inf'))  # 无效数据填充为 -inf
-                else:
-                    rin_value = 20 * np.log10(v_noise / (self.dc_value * self.amplification * scale_factor))
-                    self.ddy.append(rin_value)
+            count = min(rows_per_file, len(self.dx[j]))
+            self.ddx.extend(self.dx[j][:count])
+            volts.extend(self.dy[j][:count])
+            seg_lengths.append(count)
+
+        # 整条拼接迹线一次换算（前两个文件系数 √5，其余 √30；无效数据为 -inf），见 common/rin.py
+        self.ddy = RinConversion(self.dc_value, self.amplification).convert(volts, seg_lengths).tolist()
 
         if self.ddx and self.ddy:
             self.RIN_power = self.compute_rin_power(self.ddx, self.ddy)
         else:
             self.log("错误: 无有效数据可处理")
             self.RIN_power = []
+            self.rin_integral = None
 
-    # compute_rin_power 保持原实现
     def compute_rin_power(self, x, y):
-        power = []
-        segment_length = 6
-        for k in range(1, len(x) // segment_length + 1):
-            sub_x = x[:k*segment_length]
-            sub_y_exp = [np.power(10, val / 10.0) if np.isfinite(val) else 0 for val in y[:k*segment_length]]
-            integral = sum((sub_x[i] - sub_x[i-1]) * (sub_y_exp[i] + sub_y_exp[i-1]) / 2.0
-                           for i in range(1, len(sub_x)))
-            power.append(np.sqrt(integral))
-        return power
+        # 每 6 点一段的积分 RMS 曲线；累积梯形积分一次算出（见 common/rin.py），结果与原逐段重算相同，
+        # 任意频带的积分 RIN 用 self.rin_integral.band(f_start, f_stop) 查询
+        self.rin_integral = RinIntegral(x, y)
+        return self.rin_integral.block_power()
 
     # visualize_data 完整保留（仅把 print 改为 self.log）
     def visualize_data(self):
@@ -524,15 +583,15 @@ class BackgroundNoiseAnalyzer:
     def __init__(self, log_func=default_logger):
         self.rm = None
         self.instrument = None
+        self.ip_address = DEFAULT_IP
         self.log = log_func
 
-    def connect(self, ip_address="192.168.7.10", port=5025):
+    def connect(self, ip_address=None, port=5025):
+        """ip_address 缺省时连接 self.ip_address（由界面参数设置）"""
+        self.ip_address = ip_address or self.ip_address
         try:
-            self.rm = pyvisa.ResourceManager()
-            self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::{port}::SOCKET")
-            self.instrument.timeout = 60000
-            self.instrument.read_termination = '\n'
-            self.instrument.write_termination = '\n'
+            self.instrument = open_session(analyzer_resource(self.ip_address, port), timeout=60000,
+                                           read_termination='\n', write_termination='\n')
             self.log("成功连接到频谱分析仪")
             return True
         except Exception as e:
@@ -587,20 +646,13 @@ class BackgroundNoiseAnalyzer:
             self.instrument.query("*OPC?")
             self.log("仪器已截图并保存。")
 
-            # 复制到共享目录（按 Rin 的简化实现：一次性复制整个仪器目录到目标）
-            instrument_ip = "192.168.7.10"
-            source_path = "C:\\PTS\\Rin"
-            dest_path = r"\\192.168.7.7\PTS\zhongzi\Rin\FSV3004"
-            rm = pyvisa.ResourceManager()
-            instr = rm.open_resource(f"TCPIP0::{instrument_ip}::inst0::INSTR")
-            # 使用通配符一次性复制（与 Rin 的实现保持一致，注意：健壮性较低，但与用户要求一致）
-            instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
-            instr.close()
-            self.log(f"文件已从仪器复制到电脑共享文件夹：{dest_path}")
-
-            # 直接尝试显示截图（不等待文件同步，行为与 Rin 保持一致）
+            # 数据与截图经当前会话读回到本地；失败时退回复制到共享文件夹
+            dest_path = fetch_instrument_files(self.instrument, [dat_filename, screenshot_name], LOCAL_DIR, self.log,
+                                               self.ip_address)
+
+            # 直接显示截图（读回后文件已在本地，只有退回共享文件夹复制时才需要等待同步）
             self.show_screenshot(dest_path, screenshot_name, dat_filename, is_seedlight)
-            self.log("已发送复制命令并尝试显示图片。")
+            self.log("已读回文件并显示图片。")
 
         except Exception as e:
             self.log(f"底噪测量或截图失败: {e}")
@@ -727,14 +779,11 @@ class TestRunner:
 
                 # 仪器目录清空
                 try:
-                    ip = "192.168.7.10"
-                    rm = pyvisa.ResourceManager()
-                    inst = rm.open_resource(f"TCPIP0::{ip}::5025::SOCKET")
+                    inst = open_session(analyzer_resource(ra.ip_address))
                     inst.write("MMEM:MDIR 'C:\\PTS\\Rin'")  # 确保路径存在
                     inst.write("MMEM:DEL 'C:\\PTS\\Rin\\*.*'")
                     #inst.query("*OPC?")
                     inst.close()
-                    rm.close()
                 except Exception as e:
                     self.log(f"[警告] 仪器文件夹清理失败: {e}")
 
@@ -746,15 +795,7 @@ class TestRunner:
 
             if ra.connect():
                 ra.configure_instrument()
-                measurement_params = [
-                    (10, 100, 5, 20, "Rin_1.DAT"),
-                    (100, 1000, 5, 20, "Rin_2.DAT"),
-                    (1000, 10000, 30, 20, "Rin_3.DAT"),
-                    (10000, 100000, 30, 20, "Rin_4.DAT"),
-                    (100000, 1000000, 30, 20, "Rin_5.DAT"),
-                    (1000000, 10000000, 30, 20, "Rin_6.DAT")
-                ]
-                for start, stop, bw, avg, fname in measurement_params:
+                for start, stop, bw, avg, fname in DEFAULT_SEGMENTS:
                     if self._stop or ra.stop_flag:
                         self.log("[测试] RIN 测试已被终止")
                         break
@@ -850,7 +891,7 @@ class RinGUI:
 
         # 默认参数（保留原脚本默认路径/IP）
         self.params = {
-            "osa_ip": "192.168.7.10",
+            "osa_ip": DEFAULT_IP,
             #"osa_port": 5025,
             "save_path": r"C:\PTS\zhongzi\Rin\FSV3004",
             "dc_initial": 2.40
@@ -936,6 +977,7 @@ class RinGUI:
         log_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
         self.log_box = tk.Text(log_frame, wrap=tk.WORD)
         self.log_box.pack(fill=tk.BOTH, expand=True)
+        self.log_bus = LogBus(self.log_box, "Rin_FSV3004")
         
         # 设置grid权重，确保参数设置列固定，日志框列可以扩展
         main_container.grid_columnconfigure(0, weight=0)  # 参数设置列固定大小
@@ -955,20 +997,13 @@ class RinGUI:
         return ent
 
     def log(self, msg: str):
-        t = time.strftime("[%H:%M:%S]")
-        try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
-            self.log_box.see(tk.END)
-            self.root.update_idletasks()
-        except Exception:
-            pass
-        # 也打印到 stdout，方便日志文件或控制台查看
-        print(f"{t} {msg}")
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
 
     def get_params(self) -> Dict[str, Any]:
         p = {}
         try:
-            p["osa_ip"] = self.entries["osa_ip"].get().strip()
+            p["osa_ip"] = self.entries["osa_ip"].get().strip() or self.params["osa_ip"]
             #p["osa_port"] = int(self.entries["osa_port"].get().strip())
             p["save_path"] = self.entries["save_path"].get().strip() or self.params["save_path"]
         except Exception:
@@ -1037,6 +1072,7 @@ class RinGUI:
 
         # 创建 RinAnalyzer 并设置 dc
         ra = RinAnalyzer(log_func=self.log)
+        ra.ip_address = p["osa_ip"]
         ra.dc_value = dc_for_ra
         # 把 GUI 中的保存目录传给 RinAnalyzer，供 visualize_data 使用
         try:
@@ -1055,7 +1091,13 @@ class RinGUI:
                 self.btn_connect.config(state=tk.DISABLED)
                 self.btn_stop.config(state=tk.NORMAL)
                 self.runner._stop = False
-                self.runner.run_rin(ra, self.root)
+                lease = InstrumentLease([analyzer_resource(p["osa_ip"])], owner="Rin_FSV3004", log_func=self.log)
+                if not lease.acquire(stop_check=lambda: self.runner._stop):
+                    return
+                try:
+                    self.runner.run_rin(ra, self.root)
+                finally:
+                    lease.release()
             except Exception as e:
                 self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
             finally:
@@ -1079,6 +1121,7 @@ class RinGUI:
             return
         p = self.get_params()
         bna = BackgroundNoiseAnalyzer(log_func=self.log)
+        bna.ip_address = p["osa_ip"]
 
         def target_bg():
             try:
@@ -1089,7 +1132,13 @@ class RinGUI:
                 self.btn_connect.config(state=tk.DISABLED)
                 self.btn_stop.config(state=tk.NORMAL)
                 self.runner._stop = False
-                self.runner.run_background(bna, self.root, is_seedlight=False)
+                lease = InstrumentLease([analyzer_resource(p["osa_ip"])], owner="Rin_FSV3004", log_func=self.log)
+                if not lease.acquire(stop_check=lambda: self.runner._stop):
+                    return
+                try:
+                    self.runner.run_background(bna, self.root, is_seedlight=False)
+                finally:
+                    lease.release()
             except Exception as e:
                 self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
             finally:
@@ -1114,6 +1163,7 @@ class RinGUI:
             return
         p = self.get_params()
         bna = BackgroundNoiseAnalyzer(log_func=self.log)
+        bna.ip_address = p["osa_ip"]
 
         def target_seed():
             try:
@@ -1124,7 +1174,13 @@ class RinGUI:
                 self.btn_connect.config(state=tk.DISABLED)
                 self.btn_stop.config(state=tk.NORMAL)
                 self.runner._stop = False
-                self.runner.run_background(bna, self.root, is_seedlight=True)
+                lease = InstrumentLease([analyzer_resource(p["osa_ip"])], owner="Rin_FSV3004", log_func=self.log)
+                if not lease.acquire(stop_check=lambda: self.runner._stop):
+                    return
+                try:
+                    self.runner.run_background(bna, self.root, is_seedlight=True)
+                finally:
+                    lease.release()
             except Exception as e:
                 self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
             finally:
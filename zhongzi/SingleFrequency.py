@@ -27,6 +27,32 @@ except Exception:
 from pywinauto.application import Application
 import time
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_state import ShadowSession
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+    from common.spectrum_peaks import find_peaks
+    from common.spectrum_baseline import SpanBaseline
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease
+    from common.log_bus import LogBus
+    from common.scpi_batch import batched_writes, max_message_len
+    from common.scpi_state import ShadowSession
+    from common.scpi_trace import TraceReader
+    from common.scpi_axis import TraceAxis
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+    from common.spectrum_peaks import find_peaks
+    from common.spectrum_baseline import SpanBaseline
+
 
 class LaserController:
     def __init__(self, exe_path, window_title=".*Preci-Seed.*", log_func=print):
@@ -131,6 +157,16 @@ class LaserController:
             self.log(f"[错误] 设置温度失败: {e}")
 
 # ===============  频谱仪控制 & 峰值检测  ===============
+# 设置命令之后等待仪器执行完毕的方式，按 *IDN? 中的型号覆盖：
+#   wait:   "opc" 查询 *OPC?；"stb" 发送 *OPC 后轮询 *STB? 的 ESB 位（*ESE 1）；"srq" 等待服务请求（仅 INSTR 资源）
+#   settle: {步骤: 秒}，该型号的这些步骤改用固定等待（个别固件 *OPC? 在设置生效前就返回时使用）
+# 未列出的型号：INSTR 资源用 "srq"，其余用 "opc"，不做固定等待。
+# 步骤名：rbw / vbw / trace_mode / detector / sweep_type / sweep_time / trace_clear / continuous
+MODEL_WAITS = {
+    # "4051": {"wait": "stb", "settle": {"detector": 0.5}},
+}
+
+
 class SingleFrequency:
     def __init__(self, ip, timeout_s=60.0, log=print, cmd_map=None):
         self.ip = ip
@@ -140,6 +176,10 @@ class SingleFrequency:
         self.sa = None
         self.last_rbw_hz = None
         self.last_vbw_hz = None
+        self.wait_mode = "opc"
+        self.settle_s = {}
+        self.traces = None
+        self.axis = None
         self.CMD = {
             'idn': '*IDN?\n',
             'abort': ':ABORt\n',
@@ -170,7 +210,8 @@ class SingleFrequency:
     def open(self):
         self.rm = pyvisa.ResourceManager()
         #self.sa = self.rm.open_resource(f"TCPIP::{self.ip}::INSTR")
-        self.sa = self.rm.open_resource(f"TCPIP::{self.ip}::5025::SOCKET")
+        # 记录已发送的设置，主循环中重复的设置命令不再发送
+        self.sa = ShadowSession(open_resource(self.rm, f"TCPIP::{self.ip}::5025::SOCKET"))
         self.sa.timeout = int(self.timeout_s * 1000)
         self.sa.write_termination = '\n'
         self.sa.read_termination = '\n'
@@ -178,18 +219,89 @@ class SingleFrequency:
         idn = self.query(self.CMD['idn']).strip()
         self.log(f"[频谱仪] 已连接：{idn}")
 
-        self.write(":CALC:MARK1:MODE NORM")        # 普通标记模式（必须）
-        self.write(":CALC:MARK1 ON")                # 打开标记1显示
-        self.write(":CALC:MARK1:FUNC NOIS")         # 开启噪声标记（手册第111页精确命令）
+        # 初始设置合并为一条消息发送
+        with batched_writes(self.sa, "inst", max_message_len(idn)):
+            self.write(":CALC:MARK1:MODE NORM")        # 普通标记模式（必须）
+            self.write(":CALC:MARK1 ON")                # 打开标记1显示
+            self.write(":CALC:MARK1:FUNC NOIS")         # 开启噪声标记（手册第111页精确命令）
+            self.write(":CALC:MARK1:MAX")              # 立即跳到最高峰（最实用）
+            self.write(":SWE:TYPE:AUTO:RUL DRAN")        # 打开动态范围优先
+            self.write(":UNIT:POW DBM")          # 纵轴刻度单位设置为DBM
         self.log("[频谱仪] 噪声标记已开启 → Nrs dBm/Hz")
-        self.write(":CALC:MARK1:MAX")              # 立即跳到最高峰（最实用）
-        self.write(":SWE:TYPE:AUTO:RUL DRAN")        # 打开动态范围优先
         self.log("[频谱仪] 动态范围优先已开启")
-        self.write(":UNIT:POW DBM")          # 纵轴刻度单位设置为DBM
         self.log("[频谱仪] 纵轴刻度单位已设置为DBM")
+        self.setup_waits(idn)
+        # 迹线按型号用 32 位浮点二进制传输，不支持时自动退回 ASCII
+        self.traces = TraceReader(self.sa, idn, log=self.log, profile=InstrumentProfile(idn, log=self.log))
+        # 起止频率缓存到经驱动改动频率设置为止，读迹线时不再每次查询起止频率与点数
+        self.axis = TraceAxis(self._query_freq_range).watch(self.sa)
 
         return idn
 
+    def setup_waits(self, idn):
+        """按型号选择完成等待方式；stb / srq 需要先打开标准事件寄存器的 OPC 位"""
+        profile = next((v for k, v in MODEL_WAITS.items() if k.upper() in str(idn).upper()), {})
+        is_instr = str(getattr(self.sa, "resource_name", "")).upper().endswith("::INSTR")
+        self.wait_mode = profile.get("wait") or ("srq" if is_instr else "opc")
+        if self.wait_mode == "srq" and not (is_instr and hasattr(self.sa, "wait_on_event")):
+            self.wait_mode = "stb"
+        self.settle_s = dict(profile.get("settle", {}))
+        if self.wait_mode in ("stb", "srq"):
+            self.sa.write("*ESE 1;*SRE 32" if self.wait_mode == "srq" else "*ESE 1")
+        self.log(f"[频谱仪] 完成等待方式: {self.wait_mode}" + (f"，固定等待 {self.settle_s}" if self.settle_s else ""))
+
+    def wait_complete(self, step, timeout_s=5.0, poll_s=0.02):
+        """
+        等待之前发送的命令执行完毕，返回是否确认完成。
+        型号在 MODEL_WAITS 中为该步骤指定了固定等待时只等待固定时间。
+        """
+        if step in self.settle_s:
+            time.sleep(self.settle_s[step])
+            return True
+        old_timeout = self.sa.timeout
+        try:
+            self.sa.timeout = int(timeout_s * 1000)
+            if self.wait_mode == "opc":
+                return self.query(self.CMD['opc']).strip() == "1"
+            if self.wait_mode == "srq":
+                # 先打开事件队列再发 *OPC，很快完成的操作发出的 SRQ 不会在打开之前丢失；
+                # 事件在底层会话上等待，等待超时不代表设置状态不明，不清空 ShadowSession 的设置记录
+                inst = getattr(self.sa, "inst", self.sa)
+                event = pyvisa.constants.EventType.service_request
+                mechanism = pyvisa.constants.EventMechanism.queue
+                inst.enable_event(event, mechanism)
+                try:
+                    inst.discard_events(event, mechanism)     # 丢弃之前残留的事件
+                    self.sa.write("*CLS;*OPC")
+                    try:
+                        inst.wait_on_event(event, int(timeout_s * 1000))
+                    except pyvisa.errors.VisaIOError as e:
+                        if e.error_code != pyvisa.constants.StatusCode.error_timeout:
+                            raise
+                        self.log(f"[频谱仪] 等待 {step} 完成超时（{timeout_s:g}s）")
+                        return False
+                finally:
+                    inst.disable_event(event, mechanism)
+                self.query("*ESR?")       # 读出即清除
+                return True
+            self.sa.write("*CLS;*OPC")
+            deadline = time.time() + timeout_s
+            while time.time() < deadline:
+                if int(float(self.query("*STB?"))) & 0x20:
+                    self.query("*ESR?")
+                    return True
+                time.sleep(poll_s)
+            self.log(f"[频谱仪] 等待 {step} 完成超时（{timeout_s:g}s）")
+            return False
+        except Exception as e:
+            self.log(f"[频谱仪] 等待 {step} 完成失败: {e}")
+            return False
+        finally:
+            try:
+                self.sa.timeout = old_timeout
+            except Exception:
+                pass
+
     def close(self):
         try:
             if self.sa:
@@ -199,7 +311,8 @@ class SingleFrequency:
                 self.rm.close()
 
     def write(self, scpi):
-        self.sa.write(scpi)
+        """返回是否实际发送（与频谱仪当前设置相同的设置命令会被跳过）"""
+        return self.sa.apply(scpi)
 
     def query(self, scpi):
         return self.sa.query(scpi)
@@ -223,12 +336,12 @@ class SingleFrequency:
             #time.sleep(0.5)
 
     def set_bw(self, rbw_hz, vbw_hz=None):
-        self.write(self.CMD['rbw'].format(hz=float(rbw_hz)))
-        time.sleep(0.5)
+        if self.write(self.CMD['rbw'].format(hz=float(rbw_hz))):
+            self.wait_complete('rbw')
         self.last_rbw_hz = float(rbw_hz)
         if vbw_hz is not None:
-            self.write(self.CMD['vbw'].format(hz=float(vbw_hz)))
-            time.sleep(0.5)
+            if self.write(self.CMD['vbw'].format(hz=float(vbw_hz))):
+                self.wait_complete('vbw')
             self.last_vbw_hz = float(vbw_hz)
         # 查询实际 RBW（容错：去单位）
         try:
@@ -249,8 +362,8 @@ class SingleFrequency:
             pass
 
     def set_trace_mode(self, max_hold=False):
-        self.write(self.CMD['trace_mode_max' if max_hold else 'trace_mode_write'])
-        time.sleep(0.5)
+        if self.write(self.CMD['trace_mode_max' if max_hold else 'trace_mode_write']):
+            self.wait_complete('trace_mode')
 
     def set_sweep_type(self, sweep_type: str):
         """
@@ -258,8 +371,8 @@ class SingleFrequency:
         sweep_type: 'SPD'（速度优先）或 'DYN'（动态范围优先）
         """
         try:
-            self.write(f":SWE:TYPE {sweep_type}")
-            time.sleep(0.2)
+            if self.write(f":SWE:TYPE {sweep_type}"):
+                self.wait_complete('sweep_type')
             self.log(f"[频谱仪] 设置扫描优先级为: {sweep_type}")
         except Exception as e:
             self.log(f"[错误] 设置扫描优先级失败: {e}")
@@ -269,8 +382,9 @@ class SingleFrequency:
         设置扫描时间（秒）
         """
         try:
-            self.write(f":SWE:TIME {sweep_time_s}")
-            time.sleep(0.2)
+            # 设置未变时不发送，也不必等待生效
+            if self.write(f":SWE:TIME {sweep_time_s}"):
+                self.wait_complete('sweep_time')
             #self.log(f"[频谱仪] 设置扫描时间为: {sweep_time_s}s")
         except Exception as e:
             self.log(f"[错误] 设置扫描时间失败: {e}")
@@ -321,25 +435,25 @@ class SingleFrequency:
         常见模式: POSitive, NEGative, SAMPle, RMS
         """
         try:
-            self.write(f":DETector:FUNCtion{trace} {mode}")
-            time.sleep(0.5)
+            if self.write(f":DETector:FUNCtion{trace} {mode}"):
+                self.wait_complete('detector')
             self.log(f"[频谱仪] 已设置检波器模式: {mode}")
         except Exception as e:
             self.log(f"[错误] 设置检波器失败: {e}")
 
+    def _query_freq_range(self):
+        f_start = float(self.query(self.CMD['q_start']))
+        f_stop = float(self.query(self.CMD['q_stop']))
+        # 起止频率是实际值：Span 被仪器限幅时更新记录，下次设置会重新发送
+        self.sa.observe('FREQ:SPAN', f_stop - f_start)
+        #self.log(f"[调试] 频率范围: {f_start/1e9:.3f} GHz ~ {f_stop/1e9:.3f} GHz")
+        return f_start, f_stop
+
     def get_trace_xy(self):
         try:
-            # 添加调试信息
-            raw_data = self.sa.query_ascii_values(self.CMD['trace_data'])
-            
-            y_dbm = np.array(raw_data) # 直接转为numpy数组
-
-            f_start = float(self.query(self.CMD['q_start']))
-            f_stop = float(self.query(self.CMD['q_stop']))
-            n = int(float(self.query(self.CMD['sweep_points?'])))
-            #self.log(f"[调试] 频率范围: {f_start/1e9:.3f} GHz ~ {f_stop/1e9:.3f} GHz, 点数: {n}")
-            
-            x = np.linspace(f_start, f_stop, num=n)
+            y_dbm = self.traces.read(self.CMD['trace_data'])
+            # 横轴按迹线点数生成，起止频率来自缓存
+            x = self.axis.get(len(y_dbm))
             return x, y_dbm
         except Exception as e:
             #self.log(f"[错误] 读取谱线失败：{e}")
@@ -360,14 +474,13 @@ class SingleFrequency:
         try:
             # 清除之前的 trace（容错取 CMD）
             self.write(self.CMD.get('trace_clear', ':TRACe:CLEAr\n'))
-            time.sleep(0.5)
+            self.wait_complete('trace_clear')
         except Exception:
             pass
         try:
             self.write(':INITiate:CONTinuous ON\n')
-            time.sleep(0.5)
-            # 小延时让仪器进入连续模式（可选）
-            self.query_opc(timeout=5000)
+            # 确认仪器已进入连续模式
+            self.wait_complete('continuous')
             self.log(f"[频谱仪] 开启连续扫: {label}")
         except Exception as e:
             self.log(f"[频谱仪] 开启连续扫失败: {e}")
@@ -377,8 +490,8 @@ class SingleFrequency:
         """关闭连续扫描（:INITiate:CONTinuous OFF）。"""
         try:
             self.write(':INITiate:CONTinuous OFF\n')
-            # 小延时保证状态切换完成
-            time.sleep(0.5)
+            # 确认状态切换完成
+            self.wait_complete('continuous')
             self.log(f"[频谱仪] 关闭连续扫: {label}")
         except Exception as e:
             self.log(f"[频谱仪] 关闭连续扫失败: {e}")
@@ -406,71 +519,30 @@ class SingleFrequency:
             return False
 
 class PeakDetector:
-    def __init__(self, thresh_db=1.0, prom_db=1.0, guard=10, log_func=print):
+    def __init__(self, thresh_db=1.0, prom_db=1.0, guard=10, log_func=print, baseline=None):
         self.thresh_db = float(thresh_db)
         self.prom_db = float(prom_db)
         self.guard = int(guard)
         self.log = log_func
+        self.baseline = baseline    # common/spectrum_baseline.SpanBaseline，按段记忆噪声基线
 
-    def find(self, x, y_dbm):
-        if len(y_dbm) < 2 * self.guard + 1:
-            return []
-        
-        # 改进的噪声估计：使用频谱边缘的噪声，更准确
-        # 取频谱前10%和后10%的数据点计算噪声平均值
-        edge_points = int(len(y_dbm) * 0.1)
-        if edge_points < 10:  # 确保至少有10个点用于噪声估计
-            edge_points = 10
-        
-        # 从频谱两端取点计算噪声
-        edge_data = np.concatenate([y_dbm[:edge_points], y_dbm[-edge_points:]])
-        noise = float(np.mean(edge_data))
-        
-        peaks = []
-        g = self.guard
-        
-        # 调试信息：显示噪声水平和检测参数
-        #self.log(f"[峰值检测] 噪声水平: {noise:.2f} dBm, 阈值: {self.thresh_db} dB, 显著性: {self.prom_db} dB")
-        
-        # 对于非常窄的峰，使用更小的保护带
-        # 如果保护带大于1，尝试使用更小的保护带进行局部最大值判断
-        narrow_guard = max(1, int(g / 2))  # 缩小保护带以检测更窄的峰
-        
-        for i in range(g, len(y_dbm) - g):
-            y = float(y_dbm[i])
-            
-            # 检查当前点是否是局部最大值（使用缩小的保护带）
-            is_local_max = True
-            for j in range(1, narrow_guard + 1):
-                if y <= float(y_dbm[i-j]) or y <= float(y_dbm[i+j]):
-                    is_local_max = False
-                    break
-            
-            # 计算左右邻域平均值（用于显著性判断）
-            # 使用稍大的邻域来更准确地评估局部背景
-            left_nb = y_dbm[max(0, i-g-2):i]
-            right_nb = y_dbm[i+1:min(len(y_dbm), i+g+3)]
-            left_mean = float(np.mean(left_nb)) if len(left_nb) else noise
-            right_mean = float(np.mean(right_nb)) if len(right_nb) else noise
-            
-            # 计算局部背景噪声
-            local_noise = min(left_mean, right_mean, noise)
-            
-            # 调试信息：显示每个可能的峰值点
-            # if y - noise >= 0.5:  # 只记录接近噪声阈值的点
-            #     self.log(f"[峰值调试] 频率: {x[i]/1e9:.3f} GHz, 功率: {y:.2f} dBm, "
-            #             f"局部最大值: {is_local_max}, 局部噪声: {local_noise:.2f} dBm, "
-            #             f"噪声差: {y - noise:.2f} dB, 显著性差: {y - max(left_mean, right_mean):.2f} dB")
-            
-            # 峰值检测条件
-            if (
-                is_local_max and  # 必须是局部最大值
-                (y - local_noise >= self.thresh_db) and  # 高于局部噪声阈值
-                (y - max(left_mean, right_mean) >= self.prom_db * 0.8)  # 稍微降低显著性要求
-            ):
-                peaks.append((float(x[i]), y, local_noise))
-                self.log(f"[峰值检测] 检测到峰值: {x[i]/1e9:.3f} GHz, 功率: {y:.2f} dBm")
+    def _find_static(self, x, y_dbm):
+        # 判据见 common/spectrum_peaks.py：噪声参考取频谱两端各 10% 的平均值，局部最大值用缩小一半的保护带，
+        # 左右邻域均值判断显著性；向量化计算，结果与原逐点循环相同
+        return find_peaks(x, y_dbm, self.thresh_db, self.prom_db, self.guard)
+
+    def find(self, x, y_dbm, span_key=None):
+        # 给出段标识且启用了基线时，与该段学到的噪声基线比较；基线学习期间仍用原判据
+        if self.baseline is not None and span_key is not None:
+            peaks = self.baseline.detect(span_key, x, y_dbm, fallback=self._find_static)
+        else:
+            peaks = self._find_static(x, y_dbm)
         
+        # 每次检测只汇总输出一行，避免候选峰逐条刷屏
+        if peaks:
+            shown = ", ".join(f"{f/1e9:.3f} GHz/{pw:.2f} dBm" for f, pw, _ in peaks[:5])
+            more = f" 等共 {len(peaks)} 个" if len(peaks) > 5 else ""
+            self.log(f"[峰值检测] 检测到峰值: {shown}{more}")
         return peaks
 
     def save_csv_png(self, x, y, peaks, out_dir, name, rbw_hz=1e3):
@@ -585,6 +657,8 @@ class SingleFrequencyGUI:
             '细扫邻域点数': 10,
             '细扫峰值阈值(dB)': 5.0,
             '细扫邻域显著性(dB)': 5.0,
+            '基线学习次数': 3,          # 每段前几次扫描用于学习噪声基线，0 表示不用基线
+            '基线显著性(σ)': 5.0,
         }
 
         self.params_1_5um = {
@@ -615,6 +689,8 @@ class SingleFrequencyGUI:
             '细扫邻域点数': 10,
             '细扫峰值阈值(dB)': 5.0,
             '细扫邻域显著性(dB)': 5.0,
+            '基线学习次数': 3,          # 每段前几次扫描用于学习噪声基线，0 表示不用基线
+            '基线显著性(σ)': 5.0,
         }
 
         self.test_type_var = tk.StringVar(value="1μm")
@@ -721,14 +797,11 @@ class SingleFrequencyGUI:
         logf.pack(fill=tk.BOTH, expand=True)
         self.log_box = tk.Text(logf)
         self.log_box.pack(fill=tk.BOTH, expand=True)
-
-    def _safe_log_append(self, text):
-        self.log_box.insert(tk.END, text)
-        self.log_box.see(tk.END)
+        self.log_bus = LogBus(self.log_box, "SingleFrequency")
 
     def log(self, msg):
-        t = time.strftime('[%H:%M:%S]')
-        self.root.after(0, lambda: self._safe_log_append(f"{t} {msg}\n"))
+        # 测量线程只追加到日志总线，由 Tk 线程按固定帧率批量显示并写入日志文件
+        self.log_bus.write(msg)
     
     def update_stats(self):
         """更新统计数据显示"""
@@ -901,10 +974,13 @@ class SingleFrequencyGUI:
         self.log(f"[测试] 测试时长: {test_duration_min:.1f} 分钟")
 
         sa = SingleFrequency(ip=str(p['IP地址']), timeout_s=60.0, log=self.log)
-
         # 上位机初始化
         lc = LaserController(exe_path=str(p['上位机路径']), window_title=str(p['窗口标题(正则)']), log_func=self.log)
 
+        lease = InstrumentLease([f"TCPIP::{p['IP地址']}::5025::SOCKET"], owner="单频", log_func=self.log)
+        if not lease.acquire(stop_check=self.stop_flag.is_set):
+            return
+        # 取得租约后立即进入 try，保证 finally 中释放
         try:
             # 连接设备
             lc.start_or_connect()
@@ -1062,6 +1138,14 @@ class SingleFrequencyGUI:
             temp_cur_thread = threading.Thread(target=temp_cur_control_thread, daemon=True)
             temp_cur_thread.start()
             
+            # 细扫峰值检测：每段记忆噪声基线，只报明显偏离基线的峰（学习期间用原判据）
+            learn_sweeps = int(float(p.get('基线学习次数', 3)))
+            baseline = None
+            if learn_sweeps > 0:
+                baseline = SpanBaseline(thresh_db=float(p['细扫峰值阈值(dB)']), guard=int(p['细扫邻域点数']),
+                                        z=float(p.get('基线显著性(σ)', 5.0)), warmup=learn_sweeps)
+            fine_peak = PeakDetector(thresh_db=float(p['细扫峰值阈值(dB)']), prom_db=float(p['细扫邻域显著性(dB)']), guard=int(p['细扫邻域点数']), log_func=self.log, baseline=baseline)
+
             # 主循环：持续进行细扫，从共享变量获取温度和电流值
             while not self.stop_flag.is_set():
                 # 检查测试时长是否已到
@@ -1090,8 +1174,7 @@ class SingleFrequencyGUI:
                     x, y = sa.get_trace_xy()
                     
                     # 细扫峰值检测
-                    fine_peak = PeakDetector(thresh_db=float(p['细扫峰值阈值(dB)']), prom_db=float(p['细扫邻域显著性(dB)']), guard=int(p['细扫邻域点数']), log_func=self.log)
-                    peaks = fine_peak.find(x, y)
+                    peaks = fine_peak.find(x, y, span_key=(round(center), round(span)))
                     if peaks:
                         # 获取实际温度和电流值
                         actual_temp = self.lc.get_temperature_c()
@@ -1165,6 +1248,7 @@ class SingleFrequencyGUI:
                     sa.close()
                 except Exception:
                     pass
+                lease.release()
 
     def run(self):
         self.root.mainloop()
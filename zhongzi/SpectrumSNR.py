@@ -8,6 +8,23 @@ from tkinter import messagebox, filedialog
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import ctypes
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease, tk_wait_check
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease, tk_wait_check
+    from common.scpi_trace import TraceReader
+    from common.instrument_profile import InstrumentProfile
+    from common.emulation import open_resource
+
+# 排队等待仪器租约的最长时间（秒）
+LEASE_WAIT_TIMEOUT_S = 600
+
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
     try:
@@ -29,6 +46,8 @@ class SpectrumSNR:
         self.log = log_func
         self.rm = None
         self.osa = None
+        self.traces = None
+        self.profile = None
 
     # --- 小工具：带重试的查询 ---
     def _query(self, cmd, retries=3, delay=0.4):
@@ -57,12 +76,15 @@ class SpectrumSNR:
         self.rm = pyvisa.ResourceManager()
         self.log("[光谱仪] 正在连接...")
         OSA_ADDR = f"TCPIP::{self.params['OSA_IP']}::INSTR"
-        self.osa = self.rm.open_resource(OSA_ADDR)
+        self.osa = open_resource(self.rm, OSA_ADDR)
         timeout_s = float(self.params.get("VISA_TIMEOUT_S", 20))  # 默认 20 秒
         self.osa.timeout = int(timeout_s * 1000)  # 转换为毫秒
         self.osa.write_termination = "\n"
         self.osa.read_termination = "\n"
         idn = self._query("*IDN?")
+        # 按型号记录可用的查询写法与迹线格式
+        self.profile = InstrumentProfile(idn, log=self.log)
+        self.traces = TraceReader(self.osa, idn, log=self.log, profile=self.profile)
         self.log(f"[光谱仪] 已连接：{idn}")
 
         # ✅ 做一次零点校准
@@ -95,7 +117,7 @@ class SpectrumSNR:
             # 先发设置命令（根据手册，使用完整的SCPI命令格式，包含Y1轨迹）
             self.osa.write(f":DISPlay:WINDow:TRACe:Y1:SCALe:RLEVel {ref_level}DBM")
 
-            # 尝试读回确认，尝试几个常见的查询命令
+            # 尝试读回确认，尝试几个常见的查询命令（档案中已记录可用的排在最前，都不可用的型号之后不再尝试）
             query_cmds = [
                 ":DISPlay:WINDow:TRACe:Y1:SCALe:RLEVel?",
                 ":DISPlay:WINDow:TRACe:Y:SCALe:RLEVel?",
@@ -103,18 +125,12 @@ class SpectrumSNR:
                 ":DISP:RLEVel?",
                 ":SENSe:POWer:REF?",
             ]
-            readback = None
-            for qc in query_cmds:
-                try:
-                    resp = self.osa.query(qc).strip()
-                    if resp != "":
-                        readback = (qc, resp)
-                        break
-                except Exception:
-                    continue
-
-            if readback:
-                self.log(f"[光谱仪] 参考电平设置为 {ref_level} dBm，读回: {readback[1]} (via {readback[0]})")
+            resp = self.profile.first_working("ref_level_query", query_cmds,
+                                              lambda qc: self.osa.query(qc).strip() or None,
+                                              remember_unsupported=True)
+
+            if resp is not None:
+                self.log(f"[光谱仪] 参考电平设置为 {ref_level} dBm，读回: {resp} (via {self.profile.get('ref_level_query')})")
             else:
                 self.log(f"[光谱仪] 参考电平设置命令已发送: {ref_level} dBm（未能读回确认，可能该指令在此型号上不可查询）")
         except Exception as e:
@@ -135,8 +151,8 @@ class SpectrumSNR:
         self._opc_wait("光谱扫描")
 
         # 2. 获取波长和功率数据
-        wl = np.array(self.osa.query_ascii_values(":TRACe:X? TRA")) * 1e9  # m -> nm
-        power = np.array(self.osa.query_ascii_values(":TRACe:Y? TRA"))     # dBm
+        wl = self.traces.read(":TRACe:X? TRA") * 1e9  # m -> nm
+        power = self.traces.read(":TRACe:Y? TRA")     # dBm
         self.log(f"[光谱仪] 获取到 {len(wl)} 个点")
 
         if len(wl) == 0 or len(power) == 0:
@@ -279,6 +295,9 @@ class SpectrumSNRGUI:
             "VISA_TIMEOUT_S": "VISA超时(s)",
         }
 
+        self.waiting_lease = False
+        self.stop_requested = False
+
         self.create_widgets()
 
     def log(self, msg):
@@ -321,6 +340,7 @@ class SpectrumSNRGUI:
         # 添加按钮
         tk.Button(inner_btn_frame, text="保存参数", command=self.update_params, bg="#f4a236", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
         tk.Button(inner_btn_frame, text="开始测试", command=self.start_test, bg="#4CAF50", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
+        tk.Button(inner_btn_frame, text="停止测试", command=self.stop_test, bg="#f44336", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
 
         # --- 日志窗口 --- (右侧) - 占据整个右侧区域
         log_frame = tk.LabelFrame(main_frame, text="运行日志", padx=5, pady=5)
@@ -352,7 +372,20 @@ class SpectrumSNRGUI:
         self.log(f"[参数] 中心波长：{self.params['CENTER']}nm | 扫描范围：{self.params['SPAN']}nm")
 
     def start_test(self):
+        if self.waiting_lease:
+            return
         osa = SpectrumSNR(self.params, self.log)
+        lease = InstrumentLease([f"TCPIP::{self.params['OSA_IP']}::INSTR"], owner="信噪比", log_func=self.log)
+        # 测试在 Tk 线程中运行：排队等待仪器期间保持界面响应，“停止测试”或超时即放弃
+        self.stop_requested = False
+        self.waiting_lease = True
+        try:
+            acquired = lease.acquire(timeout=LEASE_WAIT_TIMEOUT_S,
+                                     stop_check=tk_wait_check(self.root, lambda: self.stop_requested))
+        finally:
+            self.waiting_lease = False
+        if not acquired:
+            return
         try:
             osa.connect_instrument()
             osa.configure_osa()
@@ -366,6 +399,13 @@ class SpectrumSNRGUI:
             self.log(f"[错误] 测试失败：{e}")
         finally:
             osa.close()
+            lease.release()
+
+    def stop_test(self):
+        """取消排队等待仪器（测量开始后按原流程运行到结束）"""
+        if self.waiting_lease:
+            self.stop_requested = True
+            self.log("[停止] 已请求取消等待仪器")
 
     def show_image_popup(self, img_path, snr_value):
         win = tk.Toplevel(self.root)
@@ -9,6 +9,21 @@ from PIL import Image, ImageTk
 import shutil
 import ctypes
 
+import sys
+try:
+    from common.instrument_lease import InstrumentLease, tk_wait_check
+    from common.emulation import open_resource
+    from common.scpi_file import read_block_to_file
+except ImportError:
+    # 独立运行本文件时，把项目根目录加入搜索路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.instrument_lease import InstrumentLease, tk_wait_check
+    from common.emulation import open_resource
+    from common.scpi_file import read_block_to_file
+
+# 排队等待仪器租约的最长时间（秒）
+LEASE_WAIT_TIMEOUT_S = 600
+
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
     try:
@@ -36,11 +51,11 @@ class TimeDomain:
         self.rm = pyvisa.ResourceManager()
         self.log("[示波器] 正在连接...")
         scope_address = f"TCPIP0::{self.params['SCOPE_IP']}::inst0::INSTR"
-        self.scope = self.rm.open_resource(scope_address)
+        self.scope = open_resource(self.rm, scope_address)
         self.log(f"[示波器] 已连接：{self.scope.query('*IDN?').strip()}")
         self.log("[信号源] 正在连接...")
         gen_address = f"TCPIP0::{self.params['GEN_IP']}::inst0::INSTR"
-        self.gen = self.rm.open_resource(gen_address)
+        self.gen = open_resource(self.rm, gen_address)
         self.log(f"[信号源] 已连接：{self.gen.query('*IDN?').strip()}")
 
     def calculate_optimal_scale_factor(self, vpp):
@@ -180,10 +195,9 @@ class TimeDomain:
 
     def save_screenshot(self, filename="scope_screenshot.png"):
         self.scope.write(f":DISP:DATA? ON,OFF,PNG")
-        raw_img = self.scope.read_raw()[11:]
+        # 按块头长度读取（原实现按 #9 固定跳过 11 字节后整包保存），SOCKET 资源与仿真仪器同样适用
         screenshot_path = os.path.join(self.params["OUTPUT_DIR"], filename)
-        with open(screenshot_path, "wb") as f:
-            f.write(raw_img)
+        read_block_to_file(self.scope, screenshot_path)
         self.log(f"[保存] 截图已保存到 {screenshot_path}")
         return screenshot_path
 
@@ -240,6 +254,9 @@ class TimeDomainGUI:
             "GEN_OFFSET": "信号偏置(V)",
         }
 
+        self.waiting_lease = False
+        self.stop_requested = False
+
         self.create_widgets()
 
     def log(self, msg):
@@ -286,6 +303,7 @@ class TimeDomainGUI:
         # 添加按钮
         tk.Button(inner_btn_frame, text="保存参数", command=self.update_params, bg="#f4a236", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
         tk.Button(inner_btn_frame, text="开始测试", command=self.start_test, bg="#4CAF50", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
+        tk.Button(inner_btn_frame, text="停止测试", command=self.stop_test, bg="#f44336", fg="#FFFFFF", width=12).pack(side=tk.LEFT, padx=6)
 
         # --- 日志显示区域 - 右侧 --- 占据整个右侧区域
         log_frame = tk.LabelFrame(main_frame, text="运行日志", padx=5, pady=5)
@@ -316,7 +334,20 @@ class TimeDomainGUI:
         self.log("[设置] 参数已更新")
 
     def start_test(self):
+        if self.waiting_lease:
+            return
         td = TimeDomain(self.params, self.log)
+        lease = InstrumentLease([self.params['SCOPE_IP'], self.params['GEN_IP']], owner="时域", log_func=self.log)
+        # 测试在 Tk 线程中运行：排队等待仪器期间保持界面响应，“停止测试”或超时即放弃
+        self.stop_requested = False
+        self.waiting_lease = True
+        try:
+            acquired = lease.acquire(timeout=LEASE_WAIT_TIMEOUT_S,
+                                     stop_check=tk_wait_check(self.root, lambda: self.stop_requested))
+        finally:
+            self.waiting_lease = False
+        if not acquired:
+            return
         try:
             td.connect_instruments()
             # 保存原始频率参数
@@ -351,6 +382,13 @@ class TimeDomainGUI:
             self.log(f"[错误] 测试失败：{e}")
         finally:
             td.close()
+            lease.release()
+
+    def stop_test(self):
+        """取消排队等待仪器（测量开始后按原流程运行到结束）"""
+        if self.waiting_lease:
+            self.stop_requested = True
+            self.log("[停止] 已请求取消等待仪器")
 
     def show_image_popup(self, img_path):
         win = tk.Toplevel(self.root)